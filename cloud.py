@@ -5,6 +5,7 @@ Application entry point (main).
 This file initializes and displays the login screen before entering the main window.
 """
 import sys
+import multiprocessing
 import nest_asyncio
 nest_asyncio.apply()
 from PySide6.QtWidgets import QApplication, QMessageBox, QDialog
@@ -268,6 +269,8 @@ def main():
         return 1
 
 if __name__ == "__main__":
+    # Bắt buộc cho bản đóng gói PyInstaller: tiến trình con (optimizer) không chạy lại giao diện
+    multiprocessing.freeze_support()
     try:
         exit_code = main()
         sys.exit(exit_code)
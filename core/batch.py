@@ -0,0 +1,680 @@
+# -*- coding: utf-8 -*-
+"""
+Tính toán hàng loạt (vector hóa) cho nhiều thiết kế băng tải cùng lúc.
+
+Module này chạy cùng pipeline với CalculationStrategy.execute (CEMA, DIN 22101,
+ISO 5048, truyền động đơn/kép) nhưng trên các mảng NumPy thay vì từng đối tượng
+ConveyorParameters riêng lẻ; các công thức là chung với engine (core/formulas.py). Kết quả là một bảng dạng cột (CalculationResultTable)
+có cùng các trường số với CalculationResult; có thể lấy lại CalculationResult đầy
+đủ (cảnh báo, khuyến nghị, profile lực căng, bộ truyền động) cho bất kỳ hàng nào.
+
+Ghi chú:
+- Các hàm siêu việt (exp, tan, cos) được tính qua math trên các giá trị duy nhất
+  để kết quả trùng khớp từng bit với calculate() vô hướng.
+- Chẩn đoán/khuyến nghị chỉ được tạo khi gọi to_result(i); câu cảnh báo chỉ được định
+  dạng khi đọc warnings, profile lực căng khi đọc các thuộc tính biểu đồ.
+- Bộ truyền động là giai đoạn vô hướng còn lại: mỗi hàng vẫn gọi find_optimal_transmission,
+  nhưng các hàng cùng (vận tốc, puly, motor_rpm, hộp số, bộ xích) dùng chung một TransmissionGrid.
+- Những hàng mà calculate() vô hướng sẽ ném lỗi (ví dụ khoảng cách con lăn = 0
+  với truyền động kép) cho ra inf/nan thay vì làm hỏng cả lô.
+"""
+
+import math
+from dataclasses import fields
+from typing import Callable, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from .models import CalculationResult, ConveyorParameters, TransmissionSolution
+from .diagnostics import DiagCode, Diagnostic, format_messages
+from .route import RouteLoads, RouteSegment, resolve_route_params, route_drive_forces
+from .specs import G, ACTIVE_MATERIAL_DB, ACTIVE_BELT_SPECS, BELT_SPEED_SAFETY_MARGIN
+from .safety_factors import get_sf_warning_thresholds
+from .utils.trough_utils import parse_trough_label
+from .transmission_atlas import TransmissionAtlas, active_transmission_atlas
+from . import formulas
+from .engine import (
+    MOVING_PARTS_WEIGHT_TABLE,
+    IDLER_BASE_WEIGHTS_TABLE,
+    IDLER_SPACING_LC_TABLES,
+    PULLEY_ST_TABLE,
+    PULLEY_FABRIC_TABLES,
+    IDLER_SPACING_CARRY_TABLE,
+    TRANSITION_FACTOR_TABLES,
+    validate_sf_calculation_units,
+    find_optimal_transmission,
+    select_chain_specs,
+)
+
+_DEG2RAD = math.pi / 180.0
+
+
+# ---------------- Helpers ----------------
+
+def _unique_apply(fn: Callable, *columns: Sequence, dtype=float) -> np.ndarray:
+    """Áp dụng hàm vô hướng fn trên các bộ giá trị duy nhất của các cột rồi phân phối lại."""
+    cache = {}
+    out = []
+    for key in zip(*columns):
+        if key not in cache:
+            cache[key] = fn(*key)
+        out.append(cache[key])
+    if dtype is object:
+        arr = np.empty(len(out), dtype=object)
+        arr[:] = out
+        return arr
+    return np.array(out, dtype=dtype)
+
+
+def _exact(fn: Callable[[float], float], x: np.ndarray) -> np.ndarray:
+    """Tính hàm math (exp, tan, cos...) trên giá trị duy nhất để khớp bit với bản vô hướng."""
+    uniq, inverse = np.unique(x, return_inverse=True)
+    vals = np.array([fn(float(v)) for v in uniq], dtype=float)
+    return vals[inverse.reshape(-1)]
+
+
+def _speed_trough_deg(label) -> Optional[float]:
+    """Góc máng như CalculationStrategy.execute truyền cho calculate_belt_speed (None nếu lỗi)."""
+    try:
+        return float(label.split('°')[0]) if '°' in label else 20.0
+    except Exception:
+        return None
+
+
+# ---------------- Bảng tham số ----------------
+
+class ConveyorParameterTable:
+    """
+    Bảng tham số dạng cột: mỗi trường của ConveyorParameters là một cột.
+
+    Trường số/bool là mảng NumPy (None → nan), trường chuỗi là mảng object.
+    Có thể tạo từ danh sách ConveyorParameters hoặc từ một bộ tham số gốc cộng
+    với các cột biến thể (from_variants).
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray], rows: Optional[List[ConveyorParameters]] = None):
+        lengths = {len(v) for v in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"Các cột có độ dài khác nhau: {sorted(lengths)}")
+        self.columns = columns
+        self._rows = rows
+        self._n = lengths.pop() if lengths else 0
+
+    @staticmethod
+    def _column(values: list) -> np.ndarray:
+        if all(isinstance(v, bool) for v in values):
+            return np.array(values, dtype=bool)
+        if all(isinstance(v, (int, float)) and not isinstance(v, bool) or v is None for v in values):
+            if any(v is None for v in values) or any(isinstance(v, float) for v in values):
+                return np.array([np.nan if v is None else v for v in values], dtype=float)
+            return np.array(values, dtype=np.int64)
+        arr = np.empty(len(values), dtype=object)
+        for i, v in enumerate(values):  # từng ô: giá trị tuple (tuyến) không bị NumPy tách thành chiều mới
+            arr[i] = v
+        return arr
+
+    @classmethod
+    def from_params(cls, params_list: Sequence[ConveyorParameters]) -> 'ConveyorParameterTable':
+        rows = list(params_list)
+        columns = {f.name: cls._column([getattr(p, f.name) for p in rows]) for f in fields(ConveyorParameters)}
+        return cls(columns, rows)
+
+    @classmethod
+    def from_variants(cls, base: ConveyorParameters, **variant_columns) -> 'ConveyorParameterTable':
+        """
+        Tạo bảng từ tham số gốc và các cột biến thể cùng độ dài.
+
+        Ví dụ: ConveyorParameterTable.from_variants(p, B_mm=widths, Qt_tph=capacities)
+        """
+        n = {len(v) for v in variant_columns.values()}
+        if len(n) != 1:
+            raise ValueError("Các cột biến thể phải có cùng độ dài")
+        n = n.pop()
+        columns = {}
+        for f in fields(ConveyorParameters):
+            if f.name in variant_columns:
+                values = variant_columns[f.name]
+                kind = values.dtype.kind if isinstance(values, np.ndarray) else ""
+                if kind in ("b", "i", "u", "f"):
+                    # Mảng số: giữ nguyên kiểu như _column (bool, int64, float) mà không duyệt từng ô
+                    columns[f.name] = values.astype(bool if kind == "b" else float if kind == "f" else np.int64)
+                else:
+                    columns[f.name] = cls._column(list(np.asarray(values, dtype=object)))
+            else:
+                # Cột hằng: dựng từ một ô rồi lặp lại
+                columns[f.name] = np.repeat(cls._column([getattr(base, f.name)]), n)
+        return cls(columns)
+
+    def __len__(self) -> int:
+        return self._n
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def value(self, name: str, i: int):
+        """Giá trị Python gốc của một ô (nan → None cho các trường Optional)."""
+        if self._rows is not None:
+            return getattr(self._rows[i], name)
+        v = self.columns[name][i]
+        if isinstance(v, np.generic):
+            v = v.item()
+        if isinstance(v, float) and math.isnan(v):
+            return None
+        return v
+
+    def values(self, name: str) -> list:
+        """Cột name dưới dạng danh sách giá trị Python gốc."""
+        if self._rows is not None:
+            return [getattr(row, name) for row in self._rows]
+        col = self.columns[name]
+        values = col.tolist()
+        if col.dtype.kind == "f":
+            return [None if v != v else v for v in values]  # nan → None
+        return values
+
+    def row(self, i: int) -> ConveyorParameters:
+        """Trả về ConveyorParameters của hàng i."""
+        if self._rows is not None:
+            return self._rows[i]
+        return ConveyorParameters(**{f.name: self.value(f.name, i) for f in fields(ConveyorParameters)})
+
+
+# ---------------- Bảng kết quả ----------------
+
+# Các trường số của CalculationResult (được lưu thành cột)
+_NUMERIC_RESULT_FIELDS = [
+    f.name for f in fields(CalculationResult)
+    if isinstance(f.default, (int, float)) and not isinstance(f.default, bool)
+]
+_INT_RESULT_FIELDS = {f.name for f in fields(CalculationResult) if type(f.default) is int}
+
+
+class CalculationResultTable:
+    """
+    Bảng kết quả dạng cột với cùng các trường số như CalculationResult.
+
+    Truy cập cột: table.safety_factor hoặc table["safety_factor"].
+    Lấy kết quả đầy đủ của một hàng: table.to_result(i).
+    """
+
+    def __init__(self, params: ConveyorParameterTable, columns: Dict[str, np.ndarray], state: Dict[str, object]):
+        self.params = params
+        self.columns = columns
+        self._state = state
+
+    def __len__(self) -> int:
+        return len(self.params)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def __getattr__(self, name: str):
+        columns = self.__dict__.get("columns", {})
+        if name in columns:
+            return columns[name]
+        raise AttributeError(name)
+
+    @property
+    def transmission_solutions(self) -> List[Optional[TransmissionSolution]]:
+        return self._state["transmission"]
+
+    def diagnostics(self, i: int) -> List[Diagnostic]:
+        return self._messages(i)[0]
+
+    def warnings(self, i: int) -> List[str]:
+        return format_messages(self._messages(i)[0])
+
+    def recommendations(self, i: int) -> List[str]:
+        return self._messages(i)[1]
+
+    def to_result(self, i: int) -> CalculationResult:
+        """Dựng lại CalculationResult đầy đủ cho hàng i (giống calculate())."""
+        s = self._state
+        r = CalculationResult()
+        for name in _NUMERIC_RESULT_FIELDS:
+            v = self.columns[name][i].item()
+            setattr(r, name, int(v) if name in _INT_RESULT_FIELDS else v)
+
+        dia_A = r.drum_diameter_mm
+        r.drum_diameter_mm = round(dia_A)
+        r.required_ST = round(r.required_ST, 1)
+        r.required_fabric_rating = round(r.required_fabric_rating, 1)
+        r.pulley_diameter_A_mm = dia_A
+        r.idler_spacing_carry_m = float(s["spacing_carry"][i])
+        r.idler_spacing_return_m = float(s["spacing_return"][i])
+        r.drive_distribution_method = s["distribution_method"][i]
+        r.motor_rpm = self.params.value("motor_rpm", i)
+        if s["auto_speed_ok"][i]:
+            # calculate() chỉ gán trường này trong nhánh tự tính tốc độ
+            r.recommended_speed_mps = float(s["v_rec"][i])
+
+        diagnostics, recommendations = self._messages(i)
+        r.diagnostics = diagnostics
+        r.recommendations = recommendations
+
+        # Biểu đồ lực căng được dựng lười từ hai giá trị này (giống finalize_results)
+        L = float(self.params["L_m"][i])
+        r.profile_length_m = max(L, 1.0)
+        r.profile_t2_N = r.F21 if s["dual"][i] else r.T2
+        route = self.params.value("route", i)
+        r.route = route or ((RouteSegment(L, float(self.params["H_m"][i])),) if L > 0 else ())
+        if r.route:
+            (lc, lr), (Wc, Wr) = s["route_spacing"], s["idler_weights"]
+            r.route_loads = RouteLoads(float(s["route_coeff"][i]), r.belt_weight_kgpm, r.material_load_kgpm,
+                                       float(Wc[i]), float(Wr[i]), float(lc[i]), float(lr[i]))
+
+        ts = s["transmission"][i]
+        if ts is not None:
+            # Như attach_transmission: chế độ hộp số chỉ được gán khi có tìm bộ truyền động
+            r.transmission_solution = ts
+            r.gearbox_ratio_mode = self.params.value("gearbox_ratio_mode", i)
+            r.gearbox_ratio_user = self.params.value("gearbox_ratio_user", i)
+        return r
+
+    def to_results(self) -> List[CalculationResult]:
+        return [self.to_result(i) for i in range(len(self))]
+
+    def _messages(self, i: int):
+        """Tạo chẩn đoán/khuyến nghị của hàng i theo đúng thứ tự trong execute()."""
+        s = self._state
+        c = self.columns
+        pv = self.params.value
+        warnings: List[Diagnostic] = []
+        recs: List[str] = []
+
+        B_mm = pv("B_mm", i)
+        if s["auto_speed_ok"][i]:
+            v_req, v_rec, v_max = float(s["v_req"][i]), float(s["v_rec"][i]), float(s["v_max"][i])
+            if v_req > v_rec * (1 + BELT_SPEED_SAFETY_MARGIN):
+                warnings.append(Diagnostic(DiagCode.SPEED_ABOVE_RECOMMENDED, (v_req, v_rec, BELT_SPEED_SAFETY_MARGIN*100)))
+            if v_req > v_max:
+                warnings.append(Diagnostic(DiagCode.SPEED_ABOVE_MAX, (v_req, v_max, B_mm)))
+        elif s["user_speed"][i]:
+            V, v_max = float(c["belt_speed_mps"][i]), float(s["v_max"][i])
+            if v_max > 0 and V > v_max:
+                warnings.append(Diagnostic(DiagCode.USER_SPEED_ABOVE_MAX, (V, v_max, B_mm)))
+
+        Qt = float(s["Qt"][i])
+        Qt_calc = float(c["Qt_calc_tph"][i])
+        util = float(c["capacity_utilization"][i])
+        if util > 105.0:
+            warnings.append(Diagnostic(DiagCode.CAPACITY_EXCEEDED, (
+                Qt, Qt_calc, B_mm, float(s['trough_deg'][i]), float(s['surcharge_deg'][i]))))
+        elif util > 95.0:
+            warnings.append(Diagnostic(DiagCode.CAPACITY_NEAR_LIMIT, (util,)))
+
+        if s["geo_limited"][i]:
+            warnings.append(Diagnostic(DiagCode.CAPACITY_LIMITED_BY_SECTION, (
+                float(s['q_eff'][i]) * float(s['V_clamped'][i]) * 3.6 / 1000.0, Qt)))
+
+        standard = pv("calculation_standard", i)
+        route = pv("route", i)
+        if s["dual"][i]:
+            if standard != "CEMA":
+                warnings.append(Diagnostic(DiagCode.DUAL_DRIVE_CEMA_ONLY, (standard,)))
+            if route:
+                warnings.append(Diagnostic(DiagCode.ROUTE_DUAL_DRIVE_NOMINAL, (len(route),)))
+        else:
+            if (standard or "").strip() == "ISO 5048":
+                warnings.append(Diagnostic(DiagCode.ISO_LOWER_FRICTION))
+            if s["route_slip"][i]:
+                warnings.append(Diagnostic(DiagCode.ROUTE_CURVE_SLIP, (float(s["e_ratio"][i]),)))
+
+        belt_type = pv("belt_type", i)
+        sf = float(c["safety_factor"][i])
+        warning_yellow, warning_red = get_sf_warning_thresholds(belt_type)
+        if sf < warning_red:
+            warnings.append(Diagnostic(DiagCode.SF_CRITICAL, (sf, warning_red)))
+            if "Dây thép" not in (belt_type or ""):
+                recs.append("Cân nhắc tăng bề rộng hoặc chọn đai bền hơn (ST).")
+            recs.append("KIỂM TRA NGAY: Thiết kế có thể không an toàn!")
+        elif sf < warning_yellow:
+            warnings.append(Diagnostic(DiagCode.SF_LOW, (sf, warning_yellow)))
+            recs.append("Cân nhắc kiểm tra lại thiết kế hoặc chọn đai bền hơn.")
+
+        strength_util = float(c["belt_strength_utilization"][i])
+        if strength_util > 80.0:
+            warnings.append(Diagnostic(DiagCode.BELT_UTILIZATION_HIGH, (strength_util,)))
+            recs.append("Cân nhắc tăng bề rộng băng hoặc chọn đai bền hơn.")
+        elif strength_util < 20.0:
+            recs.append("Cân nhắc giảm bề rộng băng để tiết kiệm chi phí.")
+
+        try:
+            # finalize_results chạy trước khi tra SF thiết kế nên sf_design lúc này = 0.0
+            warnings.extend(validate_sf_calculation_units(
+                max_tension_N=float(c["max_tension"][i]),
+                belt_width_mm=B_mm,
+                T_allow_Npm=s["T_allow"][i],
+                sf_design=0.0,
+                sf_actual=sf
+            ))
+        except Exception:
+            pass
+        return warnings, recs
+
+
+# ---------------- Pipeline vector hóa ----------------
+
+def calculate_batch(params_list: Union[Sequence[ConveyorParameters], ConveyorParameterTable],
+                    with_transmission: bool = True,
+                    friction_factor: Union[None, float, np.ndarray] = None) -> CalculationResultTable:
+    """
+    Chạy pipeline của CalculationStrategy.execute cho nhiều thiết kế cùng lúc.
+
+    Args:
+        params_list: Danh sách ConveyorParameters hoặc ConveyorParameterTable
+        with_transmission: Có tìm bộ truyền động (find_optimal_transmission) cho từng hàng không
+        friction_factor: Hệ số ma sát f thay cho hằng số của tiêu chuẩn (số hoặc mảng theo hàng;
+            None = 0.022 cho CEMA/ISO 5048, 0.025 cho DIN 22101 như calculate())
+
+    Returns:
+        CalculationResultTable với các cột giống các trường số của CalculationResult
+    """
+    t = params_list if isinstance(params_list, ConveyorParameterTable) else ConveyorParameterTable.from_params(params_list)
+    if any(t["route"]):
+        # Tuyến nhiều đoạn: L_m/H_m của các hàng có tuyến là tổng chiều dài/chênh cao của tuyến
+        t = ConveyorParameterTable.from_params([resolve_route_params(t.row(i)) for i in range(len(t))])
+    n = len(t)
+    cols = {name: np.zeros(n, dtype=float) for name in _NUMERIC_RESULT_FIELDS}
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        state = _run_pipeline(t, cols, friction_factor)
+    state["transmission"] = _solve_transmissions(t, cols) if with_transmission else [None] * n
+    cols["motor_rpm"] = t["motor_rpm"].astype(float)
+    if with_transmission:
+        cols["gearbox_ratio_user"] = t["gearbox_ratio_user"].astype(float)
+    return CalculationResultTable(t, cols, state)
+
+
+def _run_pipeline(t: ConveyorParameterTable, c: Dict[str, np.ndarray], friction_factor=None) -> Dict[str, object]:
+    n = len(t)
+    B = t["B_mm"].astype(float)
+    L = t["L_m"].astype(float)
+    H = t["H_m"].astype(float)
+    density = t["density_tpm3"].astype(float)
+    Qt_in = t["Qt_tph"].astype(float)
+    V_in = t["V_mps"].astype(float) if t["V_mps"].dtype != object else np.array(
+        [np.nan if v is None else float(v) for v in t["V_mps"]], dtype=float)
+    belt_type = t["belt_type"]
+    standard = t["calculation_standard"]
+    drive_type = t["drive_type"]
+    flags = (t.values("is_abrasive"), t.values("is_corrosive"), t.values("is_dusty"))
+
+    from .optimize import optimize_speed, get_max_speed_from_table
+
+    def _max_speed(width, abrasive, corrosive, dusty):
+        return get_max_speed_from_table(width, {'is_abrasive': abrasive, 'is_corrosive': corrosive, 'is_dusty': dusty})
+
+    # --- Tốc độ băng (tự động hoặc người dùng nhập) ---
+    auto = np.isnan(V_in) | (V_in <= 0)
+    v_rec = _unique_apply(optimize_speed, t["material"], t.values("particle_size_mm"), t.values("B_mm"))
+    v_max = _unique_apply(_max_speed, t.values("B_mm"), *flags)
+
+    speed_trough = _unique_apply(_speed_trough_deg, t["trough_angle_label"], dtype=object)
+    speed_trough_ok = np.array([x is not None for x in speed_trough], dtype=bool)
+    speed_trough = np.array([0.0 if x is None else x for x in speed_trough], dtype=float)
+    surcharge_raw = t["surcharge_angle_deg"].astype(float)
+    Bm = B / 1000.0
+    A_speed = formulas.cross_section_area_m2(Bm, _exact(math.tan, surcharge_raw * _DEG2RAD),
+                                             _exact(math.cos, speed_trough * _DEG2RAD))
+    denom = (density * 1000.0) * A_speed
+    v_req = (Qt_in * 1000.0 / 3600.0) / denom
+    auto_ok = auto & speed_trough_ok & (denom != 0) & np.isfinite(v_req)
+    auto_fail = auto & ~auto_ok
+    user_speed = ~auto
+
+    V = np.where(auto_ok, v_req, np.where(auto_fail, 2.0, V_in))
+    V = np.where(V <= 0, 2.0, V)
+    c["belt_speed_mps"][:] = V
+    c["belt_speed_required_mps"][:] = np.where(auto_ok, v_req, 0.0)
+    c["belt_speed_recommended_mps"][:] = np.where(user_speed, v_rec, 0.0)
+    c["max_speed_allowed_mps"][:] = np.where(auto_fail, 0.0, v_max)
+    c["belt_width_selected_mm"][:] = np.where(auto_fail, np.maximum(B, 400), B)
+
+    Qt = np.where(Qt_in <= 0, 100.0, Qt_in)
+
+    # --- Trọng lượng ---
+    c["belt_weight_kgpm"][:] = _unique_apply(formulas.belt_weight_kgpm, t.values("B_mm"), t.values("belt_thickness_mm"),
+                                             belt_type)
+    moving_parts = MOVING_PARTS_WEIGHT_TABLE.nearest_many(B)
+    c["moving_parts_weight_kgpm"][:] = moving_parts
+
+    # --- Hình học & năng lực tiết diện ---
+    trough_deg = _unique_apply(parse_trough_label, t["trough_angle_label"])
+    surcharge_deg = np.where((surcharge_raw == 0) | np.isnan(surcharge_raw), 20.0, surcharge_raw)
+    A_geo = formulas.cross_section_area_m2(Bm, _exact(math.tan, surcharge_deg * _DEG2RAD),
+                                           _exact(math.cos, trough_deg * _DEG2RAD))
+    Qt_calc = formulas.geometric_capacity_tph(A_geo, V, density)
+    A = np.where(auto_ok & (A_speed != 0), A_speed, A_geo)
+    c["cross_section_area_m2"][:] = A
+    c["Qt_calc_tph"][:] = Qt_calc
+    c["capacity_utilization"][:] = 100.0 * Qt / np.maximum(Qt_calc, 1e-6)
+
+    # --- Giới hạn tải theo tiết diện ---
+    V_cl = np.maximum(0.05, V)
+    q_from_Qt, q_from_geo, q_eff = formulas.section_limited_load(Qt, V_cl, A, density)
+    load = np.where(q_from_Qt > 0, q_from_Qt, q_from_geo)
+    load = np.where(load <= 0, np.maximum(np.maximum(q_from_Qt, q_from_geo), 0.1), load)
+    belt_w = c["belt_weight_kgpm"]
+    c["material_load_kgpm"][:] = load
+    c["total_load_kgpm"][:] = load + belt_w + moving_parts
+    c["mass_flow_rate"][:] = load * V_cl
+    c["Qt_effective_tph"][:] = c["mass_flow_rate"] * 3.6 / 1000.0
+
+    # --- Lực cản & công suất theo tiêu chuẩn ---
+    std = np.array([(s or "").strip() for s in standard], dtype=object)
+    is_din = std == "DIN 22101"
+    is_iso = std == "ISO 5048"
+    is_dual = drive_type == "Dual drive"
+    idler_weights = IDLER_BASE_WEIGHTS_TABLE.nearest_many(B)
+    Wc = idler_weights[:, 0]
+    Wr = idler_weights[:, 1]
+    carry = t["carrying_idler_spacing_m"].astype(float)
+    ret = t["return_idler_spacing_m"].astype(float)
+
+    # CEMA
+    f_cema, lo = 0.022, 66.0
+    if friction_factor is not None:
+        f_cema = np.broadcast_to(np.asarray(friction_factor, dtype=float), (n,))
+    P1, P2, P3 = formulas.cema_power_kw(f_cema, L, lo, moving_parts, load, H, V)
+    cema_friction, cema_lift = formulas.cema_forces(P1, P2, P3, V)
+
+    # DIN / ISO
+    lc_default = np.where(Qt > 1600, IDLER_SPACING_LC_TABLES["high"].nearest_many(B), IDLER_SPACING_LC_TABLES["low"].nearest_many(B))
+    lc_used = np.maximum(0.5, np.where((carry == 0) | np.isnan(carry), lc_default, carry))
+    lr_used = np.maximum(1.0, np.where((ret == 0) | np.isnan(ret), 3.0, ret))
+    f_din = np.where(is_iso, 0.022, 0.025) if friction_factor is None else f_cema
+    din_friction, din_lift = formulas.din_resistances(f_din, L, H, belt_w, load, Wc, Wr, lc_used, lr_used)
+
+    din_like = is_din | is_iso
+    single_friction = np.where(din_like, din_friction, cema_friction)
+    single_lift = np.where(din_like, din_lift, cema_lift)
+    single_power = np.where(din_like, formulas.resistance_power_kw(din_friction, din_lift, V), P1 + P2 + P3)
+    cema_single = ~din_like & ~is_dual
+    c["P1_kw"][:] = np.where(cema_single, P1, 0.0)
+    c["P2_kw"][:] = np.where(cema_single, P2, 0.0)
+    c["P3_kw"][:] = np.where(cema_single, P3, 0.0)
+
+    contact = _unique_apply(formulas.drive_contact, t.values("wrap_deg"), t.values("mu_pulley"), drive_type, dtype=object)
+    wrap_eff = np.array([x[0] for x in contact], dtype=float)
+    mu_eff = np.array([x[1] for x in contact], dtype=float)
+    theta = wrap_eff * _DEG2RAD
+    e_ratio = _exact(math.exp, mu_eff * theta)
+
+    # Tuyến: hệ số ma sát hiệu chỉnh theo lực ma sát của tiêu chuẩn (giống CalculationStrategy._attach_route)
+    mu_raw = t["mu_pulley"].astype(float)
+    theta_raw = t["wrap_deg"].astype(float) * _DEG2RAD
+    Fc, Fr = formulas.dual_drive_resistances_kgf(f_cema, L, lo, H, belt_w, load, Wc, Wr, carry, ret)
+    route_w = 2.0 * belt_w + Wc / lc_used + Wr / lr_used + load
+    route_denom = G * L * route_w
+    route_friction = np.where(is_dual, (Fc + Fr - H * load) * G, single_friction)
+    route_coeff = np.where(route_denom > 0, route_friction / route_denom, 0.0)
+    routes = t["route"]
+    route_slip = np.zeros(n, dtype=bool)
+    has_route = np.array([bool(rt) for rt in routes], dtype=bool)
+    for i in np.flatnonzero(has_route & ~is_dual):
+        loads = RouteLoads(float(route_coeff[i]), float(belt_w[i]), float(load[i]), float(Wc[i]), float(Wr[i]),
+                           float(lc_used[i]), float(lr_used[i]))
+        friction_i, lift_i, gripped = route_drive_forces(routes[i], loads, float(e_ratio[i]))
+        route_slip[i] = not gripped
+        nominal = single_friction[i]
+        single_friction[i] = friction_i
+        if cema_single[i]:
+            scale = friction_i / nominal if nominal else 0.0
+            c["P1_kw"][i] *= scale
+            c["P2_kw"][i] *= scale
+            c["P3_kw"][i] = lift_i * V[i] / 1000.0
+            single_power[i] = c["P1_kw"][i] + c["P2_kw"][i] + c["P3_kw"][i]
+            single_lift[i] = lift_i if c["P3_kw"][i] > 0 else 0.0
+        else:
+            single_power[i] = formulas.resistance_power_kw(friction_i, lift_i, V[i])
+            single_lift[i] = lift_i
+
+    # Truyền động đơn: lực căng theo Euler–Eytelwein
+    eff = single_friction + single_lift
+    eff = np.where(eff <= 0, formulas.fallback_effective_tension(load, L, H), eff)
+    T1, T2 = formulas.euler_eytelwein(eff, e_ratio)
+
+    # Truyền động kép (Mục 6.2, PDF)
+    Fp = Fc + Fr
+    e1 = _exact(math.exp, mu_raw * theta_raw)
+    e_sum = _exact(math.exp, mu_raw * theta_raw + mu_raw * theta_raw)
+    Fp1, Fp2, F21, F22, method = formulas.dual_drive_distribution(Fp, Fr, e1, e_sum, t["dual_drive_ratio"])
+
+    d = is_dual
+    c["Fc_drive"][:] = np.where(d, Fc, 0.0)
+    c["Fr_drive"][:] = np.where(d, Fr, 0.0)
+    c["Fp1"][:] = np.where(d, Fp1, 0.0)
+    c["Fp2"][:] = np.where(d, Fp2, 0.0)
+    c["F21"][:] = np.where(d, F21 * G, 0.0)
+    c["F22"][:] = np.where(d, F22 * G, 0.0)
+    c["F11"][:] = np.where(d, (Fp1 + F21) * G, 0.0)
+    c["F12"][:] = np.where(d, (Fp2 + F22) * G, 0.0)
+    c["effective_tension"][:] = np.where(d, Fp * G, eff)
+    c["T1"][:] = np.where(d, 0.0, T1)
+    c["T2"][:] = np.where(d, 0.0, T2)
+    c["wrap_angle_rad"][:] = np.where(d, 0.0, theta)
+    max_tension = np.where(d, c["F11"], T1)
+    required_power = np.where(d, Fp * G * V / 1000.0, single_power)
+    c["friction_force"][:] = np.where(d, np.where(H == 0, (Fc + Fr) * G, Fc * G), single_friction)
+    c["lift_force"][:] = np.where(d, np.where(H == 0, 0, (H * (belt_w + load)) * G), single_lift)
+
+    # --- Finalize: công suất động cơ, hệ số an toàn ---
+    eta_m = np.maximum(0.5, _or_default(t["motor_efficiency"], 0.95))
+    eta_g = np.maximum(0.5, _or_default(t["gearbox_efficiency"], 0.96))
+    Kt = np.maximum(1.0, _or_default(t["Kt_start"], 1.25))
+    required_power = np.where(required_power <= 0, formulas.fallback_power_kw(load, V_cl), required_power)
+    c["required_power_kw"][:] = required_power
+    c["motor_power_kw"][:], c["drive_efficiency_percent"][:] = formulas.drive_power(required_power, eta_m, eta_g, Kt)
+    c["efficiency"][:] = c["drive_efficiency_percent"]
+
+    belt_specs = [ACTIVE_BELT_SPECS.get(bt, {}) or {} for bt in belt_type]
+    T_allow_obj = _unique_apply(lambda bt: formulas.allowable_tension_npm(bt, ACTIVE_BELT_SPECS.get(bt, {}) or {}),
+                                belt_type, dtype=object)
+    T_allow = T_allow_obj.astype(float)
+    belt_capacity = (B / 1000.0) * T_allow
+    max_tension = np.where(max_tension <= 0, (required_power * 1000.0) / V_cl, max_tension)
+    c["max_tension"][:] = max_tension
+    c["safety_factor"][:], c["belt_strength_utilization"][:] = formulas.belt_strength(max_tension, belt_capacity)
+
+    # --- Chi phí & khối lượng ---
+    cost_per_m2 = np.array([bs.get("cost_per_m2", 50.0) for bs in belt_specs], dtype=float)
+    lc_cost = np.maximum(0.5, np.where((carry == 0) | np.isnan(carry), 1.2, carry))
+    lr_cost = np.maximum(1.0, np.where((ret == 0) | np.isnan(ret), 3.0, ret))
+    # drum_diameter_mm chưa được tính ở bước này trong execute() nên bằng 0
+    costs = formulas.capital_and_operating_costs(B, L, cost_per_m2, lc_cost, lr_cost, c["motor_power_kw"], np.zeros(n),
+                                                 required_power, t["operating_hours"].astype(float), belt_w, Wc, Wr)
+    for name, value in costs.items():
+        c[name][:] = value
+
+    # --- Puly & con lăn ---
+    is_steel = _unique_apply(formulas.is_steel_cord, belt_type, dtype=bool)
+    sf_design = _unique_apply(formulas.design_safety_factor, belt_type, t.values("material_group"),
+                              t.values("lump_size_ge_30mm"), t.values("duty_cycle_minutes"))
+    c["sf_design"][:] = sf_design
+    st_no, ft_req = formulas.required_belt_rating(max_tension, sf_design, B)
+    c["required_ST"][:] = np.where(is_steel, st_no, 0.0)
+    c["required_fabric_rating"][:] = np.where(is_steel, 0.0, ft_req)
+
+    # Cấp ST nhỏ nhất >= yêu cầu; không có cấp nào đủ lớn thì lấy cấp đầu bảng (như execute())
+    dia_steel = PULLEY_ST_TABLE.ceil_many(st_no, default=PULLEY_ST_TABLE.values[0])
+
+    strength_class = np.array([bs.get("strength", 400) for bs in belt_specs], dtype=float)
+    load_category = formulas.pulley_load_category(c["belt_strength_utilization"])
+    dia_fabric = np.empty(n, dtype=float)
+    for cat, table in PULLEY_FABRIC_TABLES.items():
+        mask = load_category == cat
+        dia_fabric[mask] = table.nearest_many(strength_class[mask])
+    # drum_diameter_mm giữ dia_A chưa làm tròn; to_result() làm tròn như execute()
+    c["drum_diameter_mm"][:] = np.where(is_steel, dia_steel, dia_fabric)
+
+    density_kgm3 = density * 1000
+    spacing_carry = IDLER_SPACING_CARRY_TABLE.nearest_many(B, density_kgm3)
+    spacing_return = np.where(B >= 2000, 2.4, 3.0)
+
+    trough_transition = _unique_apply(lambda lbl: parse_trough_label(lbl, 20.0), t["trough_angle_label"])
+    transition = np.empty(n, dtype=float)
+    for cat, mask in (("steel", is_steel), ("fabric", ~is_steel)):
+        if not mask.any():
+            continue
+        transition[mask] = TRANSITION_FACTOR_TABLES[cat].nearest_many(trough_transition[mask], B[mask])
+    c["transition_distance_m"][:] = transition * (B / 1000.0)
+
+    return {
+        "auto_speed_ok": auto_ok,
+        "user_speed": user_speed,
+        "v_req": v_req,
+        "v_rec": v_rec,
+        "v_max": v_max,
+        "Qt": Qt,
+        "trough_deg": trough_deg,
+        "surcharge_deg": surcharge_deg,
+        "geo_limited": q_eff < q_from_Qt - 1e-6,
+        "q_eff": q_eff,
+        "V_clamped": V_cl,
+        "dual": is_dual,
+        "distribution_method": np.where(is_dual, method, ""),
+        "T_allow": T_allow_obj,
+        "spacing_carry": spacing_carry,
+        "spacing_return": spacing_return,
+        "route_coeff": route_coeff,
+        "route_spacing": (lc_used, lr_used),
+        "idler_weights": (Wc, Wr),
+        "route_slip": route_slip,
+        "e_ratio": e_ratio,
+    }
+
+
+def _or_default(col: np.ndarray, default: float) -> np.ndarray:
+    """Tương đương float(x or default) cho cả cột."""
+    x = col.astype(float)
+    return np.where((x == 0) | np.isnan(x), default, x)
+
+
+def _solve_transmissions(t: ConveyorParameterTable, c: Dict[str, np.ndarray]) -> List[Optional[TransmissionSolution]]:
+    """
+    Tìm bộ truyền động cho từng hàng giống calculate() (dùng tốc độ băng đã chốt).
+
+    Đây là giai đoạn vô hướng của lô: nghiệm phụ thuộc lực kéo của từng hàng nên mỗi hàng vẫn là một
+    lần gọi find_optimal_transmission. Các hàng cùng khóa lưới dùng chung một TransmissionGrid qua atlas
+    (atlas đang bật, hoặc atlas riêng của lô), nên từ lần thứ hai chỉ còn một lần quét lọc bền.
+    """
+    from .specs import ACTIVE_CHAIN_SPECS
+
+    atlas = active_transmission_atlas() or TransmissionAtlas(capacity=max(len(t), 1))
+    solutions = []
+    for i in range(len(t)):
+        # Giống execute(): tham số đã được chốt tốc độ và lưu lượng mặc định
+        Qt_tph = t.value("Qt_tph", i)
+        p = t.row(i).replace(V_mps=float(c["belt_speed_mps"][i]), Qt_tph=100.0 if Qt_tph <= 0 else Qt_tph)
+        try:
+            solution = find_optimal_transmission(
+                calculation_params=p,
+                chain_specs=select_chain_specs(p, ACTIVE_CHAIN_SPECS),
+                pulley_diameter=round(float(c["drum_diameter_mm"][i])),
+                required_power_kw=float(c["required_power_kw"][i]),
+                atlas=atlas
+            )
+        except Exception:
+            solution = None
+        solutions.append(solution or TransmissionSolution())
+    return solutions
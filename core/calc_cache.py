@@ -0,0 +1,338 @@
+# -*- coding: utf-8 -*-
+"""
+Cache kết quả calculate() theo nội dung (content-addressed), hai tầng.
+
+Khóa là sha1 của toàn bộ giá trị ConveyorParameters, with_transmission, phiên bản engine và dấu vân
+tay của CSDL đang dùng (vật liệu, băng, xích và nội dung bảng tra tốc độ SPEED_TABLE_REGISTRY). Vì
+vậy cùng một bộ tham số trên cùng CSDL luôn cho cùng khóa, kể cả giữa các lần chạy ứng dụng; khi
+load_database thay CSDL (bump_catalog_version) hoặc file bảng tra tốc độ bị sửa, dấu vân tay đổi,
+các kết quả cũ không còn được tra tới và tầng bộ nhớ được xóa.
+
+- Tầng bộ nhớ: LRU theo tổng số byte của kết quả đã pickle.
+- Tầng đĩa: <get_user_data_dir()>/cache/calculations/<2 ký tự đầu>/<khóa>.pkl, ghi nguyên tử;
+  khi vượt dung lượng, xóa các file lâu không dùng nhất (theo mtime, được cập nhật mỗi lần đọc).
+
+Kết quả được lưu dạng pickle nên mỗi lần tra trả về một bản sao mới (người gọi sửa warnings...
+không ảnh hưởng cache). Lỗi đọc/ghi đĩa chỉ được ghi trace, không làm hỏng lần tính.
+
+    result = cached_calculate(params)              # hoặc biến môi trường CONVEYOR_CALC_CACHE=0 để tắt
+    configure_calculation_cache(persist=False)     # chỉ dùng tầng bộ nhớ
+"""
+import dataclasses
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from . import specs, speed_table
+from .models import ConveyorParameters, CalculationResult
+from .tracing import get_tracer
+
+_trace = get_tracer(__name__)
+
+# Tăng khi cấu trúc CalculationResult/khóa thay đổi để bỏ qua các file cache cũ
+CACHE_FORMAT = 4
+DEFAULT_MEMORY_BYTES = 32 * 1024 * 1024
+DEFAULT_DISK_BYTES = 256 * 1024 * 1024
+
+_PARAM_FIELDS = tuple(f.name for f in dataclasses.fields(ConveyorParameters))
+
+# (catalog_version, token của ACTIVE_CHAIN_SPECS, sha1 bảng tra tốc độ) -> dấu vân tay
+_fingerprint_state: tuple = (None, "")
+
+
+def catalog_fingerprint() -> str:
+    """
+    Dấu vân tay (sha1) của CSDL vật liệu, băng, xích và bảng tra tốc độ đang dùng.
+
+    Chỉ băm lại khi catalog_version(), nội dung ACTIVE_CHAIN_SPECS hoặc file bảng tra tốc độ thay đổi.
+    """
+    global _fingerprint_state
+    chains = specs.ACTIVE_CHAIN_SPECS
+    state = (specs.catalog_version(), getattr(chains, "cache_key", None), speed_table.SPEED_TABLE_REGISTRY.cache_key)
+    if state[1] is None or state != _fingerprint_state[0]:
+        payload = repr((
+            sorted(specs.ACTIVE_MATERIAL_DB.items()),
+            sorted(specs.ACTIVE_BELT_SPECS.items()),
+            list(chains),
+            state[2],
+        ))
+        _fingerprint_state = (state, hashlib.sha1(payload.encode("utf-8")).hexdigest())
+    return _fingerprint_state[1]
+
+
+def calculation_key(p: ConveyorParameters, with_transmission: bool = True, track_stages: bool = False) -> str:
+    """
+    Khóa cache của một lần tính.
+
+    Args:
+        p: Tham số băng tải
+        with_transmission: Có tìm bộ truyền động không
+        track_stages: Kết quả có kèm trạng thái từng giai đoạn (calculate(..., track_stages=True))
+
+    Returns:
+        Chuỗi hex sha1
+    """
+    values = tuple(getattr(p, name) for name in _PARAM_FIELDS)
+    payload = repr((CACHE_FORMAT, specs.VERSION, bool(with_transmission), bool(track_stages), values,
+                    catalog_fingerprint()))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class CalculationCache:
+    """Cache hai tầng (bộ nhớ LRU + đĩa) cho CalculationResult theo khóa calculation_key()."""
+
+    def __init__(self, directory: Optional[str] = None, memory_bytes: int = DEFAULT_MEMORY_BYTES,
+                 disk_bytes: int = DEFAULT_DISK_BYTES, persist: bool = True):
+        """
+        Args:
+            directory: Thư mục tầng đĩa (None = <thư mục cache người dùng>/calculations)
+            memory_bytes: Dung lượng tối đa của tầng bộ nhớ
+            disk_bytes: Dung lượng tối đa của tầng đĩa
+            persist: False để chỉ dùng tầng bộ nhớ
+        """
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.persist = persist
+        self._directory = directory
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory: OrderedDict = OrderedDict()
+        self._memory_size = 0
+        self._disk_size: Optional[int] = None
+        self._fingerprint = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._memory)
+
+    @property
+    def directory(self) -> str:
+        if self._directory is None:
+            from .utils.paths import get_cache_dir
+            self._directory = os.path.join(get_cache_dir(), "calculations")
+        return self._directory
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + ".pkl")
+
+    # ---------------- Tra / lưu ----------------
+
+    def get(self, key: str) -> Optional[CalculationResult]:
+        """Kết quả đã lưu (bản sao mới) hoặc None."""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+        if data is None and self.persist:
+            data = self._read(key)
+            if data is not None:
+                with self._lock:
+                    self.disk_hits += 1
+                    self._remember(key, data)
+        if data is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            return pickle.loads(data)
+        except Exception as e:
+            _trace.warning("get", lambda: f"Bỏ entry cache hỏng {key}: {e}")
+            self.discard(key)
+            return None
+
+    def put(self, key: str, result: CalculationResult):
+        """Lưu kết quả vào cả hai tầng."""
+        data = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._remember(key, data)
+        if self.persist:
+            self._write(key, data)
+
+    def discard(self, key: str):
+        with self._lock:
+            data = self._memory.pop(key, None)
+            if data is not None:
+                self._memory_size -= len(data)
+        if self.persist:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def clear(self, disk: bool = False):
+        """Xóa tầng bộ nhớ (và tầng đĩa nếu disk=True)."""
+        with self._lock:
+            self._memory.clear()
+            self._memory_size = 0
+            self.memory_hits = self.disk_hits = self.misses = 0
+        if disk and self.persist:
+            for path, _, _ in self._scan():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._disk_size = 0
+
+    def check_catalog(self, fingerprint: str):
+        """Xóa tầng bộ nhớ khi CSDL đổi (các entry cũ không bao giờ được tra tới nữa)."""
+        if fingerprint != self._fingerprint:
+            if self._fingerprint is not None:
+                _trace.info("catalog", "CSDL thay đổi, xóa cache kết quả trong bộ nhớ")
+                with self._lock:
+                    self._memory.clear()
+                    self._memory_size = 0
+            self._fingerprint = fingerprint
+
+    def _remember(self, key: str, data: bytes):
+        """Thêm vào tầng bộ nhớ và loại LRU theo dung lượng (gọi khi đang giữ lock)."""
+        if len(data) > self.memory_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_size -= len(old)
+        self._memory[key] = data
+        self._memory_size += len(data)
+        while self._memory_size > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+
+    # ---------------- Tầng đĩa ----------------
+
+    def _read(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # đánh dấu vừa dùng cho việc loại LRU
+            return data
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            _trace.warning("read", lambda: f"Không đọc được cache {path}: {e}")
+            return None
+
+    def _write(self, key: str, data: bytes):
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp, path)
+            except BaseException:
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
+                raise
+        except OSError as e:
+            _trace.warning("write", lambda: f"Không ghi được cache {path}: {e}")
+            return
+        if self._disk_size is None:
+            self._disk_size = sum(size for _, size, _ in self._scan())
+        else:
+            self._disk_size += len(data)
+        if self._disk_size > self.disk_bytes:
+            self._evict_disk()
+
+    def _scan(self) -> list:
+        """[(đường dẫn, kích thước, mtime)] của mọi file cache trên đĩa."""
+        entries = []
+        try:
+            for sub in os.scandir(self.directory):
+                if not sub.is_dir():
+                    continue
+                for entry in os.scandir(sub.path):
+                    if entry.name.endswith(".pkl"):
+                        try:
+                            st = entry.stat()
+                        except OSError:
+                            continue
+                        entries.append((entry.path, st.st_size, st.st_mtime))
+        except OSError:
+            pass
+        return entries
+
+    def _evict_disk(self):
+        """Xóa các file lâu không dùng nhất tới khi còn khoảng 90% dung lượng cho phép."""
+        entries = sorted(self._scan(), key=lambda e: e[2])
+        total = sum(size for _, size, _ in entries)
+        target = int(self.disk_bytes * 0.9)
+        removed = 0
+        for path, size, _ in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        self._disk_size = total
+        _trace.debug("evict", lambda: f"Xóa {removed} file cache, còn {total} byte")
+
+
+_cache: Optional[CalculationCache] = None
+_enabled = os.environ.get("CONVEYOR_CALC_CACHE", "1").strip().lower() not in ("0", "false", "off")
+
+
+def get_calculation_cache() -> Optional[CalculationCache]:
+    """Cache dùng chung (tạo khi dùng lần đầu); None nếu đã tắt."""
+    global _cache
+    if _enabled and _cache is None:
+        _cache = CalculationCache()
+    return _cache if _enabled else None
+
+
+def configure_calculation_cache(enabled: bool = True, **kwargs) -> Optional[CalculationCache]:
+    """
+    Bật/tắt hoặc tạo lại cache dùng chung.
+
+    Args:
+        enabled: False để tắt (cached_calculate gọi thẳng calculate)
+        **kwargs: Tham số của CalculationCache (directory, memory_bytes, disk_bytes, persist)
+
+    Returns:
+        Cache đang dùng hoặc None
+    """
+    global _cache, _enabled
+    _enabled = enabled
+    _cache = CalculationCache(**kwargs) if enabled else None
+    return _cache
+
+
+def cached_calculate(p: ConveyorParameters, with_transmission: bool = True,
+                     profile: bool = False, track_stages: bool = False) -> CalculationResult:
+    """
+    calculate() qua cache kết quả.
+
+    Lần tính có profile=True luôn chạy thật (thời gian đo phải là của lần tính này).
+
+    Args:
+        p: Tham số băng tải
+        with_transmission: Có tìm bộ truyền động không
+        profile: Gắn profile thời gian vào kết quả
+        track_stages: Lưu trạng thái từng giai đoạn (cho core.incremental.recalculate)
+
+    Returns:
+        CalculationResult
+    """
+    from .engine import calculate
+    cache = get_calculation_cache()
+    if cache is None or profile:
+        return calculate(p, with_transmission=with_transmission, profile=profile, track_stages=track_stages)
+    fingerprint = catalog_fingerprint()
+    cache.check_catalog(fingerprint)
+    key = calculation_key(p, with_transmission, track_stages)
+    result = cache.get(key)
+    if result is None:
+        result = calculate(p, with_transmission=with_transmission, track_stages=track_stages)
+        cache.put(key, result)
+    return result
@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""
+Danh mục xích có chỉ mục (thay cho việc quét toàn bộ danh sách ChainSpec ở mỗi lần tra).
+
+ChainCatalog vẫn là một list ChainSpec (mọi chỗ đang duyệt/cắt/gán ACTIVE_CHAIN_SPECS giữ nguyên),
+nhưng dựng lười các cột NumPy và chỉ mục:
+- theo mã (designation), mã ISO/ANSI, số dãy (strand);
+- theo bước xích và lực kéo cho phép (đã sắp xếp, tra khoảng bằng searchsorted);
+- tuple mã xích dùng cho optimizer.
+
+Mọi thao tác làm thay đổi list (append, gán lát cắt, sort...) đều xóa chỉ mục và cấp token mới
+(cache_key), nên các bộ nhớ đệm dựa trên token (ví dụ atlas truyền động) tự hết hiệu lực.
+
+    catalog = load_chain_data("vendor.csv")
+    catalog.with_allowable(12.0)            # xích có allowable >= 12 kN, xếp theo bước xích
+    catalog.pitch_between(15.0, 32.0)
+"""
+import itertools
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .tracing import get_tracer
+
+_trace = get_tracer(__name__)
+
+# Token tăng dần cho mỗi trạng thái nội dung của mọi catalog (không bao giờ dùng lại)
+_tokens = itertools.count(1)
+
+
+def chain_columns(chain_specs: Sequence, tensile_safety_factor: float) -> tuple:
+    """
+    Bước xích, lực kéo cho phép và trọng lượng của các xích dùng được, dạng mảng.
+
+    Xích có dữ liệu không hợp lệ (ValueError/AttributeError) bị bỏ qua.
+
+    Args:
+        chain_specs: Danh sách ChainSpec theo thứ tự ưu tiên khi hòa
+        tensile_safety_factor: Hệ số an toàn bền kéo của xích
+
+    Returns:
+        tuple: (chains, pitch_mm, allowable_kN, weight_kgpm) - chains là list ChainSpec tương ứng từng phần tử
+    """
+    chains, pitches, allowables, weights = [], [], [], []
+    for chain_spec in chain_specs:
+        try:
+            pitch = float(chain_spec.pitch_mm)
+            # Allowable theo Tensile/SF (đúng bản chất); nếu CSV thiếu, bỏ qua kiểm tra bền cho bản ghi này
+            if getattr(chain_spec, "tensile_strength_min_kn", 0.0) > 0.0:
+                allowable = chain_spec.tensile_strength_min_kn / tensile_safety_factor
+            else:
+                allowable = float("inf")
+        except (ValueError, AttributeError) as e:
+            _trace.debug("columns", lambda: f"Bỏ qua xích {getattr(chain_spec, 'designation', 'Unknown')} do lỗi: {e}")
+            continue
+        chains.append(chain_spec)
+        pitches.append(pitch)
+        allowables.append(allowable)
+        weights.append(getattr(chain_spec, "weight_kgpm", 0.0))
+    return chains, np.asarray(pitches, dtype=float), np.asarray(allowables, dtype=float), np.asarray(weights, dtype=float)
+
+
+class _ChainIndex:
+    """Cột và chỉ mục của một trạng thái nội dung catalog."""
+
+    def __init__(self, chain_specs: list):
+        n = len(chain_specs)
+        self.pitch_mm = np.full(n, math.nan)
+        self.tensile_kN = np.zeros(n)
+        self.by_designation: Dict[str, List[int]] = {}
+        self.by_code: Dict[str, List[int]] = {}
+        self.by_strand: Dict[int, List[int]] = {}
+        for i, cs in enumerate(chain_specs):
+            try:
+                self.pitch_mm[i] = float(cs.pitch_mm)
+            except (TypeError, ValueError, AttributeError):
+                pass
+            tensile = getattr(cs, "tensile_strength_min_kn", 0.0)
+            self.tensile_kN[i] = tensile if isinstance(tensile, (int, float)) else 0.0
+            designation = getattr(cs, "designation", "")
+            self.by_designation.setdefault(designation, []).append(i)
+            for code in {getattr(cs, "iso_code", ""), getattr(cs, "ansi_code", "")}:
+                if code:
+                    self.by_code.setdefault(code, []).append(i)
+            self.by_strand.setdefault(getattr(cs, "strand", 1), []).append(i)
+        # Thứ tự ổn định theo bước xích (NaN cuối cùng)
+        self.pitch_order = np.argsort(self.pitch_mm, kind="stable")
+        self.pitch_sorted = self.pitch_mm[self.pitch_order]
+        # Vị trí trong thứ tự theo bước xích, để xếp một tập con theo bước xích mà không sort lại
+        self.pitch_rank = np.empty(n, dtype=np.intp)
+        self.pitch_rank[self.pitch_order] = np.arange(n)
+        self.designations = tuple(getattr(cs, "designation", "") for cs in chain_specs if getattr(cs, "designation", ""))
+        self.unique_designations = tuple(dict.fromkeys(self.designations))
+        # Allowable theo hệ số an toàn: {sf: (thứ tự tăng dần, allowable đã sắp xếp)}
+        self.allowable_orders: Dict[float, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def allowable_order(self, safety_factor: float) -> Tuple[np.ndarray, np.ndarray]:
+        cached = self.allowable_orders.get(safety_factor)
+        if cached is None:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                allowable = np.where(self.tensile_kN > 0.0, self.tensile_kN / safety_factor, math.inf)
+            order = np.argsort(allowable, kind="stable")
+            cached = self.allowable_orders[safety_factor] = (order, allowable[order])
+        return cached
+
+
+def _invalidating(name: str):
+    method = getattr(list, name)
+
+    def wrapper(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        self._invalidate()
+        return result
+
+    wrapper.__name__ = name
+    wrapper.__doc__ = method.__doc__
+    return wrapper
+
+
+class ChainCatalog(list):
+    """List ChainSpec có chỉ mục theo mã, mã ISO/ANSI, strand, bước xích và lực kéo cho phép."""
+
+    def __init__(self, chain_specs: Sequence = ()):
+        super().__init__(chain_specs)
+        self._invalidate()
+
+    def _invalidate(self):
+        self._token = next(_tokens)
+        self._index: Optional[_ChainIndex] = None
+        self._columns: Dict[float, tuple] = {}
+        self._subsets: Dict[str, 'ChainCatalog'] = {}
+
+    # Các thao tác làm thay đổi nội dung list
+    __setitem__ = _invalidating("__setitem__")
+    __delitem__ = _invalidating("__delitem__")
+    __iadd__ = _invalidating("__iadd__")
+    __imul__ = _invalidating("__imul__")
+    append = _invalidating("append")
+    extend = _invalidating("extend")
+    insert = _invalidating("insert")
+    pop = _invalidating("pop")
+    remove = _invalidating("remove")
+    clear = _invalidating("clear")
+    sort = _invalidating("sort")
+    reverse = _invalidating("reverse")
+
+    def __reduce__(self):
+        # Chỉ truyền dữ liệu (chỉ mục được dựng lại ở tiến trình nhận)
+        return (ChainCatalog, (list(self),))
+
+    @property
+    def cache_key(self) -> int:
+        """Token của nội dung hiện tại (đổi sau mỗi lần list bị thay đổi)."""
+        return self._token
+
+    @property
+    def index(self) -> _ChainIndex:
+        index = self._index
+        if index is None:
+            index = self._index = _ChainIndex(self)
+        return index
+
+    # ---------------- Mã xích ----------------
+
+    @property
+    def designations(self) -> Tuple[str, ...]:
+        """Mã của mọi xích có mã, theo thứ tự CSDL (giữ trùng lặp giữa các strand)."""
+        return self.index.designations
+
+    @property
+    def unique_designations(self) -> Tuple[str, ...]:
+        """Mã xích không trùng, giữ thứ tự CSDL."""
+        return self.index.unique_designations
+
+    def by_designation(self, designation: str) -> List:
+        return [self[i] for i in self.index.by_designation.get(designation, ())]
+
+    def subset(self, designation: str) -> 'ChainCatalog':
+        """Catalog con của một mã xích (được cache, rỗng nếu không có mã này)."""
+        subset = self._subsets.get(designation)
+        if subset is None:
+            subset = self._subsets[designation] = ChainCatalog(self.by_designation(designation))
+        return subset
+
+    def by_code(self, code: str) -> List:
+        """Xích theo mã ISO hoặc ANSI (ví dụ "08A", "40")."""
+        return [self[i] for i in self.index.by_code.get(code, ())]
+
+    def with_strand(self, strand: int) -> List:
+        return [self[i] for i in self.index.by_strand.get(strand, ())]
+
+    # ---------------- Truy vấn khoảng ----------------
+
+    def pitch_between(self, min_mm: float = -math.inf, max_mm: float = math.inf) -> List:
+        """Xích có bước xích trong [min_mm, max_mm], xếp theo bước xích tăng dần."""
+        index = self.index
+        lo = np.searchsorted(index.pitch_sorted, min_mm, side="left")
+        hi = np.searchsorted(index.pitch_sorted, max_mm, side="right")
+        return [self[i] for i in index.pitch_order[lo:hi]]
+
+    def with_allowable(self, min_allowable_kN: float, safety_factor: Optional[float] = None,
+                       sort_by: str = "pitch") -> List:
+        """
+        Xích có lực kéo cho phép (Tensile/SF, vô hạn khi thiếu dữ liệu bền) không nhỏ hơn min_allowable_kN.
+
+        Args:
+            min_allowable_kN: Lực kéo cho phép tối thiểu (kN)
+            safety_factor: Hệ số an toàn (None = CHAIN_TENSILE_STRENGTH_SAFETY_FACTOR)
+            sort_by: "pitch" (bước xích tăng dần), "allowable" (tăng dần) hoặc "catalog" (thứ tự CSDL)
+
+        Returns:
+            Danh sách ChainSpec
+        """
+        if safety_factor is None:
+            from .specs import CHAIN_TENSILE_STRENGTH_SAFETY_FACTOR
+            safety_factor = CHAIN_TENSILE_STRENGTH_SAFETY_FACTOR
+        index = self.index
+        order, allowable_sorted = index.allowable_order(safety_factor)
+        positions = order[np.searchsorted(allowable_sorted, min_allowable_kN, side="left"):]
+        if sort_by == "pitch":
+            positions = positions[np.argsort(index.pitch_rank[positions])]
+        elif sort_by == "catalog":
+            positions = np.sort(positions)
+        elif sort_by != "allowable":
+            raise ValueError(f"sort_by không hợp lệ: {sort_by}")
+        return [self[i] for i in positions]
+
+    # ---------------- Cột cho tìm kiếm truyền động ----------------
+
+    def transmission_columns(self, tensile_safety_factor: float) -> tuple:
+        """chain_columns(self, tensile_safety_factor), được cache theo hệ số an toàn."""
+        columns = self._columns.get(tensile_safety_factor)
+        if columns is None:
+            chains, pitch, allowable, weight = chain_columns(self, tensile_safety_factor)
+            for array in (pitch, allowable, weight):
+                array.flags.writeable = False
+            columns = self._columns[tensile_safety_factor] = (tuple(chains), pitch, allowable, weight)
+        return columns
@@ -3,7 +3,7 @@ import pandas as pd
 import json
 import os
 from typing import Tuple, Dict
-from .specs import ACTIVE_MATERIAL_DB, ACTIVE_BELT_SPECS
+from .specs import ACTIVE_MATERIAL_DB, ACTIVE_BELT_SPECS, bump_catalog_version
 from .security import encryption
 from .utils.paths import resource_path
 
@@ -142,6 +142,8 @@ def load_database(path: str) -> Tuple[Dict, Dict, str]:
     if belt_db:
         ACTIVE_BELT_SPECS.clear()
         ACTIVE_BELT_SPECS.update(belt_db)
+    # Cache kết quả tính toán theo CSDL cũ không còn dùng được
+    bump_catalog_version()
 
     report = f"Đã nạp {len(mat_db)} vật liệu và {len(belt_db)} loại băng từ: {path}"
     return ACTIVE_MATERIAL_DB, ACTIVE_BELT_SPECS, report
@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+"""
+Chẩn đoán có mã cho kết quả tính toán (thay cho cảnh báo dạng chuỗi tạo sẵn).
+
+Engine chỉ ghi lại (mã, tham số số) cho mỗi cảnh báo; câu thông báo tiếng Việt được định dạng khi
+cần hiển thị hoặc xuất báo cáo (Diagnostic.message, CalculationResult.warnings). Bộ tối ưu phân
+loại và tính phạt theo mã/mức độ thay vì tìm chuỗi con trong câu thông báo.
+
+    d = Diagnostic(DiagCode.SF_LOW, (5.2, 6.0))
+    d.severity    # Severity.CRITICAL
+    d.message     # "⚠️ Hệ số an toàn thực tế thấp (SF = 5.20 < 6.0)."
+"""
+from collections.abc import MutableSequence
+from enum import IntEnum
+from typing import Iterable, List, NamedTuple, Union
+
+
+class Severity(IntEnum):
+    INFO = 0
+    WARNING = 1
+    CRITICAL = 2
+
+
+class DiagCode(IntEnum):
+    # Tốc độ băng
+    SPEED_ABOVE_RECOMMENDED = 100
+    SPEED_ABOVE_MAX = 101
+    USER_SPEED_ABOVE_MAX = 102
+    # Lưu lượng / tiết diện
+    CAPACITY_EXCEEDED = 200
+    CAPACITY_NEAR_LIMIT = 201
+    CAPACITY_LIMITED_BY_SECTION = 202
+    # Phương pháp tính
+    DUAL_DRIVE_CEMA_ONLY = 300
+    ISO_LOWER_FRICTION = 301
+    # Hệ số an toàn / cường độ đai
+    SF_CRITICAL = 400
+    SF_LOW = 401
+    SF_BELOW_DESIGN = 402
+    SF_LOW_FALLBACK = 403
+    BELT_UTILIZATION_HIGH = 404
+    # Kiểm tra đơn vị (validate_sf_calculation_units)
+    UNIT_TENSION_LOW = 500
+    UNIT_BELT_WIDTH = 501
+    UNIT_T_ALLOW = 502
+    UNIT_SF_DESIGN = 503
+    UNIT_SF_ACTUAL = 504
+    UNIT_SF_MISMATCH = 505
+    # Lý do không hợp lệ của bộ tối ưu
+    NO_TRANSMISSION = 600
+    SF_BELOW_THRESHOLD = 601
+    COST_TOO_HIGH = 602
+    VELOCITY_ERROR_TOO_HIGH = 603
+    VELOCITY_ERROR_HIGH = 604
+    # Tuyến nhiều đoạn
+    ROUTE_DUAL_DRIVE_NOMINAL = 700
+    ROUTE_CURVE_SLIP = 701
+    # Lỗi / thông điệp tự do (kiểm tra đầu vào, ngoại lệ)
+    CALCULATION_ERROR = 900
+    TEXT = 999
+
+
+_SPEED_TAIL = "Thiết kế này KHÔNG TỐI ƯU - cần tăng bề rộng băng hoặc giảm lưu lượng."
+
+# Mã -> (mức độ, mẫu str.format với các tham số theo vị trí)
+_CATALOG = {
+    DiagCode.SPEED_ABOVE_RECOMMENDED: (
+        Severity.WARNING,
+        "Tốc độ cần thiết ({0:.2f} m/s) vượt quá tốc độ khuyến nghị ({1:.2f} m/s) + {2:.0f}% margin. "
+        "Cân nhắc tăng bề rộng băng hoặc giảm lưu lượng."),
+    DiagCode.SPEED_ABOVE_MAX: (
+        Severity.CRITICAL,
+        "⚠️ CẢNH BÁO: Tốc độ tính toán ({0:.2f} m/s) vượt quá tốc độ tối đa cho phép ({1:.2f} m/s) "
+        "theo bảng tra cho bề rộng {2}mm. " + _SPEED_TAIL),
+    DiagCode.USER_SPEED_ABOVE_MAX: (
+        Severity.CRITICAL,
+        "⚠️ CẢNH BÁO: Tốc độ người dùng nhập ({0:.2f} m/s) vượt quá tốc độ tối đa cho phép ({1:.2f} m/s) "
+        "theo bảng tra cho bề rộng {2}mm. " + _SPEED_TAIL),
+    DiagCode.CAPACITY_EXCEEDED: (
+        Severity.WARNING,
+        "Lưu lượng yêu cầu {0:.1f} t/h vượt năng lực tiết diện "
+        "Q_max≈{1:.1f} t/h (B={2} mm, máng≈{3:.0f}°, surcharge≈{4:.0f}°)."),
+    DiagCode.CAPACITY_NEAR_LIMIT: (
+        Severity.WARNING,
+        "Lưu lượng yêu cầu đang tiệm cận năng lực tiết diện ({0:.1f}%)."),
+    DiagCode.CAPACITY_LIMITED_BY_SECTION: (
+        Severity.WARNING,
+        "Lưu lượng thực bị khống chế bởi tiết diện: Q_thực≈{0:.1f} t/h < Q_yêu cầu={1:.1f} t/h."),
+    DiagCode.DUAL_DRIVE_CEMA_ONLY: (
+        Severity.INFO,
+        "Tính toán truyền động kép hiện tại dựa trên phương pháp CEMA (Mục 6.2, PDF), bỏ qua lựa chọn {0}."),
+    DiagCode.ISO_LOWER_FRICTION: (
+        Severity.INFO,
+        "Đang tính theo ISO 5048 với hệ số ma sát thấp hơn DIN."),
+    DiagCode.SF_CRITICAL: (
+        Severity.CRITICAL,
+        "⚠️ Hệ số an toàn thực tế QUÁ THẤP (SF = {0:.2f} < {1})."),
+    DiagCode.SF_LOW: (
+        Severity.CRITICAL,
+        "⚠️ Hệ số an toàn thực tế thấp (SF = {0:.2f} < {1})."),
+    DiagCode.SF_BELOW_DESIGN: (
+        Severity.CRITICAL,
+        "⚠️ SF thực ({0:.2f}) chỉ bằng {1:.1%} so với SF thiết kế ({2:.2f})."),
+    DiagCode.SF_LOW_FALLBACK: (
+        Severity.WARNING,
+        "Hệ số an toàn thấp (SF = {0:.2f} < 6)."),
+    DiagCode.BELT_UTILIZATION_HIGH: (
+        Severity.WARNING,
+        "Mức sử dụng cường độ đai cao ({0:.1f}%)."),
+    DiagCode.UNIT_TENSION_LOW: (
+        Severity.WARNING,
+        "🔍 Lực căng max_tension = {0:.2f} có vẻ quá thấp (kiểm tra đơn vị N)"),
+    DiagCode.UNIT_BELT_WIDTH: (
+        Severity.WARNING,
+        "🔍 Bề rộng băng B = {0}mm có vẻ không hợp lý"),
+    DiagCode.UNIT_T_ALLOW: (
+        Severity.WARNING,
+        "🔍 T_allow = {0} N/m có vẻ không hợp lý (kiểm tra đơn vị)"),
+    DiagCode.UNIT_SF_DESIGN: (
+        Severity.WARNING,
+        "🔍 SF thiết kế = {0} có vẻ không hợp lý"),
+    DiagCode.UNIT_SF_ACTUAL: (
+        Severity.WARNING,
+        "🔍 SF thực = {0} có vẻ không hợp lý"),
+    DiagCode.UNIT_SF_MISMATCH: (
+        Severity.WARNING,
+        "🔍 SF thực ({0:.2f}) không khớp với tính toán ({1:.2f})"),
+    DiagCode.NO_TRANSMISSION: (
+        Severity.WARNING,
+        "No transmission solution"),
+    DiagCode.SF_BELOW_THRESHOLD: (
+        Severity.CRITICAL,
+        "Safety factor too low: {0} < {1} (hard threshold: {2})"),
+    DiagCode.COST_TOO_HIGH: (
+        Severity.CRITICAL,
+        "Cost too high: {0}"),
+    DiagCode.VELOCITY_ERROR_TOO_HIGH: (
+        Severity.CRITICAL,
+        "Velocity error too high: {0:.2f}% > {1}%"),
+    DiagCode.VELOCITY_ERROR_HIGH: (
+        Severity.WARNING,
+        "Warning: High velocity error: {0:.2f}%"),
+    DiagCode.ROUTE_DUAL_DRIVE_NOMINAL: (
+        Severity.INFO,
+        "Truyền động kép tính theo tổng chiều dài và chênh cao của tuyến ({0} đoạn); "
+        "biểu đồ lực căng dọc tuyến chỉ mang tính tham khảo."),
+    DiagCode.ROUTE_CURVE_SLIP: (
+        Severity.CRITICAL,
+        "⚠️ Ma sát tại các đoạn cong vượt khả năng truyền lực của puly dẫn (e^μθ = {0:.3f}); "
+        "lực căng được tính bỏ qua đoạn cong - cần tăng góc ôm hoặc lực căng ban đầu."),
+    DiagCode.CALCULATION_ERROR: (
+        Severity.CRITICAL,
+        "Lỗi tính toán: {0}"),
+    DiagCode.TEXT: (
+        Severity.WARNING,
+        "{0}"),
+}
+
+
+class Diagnostic(NamedTuple):
+    """Một chẩn đoán: mã và các tham số (số/chuỗi) để định dạng thông điệp khi cần."""
+    code: DiagCode
+    args: tuple = ()
+
+    @staticmethod
+    def text(message: str) -> "Diagnostic":
+        """Thông điệp tự do (ví dụ cảnh báo kiểm tra đầu vào)."""
+        return Diagnostic(DiagCode.TEXT, (message,))
+
+    @property
+    def severity(self) -> Severity:
+        return _CATALOG[self.code][0]
+
+    @property
+    def message(self) -> str:
+        return _CATALOG[self.code][1].format(*self.args)
+
+    def __str__(self) -> str:
+        return self.message
+
+
+def severity_of(code: DiagCode) -> Severity:
+    """Mức độ của một mã chẩn đoán."""
+    return _CATALOG[code][0]
+
+
+def as_diagnostic(item: Union[Diagnostic, str]) -> Diagnostic:
+    """Chuyển chuỗi thông điệp cũ thành Diagnostic (giữ nguyên nếu đã là Diagnostic)."""
+    return item if isinstance(item, Diagnostic) else Diagnostic.text(str(item))
+
+
+def format_messages(diagnostics: Iterable[Diagnostic]) -> List[str]:
+    """Định dạng danh sách chẩn đoán thành các câu thông báo (dùng khi hiển thị/xuất báo cáo)."""
+    return [d.message for d in diagnostics]
+
+
+class MessageList(MutableSequence):
+    """
+    Danh sách câu thông báo ghi thẳng vào một danh sách chẩn đoán (CalculationResult.warnings).
+
+    Đọc thì định dạng Diagnostic.message; thêm/sửa bằng chuỗi thì lưu thành Diagnostic.text, nên
+    result.warnings.append("...") vẫn được giữ trong result.diagnostics như danh sách chuỗi cũ.
+    """
+    __slots__ = ("_diagnostics",)
+
+    def __init__(self, diagnostics: List[Diagnostic]):
+        self._diagnostics = diagnostics
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return format_messages(self._diagnostics[index])
+        return self._diagnostics[index].message
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            self._diagnostics[index] = [as_diagnostic(m) for m in value]
+        else:
+            self._diagnostics[index] = as_diagnostic(value)
+
+    def __delitem__(self, index):
+        del self._diagnostics[index]
+
+    def __len__(self) -> int:
+        return len(self._diagnostics)
+
+    def insert(self, index: int, value):
+        self._diagnostics.insert(index, as_diagnostic(value))
+
+    def __eq__(self, other):
+        if isinstance(other, (MessageList, list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return repr(list(self))
@@ -2,14 +2,33 @@
 # -*- coding: utf-8 -*-
 
 import math
+import traceback
 from abc import ABC, abstractmethod
 from typing import Tuple, Dict, Optional
 
+import numpy as np
+
 from .models import BeltType, CalculationResult, ConveyorParameters
+from .diagnostics import DiagCode, Diagnostic
+from .route import RouteLoads, RouteSegment, resolve_route_params, route_drive_forces
 from .specs import G, ACTIVE_MATERIAL_DB, ACTIVE_BELT_SPECS
 from .utils.unit_conversion import deg2rad
 from .utils.trough_utils import parse_trough_label, capacity_from_geometry_tph
-from .safety_factors import lookup_sf_design, get_sf_warning_thresholds
+from .safety_factors import get_sf_warning_thresholds
+from .formulas import (
+    allowable_tension_npm, belt_strength, belt_weight_kgpm, capital_and_operating_costs, cema_forces, cema_power_kw,
+    design_safety_factor, din_resistances, drive_contact, drive_power, dual_drive_distribution,
+    dual_drive_resistances_kgf, euler_eytelwein, fallback_effective_tension, fallback_power_kw, is_steel_cord,
+    pulley_load_category, required_belt_rating, resistance_power_kw, section_limited_load,
+)
+from .lookup_tables import LookupTable, GridTable
+from .chain_catalog import ChainCatalog, chain_columns
+from .tracing import get_tracer
+from .profiling import stage, active_profile, profile_calculation
+from .transmission_atlas import TransmissionAtlas, active_transmission_atlas
+
+# Truy vết chi tiết (tắt mặc định, xem core/tracing.py)
+_trace = get_tracer(__name__)
 
 # --- Dữ liệu số hóa từ Mục 8, "TÍNH TOÁN BĂNG TẢI.pdf" ---
 
@@ -71,40 +90,70 @@ TRANSITION_DISTANCE_FACTORS: Dict[str, Dict[int, Dict[int, float]]] = {
     }
 }
 
+# Khối lượng phần quay theo bề rộng băng (CEMA, kg/m)
+MOVING_PARTS_WEIGHT_CEMA_KG: Dict[int, int] = {
+    400: 22, 500: 30, 650: 41, 800: 56, 1000: 69,
+    1200: 90, 1400: 114, 1600: 130, 1800: 154, 2000: 174
+}
+
+# Khối lượng cơ sở con lăn nhánh tải / nhánh về (kg)
+IDLER_BASE_WEIGHTS_KG: Dict[int, Tuple[float, float]] = {
+    400: (6.6, 5.0), 500: (7.5, 5.9), 650: (9.0, 7.3), 800: (13.9, 12.2),
+    1000: (19.6, 18.0), 1200: (23.6, 21.1), 1400: (36.6, 32.6),
+    1600: (41.4, 36.6), 1800: (47.4, 42.5), 2000: (52.2, 46.5)
+}
+
+# Khoảng cách con lăn nhánh tải mặc định (m) theo lưu lượng thấp/cao (ngưỡng 1600 t/h)
+IDLER_SPACING_LC_LOW_M: Dict[int, float] = {
+    400: 1.35, 500: 1.35, 650: 1.20, 800: 1.20, 900: 1.00,
+    1000: 1.00, 1200: 1.00, 1400: 1.00, 1600: 1.00, 1800: 1.00, 2000: 1.00
+}
+IDLER_SPACING_LC_HIGH_M: Dict[int, float] = {
+    400: 1.35, 500: 1.20, 650: 1.10, 800: 1.00, 900: 1.00,
+    1000: 1.00, 1200: 1.00, 1400: 1.00, 1600: 1.00, 1800: 1.00, 2000: 1.00
+}
+
+# --- Bảng tra đã biên dịch (dùng chung cho engine, batch và optimizer) ---
+MOVING_PARTS_WEIGHT_TABLE = LookupTable.from_dict(MOVING_PARTS_WEIGHT_CEMA_KG, name="moving_parts_weight")
+IDLER_BASE_WEIGHTS_TABLE = LookupTable.from_dict(IDLER_BASE_WEIGHTS_KG, name="idler_base_weights")
+IDLER_SPACING_LC_TABLES = {
+    "low": LookupTable.from_dict(IDLER_SPACING_LC_LOW_M, name="idler_spacing_lc"),
+    "high": LookupTable.from_dict(IDLER_SPACING_LC_HIGH_M, name="idler_spacing_lc"),
+}
+# Đường kính puly dẫn động (Loại A) theo cấp ST
+PULLEY_ST_TABLE = LookupTable([int(k.replace("ST-", "")) for k in PULLEY_DIAMETERS_ST_MM],
+                              [v["A"] for v in PULLEY_DIAMETERS_ST_MM.values()], name="pulley_diameter_st")
+# Đường kính puly dẫn động (Loại A) theo cấp bền đai vải, cho từng mức tải
+PULLEY_FABRIC_TABLES = {
+    category: LookupTable(list(PULLEY_DIAMETERS_FABRIC_MM), [v[category] for v in PULLEY_DIAMETERS_FABRIC_MM.values()],
+                          name="pulley_diameter_fabric")
+    for category in ("high", "medium", "low")
+}
+IDLER_SPACING_CARRY_TABLE = GridTable(IDLER_SPACING_CARRY_M, name="idler_spacing_carry")
+TRANSITION_FACTOR_TABLES = {cat: GridTable(table, name="transition_factor") for cat, table in TRANSITION_DISTANCE_FACTORS.items()}
+
 # ---------------- Helpers ----------------
 
 def get_friction_and_lo_cema(p: ConveyorParameters) -> Tuple[float, float]:
     f, lo = 0.022, 66.0
     
-    # Debug: in ra các giá trị để kiểm tra
-    print(f"DEBUG FRICTION: f={f}, lo={lo}")
+    _trace.debug("friction", lambda: f"f={f}, lo={lo}")
     
     return f, lo
 
 def get_moving_parts_weight_cema(width_mm: int) -> float:
-    lookup = {
-        400: 22, 500: 30, 650: 41, 800: 56, 1000: 69,
-        1200: 90, 1400: 114, 1600: 130, 1800: 154, 2000: 174
-    }
-    closest = min(lookup, key=lambda w: abs(w - width_mm))
-    weight = lookup[closest]
+    closest = MOVING_PARTS_WEIGHT_TABLE.nearest_key(width_mm)
+    weight = MOVING_PARTS_WEIGHT_TABLE.nearest(width_mm)
     
-    # Debug: in ra các giá trị để kiểm tra
-    print(f"DEBUG MOVING_PARTS: width_mm={width_mm}, closest={closest}, weight={weight}")
+    _trace.debug("moving_parts", lambda: f"width_mm={width_mm}, closest={closest}, weight={weight}")
     
     return weight
 
 def get_idler_base_weights(width_mm: int) -> Tuple[float, float]:
-    wc_wr_lookup = {
-        400: (6.6, 5.0), 500: (7.5, 5.9), 650: (9.0, 7.3), 800: (13.9, 12.2),
-        1000: (19.6, 18.0), 1200: (23.6, 21.1), 1400: (36.6, 32.6),
-        1600: (41.4, 36.6), 1800: (47.4, 42.5), 2000: (52.2, 46.5)
-    }
-    closest_w = min(wc_wr_lookup, key=lambda w: abs(w - width_mm))
-    weights = wc_wr_lookup[closest_w]
+    closest_w = IDLER_BASE_WEIGHTS_TABLE.nearest_key(width_mm)
+    weights = IDLER_BASE_WEIGHTS_TABLE.nearest(width_mm)
     
-    # Debug: in ra các giá trị để kiểm tra
-    print(f"DEBUG IDLER_WEIGHTS: width_mm={width_mm}, closest_w={closest_w}, weights={weights}")
+    _trace.debug("idler_weights", lambda: f"width_mm={width_mm}, closest_w={closest_w}, weights={weights}")
     
     return weights
 
@@ -114,7 +163,7 @@ def validate_sf_calculation_units(
     T_allow_Npm: float,
     sf_design: float,
     sf_actual: float
-) -> list[str]:
+) -> list[Diagnostic]:
     """
     Kiểm tra tính nhất quán của đơn vị trong tính toán Safety Factor.
     
@@ -126,71 +175,54 @@ def validate_sf_calculation_units(
         sf_actual: Safety Factor thực tế
     
     Returns:
-        Danh sách các cảnh báo về đơn vị (rỗng nếu OK)
+        Danh sách Diagnostic (mã UNIT_*) về đơn vị (rỗng nếu OK)
     """
     warnings = []
     
     # Kiểm tra đơn vị lực căng
     if max_tension_N < 100:  # Nếu < 100N, có thể đang dùng đơn vị khác
-        warnings.append(f"Lực căng max_tension = {max_tension_N:.2f} có vẻ quá thấp (kiểm tra đơn vị N)")
+        warnings.append(Diagnostic(DiagCode.UNIT_TENSION_LOW, (max_tension_N,)))
     
     # Kiểm tra bề rộng băng
     if belt_width_mm < 100 or belt_width_mm > 3000:
-        warnings.append(f"Bề rộng băng B = {belt_width_mm}mm có vẻ không hợp lý")
+        warnings.append(Diagnostic(DiagCode.UNIT_BELT_WIDTH, (belt_width_mm,)))
     
     # Kiểm tra T_allow (range mới: 100,000 - 3,000,000 N/m để bao được ST-500 đến ST-3150)
     if T_allow_Npm < 1e5 or T_allow_Npm > 3e6:
-        warnings.append(f"T_allow = {T_allow_Npm} N/m có vẻ không hợp lý (kiểm tra đơn vị)")
+        warnings.append(Diagnostic(DiagCode.UNIT_T_ALLOW, (T_allow_Npm,)))
     
     # Kiểm tra SF thiết kế
     if sf_design < 5.0 or sf_design > 15.0:
-        warnings.append(f"SF thiết kế = {sf_design} có vẻ không hợp lý")
+        warnings.append(Diagnostic(DiagCode.UNIT_SF_DESIGN, (sf_design,)))
     
     # Kiểm tra SF thực
     if sf_actual < 1.0 or sf_actual > 50.0:
-        warnings.append(f"SF thực = {sf_actual} có vẻ không hợp lý")
+        warnings.append(Diagnostic(DiagCode.UNIT_SF_ACTUAL, (sf_actual,)))
     
     # Kiểm tra tính nhất quán
     expected_sf = (belt_width_mm / 1000.0) * T_allow_Npm / max_tension_N
     if abs(expected_sf - sf_actual) > 0.1:
-        warnings.append(f"SF thực ({sf_actual:.2f}) không khớp với tính toán ({expected_sf:.2f})")
+        warnings.append(Diagnostic(DiagCode.UNIT_SF_MISMATCH, (sf_actual, expected_sf)))
     
     return warnings
 
 def get_default_spacings(width_mm: int, capacity_tph: float) -> Tuple[float, float]:
-    lc_lookup_low = {
-        400: 1.35, 500: 1.35, 650: 1.20, 800: 1.20, 900: 1.00,
-        1000: 1.00, 1200: 1.00, 1400: 1.00, 1600: 1.00, 1800: 1.00, 2000: 1.00
-    }
-    lc_lookup_high = {
-        400: 1.35, 500: 1.20, 650: 1.10, 800: 1.00, 900: 1.00,
-        1000: 1.00, 1200: 1.00, 1400: 1.00, 1600: 1.00, 1800: 1.00, 2000: 1.00
-    }
     lr_default = 3.0
-    lc_table = lc_lookup_high if capacity_tph > 1600 else lc_lookup_low
-    closest_lc = min(lc_table, key=lambda w: abs(w - width_mm))
-    spacings = (lc_table[closest_lc], lr_default)
+    lc_table = IDLER_SPACING_LC_TABLES["high" if capacity_tph > 1600 else "low"]
+    closest_lc = lc_table.nearest_key(width_mm)
+    spacings = (lc_table.nearest(width_mm), lr_default)
     
-    # Debug: in ra các giá trị để kiểm tra
-    print(f"DEBUG SPACINGS: width_mm={width_mm}, capacity_tph={capacity_tph}")
-    print(f"DEBUG SPACINGS: lc_table={'high' if capacity_tph > 1600 else 'low'}, closest_lc={closest_lc}")
-    print(f"DEBUG SPACINGS: spacings={spacings}")
+    _trace.debug("spacings", lambda: f"width_mm={width_mm}, capacity_tph={capacity_tph}")
+    _trace.debug("spacings", lambda: f"lc_table={'high' if capacity_tph > 1600 else 'low'}, closest_lc={closest_lc}")
+    _trace.debug("spacings", lambda: f"spacings={spacings}")
     
     return spacings
 
 def calculate_belt_weight(B_mm: int, thickness_mm: float, belt_type: str) -> float:
-    rho = 1220.0
-    if "PVC" in (belt_type or ""):
-        rho = 1350.0
-    if "Dây thép" in (belt_type or "") or "ST" in (belt_type or ""):
-        rho = 1400.0
-    B_m = max(0.3, float(B_mm) / 1000.0)
-    t_m = max(0.005, float(thickness_mm) / 1000.0)
-    weight = B_m * t_m * rho * 1.05
+    weight = belt_weight_kgpm(B_mm, thickness_mm, belt_type)
     
-    # Debug: in ra các giá trị để kiểm tra
-    print(f"DEBUG BELT_WEIGHT: B_mm={B_mm}, thickness_mm={thickness_mm}, belt_type={belt_type}")
-    print(f"DEBUG BELT_WEIGHT: rho={rho}, B_m={B_m}, t_m={t_m}, weight={weight}")
+    _trace.debug("belt_weight", lambda: f"B_mm={B_mm}, thickness_mm={thickness_mm}, belt_type={belt_type}")
+    _trace.debug("belt_weight", lambda: f"weight={weight}")
     
     return weight
 
@@ -198,7 +230,9 @@ def calculate_belt_weight(B_mm: int, thickness_mm: float, belt_type: str) -> flo
 
 class CalculationStrategy(ABC):
     def __init__(self, params: ConveyorParameters, result: CalculationResult, common_data: dict, belt_specs: dict):
-        self.p = params
+        # Tham số được coi là bất biến: giá trị cần chốt lại (V_mps, Qt_tph, L_m/H_m theo tuyến) được
+        # ghi vào một bản params.replace(...) của riêng strategy, đối tượng của người gọi không bị thay đổi
+        self.p = resolve_route_params(params)
         self.r = result
         self.common_data = common_data
         self.belt_specs = belt_specs
@@ -207,81 +241,61 @@ class CalculationStrategy(ABC):
     def calculate_resistances_and_power(self):
         ...
 
+    def _idler_spacings_used(self) -> Tuple[float, float]:
+        """Khoảng cách con lăn nhánh tải/nhánh về dùng để tính (mặc định theo bảng tra khi trống)."""
+        lc_default, lr_default = get_default_spacings(self.p.B_mm, self.p.Qt_tph)
+        lc_used = max(0.5, float(getattr(self.p, "carrying_idler_spacing_m", lc_default) or lc_default))
+        lr_used = max(1.0, float(getattr(self.p, "return_idler_spacing_m", lr_default) or lr_default))
+        return lc_used, lr_used
+
     def _effective_drive_contact(self) -> Tuple[float, float, bool]:
-        base_wrap = float(self.p.wrap_deg or 210.0)
-        base_mu = float(self.p.mu_pulley or 0.35)
-        dt = (self.p.drive_type or "").strip().lower()
-        
-        # Debug: in ra các giá trị để kiểm tra
-        print(f"DEBUG DRIVE_CONTACT: base_wrap={base_wrap}, base_mu={base_mu}, drive_type={dt}")
-        
-        if dt == "tail drive":
-            result = (max(base_wrap - 30.0, 120.0), base_mu * 0.95, False)
-            print(f"DEBUG DRIVE_CONTACT: tail drive result={result}")
-            return result
-        if dt == "center drive":
-            result = (min(max(base_wrap, 160.0), 200.0), base_mu * 0.97, False)
-            print(f"DEBUG DRIVE_CONTACT: center drive result={result}")
-            return result
-        # Dual drive is handled separately, but we return values for consistency
-        if dt == "dual drive":
-            result = (min(base_wrap + 20.0, 240.0), base_mu, True)
-            print(f"DEBUG DRIVE_CONTACT: dual drive result={result}")
-            return result
-        result = (base_wrap, base_mu, False)
-        print(f"DEBUG DRIVE_CONTACT: default result={result}")
+        result = drive_contact(self.p.wrap_deg, self.p.mu_pulley, self.p.drive_type)
+        _trace.debug("drive_contact", lambda: f"wrap_deg={self.p.wrap_deg}, mu_pulley={self.p.mu_pulley}, "
+                                              f"drive_type={self.p.drive_type}, result={result}")
         return result
 
     def _compute_geometry_capacity(self):
-        print(f"DEBUG _compute_geometry_capacity: START")
-        print(f"DEBUG _compute_geometry_capacity: trough_angle_label='{self.p.trough_angle_label}'")
-        print(f"DEBUG _compute_geometry_capacity: about to call parse_trough_label...")
+        _trace.debug("compute_geometry_capacity", "START")
+        _trace.debug("compute_geometry_capacity", lambda: f"trough_angle_label='{self.p.trough_angle_label}'")
+        _trace.debug("compute_geometry_capacity", "about to call parse_trough_label...")
         try:
             trough_deg = parse_trough_label(self.p.trough_angle_label)
-            print(f"DEBUG _compute_geometry_capacity: parse_trough_label returned {trough_deg}")
+            _trace.debug("compute_geometry_capacity", lambda: f"parse_trough_label returned {trough_deg}")
         except Exception as e:
-            print(f"DEBUG _compute_geometry_capacity: ERROR calling parse_trough_label: {e}")
-            import traceback
-            traceback.print_exc()
+            _trace.error("compute_geometry_capacity", lambda: f"ERROR calling parse_trough_label: {e}\n{traceback.format_exc()}")
             trough_deg = 20.0  # fallback
         surcharge_deg = float(getattr(self.p, "surcharge_angle_deg", 20.0) or 20.0)
         
-        # Debug: in ra các giá trị để kiểm tra
-        print(f"DEBUG: trough_angle_label={self.p.trough_angle_label}, parsed_trough_deg={trough_deg}")
-        print(f"DEBUG: surcharge_angle_deg={surcharge_deg}")
+        _trace.debug("compute_geometry_capacity", lambda: f"trough_angle_label={self.p.trough_angle_label}, parsed_trough_deg={trough_deg}")
+        _trace.debug("compute_geometry_capacity", lambda: f"surcharge_angle_deg={surcharge_deg}")
         belt_speed = getattr(self.r, 'belt_speed_mps', self.p.V_mps) or self.p.V_mps
-        print(f"DEBUG: B_mm={self.p.B_mm}, V_mps={belt_speed}, density_tpm3={self.p.density_tpm3}")
+        _trace.debug("compute_geometry_capacity", lambda: f"B_mm={self.p.B_mm}, V_mps={belt_speed}, density_tpm3={self.p.density_tpm3}")
         
-        print(f"DEBUG _compute_geometry_capacity: calling capacity_from_geometry_tph")
+        _trace.debug("compute_geometry_capacity", "calling capacity_from_geometry_tph")
         # Sử dụng tốc độ từ result nếu đã được tính tự động
         belt_speed = getattr(self.r, 'belt_speed_mps', self.p.V_mps) or self.p.V_mps
         Qt_calc, A = capacity_from_geometry_tph(
             self.p.B_mm, trough_deg, surcharge_deg,
             belt_speed, self.p.density_tpm3
         )
-        print(f"DEBUG _compute_geometry_capacity: capacity_from_geometry_tph returned Qt_calc={Qt_calc}, A={A}")
+        _trace.debug("compute_geometry_capacity", lambda: f"capacity_from_geometry_tph returned Qt_calc={Qt_calc}, A={A}")
         # Chỉ cập nhật cross_section_area_m2 nếu chưa được set từ auto speed
         if not hasattr(self.r, 'cross_section_area_m2') or self.r.cross_section_area_m2 == 0:
             self.r.cross_section_area_m2 = A
         self.r.Qt_calc_tph = Qt_calc
         
-        # Debug: in ra kết quả tính toán
-        print(f"DEBUG: Qt_calc={Qt_calc}, A={A}")
+        _trace.debug("compute_geometry_capacity", lambda: f"Qt_calc={Qt_calc}, A={A}")
         
         if self.p.Qt_tph > 0:
             util = 100.0 * self.p.Qt_tph / max(Qt_calc, 1e-6)
             self.r.capacity_utilization = util
             if util > 105.0:
-                self.r.warnings.append(
-                    f"Lưu lượng yêu cầu {self.p.Qt_tph:.1f} t/h vượt năng lực tiết diện "
-                    f"Q_max≈{Qt_calc:.1f} t/h (B={self.p.B_mm} mm, máng≈{trough_deg:.0f}°, surcharge≈{surcharge_deg:.0f}°)."
-                )
+                self.r.diagnostics.append(Diagnostic(DiagCode.CAPACITY_EXCEEDED, (
+                    self.p.Qt_tph, Qt_calc, self.p.B_mm, trough_deg, surcharge_deg)))
             elif util > 95.0:
-                self.r.warnings.append(
-                    f"Lưu lượng yêu cầu đang tiệm cận năng lực tiết diện ({util:.1f}%)."
-                )
+                self.r.diagnostics.append(Diagnostic(DiagCode.CAPACITY_NEAR_LIMIT, (util,)))
         
-        print(f"DEBUG _compute_geometry_capacity: END")
+        _trace.debug("compute_geometry_capacity", "END")
 
     def _apply_geo_limitation_to_load(self):
         # Sử dụng tốc độ từ result nếu đã được tính tự động
@@ -290,20 +304,14 @@ class CalculationStrategy(ABC):
         
         # SỬA LỖI: Tính q_from_Qt dựa trên lưu lượng yêu cầu và khối lượng riêng
         # q_from_Qt = (Qt_tph * 1000 kg/t) / (3600 s/h * V m/s) = kg/m
-        q_from_Qt = (self.p.Qt_tph * 1000.0 / 3600.0) / V
-        
-        # Tính q_from_geo: tải trọng vật liệu từ tiết diện và khối lượng riêng
-        # q_from_geo = A m² * 1000 kg/m³ = kg/m
-        q_from_geo = float(self.r.cross_section_area_m2) * 1000.0 * float(self.p.density_tpm3)
-        
-        # Lấy giá trị nhỏ hơn để đảm bảo không vượt quá khả năng tiết diện
-        q_eff = min(q_from_Qt, q_from_geo)
+        # q_from_geo = A m² * 1000 kg/m³ = kg/m; q_eff là giá trị nhỏ hơn (không vượt quá khả năng tiết diện)
+        q_from_Qt, q_from_geo, q_eff = section_limited_load(
+            self.p.Qt_tph, V, float(self.r.cross_section_area_m2), float(self.p.density_tpm3))
         
-        # Debug: in ra các giá trị để kiểm tra
-        print(f"DEBUG: V={V}, q_from_Qt={q_from_Qt:.3f}, q_from_geo={q_from_geo:.3f}")
-        print(f"DEBUG: density_tpm3={self.p.density_tpm3}, cross_section_area_m2={self.r.cross_section_area_m2:.6f}")
-        print(f"DEBUG: q_eff={q_eff:.3f}")
-        print(f"DEBUG: BEFORE - material_load_kgpm={self.r.material_load_kgpm:.3f}")
+        _trace.debug("apply_geo_limitation_to_load", lambda: f"V={V}, q_from_Qt={q_from_Qt:.3f}, q_from_geo={q_from_geo:.3f}")
+        _trace.debug("apply_geo_limitation_to_load", lambda: f"density_tpm3={self.p.density_tpm3}, cross_section_area_m2={self.r.cross_section_area_m2:.6f}")
+        _trace.debug("apply_geo_limitation_to_load", lambda: f"q_eff={q_eff:.3f}")
+        _trace.debug("apply_geo_limitation_to_load", lambda: f"BEFORE - material_load_kgpm={self.r.material_load_kgpm:.3f}")
         
         # SỬA LỖI: Đảm bảo material_load_kgpm không bị reset về 0
         # Luôn sử dụng q_from_Qt để đảm bảo công suất động cơ thay đổi khi thay đổi vật liệu
@@ -312,33 +320,32 @@ class CalculationStrategy(ABC):
         else:
             # Fallback: sử dụng giá trị từ tiết diện nếu q_from_Qt = 0
             self.r.material_load_kgpm = q_from_geo
-            print(f"DEBUG: WARNING: q_from_Qt = 0, using q_from_geo = {q_from_geo:.3f}")
+            _trace.debug("apply_geo_limitation_to_load", lambda: f"WARNING: q_from_Qt = 0, using q_from_geo = {q_from_geo:.3f}")
         
         # Kiểm tra xem có bị khống chế bởi tiết diện không
         if q_eff < q_from_Qt - 1e-6:
             # Bị khống chế bởi tiết diện
-            self.r.warnings.append(
-                f"Lưu lượng thực bị khống chế bởi tiết diện: Q_thực≈{q_eff * V * 3.6 / 1000.0:.1f} t/h < Q_yêu cầu={self.p.Qt_tph:.1f} t/h."
-            )
-            print(f"DEBUG: WARNING: Geometric limitation detected, material_load_kgpm set to {self.r.material_load_kgpm:.3f}")
+            self.r.diagnostics.append(Diagnostic(DiagCode.CAPACITY_LIMITED_BY_SECTION, (
+                q_eff * V * 3.6 / 1000.0, self.p.Qt_tph)))
+            _trace.debug("apply_geo_limitation_to_load", lambda: f"WARNING: Geometric limitation detected, material_load_kgpm set to {self.r.material_load_kgpm:.3f}")
         else:
-            print(f"DEBUG: No geometric limitation, material_load_kgpm set to {self.r.material_load_kgpm:.3f}")
+            _trace.debug("apply_geo_limitation_to_load", lambda: f"No geometric limitation, material_load_kgpm set to {self.r.material_load_kgpm:.3f}")
         
         # Đảm bảo material_load_kgpm không bị 0
         if self.r.material_load_kgpm <= 0:
-            print(f"DEBUG: ERROR: material_load_kgpm = {self.r.material_load_kgpm}, fixing...")
+            _trace.debug("apply_geo_limitation_to_load", lambda: f"ERROR: material_load_kgpm = {self.r.material_load_kgpm}, fixing...")
             # Sử dụng giá trị fallback
             fallback_load = max(q_from_Qt, q_from_geo, 0.1)  # Ít nhất 0.1 kg/m
             self.r.material_load_kgpm = fallback_load
-            print(f"DEBUG: Fixed material_load_kgpm to {fallback_load:.3f}")
+            _trace.debug("apply_geo_limitation_to_load", lambda: f"Fixed material_load_kgpm to {fallback_load:.3f}")
         
         # Luôn cập nhật total_load_kgpm và mass_flow_rate
         self.r.total_load_kgpm = self.r.material_load_kgpm + self.r.belt_weight_kgpm + self.r.moving_parts_weight_kgpm
         self.r.mass_flow_rate = self.r.material_load_kgpm * V
         self.r.Qt_effective_tph = self.r.mass_flow_rate * 3.6 / 1000.0
         
-        print(f"DEBUG: AFTER - material_load_kgpm={self.r.material_load_kgpm:.3f}, total_load_kgpm={self.r.total_load_kgpm:.3f}")
-        print(f"DEBUG: mass_flow_rate={self.r.mass_flow_rate:.3f}, Qt_effective_tph={self.r.Qt_effective_tph:.3f}")
+        _trace.debug("apply_geo_limitation_to_load", lambda: f"AFTER - material_load_kgpm={self.r.material_load_kgpm:.3f}, total_load_kgpm={self.r.total_load_kgpm:.3f}")
+        _trace.debug("apply_geo_limitation_to_load", lambda: f"mass_flow_rate={self.r.mass_flow_rate:.3f}, Qt_effective_tph={self.r.Qt_effective_tph:.3f}")
 
     # --- [BẮT ĐẦU NÂNG CẤP] ---
     def _calculate_single_drive_tensions(self):
@@ -348,43 +355,29 @@ class CalculationStrategy(ABC):
         
         # SỬA LỖI: Kiểm tra effective_tension trước khi tính toán
         if self.r.effective_tension <= 0:
-            print(f"DEBUG TENSION: ERROR: effective_tension = {self.r.effective_tension}, fixing...")
+            _trace.debug("tension", lambda: f"ERROR: effective_tension = {self.r.effective_tension}, fixing...")
             # Ước tính từ material_load_kgpm và ma sát
             belt_speed = getattr(self.r, 'belt_speed_mps', self.p.V_mps) or self.p.V_mps
             belt_speed = max(0.05, belt_speed)
-            if self.r.material_load_kgpm > 0:
-                # Ước tính lực ma sát và nâng
-                estimated_friction = self.r.material_load_kgpm * G * self.p.L_m * 0.02  # Hệ số ma sát 0.02
-                estimated_lift = self.r.material_load_kgpm * G * self.p.H_m if self.p.H_m > 0 else 0
-                self.r.effective_tension = estimated_friction + estimated_lift
-                print(f"DEBUG TENSION: Fixed effective_tension to {self.r.effective_tension:.3f}")
-            else:
-                self.r.effective_tension = 1000.0  # Giá trị mặc định
-                print(f"DEBUG TENSION: Set effective_tension to default 1000.0")
+            # Ước tính lực ma sát (hệ số 0.02) và lực nâng; không có tải thì 1000 N
+            self.r.effective_tension = fallback_effective_tension(self.r.material_load_kgpm, self.p.L_m, self.p.H_m)
+            _trace.debug("tension", lambda: f"Fixed effective_tension to {self.r.effective_tension:.3f}")
         
         wrap_deg_eff, mu_eff, _ = self._effective_drive_contact()
         theta = deg2rad(wrap_deg_eff)
         self.r.wrap_angle_rad = theta
         e_ratio = math.exp(mu_eff * theta)
 
-        # Debug: in ra các giá trị để kiểm tra
-        print(f"DEBUG TENSION: effective_tension={self.r.effective_tension}")
-        print(f"DEBUG TENSION: friction_force={self.r.friction_force}, lift_force={self.r.lift_force}")
-        print(f"DEBUG TENSION: wrap_deg_eff={wrap_deg_eff}, mu_eff={mu_eff}, theta={theta}")
-        print(f"DEBUG TENSION: mu_eff * theta={mu_eff * theta}, e_ratio={e_ratio}")
+        _trace.debug("tension", lambda: f"effective_tension={self.r.effective_tension}")
+        _trace.debug("tension", lambda: f"friction_force={self.r.friction_force}, lift_force={self.r.lift_force}")
+        _trace.debug("tension", lambda: f"wrap_deg_eff={wrap_deg_eff}, mu_eff={mu_eff}, theta={theta}")
+        _trace.debug("tension", lambda: f"mu_eff * theta={mu_eff * theta}, e_ratio={e_ratio}")
 
-        if abs(e_ratio - 1.0) < 1e-6:
-            self.r.T2 = self.r.effective_tension * 10.0
-            print(f"DEBUG TENSION: e_ratio ≈ 1, using T2 = effective_tension * 10 = {self.r.T2}")
-        else:
-            self.r.T2 = self.r.effective_tension / (e_ratio - 1.0)
-            print(f"DEBUG TENSION: e_ratio ≠ 1, using T2 = effective_tension / (e_ratio - 1) = {self.r.T2}")
-        
-        self.r.T1 = self.r.effective_tension + self.r.T2
+        # T2 = effective_tension / (e_ratio - 1), hoặc effective_tension * 10 khi e_ratio ≈ 1
+        self.r.T1, self.r.T2 = euler_eytelwein(self.r.effective_tension, e_ratio)
         self.r.max_tension = self.r.T1
         
-        # Debug: in ra kết quả cuối cùng
-        print(f"DEBUG TENSION: T2={self.r.T2}, T1={self.r.T1}, max_tension={self.r.max_tension}")
+        _trace.debug("tension", lambda: f"T2={self.r.T2}, T1={self.r.T1}, max_tension={self.r.max_tension}")
 
     def _calculate_dual_drive_tensions(self):
         """
@@ -401,22 +394,16 @@ class CalculationStrategy(ABC):
 
         # SỬA LỖI: Kiểm tra material_load_kgpm trước khi tính toán
         if Wm <= 0:
-            print(f"DEBUG DUAL DRIVE: ERROR: material_load_kgpm = {Wm}, fixing...")
+            _trace.debug("dual_drive", lambda: f"ERROR: material_load_kgpm = {Wm}, fixing...")
             # Tính lại từ Qt_tph
             belt_speed = getattr(self.r, 'belt_speed_mps', self.p.V_mps) or self.p.V_mps
             belt_speed = max(0.05, belt_speed)
             Wm = (self.p.Qt_tph * 1000.0 / 3600.0) / belt_speed
             self.r.material_load_kgpm = Wm
-            print(f"DEBUG DUAL DRIVE: Fixed material_load_kgpm to {Wm:.3f}")
+            _trace.debug("dual_drive", lambda: f"Fixed material_load_kgpm to {Wm:.3f}")
 
-        # Công thức (19) & (20) từ PDF, trang 18. Đơn vị lực là [kgf]
-        Fc_kgf = f * (l + lo) * (W1 + Wc / lc + Wm) + h * (W1 + Wm)
-        Fr_kgf = f * (l + lo) * (W1 + Wr / lr) - h * W1
-        
-        # Đổi dấu h cho băng tải xuống dốc
-        if h < 0:
-            Fc_kgf = f * (l + lo) * (W1 + Wc / lc + Wm) + h * (W1 + Wm)
-            Fr_kgf = f * (l + lo) * (W1 + Wr / lr) - h * W1
+        # Công thức (19) & (20) từ PDF, trang 18. Đơn vị lực là [kgf]; h < 0 với băng tải xuống dốc
+        Fc_kgf, Fr_kgf = dual_drive_resistances_kgf(f, l, lo, h, W1, Wm, Wc, Wr, lc, lr)
         
         self.r.Fc_drive = Fc_kgf
         self.r.Fr_drive = Fr_kgf
@@ -425,34 +412,21 @@ class CalculationStrategy(ABC):
         Fp_kgf = Fc_kgf + Fr_kgf
         self.r.effective_tension = Fp_kgf * G  # Lưu lực vòng tổng bằng Newton
 
-        mu1 = mu2 = self.p.mu_pulley
-        theta1 = theta2 = deg2rad(self.p.wrap_deg)
-        e_mu_theta1 = math.exp(mu1 * theta1)
+        # Hai puly giống nhau: μ1 = μ2, θ1 = θ2
+        mu = self.p.mu_pulley
+        theta = deg2rad(self.p.wrap_deg)
+        e_mu_theta = math.exp(mu * theta)
+        e_sum = math.exp(mu * theta + mu * theta)
         
-        # Phân phối lực vòng Fp1, Fp2 [kgf]
-        if self.p.dual_drive_ratio == "Phân phối lý thuyết":
-            # Công thức (23)
-            e_mu_theta2 = math.exp(mu2 * theta2)
-            e_sum = math.exp(mu1 * theta1 + mu2 * theta2)
-            Fp2_kgf = ((e_mu_theta2 - 1) / (e_sum - 1)) * (Fp_kgf + Fr_kgf * (e_mu_theta1 - 1))
-            Fp1_kgf = Fp_kgf - Fp2_kgf
-            self.r.drive_distribution_method = "Lý thuyết"
-        elif self.p.dual_drive_ratio == "Phân phối 2/1 (66/33)":
-            Fp1_kgf = Fp_kgf * (2/3)
-            Fp2_kgf = Fp_kgf * (1/3)
-            self.r.drive_distribution_method = "Tỷ lệ 2/1"
-        else: # Mặc định là "Phân phối đều (50/50)"
-            Fp1_kgf = Fp_kgf / 2.0
-            Fp2_kgf = Fp_kgf / 2.0
-            self.r.drive_distribution_method = "Tỷ lệ 50/50"
+        # Phân phối lực vòng Fp1, Fp2 [kgf] theo công thức (23) hoặc tỉ lệ 2/1, 50/50 (mặc định);
+        # công thức (24) & (25): lực căng nhánh chùng F21, F22 [kgf]
+        Fp1_kgf, Fp2_kgf, F21_kgf, F22_kgf, method = dual_drive_distribution(
+            Fp_kgf, Fr_kgf, e_mu_theta, e_sum, self.p.dual_drive_ratio)
+        self.r.drive_distribution_method = method
 
         self.r.Fp1 = Fp1_kgf
         self.r.Fp2 = Fp2_kgf
 
-        # Công thức (24) & (25): Lực căng nhánh chùng F21, F22 [kgf]
-        F21_kgf = Fp1_kgf / (e_mu_theta1 - 1) if abs(e_mu_theta1 - 1) > 1e-6 else Fp1_kgf * 10
-        F22_kgf = Fp2_kgf / (math.exp(mu2 * theta2) - 1) if abs(math.exp(mu2 * theta2) - 1) > 1e-6 else Fp2_kgf * 10
-
         # Lực căng nhánh căng F11, F12 [kgf]
         F11_kgf = Fp1_kgf + F21_kgf
         F12_kgf = Fp2_kgf + F22_kgf
@@ -476,11 +450,8 @@ class CalculationStrategy(ABC):
         self.r.lift_force = 0 if h == 0 else (h * (W1 + Wm)) * G
     # --- [KẾT THÚC NÂNG CẤP] ---
 
-    def execute(self) -> CalculationResult:
-        # Debug: kiểm tra giá trị đầu vào
-        print(f"DEBUG EXECUTE START: Qt_tph={self.p.Qt_tph}, V_mps={self.p.V_mps}")
-        print(f"DEBUG EXECUTE START: B_mm={self.p.B_mm}, belt_thickness_mm={self.p.belt_thickness_mm}, belt_type={self.p.belt_type}")
-        
+    def _resolve_belt_speed(self):
+        """Chốt tốc độ băng: tự động theo bảng tra khi V_mps trống, ngược lại kiểm tra V_mps của người dùng."""
         # --- [BẮT ĐẦU NÂNG CẤP TỐC ĐỘ BĂNG TỰ ĐỘNG] ---
         # Tính toán tốc độ băng tự động
         if self.p.V_mps is None or self.p.V_mps <= 0:
@@ -504,7 +475,8 @@ class CalculationStrategy(ABC):
                     material_name=self.p.material,
                     trough_angle_deg=float(self.p.trough_angle_label.split('°')[0]) if '°' in self.p.trough_angle_label else 20.0,
                     surcharge_angle_deg=self.p.surcharge_angle_deg,
-                    material_characteristics=material_characteristics
+                    material_characteristics=material_characteristics,
+                    coded=True
                 )
                 
                 # Cập nhật kết quả
@@ -516,20 +488,18 @@ class CalculationStrategy(ABC):
                 self.r.belt_width_selected_mm = self.p.B_mm  # Sửa: đảm bảo cập nhật bề rộng băng
                 
                 # Thêm cảnh báo
-                if not hasattr(self.r, 'warnings'):
-                    self.r.warnings = []
-                self.r.warnings.extend(warnings)
+                self.r.diagnostics.extend(warnings)
                 
                 # Sử dụng tốc độ đã tính
-                self.p.V_mps = v_final
-                print(f"DEBUG AUTO SPEED: Calculated speed = {v_final:.2f} m/s, max allowed = {max_speed_allowed:.2f} m/s")
+                self.p = self.p.replace(V_mps=v_final)
+                _trace.debug("auto_speed", lambda: f"Calculated speed = {v_final:.2f} m/s, max allowed = {max_speed_allowed:.2f} m/s")
                 
             except Exception as e:
-                print(f"DEBUG AUTO SPEED: Error in speed calculation: {e}")
+                _trace.debug("auto_speed", lambda: f"Error in speed calculation: {e}")
                 # Tốc độ mặc định an toàn
-                self.p.V_mps = 2.0
+                self.p = self.p.replace(V_mps=2.0)
                 self.r.belt_speed_mps = 2.0
-                print(f"DEBUG AUTO SPEED: Using fallback recommended speed 2.0 m/s")
+                _trace.debug("auto_speed", "Using fallback recommended speed 2.0 m/s")
         else:
             # Nếu có V_mps từ người dùng, vẫn cần tính tốc độ khuyến nghị và kiểm tra giới hạn
             try:
@@ -557,32 +527,61 @@ class CalculationStrategy(ABC):
                 
                 # Kiểm tra xem tốc độ người dùng có vượt quá giới hạn không
                 if max_speed_allowed > 0 and self.p.V_mps > max_speed_allowed:
-                    warning_msg = f"⚠️ CẢNH BÁO: Tốc độ người dùng nhập ({self.p.V_mps:.2f} m/s) vượt quá tốc độ tối đa cho phép ({max_speed_allowed:.2f} m/s) theo bảng tra cho bề rộng {self.p.B_mm}mm. Thiết kế này KHÔNG TỐI ƯU - cần tăng bề rộng băng hoặc giảm lưu lượng."
-                    if not hasattr(self.r, 'warnings'):
-                        self.r.warnings = []
-                    self.r.warnings.append(warning_msg)
+                    self.r.diagnostics.append(Diagnostic(DiagCode.USER_SPEED_ABOVE_MAX, (
+                        self.p.V_mps, max_speed_allowed, self.p.B_mm)))
                 
-                print(f"DEBUG AUTO SPEED: Using user-provided V_mps={self.p.V_mps} m/s, calculated v_rec={v_rec:.3f} m/s, max allowed={max_speed_allowed:.2f} m/s")
+                _trace.debug("auto_speed", lambda: f"Using user-provided V_mps={self.p.V_mps} m/s, calculated v_rec={v_rec:.3f} m/s, max allowed={max_speed_allowed:.2f} m/s")
                 
             except Exception as e:
-                print(f"DEBUG AUTO SPEED ERROR: Failed to calculate recommended speed: {e}")
+                _trace.error("auto_speed_error", lambda: f"Failed to calculate recommended speed: {e}")
                 # Fallback: sử dụng giá trị mặc định
                 self.r.belt_speed_mps = self.p.V_mps
                 self.r.belt_width_selected_mm = self.p.B_mm
                 self.r.belt_speed_recommended_mps = 2.0  # Tốc độ mặc định an toàn
-                print(f"DEBUG AUTO SPEED: Using fallback recommended speed 2.0 m/s")
+                _trace.debug("auto_speed", "Using fallback recommended speed 2.0 m/s")
         # --- [KẾT THÚC NÂNG CẤP TỐC ĐỘ BĂNG TỰ ĐỘNG] ---
+
+    def execute(self) -> CalculationResult:
+        _trace.debug("execute_start", lambda: f"Qt_tph={self.p.Qt_tph}, V_mps={self.p.V_mps}")
+        _trace.debug("execute_start", lambda: f"B_mm={self.p.B_mm}, belt_thickness_mm={self.p.belt_thickness_mm}, belt_type={self.p.belt_type}")
+        
+        self.run_load_stage()
+        self.run_tension_stage()
+        self.run_finalize_stage()
+        self.run_cost_stage()
+        self.run_pulley_stage()
+        
+        _trace.debug("final", lambda: f"required_power_kw={self.r.required_power_kw}")
+        _trace.debug("final", lambda: f"motor_power_kw={self.r.motor_power_kw}")
+        _trace.debug("final", lambda: f"safety_factor={self.r.safety_factor}")
+        _trace.debug("final", lambda: f"friction_force={self.r.friction_force}, lift_force={self.r.lift_force}")
+        _trace.debug("final", lambda: f"effective_tension={self.r.effective_tension}")
+        _trace.debug("final", lambda: f"T1={self.r.T1}, T2={self.r.T2}, max_tension={self.r.max_tension}")
+        
+        _trace.debug("calculate", lambda: f"transmission_solution={self.r.transmission_solution}")
+        _trace.debug("calculate", lambda: f"safety_factor={self.r.safety_factor}")
+        _trace.debug("calculate", lambda: f"cost_capital_total={self.r.cost_capital_total}")
+        return self.r
+
+    # --- [BẮT ĐẦU NÂNG CẤP TÍNH LẠI TỪNG PHẦN] ---
+    # Các giai đoạn của execute() theo thứ tự. core/incremental.py khai báo tham số và trường kết quả
+    # mà từng giai đoạn đọc/ghi để recalculate() chỉ chạy lại các giai đoạn bị ảnh hưởng.
+
+    def run_load_stage(self):
+        """Chốt tốc độ băng, tải trọng trên mét, tiết diện và năng suất."""
+        with stage("auto_speed"):
+            self._resolve_belt_speed()
         
         # SỬA LỖI: Đảm bảo V_mps không bị 0
         if self.p.V_mps <= 0:
-            print(f"DEBUG: ERROR: V_mps = {self.p.V_mps}, fixing to 2.0 m/s")
-            self.p.V_mps = 2.0
+            _trace.debug("execute", lambda: f"ERROR: V_mps = {self.p.V_mps}, fixing to 2.0 m/s")
+            self.p = self.p.replace(V_mps=2.0)
             self.r.belt_speed_mps = 2.0
         
         # SỬA LỖI: Đảm bảo Qt_tph không bị 0
         if self.p.Qt_tph <= 0:
-            print(f"DEBUG: ERROR: Qt_tph = {self.p.Qt_tph}, fixing to 100.0 tph")
-            self.p.Qt_tph = 100.0
+            _trace.debug("execute", lambda: f"ERROR: Qt_tph = {self.p.Qt_tph}, fixing to 100.0 tph")
+            self.p = self.p.replace(Qt_tph=100.0)
         
         self.r.mass_flow_rate = self.p.Qt_tph * 1000.0 / 3600.0
         self.r.material_load_kgpm = self.r.mass_flow_rate / max(self.p.V_mps, 0.1)
@@ -593,17 +592,17 @@ class CalculationStrategy(ABC):
             self.r.moving_parts_weight_kgpm = 0.0
         self.r.total_load_kgpm = self.r.material_load_kgpm + self.r.belt_weight_kgpm + self.r.moving_parts_weight_kgpm
 
-        # Debug: in ra các giá trị để kiểm tra
         belt_speed = getattr(self.r, 'belt_speed_mps', self.p.V_mps) or self.p.V_mps
-        print(f"DEBUG: Qt_tph={self.p.Qt_tph}, V_mps={belt_speed}")
-        print(f"DEBUG: mass_flow_rate={self.r.mass_flow_rate}, material_load_kgpm={self.r.material_load_kgpm}")
-        print(f"DEBUG: belt_weight_kgpm={self.r.belt_weight_kgpm}, moving_parts_weight_kgpm={self.r.moving_parts_weight_kgpm}")
-        print(f"DEBUG: total_load_kgpm={self.r.total_load_kgpm}")
-        print(f"DEBUG: B_mm={self.p.B_mm}, belt_thickness_mm={self.p.belt_thickness_mm}, belt_type={self.p.belt_type}")
-        print(f"DEBUG: calculation_standard={self.p.calculation_standard}, drive_type={self.p.drive_type}")
-
-        self._compute_geometry_capacity()
-        self._apply_geo_limitation_to_load()
+        _trace.debug("execute", lambda: f"Qt_tph={self.p.Qt_tph}, V_mps={belt_speed}")
+        _trace.debug("execute", lambda: f"mass_flow_rate={self.r.mass_flow_rate}, material_load_kgpm={self.r.material_load_kgpm}")
+        _trace.debug("execute", lambda: f"belt_weight_kgpm={self.r.belt_weight_kgpm}, moving_parts_weight_kgpm={self.r.moving_parts_weight_kgpm}")
+        _trace.debug("execute", lambda: f"total_load_kgpm={self.r.total_load_kgpm}")
+        _trace.debug("execute", lambda: f"B_mm={self.p.B_mm}, belt_thickness_mm={self.p.belt_thickness_mm}, belt_type={self.p.belt_type}")
+        _trace.debug("execute", lambda: f"calculation_standard={self.p.calculation_standard}, drive_type={self.p.drive_type}")
+
+        with stage("geometry_capacity"):
+            self._compute_geometry_capacity()
+            self._apply_geo_limitation_to_load()
         
         # Cập nhật lại total_load_kgpm sau khi material_load_kgpm có thể đã thay đổi
         self.r.total_load_kgpm = self.r.material_load_kgpm + self.r.belt_weight_kgpm + self.r.moving_parts_weight_kgpm
@@ -615,86 +614,167 @@ class CalculationStrategy(ABC):
         self.r.mass_flow_rate = self.r.material_load_kgpm * V
         self.r.Qt_effective_tph = self.r.mass_flow_rate * 3.6 / 1000.0
         
-        # Debug: sau khi áp dụng giới hạn hình học
-        print(f"DEBUG: AFTER GEO - material_load_kgpm={self.r.material_load_kgpm}, total_load_kgpm={self.r.total_load_kgpm}")
-        print(f"DEBUG: AFTER GEO - mass_flow_rate={self.r.mass_flow_rate}, Qt_effective_tph={self.r.Qt_effective_tph}")
+        _trace.debug("execute", lambda: f"AFTER GEO - material_load_kgpm={self.r.material_load_kgpm}, total_load_kgpm={self.r.total_load_kgpm}")
+        _trace.debug("execute", lambda: f"AFTER GEO - mass_flow_rate={self.r.mass_flow_rate}, Qt_effective_tph={self.r.Qt_effective_tph}")
         
         # SỬA LỖI: Kiểm tra cuối cùng để đảm bảo không có giá trị 0
         if self.r.material_load_kgpm <= 0:
-            print(f"DEBUG: FINAL CHECK: material_load_kgpm = {self.r.material_load_kgpm}, fixing...")
+            _trace.debug("execute", lambda: f"FINAL CHECK: material_load_kgpm = {self.r.material_load_kgpm}, fixing...")
             # Tính lại từ Qt_tph
             fallback_load = (self.p.Qt_tph * 1000.0 / 3600.0) / max(V, 0.1)
             self.r.material_load_kgpm = max(fallback_load, 0.1)
-            print(f"DEBUG: Fixed material_load_kgpm to {self.r.material_load_kgpm:.3f}")
+            _trace.debug("execute", lambda: f"Fixed material_load_kgpm to {self.r.material_load_kgpm:.3f}")
         
         if self.r.total_load_kgpm <= 0:
-            print(f"DEBUG: FINAL CHECK: total_load_kgpm = {self.r.total_load_kgpm}, fixing...")
+            _trace.debug("execute", lambda: f"FINAL CHECK: total_load_kgpm = {self.r.total_load_kgpm}, fixing...")
             self.r.total_load_kgpm = self.r.material_load_kgpm + self.r.belt_weight_kgpm + self.r.moving_parts_weight_kgpm
-            print(f"DEBUG: Fixed total_load_kgpm to {self.r.total_load_kgpm:.3f}")
+            _trace.debug("execute", lambda: f"Fixed total_load_kgpm to {self.r.total_load_kgpm:.3f}")
         
         # SỬA LỖI: Đảm bảo belt_width_selected_mm không bị 0
         if not hasattr(self.r, 'belt_width_selected_mm') or self.r.belt_width_selected_mm <= 0:
-            print(f"DEBUG: FINAL CHECK: belt_width_selected_mm = {getattr(self.r, 'belt_width_selected_mm', 0)}, fixing...")
+            _trace.debug("execute", lambda: f"FINAL CHECK: belt_width_selected_mm = {getattr(self.r, 'belt_width_selected_mm', 0)}, fixing...")
             self.r.belt_width_selected_mm = max(self.p.B_mm, 400)  # Sử dụng giá trị từ params hoặc giá trị tối thiểu 400mm
-            print(f"DEBUG: Fixed belt_width_selected_mm to {self.r.belt_width_selected_mm}")
-        
+            _trace.debug("execute", lambda: f"Fixed belt_width_selected_mm to {self.r.belt_width_selected_mm}")
+
+    def run_tension_stage(self):
+        """Lực cản, công suất yêu cầu và lực căng (truyền động đơn hoặc kép)."""
         # --- [BẮT ĐẦU NÂNG CẤP] ---
         # Phân luồng tính toán cho truyền động đơn và kép
         if self.p.drive_type == "Dual drive":
             if self.p.calculation_standard != "CEMA":
-                 self.r.warnings.append(f"Tính toán truyền động kép hiện tại dựa trên phương pháp CEMA (Mục 6.2, PDF), bỏ qua lựa chọn {self.p.calculation_standard}.")
-            print(f"DEBUG: Using dual drive calculation")
-            self._calculate_dual_drive_tensions()
+                 self.r.diagnostics.append(Diagnostic(DiagCode.DUAL_DRIVE_CEMA_ONLY, (self.p.calculation_standard,)))
+            _trace.debug("execute", "Using dual drive calculation")
+            with stage("tensions"):
+                self._calculate_dual_drive_tensions()
+                self._attach_route(dual=True)
         else:
-            print(f"DEBUG: Using single drive calculation with {self.p.calculation_standard}")
-            self.calculate_resistances_and_power()
-            self._calculate_single_drive_tensions()
+            _trace.debug("execute", lambda: f"Using single drive calculation with {self.p.calculation_standard}")
+            with stage("resistances_power"):
+                self.calculate_resistances_and_power()
+                self._attach_route(dual=False)
+            with stage("tensions"):
+                self._calculate_single_drive_tensions()
         # --- [KẾT THÚC NÂNG CẤP] ---
 
-        self.finalize_results()
-        self._calculate_costs()
-        self._calculate_pulleys_and_idlers()
-        
-        # Debug: kết quả cuối cùng
-        print(f"DEBUG FINAL: required_power_kw={self.r.required_power_kw}")
-        print(f"DEBUG FINAL: motor_power_kw={self.r.motor_power_kw}")
-        print(f"DEBUG FINAL: safety_factor={self.r.safety_factor}")
-        print(f"DEBUG FINAL: friction_force={self.r.friction_force}, lift_force={self.r.lift_force}")
-        print(f"DEBUG FINAL: effective_tension={self.r.effective_tension}")
-        print(f"DEBUG FINAL: T1={self.r.T1}, T2={self.r.T2}, max_tension={self.r.max_tension}")
-        
-        print(f"DEBUG CALCULATE: transmission_solution={self.r.transmission_solution}")
-        print(f"DEBUG CALCULATE: safety_factor={self.r.safety_factor}")
-        print(f"DEBUG CALCULATE: cost_capital_total={self.r.cost_capital_total}")
-        return self.r
+    # --- [BẮT ĐẦU NÂNG CẤP TUYẾN NHIỀU ĐOẠN] ---
+    def _attach_route(self, dual: bool):
+        """
+        Gắn tuyến và tải của tuyến vào kết quả; với tuyến nhiều đoạn và truyền động đơn, thay lực
+        ma sát, lực nâng và công suất của tiêu chuẩn bằng kết quả lan truyền lực căng trên tuyến.
+
+        Hệ số ma sát của tuyến được hiệu chỉnh theo lực ma sát của tiêu chuẩn (core.route), nên
+        tuyến một đoạn đồng đều cho đúng các giá trị của tiêu chuẩn.
+        """
+        p = self.p
+        route = p.route or ((RouteSegment(p.L_m, p.H_m),) if p.L_m > 0 else ())
+        self.r.route = route
+        if not route:
+            return
+        q_B = self.r.belt_weight_kgpm
+        q_G = self.r.material_load_kgpm
+        Wc, Wr = get_idler_base_weights(p.B_mm)
+        lc_used, lr_used = self._idler_spacings_used()
+        if dual:
+            # Phần ma sát của lực vòng (19) + (20), bỏ các thành phần chênh cao
+            friction = (self.r.Fc_drive + self.r.Fr_drive - p.H_m * q_G) * G
+        else:
+            friction = self.r.friction_force
+        loads = RouteLoads.calibrated(friction, p.L_m, q_B, q_G, Wc, Wr, lc_used, lr_used)
+        self.r.route_loads = loads
+        if not p.route:
+            return
+        if dual:
+            self.r.diagnostics.append(Diagnostic(DiagCode.ROUTE_DUAL_DRIVE_NOMINAL, (len(route),)))
+            return
+
+        wrap_deg_eff, mu_eff, _ = self._effective_drive_contact()
+        e_ratio = math.exp(mu_eff * deg2rad(wrap_deg_eff))
+        route_friction, route_lift, gripped = route_drive_forces(route, loads, e_ratio)
+        if not gripped:
+            self.r.diagnostics.append(Diagnostic(DiagCode.ROUTE_CURVE_SLIP, (e_ratio,)))
+        belt_speed = getattr(self.r, 'belt_speed_mps', self.p.V_mps) or self.p.V_mps
+        nominal_friction = self.r.friction_force
+        self.r.friction_force = route_friction
+        if self.r.P1_kw + self.r.P2_kw > 0:
+            # CEMA: P1/P2 theo tỉ lệ lực ma sát, P3 theo lực nâng của tuyến
+            scale = route_friction / nominal_friction if nominal_friction else 0.0
+            self.r.P1_kw *= scale
+            self.r.P2_kw *= scale
+            self.r.P3_kw = route_lift * belt_speed / 1000.0
+            self.r.required_power_kw = self.r.P1_kw + self.r.P2_kw + self.r.P3_kw
+            self.r.lift_force = route_lift if self.r.P3_kw > 0 else 0.0
+        else:
+            self.r.required_power_kw = (route_friction + route_lift) * belt_speed / 1000.0
+            self.r.lift_force = route_lift
+        _trace.debug("route", lambda: f"segments={len(route)}, friction={route_friction}, lift={route_lift}")
+
+    def evaluate_load_cases(self, cases=None) -> 'LoadCaseMatrix':
+        """
+        Đánh giá nhiều trường hợp tải (rỗng, đầy tải, khởi động, dừng/hãm...) trong một lượt vector
+        hóa, dùng chung hình học, trọng lượng đai và con lăn của lần tính đã chạy (execute()).
+
+        Với truyền động kép, hai puly được gộp thành một puly có tổng góc ôm.
+
+        Args:
+            cases: Các LoadCase (None = core.load_cases.default_load_cases(Kt_start))
+
+        Returns:
+            LoadCaseMatrix
+
+        Raises:
+            ValueError: Nếu chưa chạy giai đoạn lực căng (kết quả chưa có tải của tuyến)
+        """
+        from .load_cases import default_load_cases, evaluate_load_cases
+        if self.r.route_loads is None:
+            raise ValueError("Chưa có tải của tuyến: cần chạy execute() trước khi đánh giá trường hợp tải")
+        if cases is None:
+            cases = default_load_cases(self.p.Kt_start)
+        if self.p.drive_type == "Dual drive":
+            e_ratio = math.exp(2.0 * self.p.mu_pulley * deg2rad(self.p.wrap_deg))
+        else:
+            wrap_deg_eff, mu_eff, _ = self._effective_drive_contact()
+            e_ratio = math.exp(mu_eff * deg2rad(wrap_deg_eff))
+        belt_speed = getattr(self.r, 'belt_speed_mps', self.p.V_mps) or self.p.V_mps
+        belt_capacity_N = (self.p.B_mm / 1000.0) * self._calculate_T_allow_from_belt_specs()
+        return evaluate_load_cases(self.r.route, self.r.route_loads, cases, e_ratio, belt_speed, belt_capacity_N)
+    # --- [KẾT THÚC NÂNG CẤP TUYẾN NHIỀU ĐOẠN] ---
+
+    def run_finalize_stage(self):
+        """Công suất động cơ, hệ số an toàn đai và biểu đồ lực căng."""
+        with stage("finalize"):
+            self.finalize_results()
+
+    def run_cost_stage(self):
+        """Chi phí đầu tư, vận hành và khối lượng."""
+        with stage("costs"):
+            self._calculate_costs()
+
+    def run_pulley_stage(self):
+        """SF thiết kế, đường kính puly, khoảng cách con lăn và khoảng chuyển tiếp."""
+        with stage("pulleys_idlers"):
+            self._calculate_pulleys_and_idlers()
+    # --- [KẾT THÚC NÂNG CẤP TÍNH LẠI TỪNG PHẦN] ---
 
     def finalize_results(self):
         eta_m = max(0.5, float(getattr(self.p, "motor_efficiency", 0.95) or 0.95))
         eta_g = max(0.5, float(getattr(self.p, "gearbox_efficiency", 0.96) or 0.96))
         Kt = max(1.0, float(getattr(self.p, "Kt_start", 1.25) or 1.25))
 
-        # Debug: in ra các giá trị để kiểm tra
-        print(f"DEBUG FINALIZE: eta_m={eta_m}, eta_g={eta_g}, Kt={Kt}")
-        print(f"DEBUG FINALIZE: required_power_kw={self.r.required_power_kw}")
-        print(f"DEBUG FINALIZE: max_tension={self.r.max_tension}")
+        _trace.debug("finalize", lambda: f"eta_m={eta_m}, eta_g={eta_g}, Kt={Kt}")
+        _trace.debug("finalize", lambda: f"required_power_kw={self.r.required_power_kw}")
+        _trace.debug("finalize", lambda: f"max_tension={self.r.max_tension}")
 
         # SỬA LỖI: Kiểm tra required_power_kw trước khi tính toán
         if self.r.required_power_kw <= 0:
-            print(f"DEBUG FINALIZE: ERROR: required_power_kw = {self.r.required_power_kw}, fixing...")
+            _trace.debug("finalize", lambda: f"ERROR: required_power_kw = {self.r.required_power_kw}, fixing...")
             # Tính lại từ material_load_kgpm và tốc độ
             belt_speed = getattr(self.r, 'belt_speed_mps', self.p.V_mps) or self.p.V_mps
             belt_speed = max(0.05, belt_speed)
-            if self.r.material_load_kgpm > 0:
-                # Ước tính công suất từ tải trọng và ma sát
-                estimated_power = (self.r.material_load_kgpm * G * belt_speed * 0.02) / 1000.0  # Giả định hệ số ma sát 0.02
-                self.r.required_power_kw = max(estimated_power, 0.1)
-                print(f"DEBUG FINALIZE: Fixed required_power_kw to {self.r.required_power_kw:.3f}")
-            else:
-                self.r.required_power_kw = 0.1
-                print(f"DEBUG FINALIZE: Set required_power_kw to default 0.1")
+            # Ước tính công suất từ tải trọng và ma sát (giả định hệ số ma sát 0.02)
+            self.r.required_power_kw = fallback_power_kw(self.r.material_load_kgpm, belt_speed)
+            _trace.debug("finalize", lambda: f"Fixed required_power_kw to {self.r.required_power_kw:.3f}")
 
-        self.r.motor_power_kw = self.r.required_power_kw * Kt / (eta_m * eta_g)
-        drive_eta = (eta_m * eta_g / Kt) * 100.0
+        self.r.motor_power_kw, drive_eta = drive_power(self.r.required_power_kw, eta_m, eta_g, Kt)
         self.r.drive_efficiency_percent = drive_eta
         self.r.efficiency = drive_eta
 
@@ -706,41 +786,27 @@ class CalculationStrategy(ABC):
         
         # SỬA LỖI: Kiểm tra max_tension trước khi tính safety_factor
         if self.r.max_tension <= 0:
-            print(f"DEBUG FINALIZE: ERROR: max_tension = {self.r.max_tension}, fixing...")
+            _trace.debug("finalize", lambda: f"ERROR: max_tension = {self.r.max_tension}, fixing...")
             # Ước tính từ required_power_kw
             belt_speed = getattr(self.r, 'belt_speed_mps', self.p.V_mps) or self.p.V_mps
             belt_speed = max(0.05, belt_speed)
             self.r.max_tension = (self.r.required_power_kw * 1000.0) / belt_speed
-            print(f"DEBUG FINALIZE: Fixed max_tension to {self.r.max_tension:.3f}")
-        
-        self.r.safety_factor = belt_capacity_N / max(self.r.max_tension, 1e-6)
-        self.r.belt_strength_utilization = 100.0 * self.r.max_tension / max(belt_capacity_N, 1e-6)
+            _trace.debug("finalize", lambda: f"Fixed max_tension to {self.r.max_tension:.3f}")
         
-        # Debug: in ra kết quả cuối cùng
-        print(f"DEBUG FINALIZE: motor_power_kw={self.r.motor_power_kw}")
-        print(f"DEBUG FINALIZE: safety_factor={self.r.safety_factor}")
-        print(f"DEBUG FINALIZE: belt_strength_utilization={self.r.belt_strength_utilization}")
-        print(f"DEBUG FINALIZE: T_allow_Npm={T_allow_Npm}, belt_capacity_N={belt_capacity_N}")
-
-        n = 50
-        L = max(self.p.L_m, 1.0)
-        self.r.distances_m = [i * L / n for i in range(n + 1)]
-        self.r.friction_force_profile = [self.r.friction_force * (d / L) for d in self.r.distances_m]
-        self.r.lift_force_profile = [self.r.lift_force * (d / L) for d in self.r.distances_m]
+        self.r.safety_factor, self.r.belt_strength_utilization = belt_strength(self.r.max_tension, belt_capacity_N)
         
-        # Cập nhật profile lực căng cho cả 2 trường hợp
+        _trace.debug("finalize", lambda: f"motor_power_kw={self.r.motor_power_kw}")
+        _trace.debug("finalize", lambda: f"safety_factor={self.r.safety_factor}")
+        _trace.debug("finalize", lambda: f"belt_strength_utilization={self.r.belt_strength_utilization}")
+        _trace.debug("finalize", lambda: f"T_allow_Npm={T_allow_Npm}, belt_capacity_N={belt_capacity_N}")
+
+        # Biểu đồ lực căng dọc băng được dựng lười từ hai giá trị này (CalculationResult.profiles)
+        self.r.profile_length_m = max(self.p.L_m, 1.0)
         if self.p.drive_type == "Dual drive":
-             # Với truyền động kép, T2 là F21 (lực căng nhánh chùng tại puly 1)
-            t2_base = self.r.F21
-            self.r.t2_profile = [t2_base for _ in self.r.distances_m]
+            # Với truyền động kép, T2 là F21 (lực căng nhánh chùng tại puly 1)
+            self.r.profile_t2_N = self.r.F21
         else:
-            t2_base = self.r.T2
-            self.r.t2_profile = [t2_base for _ in self.r.distances_m]
-
-        self.r.tension_profile = [
-            t2_base + self.r.friction_force_profile[i] + self.r.lift_force_profile[i]
-            for i in range(len(self.r.distances_m))
-        ]
+            self.r.profile_t2_N = self.r.T2
 
         # --- [BẮT ĐẦU SỬA LỖI SAFETY FACTOR] ---
         # Cải thiện cảnh báo SF thực dựa trên ngưỡng từ bảng tra
@@ -749,214 +815,131 @@ class CalculationStrategy(ABC):
             
             # Kiểm tra SF thực và đưa ra cảnh báo phù hợp
             if self.r.safety_factor < warning_red:
-                self.r.warnings.append(f"⚠️ Hệ số an toàn thực tế QUÁ THẤP (SF = {self.r.safety_factor:.2f} < {warning_red}).")
+                self.r.diagnostics.append(Diagnostic(DiagCode.SF_CRITICAL, (self.r.safety_factor, warning_red)))
                 if "Dây thép" not in (self.p.belt_type or ""):
                     self.r.recommendations.append("Cân nhắc tăng bề rộng hoặc chọn đai bền hơn (ST).")
                 self.r.recommendations.append("KIỂM TRA NGAY: Thiết kế có thể không an toàn!")
             elif self.r.safety_factor < warning_yellow:
-                self.r.warnings.append(f"⚠️ Hệ số an toàn thực tế thấp (SF = {self.r.safety_factor:.2f} < {warning_yellow}).")
+                self.r.diagnostics.append(Diagnostic(DiagCode.SF_LOW, (self.r.safety_factor, warning_yellow)))
                 self.r.recommendations.append("Cân nhắc kiểm tra lại thiết kế hoặc chọn đai bền hơn.")
             else:
-                print(f"DEBUG FINALIZE: SF thực = {self.r.safety_factor:.2f} (OK, >= {warning_yellow})")
+                _trace.debug("finalize", lambda: f"SF thực = {self.r.safety_factor:.2f} (OK, >= {warning_yellow})")
                 
             # Thêm thông tin so sánh SF thiết kế vs SF thực
             if hasattr(self.r, 'sf_design') and self.r.sf_design > 0:
                 sf_ratio = self.r.safety_factor / self.r.sf_design
                 if sf_ratio < 0.8:
-                    self.r.warnings.append(f"⚠️ SF thực ({self.r.safety_factor:.2f}) chỉ bằng {sf_ratio:.1%} so với SF thiết kế ({self.r.sf_design:.2f}).")
+                    self.r.diagnostics.append(Diagnostic(DiagCode.SF_BELOW_DESIGN, (self.r.safety_factor, sf_ratio, self.r.sf_design)))
                 elif sf_ratio > 1.5:
-                    print(f"DEBUG FINALIZE: SF thực ({self.r.safety_factor:.2f}) cao hơn {sf_ratio:.1%} so với SF thiết kế ({self.r.sf_design:.2f}) - Thiết kế dư an toàn")
+                    _trace.debug("finalize", lambda: f"SF thực ({self.r.safety_factor:.2f}) cao hơn {sf_ratio:.1%} so với SF thiết kế ({self.r.sf_design:.2f}) - Thiết kế dư an toàn")
                 
         except Exception as e:
-            print(f"DEBUG FINALIZE: Lỗi kiểm tra ngưỡng SF: {e}, dùng logic cũ")
+            _trace.debug("finalize", lambda: f"Lỗi kiểm tra ngưỡng SF: {e}, dùng logic cũ")
             # Fallback: logic cũ
             if self.r.safety_factor < 6.0:
-                self.r.warnings.append(f"Hệ số an toàn thấp (SF = {self.r.safety_factor:.2f} < 6).")
+                self.r.diagnostics.append(Diagnostic(DiagCode.SF_LOW_FALLBACK, (self.r.safety_factor,)))
                 if "Dây thép" not in (self.p.belt_type or ""):
                     self.r.recommendations.append("Cân nhắc tăng bề rộng hoặc chọn đai bền hơn (ST).")
         
         # Kiểm tra mức sử dụng cường độ đai
         if self.r.belt_strength_utilization > 80.0:
-            self.r.warnings.append(f"Mức sử dụng cường độ đai cao ({self.r.belt_strength_utilization:.1f}%).")
+            self.r.diagnostics.append(Diagnostic(DiagCode.BELT_UTILIZATION_HIGH, (self.r.belt_strength_utilization,)))
             self.r.recommendations.append("Cân nhắc tăng bề rộng băng hoặc chọn đai bền hơn.")
         elif self.r.belt_strength_utilization < 20.0:
-            print(f"DEBUG FINALIZE: Mức sử dụng cường độ đai thấp ({self.r.belt_strength_utilization:.1f}%) - Có thể tối ưu hóa")
+            _trace.debug("finalize", lambda: f"Mức sử dụng cường độ đai thấp ({self.r.belt_strength_utilization:.1f}%) - Có thể tối ưu hóa")
             self.r.recommendations.append("Cân nhắc giảm bề rộng băng để tiết kiệm chi phí.")
         
         # Kiểm tra tính nhất quán của đơn vị
         try:
-            unit_warnings = validate_sf_calculation_units(
+            self.r.diagnostics.extend(validate_sf_calculation_units(
                 max_tension_N=self.r.max_tension,
                 belt_width_mm=self.p.B_mm,
                 T_allow_Npm=T_allow_Npm,
                 sf_design=getattr(self.r, 'sf_design', 0.0),
                 sf_actual=self.r.safety_factor
-            )
-            for warning in unit_warnings:
-                self.r.warnings.append(f"🔍 {warning}")
+            ))
         except Exception as e:
-            print(f"DEBUG FINALIZE: Lỗi kiểm tra đơn vị: {e}")
+            _trace.debug("finalize", lambda: f"Lỗi kiểm tra đơn vị: {e}")
         # --- [KẾT THÚC SỬA LỖI SAFETY FACTOR] ---
 
     def _calculate_costs(self):
-        cost_per_m2 = self.belt_specs.get("cost_per_m2", 50.0)
-        belt_area_m2 = (self.p.B_mm / 1000.0) * self.p.L_m * 2.1
-        self.r.cost_belt = belt_area_m2 * cost_per_m2
-
-        import math as _m
         lc_used = max(0.5, float(getattr(self.p, "carrying_idler_spacing_m", 1.2) or 1.2))
         lr_used = max(1.0, float(getattr(self.p, "return_idler_spacing_m", 3.0) or 3.0))
-        num_carry = _m.ceil(self.p.L_m / lc_used)
-        num_return = _m.ceil(self.p.L_m / lr_used)
-
-        cost_per_idler = 30.0 + (self.p.B_mm / 1000.0) * 80.0
-        self.r.cost_idlers = (num_carry + num_return) * cost_per_idler
-
-        cost_per_m_struct = 150.0 + (self.p.B_mm / 1000.0) * 200.0
-        self.r.cost_structure = self.p.L_m * cost_per_m_struct
-
-        self.r.cost_drive = self.r.motor_power_kw * 750.0 + (self.r.drum_diameter_mm / 1000.0) ** 2 * 2000.0 * 2.0
-
-        self.r.cost_others = (self.r.cost_belt + self.r.cost_idlers + self.r.cost_structure + self.r.cost_drive) * 0.15
-        self.r.cost_capital_total = self.r.cost_belt + self.r.cost_idlers + self.r.cost_structure + self.r.cost_drive + self.r.cost_others
-
-        kwh_per_year = self.r.required_power_kw * (self.p.operating_hours * 365.0)
-        self.r.op_cost_energy_per_year = kwh_per_year * 0.12
-        self.r.op_cost_maintenance_per_year = self.r.cost_capital_total * 0.02
-        self.r.op_cost_total_per_year = self.r.op_cost_energy_per_year + self.r.op_cost_maintenance_per_year
-
-        # --- [BẮT ĐẦU TÍNH TOÁN KHỐI LƯỢNG] ---
-        # Ước tính khối lượng các thành phần
-        belt_mass = self.r.belt_weight_kgpm * self.p.L_m * 2.1
-        
         Wc, Wr = get_idler_base_weights(self.p.B_mm)
-        idler_mass = (num_carry * Wc) + (num_return * Wr)
-        
-        # Ước tính khối lượng kết cấu và hệ thống truyền động
-        # Giả định giá thép kết cấu là $5/kg và giá hệ thống truyền động là $10/kg
-        structure_mass = self.r.cost_structure / 5.0 if self.r.cost_structure > 0 else self.p.L_m * 50
-        drive_mass = self.r.cost_drive / 10.0 if self.r.cost_drive > 0 else self.r.motor_power_kw * 20
-        
-        self.r.total_mass_kg = belt_mass + idler_mass + structure_mass + drive_mass
-        # --- [KẾT THÚC TÍNH TOÁN KHỐI LƯỢNG] ---
-        
-        # Debug: in ra các giá trị để kiểm tra
-        print(f"DEBUG COSTS: cost_belt={self.r.cost_belt}, cost_idlers={self.r.cost_idlers}")
-        print(f"DEBUG COSTS: cost_structure={self.r.cost_structure}, cost_drive={self.r.cost_drive}")
-        print(f"DEBUG COSTS: cost_capital_total={self.r.cost_capital_total}")
-        print(f"DEBUG COSTS: op_cost_energy_per_year={self.r.op_cost_energy_per_year}")
-        print(f"DEBUG MASS: belt_mass={belt_mass:.2f}, idler_mass={idler_mass:.2f}, structure_mass={structure_mass:.2f}, drive_mass={drive_mass:.2f}")
-        print(f"DEBUG MASS: total_mass_kg={self.r.total_mass_kg:.2f}")
+        # Chi phí đầu tư/vận hành và khối lượng ước tính (giá thép kết cấu $5/kg, truyền động $10/kg)
+        costs = capital_and_operating_costs(
+            self.p.B_mm, self.p.L_m, self.belt_specs.get("cost_per_m2", 50.0), lc_used, lr_used,
+            self.r.motor_power_kw, self.r.drum_diameter_mm, self.r.required_power_kw, self.p.operating_hours,
+            self.r.belt_weight_kgpm, Wc, Wr)
+        for name, value in costs.items():
+            setattr(self.r, name, value)
+        
+        _trace.debug("costs", lambda: f"cost_belt={self.r.cost_belt}, cost_idlers={self.r.cost_idlers}")
+        _trace.debug("costs", lambda: f"cost_structure={self.r.cost_structure}, cost_drive={self.r.cost_drive}")
+        _trace.debug("costs", lambda: f"cost_capital_total={self.r.cost_capital_total}")
+        _trace.debug("costs", lambda: f"op_cost_energy_per_year={self.r.op_cost_energy_per_year}")
+        _trace.debug("mass", lambda: f"total_mass_kg={self.r.total_mass_kg:.2f}")
 
     def _calculate_pulleys_and_idlers(self):
         dia_A = 0.0
-        is_steel_cord = "ST" in self.p.belt_type or "Thép" in self.p.belt_type
+        steel_cord = is_steel_cord(self.p.belt_type)
 
-        # Debug: in ra các giá trị để kiểm tra
-        print(f"DEBUG PULLEYS: belt_type={self.p.belt_type}, is_steel_cord={is_steel_cord}")
-        print(f"DEBUG PULLEYS: max_tension={self.r.max_tension}")
+        _trace.debug("pulleys", lambda: f"belt_type={self.p.belt_type}, is_steel_cord={steel_cord}")
+        _trace.debug("pulleys", lambda: f"max_tension={self.r.max_tension}")
 
         # --- [BẮT ĐẦU SỬA LỖI SAFETY FACTOR] ---
         # Lấy Safety Factor thiết kế từ bảng tra
-        try:
-            sf_design = lookup_sf_design(
-                belt_type=self.p.belt_type,
-                group=getattr(self.p, "material_group", "A"),
-                lump_ge_30mm=getattr(self.p, "lump_size_ge_30mm", False),
-                duty_minutes=getattr(self.p, "duty_cycle_minutes", None)
-            )
-            self.r.sf_design = sf_design
-            print(f"DEBUG PULLEYS: SF thiết kế = {sf_design}")
-        except Exception as e:
-            print(f"DEBUG PULLEYS: Lỗi tra SF thiết kế: {e}, dùng giá trị mặc định")
-            # Fallback: dùng giá trị mặc định dựa trên loại đai
-            if is_steel_cord:
-                sf_design = 7.0  # Giá trị trung bình cho steel cord
-            else:
-                sf_design = 9.0  # Giá trị trung bình cho fabric
-            self.r.sf_design = sf_design
+        # Lỗi tra bảng thì dùng giá trị trung bình theo loại đai (7.0 steel cord, 9.0 fabric)
+        sf_design = design_safety_factor(
+            self.p.belt_type,
+            getattr(self.p, "material_group", "A"),
+            getattr(self.p, "lump_size_ge_30mm", False),
+            getattr(self.p, "duty_cycle_minutes", None)
+        )
+        self.r.sf_design = sf_design
+        _trace.debug("pulleys", lambda: f"SF thiết kế = {sf_design}")
 
-        if is_steel_cord:
-            # SỬA LỖI: Dùng SF thiết kế thay vì SF thực
-            f_max_kg = self.r.max_tension / G
-            st_no_calc = f_max_kg * sf_design / (self.p.B_mm / 10.0)
+        # SỬA LỖI: Dùng SF thiết kế thay vì SF thực; F·TS của đai vải tính trên bề rộng hữu ích
+        st_no_calc, ft_req = required_belt_rating(self.r.max_tension, sf_design, self.p.B_mm)
+        if steel_cord:
             self.r.required_ST = round(st_no_calc, 1)
-            print(f"DEBUG PULLEYS: ST yêu cầu = {st_no_calc:.1f}")
+            _trace.debug("pulleys", lambda: f"ST yêu cầu = {st_no_calc:.1f}")
             
-            st_types = sorted([int(s.replace("ST-", "")) for s in PULLEY_DIAMETERS_ST_MM.keys()])
-            closest_st_val = min(st_types, key=lambda x: float('inf') if x < st_no_calc else x - st_no_calc)
-            st_key = f"ST-{closest_st_val}"
-            if st_key in PULLEY_DIAMETERS_ST_MM:
-                dia_A = PULLEY_DIAMETERS_ST_MM[st_key]['A']
-                print(f"DEBUG PULLEYS: Chọn ST-{closest_st_val}, dia_A = {dia_A}")
+            # Cấp ST nhỏ nhất >= yêu cầu; không có cấp nào đủ lớn thì lấy cấp đầu bảng
+            st_idx = PULLEY_ST_TABLE.ceil_index(st_no_calc)
+            if st_idx is None:
+                st_idx = 0
+            closest_st_val = PULLEY_ST_TABLE.key_list[st_idx]
+            dia_A = PULLEY_ST_TABLE.value_list[st_idx]
+            _trace.debug("pulleys", lambda: f"Chọn ST-{closest_st_val}, dia_A = {dia_A}")
         else:
-            # SỬA LỖI: Tính F·TS yêu cầu cho đai vải
-            f_max_kg = self.r.max_tension / G
-            B_cm = self.p.B_mm / 10.0
-            Be_cm = max((self.p.B_mm - 60.0) / 10.0, 1.0)  # Bề rộng hữu ích
-            
-            ft_req = f_max_kg * sf_design / Be_cm
             self.r.required_fabric_rating = round(ft_req, 1)
-            print(f"DEBUG PULLEYS: F·TS yêu cầu = {ft_req:.1f}, B = {B_cm}cm, Be = {Be_cm}cm")
+            _trace.debug("pulleys", lambda: f"F·TS yêu cầu = {ft_req:.1f}")
             
-            # Chọn đai vải dựa trên rating yêu cầu
-            load_level_percent = self.r.belt_strength_utilization
-            if load_level_percent > 60:
-                load_category_key = "high"
-            elif 30 <= load_level_percent <= 60:
-                load_category_key = "medium"
-            else:
-                load_category_key = "low"
+            # Chọn đai vải dựa trên mức sử dụng cường độ đai
+            load_category_key = pulley_load_category(self.r.belt_strength_utilization)
             
             strength_class = self.belt_specs.get("strength", 400)
-            available_strengths = sorted(PULLEY_DIAMETERS_FABRIC_MM.keys())
-            closest_strength_class = min(available_strengths, key=lambda x: abs(x - strength_class))
-            
-            if closest_strength_class in PULLEY_DIAMETERS_FABRIC_MM:
-                dia_A = PULLEY_DIAMETERS_FABRIC_MM[closest_strength_class][load_category_key]
+            dia_A = PULLEY_FABRIC_TABLES[load_category_key].nearest(strength_class)
         # --- [KẾT THÚC SỬA LỖI SAFETY FACTOR] ---
         
-        # Debug: in ra kết quả
-        print(f"DEBUG PULLEYS: dia_A={dia_A}")
+        _trace.debug("pulleys", lambda: f"dia_A={dia_A}")
 
-        dia_B = dia_A * 0.8
-        dia_C = dia_A * 0.6
-        
-        self.r.recommended_pulley_diameters_mm = {
-            "Puly dẫn động/đầu (Loại A)": round(dia_A),
-            "Puly căng/đuôi (Loại B)": round(dia_B),
-            "Puly dẫn hướng (Loại C)": round(dia_C),
-        }
+        # Loại B = 0.8·A, loại C = 0.6·A (CalculationResult.recommended_pulley_diameters_mm)
+        self.r.pulley_diameter_A_mm = dia_A
         self.r.drum_diameter_mm = round(dia_A)
 
         density_kgm3 = self.p.density_tpm3 * 1000
-        available_widths = sorted(IDLER_SPACING_CARRY_M.keys())
-        closest_width = min(available_widths, key=lambda w: abs(w - self.p.B_mm))
-        
-        spacing_map = IDLER_SPACING_CARRY_M.get(closest_width, {})
-        available_densities = sorted(spacing_map.keys())
-        closest_density = min(available_densities, key=lambda d: abs(d - density_kgm3)) if available_densities else 0
-        
-        spacing_carry = spacing_map.get(closest_density, 1.2)
+        spacing_carry = IDLER_SPACING_CARRY_TABLE.nearest(self.p.B_mm, density_kgm3)
         spacing_return = 2.4 if self.p.B_mm >= 2000 else 3.0
 
-        self.r.recommended_idler_spacing_m = {
-            "Nhánh tải (đề xuất)": spacing_carry,
-            "Nhánh về (đề xuất)": spacing_return,
-        }
+        self.r.idler_spacing_carry_m = spacing_carry
+        self.r.idler_spacing_return_m = spacing_return
 
-        belt_cat = "steel" if is_steel_cord else "fabric"
+        belt_cat = "steel" if steel_cord else "fabric"
         trough_deg = parse_trough_label(self.p.trough_angle_label, 20.0)
         
-        factors_table = TRANSITION_DISTANCE_FACTORS.get(belt_cat, {})
-        available_angles = sorted(factors_table.keys())
-        closest_angle = min(available_angles, key=lambda a: abs(a - trough_deg))
-        
-        width_map = factors_table.get(closest_angle, {})
-        available_widths_trans = sorted(width_map.keys())
-        closest_width_trans = min(available_widths_trans, key=lambda w: abs(w - self.p.B_mm))
-        
-        factor = width_map.get(closest_width_trans, 1.5)
+        factor = TRANSITION_FACTOR_TABLES[belt_cat].nearest(trough_deg, self.p.B_mm)
         self.r.transition_distance_m = factor * (self.p.B_mm / 1000.0)
 
     def _calculate_T_allow_from_belt_specs(self) -> float:
@@ -966,38 +949,9 @@ class CalculationStrategy(ABC):
         Returns:
             T_allow_Npm tính theo N/m dựa trên loại đai và rating
         """
-        # Kiểm tra nếu đã có T_allow_Npm từ belt_specs
-        if "T_allow_Npm" in self.belt_specs:
-            return self.belt_specs["T_allow_Npm"]
-        
-        # Nếu không có, tính từ thông số đai đã chọn
-        belt_type = self.p.belt_type or ""
-        
-        # Nếu là đai dây thép (ST-No)
-        if "ST" in belt_type or "Thép" in belt_type:
-            # Tìm số ST từ belt_type (ví dụ: "ST-500" -> 500)
-            import re
-            st_match = re.search(r'ST-(\d+)', belt_type)
-            if st_match:
-                st_no = int(st_match.group(1))
-                # Công thức: T_allow_Npm = ST_No * 9.81 * 100
-                T_allow_Npm = st_no * 9.81 * 100
-                print(f"DEBUG T_allow: Tính từ ST-{st_no}: {T_allow_Npm:.0f} N/m")
-                return T_allow_Npm
-        
-        # Nếu là đai vải (F·TS)
-        if "FABRIC" in belt_type.upper() or "EP" in belt_type.upper() or "NN" in belt_type.upper():
-            # Lấy strength từ belt_specs
-            strength = self.belt_specs.get("strength", 400)
-            # Công thức: T_allow_Npm = FTS * 9.81 * 100
-            T_allow_Npm = strength * 9.81 * 100
-            print(f"DEBUG T_allow: Tính từ F·TS {strength}: {T_allow_Npm:.0f} N/m")
-            return T_allow_Npm
-        
-        # Fallback: dùng giá trị từ belt_specs nếu có
-        fallback_value = self.belt_specs.get("T_allow_Npm", 100000.0)  # Tăng từ 6000 lên 100000
-        print(f"DEBUG T_allow: Dùng fallback: {fallback_value:.0f} N/m")
-        return fallback_value
+        T_allow_Npm = allowable_tension_npm(self.p.belt_type, self.belt_specs)
+        _trace.debug("t_allow", lambda: f"belt_type={self.p.belt_type}: {T_allow_Npm:.0f} N/m")
+        return T_allow_Npm
 
 
 # --------- Concrete strategies ---------
@@ -1011,36 +965,30 @@ class CEMAStrategy(CalculationStrategy):
         
         # SỬA LỖI: Kiểm tra giá trị hợp lệ trước khi tính toán
         if self.r.material_load_kgpm <= 0:
-            print(f"DEBUG CEMA: ERROR: material_load_kgpm = {self.r.material_load_kgpm}, using fallback")
+            _trace.debug("cema", lambda: f"ERROR: material_load_kgpm = {self.r.material_load_kgpm}, using fallback")
             # Tính lại từ Qt_tph
             belt_speed = max(0.05, belt_speed)
             self.r.material_load_kgpm = (self.p.Qt_tph * 1000.0 / 3600.0) / belt_speed
-            print(f"DEBUG CEMA: Fixed material_load_kgpm to {self.r.material_load_kgpm:.3f}")
+            _trace.debug("cema", lambda: f"Fixed material_load_kgpm to {self.r.material_load_kgpm:.3f}")
         
-        P1_kw = (f * (self.p.L_m + lo) * W_kgpm * V_mpm) / 6120.0
-        P2_kw = (f * (self.p.L_m + lo) * self.r.material_load_kgpm * V_mpm) / 6120.0
         belt_speed = getattr(self.r, 'belt_speed_mps', self.p.V_mps) or self.p.V_mps
-        P3_kw = (self.p.H_m * self.r.material_load_kgpm) * G * belt_speed / 1000.0
+        P1_kw, P2_kw, P3_kw = cema_power_kw(f, self.p.L_m, lo, W_kgpm, self.r.material_load_kgpm, self.p.H_m, belt_speed)
         
-        # Debug: in ra các giá trị để kiểm tra
-        print(f"DEBUG CEMA: f={f}, lo={lo}, V_mpm={V_mpm}, W_kgpm={W_kgpm}")
-        print(f"DEBUG CEMA: L_m={self.p.L_m}, H_m={self.p.H_m}, material_load_kgpm={self.r.material_load_kgpm}")
-        print(f"DEBUG CEMA: P1_kw={P1_kw}, P2_kw={P2_kw}, P3_kw={P3_kw}")
+        _trace.debug("cema", lambda: f"f={f}, lo={lo}, V_mpm={V_mpm}, W_kgpm={W_kgpm}")
+        _trace.debug("cema", lambda: f"L_m={self.p.L_m}, H_m={self.p.H_m}, material_load_kgpm={self.r.material_load_kgpm}")
+        _trace.debug("cema", lambda: f"P1_kw={P1_kw}, P2_kw={P2_kw}, P3_kw={P3_kw}")
         
         self.r.P1_kw = P1_kw
         self.r.P2_kw = P2_kw
         self.r.P3_kw = P3_kw
         self.r.Pt_kw = 0.0
         self.r.required_power_kw = P1_kw + P2_kw + P3_kw
-        belt_speed = getattr(self.r, 'belt_speed_mps', self.p.V_mps) or self.p.V_mps
-        self.r.friction_force = (P1_kw + P2_kw) * 1000.0 / max(belt_speed, 0.1)
-        self.r.lift_force = (P3_kw * 1000.0 / max(belt_speed, 0.1)) if P3_kw > 0 else 0.0
+        self.r.friction_force, self.r.lift_force = cema_forces(P1_kw, P2_kw, P3_kw, belt_speed)
         
-        # Debug: in ra kết quả cuối cùng
-        print(f"DEBUG CEMA: required_power_kw={self.r.required_power_kw}")
-        print(f"DEBUG CEMA: friction_force={self.r.friction_force}, lift_force={self.r.lift_force}")
+        _trace.debug("cema", lambda: f"required_power_kw={self.r.required_power_kw}")
+        _trace.debug("cema", lambda: f"friction_force={self.r.friction_force}, lift_force={self.r.lift_force}")
         belt_speed = getattr(self.r, 'belt_speed_mps', self.p.V_mps) or self.p.V_mps
-        print(f"DEBUG CEMA: V_mps={belt_speed}, max(V_mps, 0.1)={max(belt_speed, 0.1)}")
+        _trace.debug("cema", lambda: f"V_mps={belt_speed}, max(V_mps, 0.1)={max(belt_speed, 0.1)}")
 
 class DINStrategy(CalculationStrategy):
     def calculate_resistances_and_power(self):
@@ -1048,21 +996,12 @@ class DINStrategy(CalculationStrategy):
         q_B = self.r.belt_weight_kgpm
         Wc, Wr = get_idler_base_weights(self.p.B_mm)
 
-        lc_default, lr_default = get_default_spacings(self.p.B_mm, self.p.Qt_tph)
-        lc_used = max(0.5, float(getattr(self.p, "carrying_idler_spacing_m", lc_default) or lc_default))
-        lr_used = max(1.0, float(getattr(self.p, "return_idler_spacing_m", lr_default) or lr_default))
-
-        q_R_upper = Wc / lc_used
-        q_R_lower = Wr / lr_used
+        lc_used, lr_used = self._idler_spacings_used()
 
         f = 0.025
-        L = self.p.L_m
-        H = self.p.H_m
-        F_friction = f * G * L * (2.0 * q_B + q_R_upper + q_R_lower + q_G)
-        F_lift = G * H * q_G
-        F_total = F_friction + F_lift
+        F_friction, F_lift = din_resistances(f, self.p.L_m, self.p.H_m, q_B, q_G, Wc, Wr, lc_used, lr_used)
         belt_speed = getattr(self.r, 'belt_speed_mps', self.p.V_mps) or self.p.V_mps
-        self.r.required_power_kw = F_total * belt_speed / 1000.0
+        self.r.required_power_kw = resistance_power_kw(F_friction, F_lift, belt_speed)
         self.r.friction_force = F_friction
         self.r.lift_force = F_lift
 
@@ -1072,24 +1011,15 @@ class ISOStrategy(DINStrategy):
         q_B = self.r.belt_weight_kgpm
         Wc, Wr = get_idler_base_weights(self.p.B_mm)
 
-        lc_default, lr_default = get_default_spacings(self.p.B_mm, self.p.Qt_tph)
-        lc_used = max(0.5, float(getattr(self.p, "carrying_idler_spacing_m", lc_default) or lc_default))
-        lr_used = max(1.0, float(getattr(self.p, "return_idler_spacing_m", lr_default) or lr_default))
-
-        q_R_upper = Wc / lc_used
-        q_R_lower = Wr / lr_used
+        lc_used, lr_used = self._idler_spacings_used()
 
         f_iso = 0.022
-        L = self.p.L_m
-        H = self.p.H_m
-        F_friction = f_iso * G * L * (2.0 * q_B + q_R_upper + q_R_lower + q_G)
-        F_lift = G * H * q_G
-        F_total = F_friction + F_lift
+        F_friction, F_lift = din_resistances(f_iso, self.p.L_m, self.p.H_m, q_B, q_G, Wc, Wr, lc_used, lr_used)
         belt_speed = getattr(self.r, 'belt_speed_mps', self.p.V_mps) or self.p.V_mps
-        self.r.required_power_kw = F_total * belt_speed / 1000.0
+        self.r.required_power_kw = resistance_power_kw(F_friction, F_lift, belt_speed)
         self.r.friction_force = F_friction
         self.r.lift_force = F_lift
-        self.r.warnings.append("Đang tính theo ISO 5048 với hệ số ma sát thấp hơn DIN.")
+        self.r.diagnostics.append(Diagnostic(DiagCode.ISO_LOWER_FRICTION))
 
 # ---------------- API ----------------
 
@@ -1101,19 +1031,105 @@ def get_strategy(params: ConveyorParameters, result: CalculationResult, common_d
         return ISOStrategy(params, result, common_data, belt_specs)
     return CEMAStrategy(params, result, common_data, belt_specs)
 
-def calculate(p: ConveyorParameters) -> CalculationResult:
+def calculate(p: ConveyorParameters, with_transmission: bool = True, profile: bool = False,
+              track_stages: bool = False) -> CalculationResult:
+    """
+    Tính toán băng tải cho một bộ tham số.
+
+    Args:
+        p: Tham số băng tải
+        with_transmission: Có tìm bộ truyền động (hộp số + nhông xích) không
+        profile: True để gắn thời gian từng giai đoạn và số lần tra bảng vào result.profile
+        track_stages: True để lưu trạng thái từng giai đoạn vào result.stage_state, cho phép
+            core.incremental.recalculate() chỉ tính lại phần bị ảnh hưởng khi đổi tham số
+
+    Returns:
+        CalculationResult
+    """
+    if profile:
+        with profile_calculation() as prof:
+            result = calculate(p, with_transmission, track_stages=track_stages)
+        result.profile = prof
+        return result
+    if track_stages:
+        from .incremental import calculate_incremental
+        return calculate_incremental(p, with_transmission)
+
     r = CalculationResult()
     mat = ACTIVE_MATERIAL_DB.get(p.material, {})
     belt = ACTIVE_BELT_SPECS.get(p.belt_type, {})
     common_data = {"material": mat}
     belt_specs = belt or {}
     strat = get_strategy(p, r, common_data, belt_specs)
+    current_profile = active_profile()
+    if current_profile is not None:
+        current_profile.record_strategy(type(strat).__name__)
     result = strat.execute()
     
     # --- [BẮT ĐẦU NÂNG CẤP TRUYỀN ĐỘNG] ---
     # Lưu motor_rpm vào kết quả để UI hiển thị chính xác
     result.motor_rpm = p.motor_rpm
     
+    if with_transmission:
+        # strat.p: tham số đã chốt tốc độ băng (p của người gọi không bị thay đổi)
+        attach_transmission(result, strat.p)
+    # --- [KẾT THÚC NÂNG CẤP TRUYỀN ĐỘNG] ---
+    return result
+
+def select_chain_specs(p: ConveyorParameters, chain_specs: list) -> list:
+    """
+    Lọc danh sách xích theo lựa chọn của người dùng/optimizer.
+
+    Với chain_selection_mode = "manual" chỉ giữ xích có designation trùng chain_spec_designation;
+    nếu không tìm thấy thì dùng toàn bộ danh sách.
+    """
+    mode = (getattr(p, "chain_selection_mode", "auto") or "auto").lower()
+    designation = getattr(p, "chain_spec_designation", "") or ""
+    if mode != "manual" or not designation:
+        return chain_specs
+    if isinstance(chain_specs, ChainCatalog):
+        # Catalog con được cache theo mã xích (cột truyền động dùng lại giữa các lần gọi)
+        selected = chain_specs.subset(designation)
+    else:
+        selected = [cs for cs in chain_specs if getattr(cs, "designation", "") == designation]
+    if not selected:
+        _trace.debug("tx", lambda: f"Không tìm thấy xích {designation}, dùng toàn bộ danh sách xích")
+        return chain_specs
+    return selected
+
+def calculate_load_cases(p: ConveyorParameters, cases=None, with_transmission: bool = False) -> tuple:
+    """
+    Tính thiết kế và đánh giá ma trận trường hợp tải trong cùng một lượt.
+
+    Args:
+        p: Tham số băng tải
+        cases: Các core.load_cases.LoadCase (None = bộ mặc định theo Kt_start)
+        with_transmission: Có tìm bộ truyền động cho kết quả định mức không
+
+    Returns:
+        (CalculationResult định mức, LoadCaseMatrix)
+    """
+    r = CalculationResult()
+    mat = ACTIVE_MATERIAL_DB.get(p.material, {})
+    belt = ACTIVE_BELT_SPECS.get(p.belt_type, {})
+    strat = get_strategy(p, r, {"material": mat}, belt or {})
+    result = strat.execute()
+    result.motor_rpm = p.motor_rpm
+    if with_transmission:
+        attach_transmission(result, strat.p)
+    return result, strat.evaluate_load_cases(cases)
+
+def attach_transmission(result: CalculationResult, p: ConveyorParameters) -> CalculationResult:
+    """
+    Tìm bộ truyền động (hộp số + nhông xích) cho kết quả đã tính và gán vào result.
+
+    Args:
+        result: Kết quả từ CalculationStrategy.execute
+        p: Tham số đã được execute chốt tốc độ băng
+
+    Returns:
+        result (đã gán transmission_solution, gearbox_ratio_mode, gearbox_ratio_user)
+    """
     # Tính toán bộ truyền động hoàn chỉnh
     try:
         from .specs import ACTIVE_CHAIN_SPECS
@@ -1122,12 +1138,13 @@ def calculate(p: ConveyorParameters) -> CalculationResult:
         pulley_diameter = result.recommended_pulley_diameters_mm.get('Puly dẫn động/đầu (Loại A)', 500)  # mm
         
         # Gọi hàm tìm giải pháp tối ưu
-        transmission_solution = find_optimal_transmission(
-            calculation_params=p,
-            chain_specs=ACTIVE_CHAIN_SPECS,
-            pulley_diameter=pulley_diameter,  # Truyền đường kính puly thực tế
-            required_power_kw=result.required_power_kw if hasattr(result, "required_power_kw") else None
-        )
+        with stage("transmission"):
+            transmission_solution = find_optimal_transmission(
+                calculation_params=p,
+                chain_specs=select_chain_specs(p, ACTIVE_CHAIN_SPECS),
+                pulley_diameter=pulley_diameter,  # Truyền đường kính puly thực tế
+                required_power_kw=result.required_power_kw if hasattr(result, "required_power_kw") else None
+            )
         
         if transmission_solution:
             result.transmission_solution = transmission_solution
@@ -1136,37 +1153,271 @@ def calculate(p: ConveyorParameters) -> CalculationResult:
             result.gearbox_ratio_mode = p.gearbox_ratio_mode
             result.gearbox_ratio_user = p.gearbox_ratio_user
             # --- [KẾT THÚC NÂNG CẤP HỘP SỐ MANUAL] ---
-            print(f"DEBUG: Đã tìm thấy giải pháp truyền động: {transmission_solution}")
+            _trace.debug("attach_transmission", lambda: f"Đã tìm thấy giải pháp truyền động: {transmission_solution}")
         else:
-            print("DEBUG: Không tìm thấy giải pháp truyền động phù hợp")
+            _trace.debug("attach_transmission", "Không tìm thấy giải pháp truyền động phù hợp")
             # --- [BẮT ĐẦU SỬA LỖI] ---
             # Tạo một transmission_solution mặc định để tránh lỗi UI
             from .models import TransmissionSolution
             result.transmission_solution = TransmissionSolution()
             result.gearbox_ratio_mode = p.gearbox_ratio_mode
             result.gearbox_ratio_user = p.gearbox_ratio_user
-            print("DEBUG: Đã tạo transmission_solution mặc định để tránh lỗi UI")
+            _trace.debug("attach_transmission", "Đã tạo transmission_solution mặc định để tránh lỗi UI")
             # --- [KẾT THÚC SỬA LỖI] ---
             
     except Exception as e:
-        print(f"DEBUG: Lỗi khi tính toán truyền động: {e}")
+        _trace.debug("attach_transmission", lambda: f"Lỗi khi tính toán truyền động: {e}")
         # --- [BẮT ĐẦU SỬA LỖI] ---
         # Tạo transmission_solution mặc định để tránh lỗi UI
         from .models import TransmissionSolution
         result.transmission_solution = TransmissionSolution()
         result.gearbox_ratio_mode = p.gearbox_ratio_mode
         result.gearbox_ratio_user = p.gearbox_ratio_user
-        print("DEBUG: Đã tạo transmission_solution mặc định sau khi có lỗi")
+        _trace.debug("attach_transmission", "Đã tạo transmission_solution mặc định sau khi có lỗi")
         # --- [KẾT THÚC SỬA LỖI] ---
-    # --- [KẾT THÚC NÂNG CẤP TRUYỀN ĐỘNG] ---
     
     return result
 
+def calculate_batch(params_list, with_transmission: bool = True):
+    """
+    Tính toán hàng loạt (vector hóa bằng NumPy) cho nhiều thiết kế.
+
+    Args:
+        params_list: Danh sách ConveyorParameters hoặc ConveyorParameterTable
+        with_transmission: Có tìm bộ truyền động cho từng hàng không
+
+    Returns:
+        CalculationResultTable; dùng .to_result(i) để lấy CalculationResult của hàng i
+    """
+    from .batch import calculate_batch as _calculate_batch
+    return _calculate_batch(params_list, with_transmission=with_transmission)
+
+# --- [BẮT ĐẦU NÂNG CẤP VECTOR HÓA TRUYỀN ĐỘNG] ---
+# Số răng nhông dẫn được xét: 17-25
+_DRIVE_SPROCKET_TEETH = np.arange(17, 26)
+
+
+def _chain_arrays(chain_specs: list, tensile_safety_factor: float) -> tuple:
+    """
+    Cột (chains, pitch_mm, allowable_kN, weight_kgpm) của các xích dùng được (xem chain_columns).
+
+    ChainCatalog trả về cột đã cache, danh sách thường được duyệt mỗi lần gọi.
+    """
+    if isinstance(chain_specs, ChainCatalog):
+        return chain_specs.transmission_columns(tensile_safety_factor)
+    return chain_columns(chain_specs, tensile_safety_factor)
+
+
+def _lexicographic_top_k(keys: list, k: int) -> np.ndarray:
+    """
+    Chỉ số của k phần tử nhỏ nhất theo thứ tự từ điển của các khóa (khóa đầu quan trọng nhất).
+
+    Chỉ sắp xếp những phần tử có khóa đầu không lớn hơn giá trị nhỏ thứ k (partial sort).
+    """
+    primary = keys[0]
+    k = min(k, primary.size)
+    if k < primary.size:
+        threshold = np.partition(primary, k - 1)[k - 1]
+        candidates = np.flatnonzero(primary <= threshold)
+    else:
+        candidates = np.arange(primary.size)
+    order = np.lexsort(tuple(key[candidates] for key in reversed(keys)))
+    return candidates[order[:k]]
+
+
+class TransmissionGrid:
+    """
+    Phần không phụ thuộc công suất của lưới hộp số (G) × răng nhông dẫn 17-25 (Z) × xích (C).
+
+    Chỉ phụ thuộc vận tốc băng, đường kính puly, motor_rpm, chế độ hộp số và bộ xích, nên có thể
+    dùng lại cho mọi công suất yêu cầu (xem core/transmission_atlas.py). Các ô (hộp số, z1) đạt điều
+    kiện số răng được lưu theo thứ tự C-order, tốc độ xích của chúng là mảng (số ô, C).
+    """
+
+    def __init__(self, calculation_params: 'ConveyorParameters', chain_specs: list, pulley_diameter: float):
+        from .specs import STANDARD_GEARBOX_RATIOS, CHAIN_TENSILE_STRENGTH_SAFETY_FACTOR
+
+        # Tính toán yêu cầu
+        self.target_velocity = target_velocity = calculation_params.V_mps
+        self.motor_rpm = motor_rpm = calculation_params.motor_rpm
+        self.pulley_diameter = pulley_diameter
+
+        # Tính tốc độ puly yêu cầu: n_pulley_req = (V * 60) / (π * D)
+        rpm_pulley_required = (target_velocity * 60) / (math.pi * pulley_diameter / 1000)
+
+        _trace.debug("tx", lambda: f"target_velocity={target_velocity} m/s, pulley_diameter={pulley_diameter} mm")
+        _trace.debug("tx", lambda: f"motor_rpm={motor_rpm}, rpm_pulley_required={rpm_pulley_required:.2f}")
+
+        # --- [BẮT ĐẦU NÂNG CẤP HỘP SỐ MANUAL] ---
+        # Xác định danh sách tỉ số hộp số theo chế độ
+        self.use_manual = use_manual = (calculation_params.gearbox_ratio_mode.lower() == "manual" and calculation_params.gearbox_ratio_user > 0)
+        self.gearbox_ratio_user = calculation_params.gearbox_ratio_user
+        if use_manual:
+            gearbox_candidates = [calculation_params.gearbox_ratio_user]
+            _trace.debug("tx", lambda: f"Sử dụng chế độ Manual với i_g = {calculation_params.gearbox_ratio_user}")
+        else:
+            gearbox_candidates = STANDARD_GEARBOX_RATIOS
+            _trace.debug("tx", lambda: f"Sử dụng chế độ Auto với {len(STANDARD_GEARBOX_RATIOS)} tỉ số chuẩn")
+        # --- [KẾT THÚC NÂNG CẤP HỘP SỐ MANUAL] ---
+
+        # Các đại lượng theo hộp số (vô hướng, vài chục phần tử): tốc độ trục ra và tỉ số nhông-xích mục tiêu
+        gearbox_list, output_rpm_list, i_target_list = [], [], []
+        for gearbox_ratio in gearbox_candidates:
+            # Tính tốc độ trục ra của hộp số
+            # Công thức: Tốc độ đầu ra = Tốc độ động cơ ÷ Tỉ số hộp số
+            output_rpm = motor_rpm / gearbox_ratio
+
+            # Tính tỉ số truyền nhông-xích mục tiêu: i_s = n_out / n_pulley_req
+            i_sprocket_target = output_rpm / rpm_pulley_required
+
+            # --- [BẮT ĐẦU NÂNG CẤP HỘP SỐ MANUAL] ---
+            # Giới hạn tỉ số truyền nhông-xích trong khoảng hợp lý [1.2, 3.0]
+            # Với chế độ Manual, clamp i_s_target nếu ngoài dải
+            if i_sprocket_target < 1.2 or i_sprocket_target > 3.0:
+                if use_manual:
+                    # Clamp i_s_target cho chế độ Manual
+                    clamped_i_s = max(1.2, min(3.0, i_sprocket_target))
+                    _trace.debug("tx", lambda: f"Manual mode - i_s_target {i_sprocket_target:.3f} ngoài dải [1.2, 3.0], clamp về {clamped_i_s:.3f}")
+                    i_sprocket_target = clamped_i_s
+                else:
+                    # Bỏ qua cho chế độ Auto
+                    continue
+            # --- [KẾT THÚC NÂNG CẤP HỘP SỐ MANUAL] ---
+
+            _trace.debug("tx", lambda: f"ig={gearbox_ratio}, output_rpm={output_rpm:.2f}, i_s_target={i_sprocket_target:.3f}")
+            gearbox_list.append(gearbox_ratio)
+            output_rpm_list.append(output_rpm)
+            i_target_list.append(i_sprocket_target)
+        self.gearbox_list = gearbox_list
+        self.output_rpm_list = output_rpm_list
+
+        self.chains, self.pitch_mm, self.allowable_kN, self.weight_kgpm = _chain_arrays(chain_specs, CHAIN_TENSILE_STRENGTH_SAFETY_FACTOR)
+        self.empty = not (gearbox_list and self.chains)
+        self._ranking = None
+        if self.empty:
+            return
+
+        # Cùng công thức và thứ tự phép tính với vòng lặp vô hướng trước đây nên kết quả trùng từng bit.
+        # Thứ tự phẳng (G, Z, C) theo C-order chính là thứ tự duyệt cũ, dùng để phá hòa.
+        self.gearbox = np.asarray(gearbox_list, dtype=float)[:, None]
+        output_rpm = np.asarray(output_rpm_list, dtype=float)
+        z1 = _DRIVE_SPROCKET_TEETH[None, :]
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            # Số răng nhông bị dẫn (round của Python và np.rint cùng làm tròn nửa về số chẵn)
+            self.z2 = np.rint(z1 * np.asarray(i_target_list, dtype=float)[:, None])
+            self.teeth_ok = (self.z2 >= z1) & (self.z2 <= 120)
+            # Tỉ số truyền thực tế và vận tốc băng tải thực tế
+            self.i_total = self.gearbox * (self.z2 / z1)
+            self.actual_velocity = (motor_rpm / self.i_total) * (math.pi * pulley_diameter / 1000) / 60
+            self.error = np.abs(self.actual_velocity - target_velocity) / target_velocity * 100
+
+            # Tốc độ xích (m/s) của các ô đạt số răng với mọi xích: mảng (số ô, C)
+            self.cell_g, self.cell_z = np.divmod(np.flatnonzero(self.teeth_ok), len(_DRIVE_SPROCKET_TEETH))
+            circumference_m = (self.pitch_mm / 1000.0)[None, :] * _DRIVE_SPROCKET_TEETH[self.cell_z][:, None]
+            self.v_chain = np.maximum(circumference_m * (output_rpm[self.cell_g] / 60.0)[:, None], 1e-9)
+
+    @property
+    def size(self) -> int:
+        """Số tổ hợp (hộp số, z1, xích) của lưới."""
+        return 0 if self.empty else self.teeth_ok.size * len(self.chains)
+
+    def required_force(self, required_power_kw: Optional[float], v_chain: Optional[np.ndarray] = None) -> np.ndarray:
+        """Lực kéo yêu cầu trên xích (kN) của các ô với mọi xích: mảng (số ô, C)."""
+        v_chain = self.v_chain if v_chain is None else v_chain
+        if required_power_kw is not None and required_power_kw > 0:
+            with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+                return ((required_power_kw * 1000.0) / v_chain) / 1000.0
+        # Fallback mềm để không loại bỏ toàn bộ khi thiếu dữ liệu
+        return np.full(v_chain.shape, 0.5)
+
+    def first_feasible(self, required_power_kw: Optional[float]) -> Optional[tuple]:
+        """
+        Nghiệm tối ưu bằng một lần quét: các ô được xếp sẵn theo (sai số, |i_s - 1.9|, tổng răng, thứ tự duyệt),
+        nên tổ hợp đủ bền đầu tiên theo thứ tự đó chính là nghiệm của find_optimal_transmission.
+
+        Returns:
+            (g, z, c, lực kéo kN); () nếu không có tổ hợp đủ bền; None nếu nghiệm đầu tiên hòa ba tiêu chí
+            đầu với một cặp răng khác (cần xếp hạng đầy đủ)
+        """
+        if self._ranking is None:
+            self._ranking = self._rank_cells()
+        order, v_sorted, ambiguous = self._ranking
+        force = self.required_force(required_power_kw, v_sorted)
+        feasible = ~(force > self.allowable_kN[None, :])
+        flat = int(feasible.argmax())
+        row, c = divmod(flat, len(self.chains))
+        if not feasible[row, c]:
+            return ()
+        if ambiguous[row]:
+            return None
+        cell = order[row]
+        return int(self.cell_g[cell]), int(self.cell_z[cell]), c, float(force[row, c])
+
+    def _rank_cells(self) -> tuple:
+        """Thứ tự các ô theo ba tiêu chí xếp hạng đầu, tốc độ xích theo thứ tự đó và cờ hòa giữa các cặp răng."""
+        from .specs import PREFERRED_CHAIN_RATIO
+        z1 = _DRIVE_SPROCKET_TEETH[self.cell_z]
+        z2 = self.z2[self.cell_g, self.cell_z]
+        keys = (self.error[self.cell_g, self.cell_z], np.abs((z2 / z1) - PREFERRED_CHAIN_RATIO), (z1 + z2) * 0.1)
+        # lexsort ổn định: hòa cả ba khóa thì giữ thứ tự duyệt
+        order = np.lexsort(keys[::-1])
+        pair = (z1 * 1000 + z2.astype(np.int64))[order]
+        sorted_keys = [key[order] for key in keys]
+        ambiguous = ~np.isfinite(sorted_keys[0])
+        start = 0
+        for i in range(1, order.size + 1):
+            if i == order.size or any(key[i] != key[start] for key in sorted_keys):
+                if len(set(pair[start:i].tolist())) > 1:
+                    ambiguous[start:i] = True
+                start = i
+        return order, self.v_chain[order], ambiguous
+
+    def solution(self, g: int, z: int, c: int, force: float) -> 'TransmissionSolution':
+        """Dựng TransmissionSolution cho tổ hợp (g, z, c) với lực kéo yêu cầu force (kN)."""
+        from .models import TransmissionSolution
+        chain_spec = self.chains[c]
+        allowable = float(self.allowable_kN[c])
+        velocity = float(self.actual_velocity[g, z])
+        err = float(self.error[g, z])
+        solution = TransmissionSolution(
+            gearbox_ratio=self.gearbox_list[g],
+            drive_sprocket_teeth=int(_DRIVE_SPROCKET_TEETH[z]),
+            driven_sprocket_teeth=int(self.z2[g, z]),
+            chain_pitch_mm=chain_spec.pitch_mm,
+            actual_belt_velocity=velocity,
+            error=err,
+            chain_designation=getattr(chain_spec, "designation", ""),
+            total_transmission_ratio=float(self.i_total[g, z]),
+            chain_spec=chain_spec,
+            # --- [BẮT ĐẦU NÂNG CẤP THEO KẾ HOẠCH] ---
+            required_force_kN=force,
+            allowable_kN=allowable,
+            safety_margin=allowable / max(force, 1e-9),
+            chain_weight_kgpm=float(self.weight_kgpm[c])
+            # --- [KẾT THÚC NÂNG CẤP THEO KẾ HOẠCH] ---
+        )
+        # --- [BẮT ĐẦU SỬA LỖI UI] ---
+        # Gán các thuộc tính alias để UI có thể truy cập đúng
+        solution.gearbox_ratio_mode = "Manual" if self.use_manual else "Auto"
+        # Tốc độ đầu ra động cơ = Tốc độ động cơ ÷ Tỉ số hộp số
+        solution.motor_output_rpm = self.output_rpm_list[g]
+        solution.actual_velocity_mps = velocity
+        solution.velocity_error_percent = err
+        solution.required_force_kN = force
+        solution.allowable_force_kN = allowable
+        solution.chain_weight_kg_per_m = float(self.weight_kgpm[c])
+        # --- [KẾT THÚC SỬA LỖI UI] ---
+        return solution
+# --- [KẾT THÚC NÂNG CẤP VECTOR HÓA TRUYỀN ĐỘNG] ---
+
+
 # --- [BẮT ĐẦU NÂNG CẤP TRUYỀN ĐỘNG] ---
 def find_optimal_transmission(calculation_params: 'ConveyorParameters',
                               chain_specs: list,
                               pulley_diameter: float,
-                              required_power_kw: float | None = None) -> Optional['TransmissionSolution']:
+                              required_power_kw: float | None = None,
+                              use_atlas: bool = True,
+                              atlas: Optional['TransmissionAtlas'] = None) -> Optional['TransmissionSolution']:
     """
     Tìm giải pháp truyền động tối ưu đa mục tiêu theo kế hoạch Plan C:
     1. Dùng dữ liệu thực từ Bang tra 1.csv (Tensile Strength, Measuring Load, ISO/ANSI, Strand)
@@ -1176,209 +1427,110 @@ def find_optimal_transmission(calculation_params: 'ConveyorParameters',
     Args:
         calculation_params: Tham số tính toán băng tải
         chain_specs: Danh sách các loại xích có sẵn
+        use_atlas: Dùng atlas truyền động nếu đã bật (xem core/transmission_atlas.py); kết quả không đổi
+        atlas: Atlas dùng thay cho atlas đang bật (ví dụ atlas riêng của một lô calculate_batch)
     
     Returns:
         TransmissionSolution hoặc None nếu không tìm thấy giải pháp phù hợp
     """
-    from .models import TransmissionSolution
-    from .specs import STANDARD_GEARBOX_RATIOS, CHAIN_TENSILE_STRENGTH_SAFETY_FACTOR, PREFERRED_CHAIN_RATIO, PREFERRED_CHAIN_RANGE
-    
-    # Tính toán yêu cầu
-    target_velocity = calculation_params.V_mps
-    motor_rpm = calculation_params.motor_rpm
-    
-    # Tính tốc độ puly yêu cầu: n_pulley_req = (V * 60) / (π * D)
-    rpm_pulley_required = (target_velocity * 60) / (math.pi * pulley_diameter / 1000)
-    
-    print(f"DEBUG TX: target_velocity={target_velocity} m/s, pulley_diameter={pulley_diameter} mm")
-    print(f"DEBUG TX: motor_rpm={motor_rpm}, rpm_pulley_required={rpm_pulley_required:.2f}")
-    
-    valid_solutions = []
-    
-    # --- [BẮT ĐẦU NÂNG CẤP HỘP SỐ MANUAL] ---
-    # Xác định danh sách tỉ số hộp số theo chế độ
-    use_manual = (calculation_params.gearbox_ratio_mode.lower() == "manual" and calculation_params.gearbox_ratio_user > 0)
-    if use_manual:
-        gearbox_candidates = [calculation_params.gearbox_ratio_user]
-        print(f"DEBUG TX: Sử dụng chế độ Manual với i_g = {calculation_params.gearbox_ratio_user}")
+    from .specs import PREFERRED_CHAIN_RATIO
+
+    # --- [BẮT ĐẦU NÂNG CẤP ATLAS TRUYỀN ĐỘNG] ---
+    # Atlas giữ lưới đã dựng theo (vận tốc, puly, motor_rpm, hộp số, bộ xích); lưới được dùng lại thì
+    # lấy nghiệm bằng một lần quét. Khi đang truy vết thì đi đường đầy đủ để in được các giải pháp đầu.
+    if atlas is None:
+        atlas = active_transmission_atlas()
+    if not use_atlas or _trace.enabled:
+        atlas = None
+    if atlas is not None:
+        grid, cached = atlas.grid(calculation_params, chain_specs, pulley_diameter)
+        best = grid.first_feasible(required_power_kw) if cached and not grid.empty else None
+        if best is not None:
+            return grid.solution(*best) if best else None
     else:
-        gearbox_candidates = STANDARD_GEARBOX_RATIOS
-        print(f"DEBUG TX: Sử dụng chế độ Auto với {len(STANDARD_GEARBOX_RATIOS)} tỉ số chuẩn")
-    # --- [KẾT THÚC NÂNG CẤP HỘP SỐ MANUAL] ---
-    
-    # Vòng lặp chính - Duyệt qua các hộp số theo chế độ được chọn
-    for gearbox_ratio in gearbox_candidates:
-        # Tính tốc độ trục ra của hộp số
-        # Công thức: Tốc độ đầu ra = Tốc độ động cơ ÷ Tỉ số hộp số
-        output_rpm = motor_rpm / gearbox_ratio
-        
-        # Tính tỉ số truyền nhông-xích mục tiêu: i_s = n_out / n_pulley_req
-        i_sprocket_target = output_rpm / rpm_pulley_required
-        
-        # --- [BẮT ĐẦU NÂNG CẤP HỘP SỐ MANUAL] ---
-        # Giới hạn tỉ số truyền nhông-xích trong khoảng hợp lý [1.2, 3.0]
-        # Với chế độ Manual, clamp i_s_target nếu ngoài dải
-        if i_sprocket_target < 1.2 or i_sprocket_target > 3.0:
-            if use_manual:
-                # Clamp i_s_target cho chế độ Manual
-                clamped_i_s = max(1.2, min(3.0, i_sprocket_target))
-                print(f"DEBUG TX: Manual mode - i_s_target {i_sprocket_target:.3f} ngoài dải [1.2, 3.0], clamp về {clamped_i_s:.3f}")
-                i_sprocket_target = clamped_i_s
-            else:
-                # Bỏ qua cho chế độ Auto
-                continue
-        # --- [KẾT THÚC NÂNG CẤP HỘP SỐ MANUAL] ---
-        
-        print(f"DEBUG TX: ig={gearbox_ratio}, output_rpm={output_rpm:.2f}, i_s_target={i_sprocket_target:.3f}")
-        
-        # Vòng lặp phụ - Tìm cặp nhông phù hợp
-        for z1 in range(17, 26):  # Số răng nhông dẫn từ 17-25
-            # Tính số răng nhông bị dẫn lý thuyết
-            z2_ideal = z1 * i_sprocket_target
-            z2_actual = round(z2_ideal)
-            
-            # Kiểm tra giới hạn số răng nhông bị dẫn
-            if z2_actual < z1 or z2_actual > 120:
-                continue
-            
-            # Tính lại tỉ số truyền thực tế
-            i_sprocket_actual = z2_actual / z1
-            i_total_actual = gearbox_ratio * i_sprocket_actual
-            
-            # Tính vận tốc băng tải thực tế
-            actual_velocity = (motor_rpm / i_total_actual) * (math.pi * pulley_diameter / 1000) / 60
-            
-            # Tính sai số
-            error = abs(actual_velocity - target_velocity) / target_velocity * 100
-            
-            # Vòng lặp thứ ba - Kiểm tra độ bền với từng loại xích (dựa vào Tensile Strength, KHÔNG dùng Measuring Load làm allowable)
-            for chain_spec in chain_specs:
-                try:
-                    # Tốc độ xích (m/s)
-                    circumference_m = (chain_spec.pitch_mm / 1000.0) * z1
-                    v_chain = max(circumference_m * (output_rpm / 60.0), 1e-9)
-
-                    # Công suất yêu cầu (W) -> lực kéo yêu cầu trên xích (kN)
-                    if required_power_kw is not None and required_power_kw > 0:
-                        P_req_W = required_power_kw * 1000.0
-                        F_required_kN = (P_req_W / v_chain) / 1000.0
-                    else:
-                        # Fallback mềm để không loại bỏ toàn bộ khi thiếu dữ liệu
-                        # Giả định tải yêu cầu nhỏ (có thể cấu hình/ghi log để người dùng bổ sung power)
-                        F_required_kN = 0.5
-
-                    # Allowable theo Tensile/SF (đúng bản chất)
-                    if getattr(chain_spec, "tensile_strength_min_kn", 0.0) > 0.0:
-                        allowable_kN = chain_spec.tensile_strength_min_kn / CHAIN_TENSILE_STRENGTH_SAFETY_FACTOR
-                    else:
-                        # nếu CSV thiếu, bỏ qua kiểm tra bền cho bản ghi này
-                        allowable_kN = float("inf")
-
-                    # Lọc theo bền
-                    if F_required_kN > allowable_kN:
-                        print(f"DEBUG TX: Xích {getattr(chain_spec, 'designation', 'Unknown')} không đủ bền: F_req={F_required_kN:.3f} kN > F_allow={allowable_kN:.3f} kN")
-                        continue
-                    
-                    print(f"DEBUG TX: Xích {getattr(chain_spec, 'designation', 'Unknown')} đủ bền: F_req={F_required_kN:.3f} kN <= F_allow={allowable_kN:.3f} kN")
-
-                    # Tạo giải pháp hợp lệ
-                    solution = TransmissionSolution(
-                        gearbox_ratio=gearbox_ratio,
-                        drive_sprocket_teeth=z1,
-                        driven_sprocket_teeth=z2_actual,
-                        chain_pitch_mm=chain_spec.pitch_mm,
-                        actual_belt_velocity=actual_velocity,
-                        error=error,
-                        chain_designation=getattr(chain_spec, "designation", ""),
-                        total_transmission_ratio=i_total_actual,
-                        chain_spec=chain_spec,
-                        # --- [BẮT ĐẦU NÂNG CẤP THEO KẾ HOẠCH] ---
-                        required_force_kN=F_required_kN,
-                        allowable_kN=allowable_kN,
-                        safety_margin=allowable_kN / max(F_required_kN, 1e-9),
-                        chain_weight_kgpm=getattr(chain_spec, "weight_kgpm", 0.0)
-                        # --- [KẾT THÚC NÂNG CẤP THEO KẾ HOẠCH] ---
-                    )
-                    
-                    # --- [BẮT ĐẦU SỬA LỖI UI] ---
-                    # Gán các thuộc tính alias để UI có thể truy cập đúng
-                    solution.gearbox_ratio_mode = "Manual" if use_manual else "Auto"
-                    # Tốc độ đầu ra động cơ = Tốc độ động cơ ÷ Tỉ số hộp số
-                    solution.motor_output_rpm = output_rpm
-                    solution.actual_velocity_mps = actual_velocity
-                    solution.velocity_error_percent = error
-                    solution.required_force_kN = F_required_kN
-                    solution.allowable_force_kN = allowable_kN
-                    solution.chain_weight_kg_per_m = getattr(chain_spec, "weight_kgpm", 0.0)
-                    # --- [KẾT THÚC SỬA LỖI UI] ---
-                    
-                    valid_solutions.append(solution)
-
-                    # ĐÃ tìm được xích đủ bền cho cặp z1/z2 hiện tại
-                    # KHÔNG break để xem xét tất cả các loại xích có thể phù hợp
-                    # (sẽ sắp xếp sau để chọn tốt nhất)
-                except (ValueError, AttributeError) as e:
-                    # Bỏ qua xích có dữ liệu không hợp lệ
-                    print(f"DEBUG TX: Bỏ qua xích {getattr(chain_spec, 'designation', 'Unknown')} do lỗi: {e}")
-                    continue
-    
+        grid = TransmissionGrid(calculation_params, chain_specs, pulley_diameter)
+    # --- [KẾT THÚC NÂNG CẤP ATLAS TRUYỀN ĐỘNG] ---
+    use_manual = grid.use_manual
+
+    # --- [BẮT ĐẦU NÂNG CẤP VECTOR HÓA TRUYỀN ĐỘNG] ---
+    feasible_idx = np.empty(0, dtype=np.intp)
+    if not grid.empty:
+        # Lọc theo bền (allowable theo Tensile/SF, inf nếu CSV thiếu)
+        force = grid.required_force(required_power_kw)
+        feasible_idx = np.flatnonzero(~(force > grid.allowable_kN[None, :]))
+        _trace.debug("tx", lambda: f"{feasible_idx.size}/{grid.size} tổ hợp (hộp số, z1, xích) đủ bền")
+
     # --- [BẮT ĐẦU NÂNG CẤP HỘP SỐ MANUAL] ---
     # Lựa chọn giải pháp tốt nhất
-    if not valid_solutions:
+    if feasible_idx.size == 0:
         if use_manual:
-            print(f"DEBUG TX: Chế độ Manual - Không tìm thấy giải pháp phù hợp với i_g = {calculation_params.gearbox_ratio_user}")
-            print("DEBUG TX: Khuyến nghị: Thử i_g khác hoặc chuyển về chế độ Auto")
+            _trace.debug("tx", lambda: f"Chế độ Manual - Không tìm thấy giải pháp phù hợp với i_g = {calculation_params.gearbox_ratio_user}")
+            _trace.debug("tx", "Khuyến nghị: Thử i_g khác hoặc chuyển về chế độ Auto")
         else:
-            print("DEBUG TX: Chế độ Auto - Không tìm thấy giải pháp phù hợp")
+            _trace.debug("tx", "Chế độ Auto - Không tìm thấy giải pháp phù hợp")
         return None
     # --- [KẾT THÚC NÂNG CẤP HỘP SỐ MANUAL] ---
-    
-    # Loại bỏ các giải pháp trùng lặp cặp răng (giữ lại giải pháp tốt nhất cho mỗi cặp)
-    unique_solutions = {}
-    for sol in valid_solutions:
-        key = (sol.drive_sprocket_teeth, sol.driven_sprocket_teeth)
-        if key not in unique_solutions or sol.error < unique_solutions[key].error:
-            unique_solutions[key] = sol
-    
-    valid_solutions = list(unique_solutions.values())
-    
+
+    cell_k, c_idx = np.divmod(feasible_idx, len(grid.chains))
+    g_idx, z_idx = grid.cell_g[cell_k], grid.cell_z[cell_k]
+    sol_force = force[cell_k, c_idx]
+    sol_z1 = _DRIVE_SPROCKET_TEETH[z_idx]
+    sol_z2 = grid.z2[g_idx, z_idx]
+    sol_error = grid.error[g_idx, z_idx]
+
+    # Loại bỏ các giải pháp trùng lặp cặp răng (giữ lại giải pháp tốt nhất cho mỗi cặp):
+    # mỗi cặp (z1, z2) giữ giải pháp sai số nhỏ nhất, hòa thì giải pháp gặp trước;
+    # thứ tự "gặp lần đầu" của cặp được giữ để phá hòa khi xếp hạng (như dict trước đây)
+    pair_key = sol_z1 * 1000 + sol_z2.astype(np.int64)
+    position = np.arange(feasible_idx.size)
+    by_pair = np.lexsort((position, sol_error, pair_key))
+    sorted_keys = pair_key[by_pair]
+    first_in_group = np.ones(by_pair.size, dtype=bool)
+    first_in_group[1:] = sorted_keys[1:] != sorted_keys[:-1]
+    unique = by_pair[first_in_group]
+    _, first_seen = np.unique(pair_key, return_index=True)
+
     # --- [BẮT ĐẦU NÂNG CẤP HỘP SỐ MANUAL] ---
     # Cải thiện thuật toán sắp xếp để cân bằng tốt hơn giữa các tiêu chí
-    # Với chế độ Manual, ưu tiên giải pháp sử dụng i_g user
+    u_z1, u_z2 = sol_z1[unique], sol_z2[unique]
+    u_gear, u_chain = g_idx[unique], c_idx[unique]
+    u_force = sol_force[unique]
+    ranking_keys = [
+        sol_error[unique],  # 1) Sai số vận tốc (ưu tiên cao nhất)
+        np.abs((u_z2 / u_z1) - PREFERRED_CHAIN_RATIO),  # 2) Gần 1.9 (ưu tiên cao)
+        (u_z1 + u_z2) * 0.1,  # 3) Tổng số răng (giảm ảnh hưởng)
+        grid.pitch_mm[u_chain] * 0.01,  # 4) Pitch nhỏ (giảm ảnh hưởng)
+    ]
     if use_manual:
-        valid_solutions.sort(key=lambda x: (
-            x.error,  # 1) Sai số vận tốc (ưu tiên cao nhất)
-            abs((x.driven_sprocket_teeth / x.drive_sprocket_teeth) - PREFERRED_CHAIN_RATIO),  # 2) Gần 1.9 (ưu tiên cao)
-            (x.drive_sprocket_teeth + x.driven_sprocket_teeth) * 0.1,  # 3) Tổng số răng (giảm ảnh hưởng)
-            getattr(x.chain_spec, "pitch_mm", 999.0) * 0.01,  # 4) Pitch nhỏ (giảm ảnh hưởng)
-            -x.safety_margin * 0.1  # 5) Margin bền kéo cao (ưu tiên an toàn)
-        ))
+        # Với chế độ Manual, ưu tiên giải pháp sử dụng i_g user
+        ranking_keys.append(-(grid.allowable_kN[u_chain] / np.maximum(u_force, 1e-9)) * 0.1)  # 5) Margin bền kéo cao (ưu tiên an toàn)
     else:
         # Chế độ Auto - giữ nguyên logic cũ
-        valid_solutions.sort(key=lambda x: (
-            x.error,  # 1) Sai số vận tốc (ưu tiên cao nhất)
-            abs((x.driven_sprocket_teeth / x.drive_sprocket_teeth) - PREFERRED_CHAIN_RATIO),  # 2) Gần 1.9 (ưu tiên cao)
-            (x.drive_sprocket_teeth + x.driven_sprocket_teeth) * 0.1,  # 3) Tổng số răng (giảm ảnh hưởng)
-            getattr(x.chain_spec, "pitch_mm", 999.0) * 0.01,  # 4) Pitch nhỏ (giảm ảnh hưởng)
-            -x.gearbox_ratio * 0.001  # 5) Hộp số tỉ số lớn (giảm ảnh hưởng)
-        ))
+        ranking_keys.append(-grid.gearbox[u_gear, 0] * 0.001)  # 5) Hộp số tỉ số lớn (giảm ảnh hưởng)
+    ranking_keys.append(first_seen)
     # --- [KẾT THÚC NÂNG CẤP HỘP SỐ MANUAL] ---
-    
+
+    # Chỉ dựng TransmissionSolution cho giải pháp thắng (top-k từng phần, không sắp xếp toàn bộ)
+    top = _lexicographic_top_k(ranking_keys, 5 if _trace.enabled else 1)
+    # --- [KẾT THÚC NÂNG CẤP VECTOR HÓA TRUYỀN ĐỘNG] ---
+
     # --- [BẮT ĐẦU NÂNG CẤP HỘP SỐ MANUAL] ---
-    # In ra tất cả giải pháp để debug
     mode_text = "Manual" if use_manual else "Auto"
-    print(f"DEBUG TX: Chế độ {mode_text} - Tìm thấy {len(valid_solutions)} giải pháp:")
-    for i, sol in enumerate(valid_solutions[:5]):  # Chỉ hiển thị 5 giải pháp đầu
-        i_s = sol.driven_sprocket_teeth / sol.drive_sprocket_teeth
-        print(f"  {i+1}. gearbox={sol.gearbox_ratio}, z1={sol.drive_sprocket_teeth}, z2={sol.driven_sprocket_teeth}, "
-              f"i_s={i_s:.3f}, error={sol.error:.2f}%")
+    if _trace.enabled:
+        # In ra các giải pháp đầu để debug
+        _trace.debug("tx", lambda: f"Chế độ {mode_text} - Tìm thấy {unique.size} giải pháp:")
+        for i, k in enumerate(top):
+            u = unique[k]
+            _trace.debug("tx", lambda: f"  {i+1}. gearbox={grid.gearbox_list[g_idx[u]]}, z1={sol_z1[u]}, z2={int(sol_z2[u])}, "
+                                       f"i_s={sol_z2[u] / sol_z1[u]:.3f}, error={sol_error[u]:.2f}%")
     
-    best_solution = valid_solutions[0]
+    u = unique[int(top[0])]
+    best_solution = grid.solution(int(g_idx[u]), int(z_idx[u]), int(c_idx[u]), float(sol_force[u]))
     
-    print(f"DEBUG TX: Chế độ {mode_text} - Giải pháp tốt nhất: gearbox={best_solution.gearbox_ratio}, "
-          f"z1={best_solution.drive_sprocket_teeth}, z2={best_solution.driven_sprocket_teeth}, "
-          f"i_s={best_solution.driven_sprocket_teeth/best_solution.drive_sprocket_teeth:.3f}, "
-          f"chain={best_solution.chain_designation}, error={best_solution.error:.2f}%")
+    _trace.debug("tx", lambda: f"Chế độ {mode_text} - Giải pháp tốt nhất: gearbox={best_solution.gearbox_ratio}, "
+                               f"z1={best_solution.drive_sprocket_teeth}, z2={best_solution.driven_sprocket_teeth}, "
+                               f"i_s={best_solution.driven_sprocket_teeth/best_solution.drive_sprocket_teeth:.3f}, "
+                               f"chain={best_solution.chain_designation}, error={best_solution.error:.2f}%")
     # --- [KẾT THÚC NÂNG CẤP HỘP SỐ MANUAL] ---
     
     return best_solution
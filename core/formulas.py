@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+"""
+Công thức tính băng tải dùng chung cho calculate() (vô hướng) và calculate_batch() (mảng NumPy).
+
+Các hàm nhận số thực hoặc mảng NumPy cùng hình dạng và giữ nguyên thứ tự phép tính, nên bản vô hướng
+và bản vector hóa cho kết quả trùng từng bit. Hàm siêu việt (exp, tan, cos) do nơi gọi tính trước
+(math cho vô hướng, batch._exact cho mảng) rồi truyền vào. Nhánh điều kiện dùng _select: với số thực
+chỉ là biểu thức if/else, với mảng là np.where; mẫu số của nhánh không được chọn được thay bằng 1.0 để
+bản vô hướng không chia cho 0.
+
+Các hàm tra theo chuỗi (loại đai, kiểu truyền động) chỉ nhận giá trị vô hướng; batch áp dụng chúng
+trên các giá trị duy nhất của cột.
+"""
+
+import math
+import re
+
+import numpy as np
+
+from .specs import G
+from .safety_factors import lookup_sf_design
+from .tracing import get_tracer
+
+_trace = get_tracer(__name__)
+
+
+def _is_array(*values) -> bool:
+    return any(isinstance(v, np.ndarray) for v in values)
+
+
+def _select(condition, if_true, if_false):
+    """if_true nếu condition đúng, ngược lại if_false (np.where khi condition là mảng)."""
+    if isinstance(condition, np.ndarray):
+        return np.where(condition, if_true, if_false)
+    return if_true if condition else if_false
+
+
+def _maximum(a, b):
+    return np.maximum(a, b) if _is_array(a, b) else max(a, b)
+
+
+def _minimum(a, b):
+    return np.minimum(a, b) if _is_array(a, b) else min(a, b)
+
+
+def _ceil(x):
+    return np.ceil(x) if isinstance(x, np.ndarray) else math.ceil(x)
+
+
+# ---------------- Tra theo loại đai / kiểu truyền động (vô hướng) ----------------
+
+def is_steel_cord(belt_type: str) -> bool:
+    """Đai lõi thép (ST-No) hay đai vải."""
+    belt_type = belt_type or ""
+    return "ST" in belt_type or "Thép" in belt_type
+
+
+def belt_weight_kgpm(B_mm, thickness_mm, belt_type: str) -> float:
+    """Trọng lượng đai trên mét (kg/m) theo bề rộng, chiều dày và vật liệu đai."""
+    rho = 1220.0
+    if "PVC" in (belt_type or ""):
+        rho = 1350.0
+    if "Dây thép" in (belt_type or "") or "ST" in (belt_type or ""):
+        rho = 1400.0
+    B_m = max(0.3, float(B_mm) / 1000.0)
+    t_m = max(0.005, float(thickness_mm) / 1000.0)
+    return B_m * t_m * rho * 1.05
+
+
+def drive_contact(wrap_deg, mu_pulley, drive_type: str) -> tuple:
+    """
+    Góc ôm (độ) và hệ số ma sát hiệu dụng theo kiểu truyền động.
+
+    Returns:
+        (góc ôm, hệ số ma sát, True nếu là truyền động kép)
+    """
+    base_wrap = float(wrap_deg or 210.0)
+    base_mu = float(mu_pulley or 0.35)
+    dt = (drive_type or "").strip().lower()
+    if dt == "tail drive":
+        return max(base_wrap - 30.0, 120.0), base_mu * 0.95, False
+    if dt == "center drive":
+        return min(max(base_wrap, 160.0), 200.0), base_mu * 0.97, False
+    # Truyền động kép được tính riêng, giá trị trả về chỉ để thống nhất
+    if dt == "dual drive":
+        return min(base_wrap + 20.0, 240.0), base_mu, True
+    return base_wrap, base_mu, False
+
+
+def allowable_tension_npm(belt_type: str, belt_specs: dict) -> float:
+    """
+    Sức chịu kéo cho phép T_allow (N/m) từ thông số đai đã chọn.
+
+    ST-No: T_allow = ST_No × 9.81 × 100 (ST-500 = 490,500 N/m); đai vải: F·TS × 9.81 × 100.
+    """
+    if "T_allow_Npm" in belt_specs:
+        return belt_specs["T_allow_Npm"]
+    belt_type = belt_type or ""
+    if "ST" in belt_type or "Thép" in belt_type:
+        st_match = re.search(r'ST-(\d+)', belt_type)
+        if st_match:
+            return int(st_match.group(1)) * 9.81 * 100
+    if "FABRIC" in belt_type.upper() or "EP" in belt_type.upper() or "NN" in belt_type.upper():
+        return belt_specs.get("strength", 400) * 9.81 * 100
+    return belt_specs.get("T_allow_Npm", 100000.0)
+
+
+def design_safety_factor(belt_type: str, group, lump_ge_30mm, duty_minutes) -> float:
+    """SF thiết kế theo bảng tra; lỗi tra bảng thì dùng giá trị trung bình (7.0 đai thép, 9.0 đai vải)."""
+    try:
+        return lookup_sf_design(belt_type=belt_type, group=group, lump_ge_30mm=lump_ge_30mm,
+                                duty_minutes=duty_minutes)
+    except Exception as e:
+        _trace.debug("sf_design", lambda: f"Lỗi tra SF thiết kế: {e}, dùng giá trị mặc định")
+        return 7.0 if is_steel_cord(belt_type) else 9.0
+
+
+# ---------------- Hình học & tải ----------------
+
+def cross_section_area_m2(belt_width_m, tan_surcharge, cos_trough):
+    """Tiết diện vật liệu (m²): phần nêm đáy theo góc surcharge + phần hai bên theo góc máng."""
+    A_bottom = 0.25 * belt_width_m * belt_width_m * tan_surcharge
+    A_sides = (belt_width_m * belt_width_m / 8.0) * (1.0 - cos_trough)
+    return _maximum(0.0, A_bottom + A_sides)
+
+
+def geometric_capacity_tph(area_m2, belt_speed_mps, density_tpm3):
+    """Năng suất theo tiết diện (t/h) với tốc độ >= 0.05 m/s và khối lượng riêng >= 0.1 t/m³."""
+    return (area_m2 * _maximum(0.05, belt_speed_mps)) * (_maximum(0.1, density_tpm3) * 1000.0) * 3.6
+
+
+def section_limited_load(Qt_tph, belt_speed_mps, area_m2, density_tpm3) -> tuple:
+    """
+    Tải vật liệu trên mét theo lưu lượng và theo tiết diện.
+
+    Returns:
+        (q từ lưu lượng, q từ tiết diện, q hiệu dụng = min của hai giá trị) (kg/m)
+    """
+    q_from_Qt = (Qt_tph * 1000.0 / 3600.0) / belt_speed_mps
+    q_from_geo = area_m2 * 1000.0 * density_tpm3
+    return q_from_Qt, q_from_geo, _minimum(q_from_Qt, q_from_geo)
+
+
+# ---------------- Lực cản & công suất ----------------
+
+def cema_power_kw(f, L_m, lo, moving_parts_kgpm, material_load_kgpm, H_m, belt_speed_mps) -> tuple:
+    """Công suất CEMA (kW): P1 phần quay, P2 vật liệu, P3 nâng."""
+    V_mpm = belt_speed_mps * 60.0
+    P1 = (f * (L_m + lo) * moving_parts_kgpm * V_mpm) / 6120.0
+    P2 = (f * (L_m + lo) * material_load_kgpm * V_mpm) / 6120.0
+    P3 = (H_m * material_load_kgpm) * G * belt_speed_mps / 1000.0
+    return P1, P2, P3
+
+
+def cema_forces(P1, P2, P3, belt_speed_mps) -> tuple:
+    """Lực ma sát và lực nâng (N) suy ra từ công suất CEMA."""
+    friction = (P1 + P2) * 1000.0 / _maximum(belt_speed_mps, 0.1)
+    lift = _select(P3 > 0, P3 * 1000.0 / _maximum(belt_speed_mps, 0.1), 0.0)
+    return friction, lift
+
+
+def din_resistances(f, L_m, H_m, q_B, q_G, Wc, Wr, lc, lr) -> tuple:
+    """Lực ma sát và lực nâng (N) theo DIN 22101 / ISO 5048 (f = 0.025 / 0.022)."""
+    friction = f * G * L_m * (2.0 * q_B + Wc / lc + Wr / lr + q_G)
+    lift = G * H_m * q_G
+    return friction, lift
+
+
+def resistance_power_kw(friction, lift, belt_speed_mps):
+    """Công suất yêu cầu (kW) của tổng lực cản."""
+    return (friction + lift) * belt_speed_mps / 1000.0
+
+
+def fallback_effective_tension(material_load_kgpm, L_m, H_m):
+    """Lực vòng ước tính (N) khi lực cản tính được <= 0: ma sát 0.02 + nâng; không có tải thì 1000 N."""
+    estimated = material_load_kgpm * G * L_m * 0.02 + _select(H_m > 0, material_load_kgpm * G * H_m, 0.0)
+    return _select(material_load_kgpm > 0, estimated, 1000.0)
+
+
+def fallback_power_kw(material_load_kgpm, belt_speed_mps):
+    """Công suất ước tính (kW) khi công suất tính được <= 0 (ma sát 0.02, tối thiểu 0.1 kW)."""
+    estimated = _maximum((material_load_kgpm * G * belt_speed_mps * 0.02) / 1000.0, 0.1)
+    return _select(material_load_kgpm > 0, estimated, 0.1)
+
+
+# ---------------- Lực căng ----------------
+
+def euler_eytelwein(effective_tension, e_ratio) -> tuple:
+    """Lực căng nhánh căng T1 và nhánh chùng T2 (N) của puly dẫn với e^(μθ) = e_ratio."""
+    near_one = abs(e_ratio - 1.0) < 1e-6
+    T2 = _select(near_one, effective_tension * 10.0, effective_tension / _select(near_one, 1.0, e_ratio - 1.0))
+    return effective_tension + T2, T2
+
+
+def dual_drive_resistances_kgf(f, L_m, lo, H_m, W1, Wm, Wc, Wr, lc, lr) -> tuple:
+    """Lực cản nhánh tải Fc và nhánh về Fr (kgf), công thức (19) & (20), Mục 6.2, PDF."""
+    Fc = f * (L_m + lo) * (W1 + Wc / lc + Wm) + H_m * (W1 + Wm)
+    Fr = f * (L_m + lo) * (W1 + Wr / lr) - H_m * W1
+    return Fc, Fr
+
+
+def dual_drive_distribution(Fp, Fr, e_ratio, e_sum, ratio_label) -> tuple:
+    """
+    Phân phối lực vòng Fp (kgf) cho hai puly và lực căng nhánh chùng, công thức (23)-(25).
+
+    Args:
+        e_ratio: e^(μθ) của một puly (hai puly giống nhau)
+        e_sum: e^(μθ1 + μθ2)
+        ratio_label: ConveyorParameters.dual_drive_ratio
+
+    Returns:
+        (Fp1, Fp2, F21, F22, tên phương pháp) với lực theo kgf
+    """
+    theory = ratio_label == "Phân phối lý thuyết"
+    two_one = ratio_label == "Phân phối 2/1 (66/33)"
+    Fp2_theory = ((e_ratio - 1) / _select(theory, e_sum - 1, 1.0)) * (Fp + Fr * (e_ratio - 1))
+    Fp1 = _select(theory, Fp - Fp2_theory, _select(two_one, Fp * (2 / 3), Fp / 2.0))
+    Fp2 = _select(theory, Fp2_theory, _select(two_one, Fp * (1 / 3), Fp / 2.0))
+    far_from_one = abs(e_ratio - 1) > 1e-6
+    slack_denom = _select(far_from_one, e_ratio - 1, 1.0)
+    F21 = _select(far_from_one, Fp1 / slack_denom, Fp1 * 10)
+    F22 = _select(far_from_one, Fp2 / slack_denom, Fp2 * 10)
+    method = _select(theory, "Lý thuyết", _select(two_one, "Tỷ lệ 2/1", "Tỷ lệ 50/50"))
+    return Fp1, Fp2, F21, F22, method
+
+
+# ---------------- Động cơ, độ bền đai, chi phí ----------------
+
+def drive_power(required_power_kw, eta_m, eta_g, Kt) -> tuple:
+    """Công suất động cơ (kW) và hiệu suất truyền động (%)."""
+    return required_power_kw * Kt / (eta_m * eta_g), (eta_m * eta_g / Kt) * 100.0
+
+
+def belt_strength(max_tension, belt_capacity_N) -> tuple:
+    """Hệ số an toàn thực và mức sử dụng cường độ đai (%)."""
+    return (belt_capacity_N / _maximum(max_tension, 1e-6),
+            100.0 * max_tension / _maximum(belt_capacity_N, 1e-6))
+
+
+def required_belt_rating(max_tension, sf_design, B_mm) -> tuple:
+    """
+    Cấp bền yêu cầu theo SF thiết kế.
+
+    Returns:
+        (ST yêu cầu cho đai thép, F·TS yêu cầu cho đai vải trên bề rộng hữu ích B - 60 mm)
+    """
+    f_max_kg = max_tension / G
+    st_no = f_max_kg * sf_design / (B_mm / 10.0)
+    Be_cm = _maximum((B_mm - 60.0) / 10.0, 1.0)
+    return st_no, f_max_kg * sf_design / Be_cm
+
+
+def pulley_load_category(belt_strength_utilization):
+    """Mức tải của puly đai vải theo mức sử dụng cường độ đai: "high" > 60%, "medium" 30-60%, "low"."""
+    high = belt_strength_utilization > 60
+    medium = (30 <= belt_strength_utilization) & (belt_strength_utilization <= 60)
+    return _select(high, "high", _select(medium, "medium", "low"))
+
+
+def capital_and_operating_costs(B_mm, L_m, cost_per_m2, lc, lr, motor_power_kw, drum_diameter_mm,
+                                required_power_kw, operating_hours, belt_weight_kgpm, Wc, Wr) -> dict:
+    """
+    Chi phí đầu tư, vận hành và khối lượng ước tính.
+
+    Giả định giá thép kết cấu $5/kg, hệ truyền động $10/kg, điện $0.12/kWh, bảo trì 2%/năm.
+
+    Returns:
+        dict theo tên trường của CalculationResult (cost_*, op_cost_*, total_mass_kg)
+    """
+    cost_belt = ((B_mm / 1000.0) * L_m * 2.1) * cost_per_m2
+    num_carry = _ceil(L_m / lc)
+    num_return = _ceil(L_m / lr)
+    cost_idlers = (num_carry + num_return) * (30.0 + (B_mm / 1000.0) * 80.0)
+    cost_structure = L_m * (150.0 + (B_mm / 1000.0) * 200.0)
+    cost_drive = motor_power_kw * 750.0 + (drum_diameter_mm / 1000.0) ** 2 * 2000.0 * 2.0
+    cost_others = (cost_belt + cost_idlers + cost_structure + cost_drive) * 0.15
+    cost_capital_total = cost_belt + cost_idlers + cost_structure + cost_drive + cost_others
+    energy = (required_power_kw * (operating_hours * 365.0)) * 0.12
+    maintenance = cost_capital_total * 0.02
+
+    belt_mass = belt_weight_kgpm * L_m * 2.1
+    idler_mass = (num_carry * Wc) + (num_return * Wr)
+    structure_mass = _select(cost_structure > 0, cost_structure / 5.0, L_m * 50)
+    drive_mass = _select(cost_drive > 0, cost_drive / 10.0, motor_power_kw * 20)
+    return {
+        "cost_belt": cost_belt,
+        "cost_idlers": cost_idlers,
+        "cost_structure": cost_structure,
+        "cost_drive": cost_drive,
+        "cost_others": cost_others,
+        "cost_capital_total": cost_capital_total,
+        "op_cost_energy_per_year": energy,
+        "op_cost_maintenance_per_year": maintenance,
+        "op_cost_total_per_year": energy + maintenance,
+        "total_mass_kg": belt_mass + idler_mass + structure_mass + drive_mass,
+    }
@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+"""
+Tính lại từng phần theo đồ thị phụ thuộc giữa tham số và các giai đoạn tính toán.
+
+Mỗi giai đoạn của CalculationStrategy.execute (và bước tìm bộ truyền động) được khai báo bằng một
+StageNode: các trường ConveyorParameters nó dùng, các trường CalculationResult nó đọc từ giai đoạn
+khác và các trường nó ghi. recalculate(prev_result, changes) chỉ chạy lại giai đoạn có tham số bị đổi
+hoặc đọc một trường mà giai đoạn chạy lại trước đó đã ghi ra giá trị khác; các giai đoạn còn lại
+giữ nguyên kết quả cũ. Ví dụ đổi motor_rpm chỉ chạy lại bước truyền động, đổi operating_hours chỉ
+chạy lại chi phí.
+
+Kết quả luôn trùng với calculate() trên bộ tham số mới (kể cả thứ tự cảnh báo/khuyến nghị): cảnh
+báo được lưu theo từng giai đoạn và ghép lại theo thứ tự chạy. Khi CSDL (vật liệu, băng, xích) đổi
+thì mọi giai đoạn đều được tính lại.
+
+    result = calculate(params, track_stages=True)
+    result = recalculate(result, {"motor_rpm": 960})      # hoặc recalculate(result, new_params)
+"""
+import copy
+import dataclasses
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, FrozenSet, Mapping, Optional, Tuple, Union
+
+from . import specs
+from .models import ConveyorParameters, CalculationResult
+from .diagnostics import Diagnostic
+from .route import resolve_route_params
+from .tracing import get_tracer
+
+_trace = get_tracer(__name__)
+
+
+@dataclass(frozen=True)
+class StageNode:
+    """Một giai đoạn tính toán và các phụ thuộc của nó."""
+    name: str
+    run: Callable                      # run(strategy, with_transmission)
+    params: FrozenSet[str]             # Trường ConveyorParameters được dùng
+    reads: FrozenSet[str]              # Trường CalculationResult do giai đoạn khác ghi
+    writes: FrozenSet[str]             # Trường CalculationResult được ghi
+
+
+def _run_transmission(strat, with_transmission: bool):
+    from .engine import attach_transmission
+    strat.r.motor_rpm = strat.p.motor_rpm
+    if with_transmission:
+        attach_transmission(strat.r, strat.p)
+
+
+# Thứ tự giống CalculationStrategy.execute rồi tới bước truyền động của calculate().
+# Tốc độ băng đã chốt (strategy.p.V_mps) luôn bằng result.belt_speed_mps nên được khai báo qua trường đó.
+STAGE_GRAPH: Tuple[StageNode, ...] = (
+    StageNode(
+        "load", lambda s, t: s.run_load_stage(),
+        params=frozenset({"V_mps", "Qt_tph", "B_mm", "belt_thickness_mm", "belt_type", "density_tpm3",
+                          "particle_size_mm", "material", "is_abrasive", "is_corrosive", "is_dusty",
+                          "trough_angle_label", "surcharge_angle_deg"}),
+        reads=frozenset(),
+        writes=frozenset({"belt_speed_mps", "belt_speed_required_mps", "belt_speed_recommended_mps",
+                          "recommended_speed_mps", "max_speed_allowed_mps", "belt_width_selected_mm",
+                          "cross_section_area_m2", "Qt_calc_tph", "capacity_utilization", "mass_flow_rate",
+                          "Qt_effective_tph", "material_load_kgpm", "belt_weight_kgpm",
+                          "moving_parts_weight_kgpm", "total_load_kgpm"}),
+    ),
+    StageNode(
+        "tensions", lambda s, t: s.run_tension_stage(),
+        params=frozenset({"calculation_standard", "drive_type", "L_m", "H_m", "B_mm", "Qt_tph", "V_mps",
+                          "carrying_idler_spacing_m", "return_idler_spacing_m", "dual_drive_ratio",
+                          "mu_pulley", "wrap_deg", "route"}),
+        reads=frozenset({"belt_speed_mps", "material_load_kgpm", "belt_weight_kgpm"}),
+        writes=frozenset({"P1_kw", "P2_kw", "P3_kw", "Pt_kw", "required_power_kw", "friction_force",
+                          "lift_force", "effective_tension", "wrap_angle_rad", "T1", "T2", "max_tension",
+                          "F11", "F12", "F21", "F22", "Fc_drive", "Fr_drive", "Fp1", "Fp2",
+                          "drive_distribution_method", "material_load_kgpm", "route", "route_loads"}),
+    ),
+    StageNode(
+        "finalize", lambda s, t: s.run_finalize_stage(),
+        params=frozenset({"motor_efficiency", "gearbox_efficiency", "Kt_start", "B_mm", "belt_type", "L_m",
+                          "V_mps", "drive_type", "route"}),
+        reads=frozenset({"required_power_kw", "max_tension", "material_load_kgpm", "belt_speed_mps",
+                         "friction_force", "lift_force", "F21", "T2", "sf_design"}),
+        writes=frozenset({"required_power_kw", "max_tension", "motor_power_kw", "drive_efficiency_percent",
+                          "efficiency", "safety_factor", "belt_strength_utilization", "profile_length_m",
+                          "profile_t2_N"}),
+    ),
+    StageNode(
+        "costs", lambda s, t: s.run_cost_stage(),
+        params=frozenset({"B_mm", "L_m", "carrying_idler_spacing_m", "return_idler_spacing_m",
+                          "operating_hours", "belt_type", "route"}),
+        reads=frozenset({"motor_power_kw", "drum_diameter_mm", "required_power_kw", "belt_weight_kgpm"}),
+        writes=frozenset({"cost_belt", "cost_idlers", "cost_structure", "cost_drive", "cost_others",
+                          "cost_capital_total", "op_cost_energy_per_year", "op_cost_maintenance_per_year",
+                          "op_cost_total_per_year", "total_mass_kg"}),
+    ),
+    StageNode(
+        "pulleys_idlers", lambda s, t: s.run_pulley_stage(),
+        params=frozenset({"belt_type", "material_group", "lump_size_ge_30mm", "duty_cycle_minutes", "B_mm",
+                          "density_tpm3", "trough_angle_label"}),
+        reads=frozenset({"max_tension", "belt_strength_utilization"}),
+        writes=frozenset({"sf_design", "required_ST", "required_fabric_rating", "pulley_diameter_A_mm",
+                          "drum_diameter_mm", "idler_spacing_carry_m", "idler_spacing_return_m",
+                          "transition_distance_m"}),
+    ),
+    StageNode(
+        "transmission", _run_transmission,
+        params=frozenset({"motor_rpm", "gearbox_ratio_mode", "gearbox_ratio_user", "chain_selection_mode",
+                          "chain_spec_designation", "V_mps"}),
+        reads=frozenset({"pulley_diameter_A_mm", "required_power_kw", "belt_speed_mps"}),
+        writes=frozenset({"transmission_solution", "gearbox_ratio_mode", "gearbox_ratio_user", "motor_rpm"}),
+    ),
+)
+
+STAGE_NAMES = tuple(node.name for node in STAGE_GRAPH)
+
+_RESULT_DEFAULTS: Dict[str, Callable[[], Any]] = {}
+for _f in dataclasses.fields(CalculationResult):
+    if _f.default is not dataclasses.MISSING:
+        _RESULT_DEFAULTS[_f.name] = (lambda v: lambda: v)(_f.default)
+    elif _f.default_factory is not dataclasses.MISSING:
+        _RESULT_DEFAULTS[_f.name] = _f.default_factory
+
+
+def _plan_resets() -> Dict[str, Tuple[FrozenSet[str], FrozenSet[str]]]:
+    """
+    Các trường phải trả về mặc định trước khi chạy lại từng giai đoạn, để giai đoạn thấy đúng trạng
+    thái như trong một lần tính đầy đủ.
+
+    Returns:
+        {tên giai đoạn: (trường ghi chưa có giai đoạn nào trước đó ghi,
+                         trường đọc mà chỉ giai đoạn sau mới ghi - khôi phục sau khi chạy)}
+    """
+    plan = {}
+    written = set()
+    for i, node in enumerate(STAGE_GRAPH):
+        later = set().union(*(n.writes for n in STAGE_GRAPH[i + 1:]))
+        own = frozenset(node.writes - written)
+        ahead = frozenset((node.reads - written - node.writes) & later)
+        plan[node.name] = (own, ahead)
+        written |= node.writes
+    return plan
+
+
+_RESETS = _plan_resets()
+_PARAM_FIELDS = frozenset(f.name for f in dataclasses.fields(ConveyorParameters))
+
+
+def stage_params() -> Dict[str, FrozenSet[str]]:
+    """{tên giai đoạn: trường tham số} - tiện cho UI biết ô nhập nào ảnh hưởng phần kết quả nào."""
+    return {node.name: node.params for node in STAGE_GRAPH}
+
+
+def affected_stages(changed_fields) -> Tuple[str, ...]:
+    """
+    Các giai đoạn có thể phải chạy lại khi đổi các tham số (lan truyền theo trường kết quả, chưa xét
+    giá trị thực tế nên là cận trên của những gì recalculate() chạy).
+    """
+    dirty_params = set(changed_fields)
+    dirty_outputs = set()
+    stages = []
+    for node in STAGE_GRAPH:
+        if node.params & dirty_params or node.reads & dirty_outputs:
+            stages.append(node.name)
+            dirty_outputs |= node.writes
+    return tuple(stages)
+
+
+@dataclass
+class StageState:
+    """Trạng thái gắn vào kết quả để tính lại từng phần."""
+    params: ConveyorParameters
+    # Tham số sau khi engine chốt V_mps/Qt_tph (strategy.p)
+    effective_params: ConveyorParameters
+    with_transmission: bool
+    catalog_token: tuple
+    # {tên giai đoạn: (chẩn đoán, khuyến nghị)} do giai đoạn đó sinh ra
+    messages: Dict[str, Tuple[Tuple[Diagnostic, ...], Tuple[str, ...]]] = field(default_factory=dict)
+    # Các giai đoạn đã chạy ở lần tính gần nhất
+    recomputed: Tuple[str, ...] = ()
+
+
+def _catalog_token() -> tuple:
+    return (specs.catalog_version(), getattr(specs.ACTIVE_CHAIN_SPECS, "cache_key", None))
+
+
+def _same(a, b) -> bool:
+    if a is b:
+        return True
+    try:
+        return bool(a == b)
+    except Exception:
+        return False
+
+
+def _run(p: ConveyorParameters, result: CalculationResult, with_transmission: bool,
+         prev: Optional[StageState], changed: set) -> CalculationResult:
+    """Chạy các giai đoạn cần thiết trên result (đã là bản sao) và gắn StageState mới."""
+    from .engine import get_strategy
+    mat = specs.ACTIVE_MATERIAL_DB.get(p.material, {})
+    belt = specs.ACTIVE_BELT_SPECS.get(p.belt_type, {})
+    strat = get_strategy(p, result, {"material": mat}, belt or {})
+    full = prev is None
+    if not full and not STAGE_GRAPH[0].params & changed:
+        # Giai đoạn "load" không chạy lại thì giữ các giá trị V_mps/Qt_tph đã chốt; L_m/H_m lấy lại từ
+        # tham số gốc rồi chốt theo tuyến (tuyến có thể vừa được thêm hoặc bỏ)
+        kept = changed | {"L_m", "H_m"}
+        strat.p = resolve_route_params(prev.effective_params.replace(**{name: getattr(p, name) for name in kept}))
+
+    reference = copy.copy(result)  # giá trị cũ để so sánh đầu ra
+    dirty_outputs = set()
+    messages = {}
+    recomputed = []
+    for node in STAGE_GRAPH:
+        if node.name == "transmission" and not full and prev.with_transmission != with_transmission:
+            run_it = True
+        else:
+            run_it = full or bool(node.params & changed) or bool(node.reads & dirty_outputs)
+        if not run_it:
+            messages[node.name] = prev.messages.get(node.name, ((), ()))
+            continue
+        own, ahead = _RESETS[node.name]
+        if not full:
+            for name in own:
+                setattr(result, name, _RESULT_DEFAULTS[name]())
+        saved = {name: getattr(result, name) for name in ahead}
+        for name in ahead:
+            setattr(result, name, _RESULT_DEFAULTS[name]())
+        effective_before = strat.p
+        result.diagnostics, result.recommendations = [], []
+        node.run(strat, with_transmission)
+        messages[node.name] = (tuple(result.diagnostics), tuple(result.recommendations))
+        for name, value in saved.items():
+            if name not in node.writes:
+                setattr(result, name, value)
+        recomputed.append(node.name)
+        if not full:
+            dirty_outputs |= {name for name in node.writes
+                              if not _same(getattr(result, name, None), getattr(reference, name, None))}
+            if strat.p is not effective_before:
+                changed |= {name for name in ("V_mps", "Qt_tph")
+                            if not _same(getattr(strat.p, name), getattr(prev.effective_params, name))}
+
+    result.diagnostics = [d for node in STAGE_GRAPH for d in messages[node.name][0]]
+    result.recommendations = [r for node in STAGE_GRAPH for r in messages[node.name][1]]
+    result.profile = None
+    result.stage_state = StageState(p, strat.p, with_transmission, _catalog_token(), messages, tuple(recomputed))
+    return result
+
+
+def calculate_incremental(p: ConveyorParameters, with_transmission: bool = True) -> CalculationResult:
+    """
+    Tính đầy đủ như calculate() và lưu trạng thái từng giai đoạn vào result.stage_state.
+
+    Args:
+        p: Tham số băng tải
+        with_transmission: Có tìm bộ truyền động không
+
+    Returns:
+        CalculationResult có stage_state
+    """
+    return _run(p, CalculationResult(), with_transmission, None, set())
+
+
+def changed_fields(old: ConveyorParameters, new: ConveyorParameters) -> Dict[str, Any]:
+    """Các trường của new khác old: {tên: giá trị mới}."""
+    return {name: getattr(new, name) for name in _PARAM_FIELDS
+            if not _same(getattr(old, name), getattr(new, name))}
+
+
+def recalculate(prev_result: CalculationResult, changes: Union[Mapping[str, Any], ConveyorParameters],
+                with_transmission: Optional[bool] = None) -> CalculationResult:
+    """
+    Tính lại sau khi đổi một số tham số, chỉ chạy các giai đoạn bị ảnh hưởng.
+
+    prev_result không bị thay đổi; các trường không được tính lại dùng chung đối tượng với
+    prev_result. Cảnh báo do nơi khác thêm vào prev_result (ví dụ kiểm tra đầu vào của UI) không được
+    giữ lại.
+
+    Args:
+        prev_result: Kết quả của calculate(..., track_stages=True) hoặc recalculate()
+        changes: {tên trường: giá trị mới} hoặc bộ ConveyorParameters mới
+        with_transmission: None = giữ như lần tính trước
+
+    Returns:
+        CalculationResult mới (có stage_state)
+
+    Raises:
+        ValueError: Nếu prev_result không có stage_state
+        TypeError: Nếu changes có trường không tồn tại
+    """
+    prev = getattr(prev_result, "stage_state", None)
+    if prev is None:
+        raise ValueError("Kết quả không có trạng thái giai đoạn - dùng calculate(p, track_stages=True)")
+    if isinstance(changes, ConveyorParameters):
+        new_params = changes
+        changes = changed_fields(prev.params, changes)
+    else:
+        new_params = prev.params.replace(**changes)
+        changes = changed_fields(prev.params, new_params)
+    if with_transmission is None:
+        with_transmission = prev.with_transmission
+
+    if prev.catalog_token != _catalog_token():
+        _trace.debug("recalculate", "CSDL đã thay đổi, tính lại toàn bộ")
+        return calculate_incremental(new_params, with_transmission)
+
+    result = _run(new_params, copy.copy(prev_result), with_transmission, prev, set(changes))
+    _trace.debug("recalculate", lambda: f"Đổi {sorted(changes)} -> chạy lại {result.stage_state.recomputed}")
+    return result
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Ma trận trường hợp tải: kiểm tra một thiết kế dưới nhiều trạng thái vận hành trong một lượt tính.
+
+Mỗi LoadCase mô tả mức chất tải trên tuyến (toàn tuyến, chỉ đoạn dốc lên, chỉ đoạn dốc xuống) và
+lực quán tính khi tăng/giảm tốc (khởi động, dừng/hãm). Hình học, trọng lượng đai, con lăn và hệ
+số ma sát đã hiệu chỉnh được dùng chung (RouteLoads của kết quả); lực cản của mọi trường hợp là
+một phép nhân ma trận trên tuyến (core.route.loop_coefficients_many).
+
+    result, cases = calculate_load_cases(params)
+    cases.governing_tension.name          # trường hợp quyết định lực căng lớn nhất
+    cases.safety_factor[cases.index("Khởi động đầy tải")]
+"""
+from dataclasses import dataclass
+from typing import NamedTuple, Sequence, Tuple
+
+import numpy as np
+
+from .route import RouteLoads, loop_coefficients_many
+
+# Vùng chất tải của LoadCase.load_on
+LOAD_ON_ALL = "all"
+LOAD_ON_INCLINES = "inclines"
+LOAD_ON_DECLINES = "declines"
+_LOAD_ON = (LOAD_ON_ALL, LOAD_ON_INCLINES, LOAD_ON_DECLINES)
+
+
+@dataclass(frozen=True)
+class LoadCase:
+    """
+    Một trường hợp tải.
+
+    Args:
+        name: Tên hiển thị
+        load_fraction: Mức tải so với tải định mức trên các đoạn được chất tải
+        load_on: "all" | "inclines" (chỉ đoạn dốc lên) | "declines" (chỉ đoạn dốc xuống và đoạn bằng)
+        inertia_factor: Lực quán tính tính bằng phần của |Fu| ổn định: dương khi khởi động (Kt_start - 1),
+            âm khi dừng/hãm
+    """
+    name: str
+    load_fraction: float = 1.0
+    load_on: str = LOAD_ON_ALL
+    inertia_factor: float = 0.0
+
+    def __post_init__(self):
+        if self.load_on not in _LOAD_ON:
+            raise ValueError(f"load_on phải là một trong {_LOAD_ON} (nhận {self.load_on!r})")
+        if self.load_fraction < 0:
+            raise ValueError(f"Mức tải phải ≥ 0 (nhận {self.load_fraction})")
+
+
+def default_load_cases(Kt_start: float = 1.25) -> Tuple[LoadCase, ...]:
+    """
+    Các trường hợp kiểm tra mặc định: rỗng, đầy tải, tải trên dốc lên, khởi động, dừng/hãm.
+
+    Args:
+        Kt_start: Hệ số khởi động (ConveyorParameters.Kt_start)
+
+    Returns:
+        Tuple LoadCase
+    """
+    Kt = max(1.0, float(Kt_start or 1.25))
+    return (
+        LoadCase("Băng rỗng", 0.0),
+        LoadCase("Đầy tải"),
+        LoadCase("Tải trên đoạn dốc lên", load_on=LOAD_ON_INCLINES),
+        LoadCase("Khởi động đầy tải", inertia_factor=Kt - 1.0),
+        LoadCase("Dừng/hãm, tải trên đoạn dốc xuống", load_on=LOAD_ON_DECLINES, inertia_factor=1.0 - Kt),
+    )
+
+
+class LoadCaseMatrix(NamedTuple):
+    """Kết quả theo trường hợp tải (mỗi cột là một mảng theo thứ tự cases)."""
+    cases: Tuple[LoadCase, ...]
+    friction_N: np.ndarray
+    lift_N: np.ndarray
+    effective_tension_N: np.ndarray     # Lực vòng tại puly dẫn (âm = hãm/tái sinh)
+    T1_N: np.ndarray                    # Nhánh căng tại puly dẫn
+    T2_N: np.ndarray                    # Nhánh chùng tại puly dẫn
+    max_tension_N: np.ndarray
+    required_power_kw: np.ndarray       # Âm khi băng kéo động cơ (cần phanh/hãm)
+    safety_factor: np.ndarray
+
+    def index(self, name: str) -> int:
+        """Vị trí của trường hợp có tên name."""
+        for i, case in enumerate(self.cases):
+            if case.name == name:
+                return i
+        raise KeyError(name)
+
+    @property
+    def governing_tension(self) -> LoadCase:
+        """Trường hợp có lực căng lớn nhất."""
+        return self.cases[int(np.argmax(self.max_tension_N))]
+
+    @property
+    def governing_power(self) -> LoadCase:
+        """Trường hợp cần công suất dẫn động lớn nhất."""
+        return self.cases[int(np.argmax(self.required_power_kw))]
+
+    @property
+    def governing_safety(self) -> LoadCase:
+        """Trường hợp có hệ số an toàn đai nhỏ nhất."""
+        return self.cases[int(np.argmin(self.safety_factor))]
+
+    def governing(self) -> dict:
+        """{tiêu chí: tên trường hợp quyết định} (để hiển thị/ghi báo cáo)."""
+        return {
+            "max_tension": self.governing_tension.name,
+            "required_power": self.governing_power.name,
+            "safety_factor": self.governing_safety.name,
+        }
+
+
+def _load_fractions(route, cases: Sequence[LoadCase]) -> np.ndarray:
+    """Ma trận mức chất tải (trường hợp × đoạn) từ mức tải của tuyến và vùng chất tải."""
+    base = np.array([seg.load_fraction for seg in route], dtype=float)
+    lift = np.array([seg.lift_m for seg in route], dtype=float)
+    regions = {LOAD_ON_ALL: np.ones(len(route)), LOAD_ON_INCLINES: (lift > 0).astype(float),
+               LOAD_ON_DECLINES: (lift <= 0).astype(float)}
+    return np.array([base * regions[case.load_on] * case.load_fraction for case in cases])
+
+
+def evaluate_load_cases(route, loads: RouteLoads, cases: Sequence[LoadCase], e_ratio: float,
+                        belt_speed_mps: float, belt_capacity_N: float) -> LoadCaseMatrix:
+    """
+    Lực căng, công suất và hệ số an toàn của mọi trường hợp tải trong một lượt vector hóa.
+
+    Lực căng theo Euler–Eytelwein với T2 = |Fu|/(e - 1) như khi tính truyền động đơn; khi lực vòng
+    âm (hãm) nhánh căng nằm ở phía nhánh về nên lực căng lớn nhất là |Fu|·e/(e - 1).
+
+    Args:
+        route: Tuyến của kết quả (CalculationResult.route)
+        loads: Tải và hệ số ma sát đã hiệu chỉnh (CalculationResult.route_loads)
+        cases: Các trường hợp tải
+        e_ratio: e^{μθ} của puly dẫn
+        belt_speed_mps: Tốc độ băng
+        belt_capacity_N: Lực kéo cho phép của đai (B · T_allow)
+
+    Returns:
+        LoadCaseMatrix
+    """
+    cases = tuple(cases)
+    A, B, lift = loop_coefficients_many(route, loads, _load_fractions(route, cases))
+    inertia = np.array([case.inertia_factor for case in cases], dtype=float)
+    if A == 1.0:
+        pull = B
+    else:
+        # T1 = A·T2 + B và T1 = e·T2; đoạn cong vượt khả năng của puly thì bỏ qua đoạn cong
+        pull = (e_ratio - 1.0) * B / (e_ratio - A) if e_ratio > A else B
+    friction = pull - lift
+    # Khởi động cần thêm lực kéo; khi dừng quán tính đẩy băng, lực hãm (Fu âm) tăng về độ lớn
+    pull = pull + inertia * np.abs(pull)
+    grip = max(e_ratio - 1.0, 1e-6)
+    T2 = np.abs(pull) / grip
+    T1 = pull + T2
+    max_tension = np.abs(pull) + T2
+    power = pull * belt_speed_mps / 1000.0
+    safety = belt_capacity_N / np.maximum(max_tension, 1e-6)
+    for array in (friction, lift, pull, T1, T2, max_tension, power, safety):
+        array.flags.writeable = False
+    return LoadCaseMatrix(cases, friction, lift, pull, T1, T2, max_tension, power, safety)
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+Bảng tra kỹ thuật được biên dịch sẵn (khóa đã sắp xếp + mảng NumPy).
+
+Thay cho các phép quét min(dict, key=lambda ...) và sorted(...) lặp lại ở mỗi lần tra:
+- LookupTable: bảng 1 chiều (khóa → giá trị), tra gần nhất / sàn / trần / nội suy tuyến tính.
+- GridTable: bảng 2 chiều dạng dict lồng nhau, tra gần nhất theo từng trục / nội suy song tuyến.
+
+Mỗi phép tra có bản vô hướng (bisect, trả về đúng đối tượng giá trị gốc) và bản vector (NumPy).
+Quy ước giống các phép quét cũ: cách đều thì lấy khóa nhỏ hơn, giá trị NaN lấy khóa đầu tiên.
+Bảng có tên (name) được đếm số lần tra khi đang đo profile (xem core/profiling.py).
+"""
+import bisect
+import math
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from .profiling import count_lookup
+
+
+class LookupTable:
+    """Bảng tra 1 chiều với khóa số đã sắp xếp tăng dần."""
+
+    def __init__(self, keys: Sequence[float], values: Sequence, name: str = ""):
+        self.name = name
+        if len(keys) == 0:
+            raise ValueError("Bảng tra không có dữ liệu")
+        order = sorted(range(len(keys)), key=lambda i: keys[i])
+        self.key_list = [keys[i] for i in order]
+        self.value_list = [values[i] for i in order]
+        self.keys = np.asarray(self.key_list, dtype=float)
+        try:
+            self.values = np.asarray(self.value_list, dtype=float)
+        except (TypeError, ValueError):
+            # Giá trị không phải số (ví dụ các hàng của GridTable)
+            self.values = np.empty(len(self.value_list), dtype=object)
+            self.values[:] = self.value_list
+
+    @classmethod
+    def from_dict(cls, table: Dict, name: str = "") -> 'LookupTable':
+        return cls(list(table.keys()), list(table.values()), name=name)
+
+    def __len__(self) -> int:
+        return len(self.key_list)
+
+    # ---------------- Vô hướng ----------------
+
+    def nearest_index(self, x: float) -> int:
+        """Chỉ số khóa gần nhất (giống min(keys, key=lambda k: abs(k - x)))."""
+        if x != x:
+            return 0
+        keys = self.key_list
+        i = bisect.bisect_left(keys, x)
+        if i <= 0:
+            return 0
+        if i >= len(keys):
+            return len(keys) - 1
+        return i - 1 if (x - keys[i - 1]) <= (keys[i] - x) else i
+
+    def floor_index(self, x: float) -> Optional[int]:
+        """Chỉ số khóa lớn nhất <= x (None nếu x nhỏ hơn mọi khóa)."""
+        i = bisect.bisect_right(self.key_list, x) - 1
+        return i if i >= 0 else None
+
+    def ceil_index(self, x: float) -> Optional[int]:
+        """Chỉ số khóa nhỏ nhất >= x (None nếu x lớn hơn mọi khóa)."""
+        i = bisect.bisect_left(self.key_list, x)
+        return i if i < len(self.key_list) else None
+
+    def nearest_key(self, x: float):
+        if self.name:
+            count_lookup(self.name)
+        return self.key_list[self.nearest_index(x)]
+
+    def nearest(self, x: float):
+        """Giá trị tại khóa gần nhất (đối tượng gốc, ví dụ int hoặc tuple)."""
+        if self.name:
+            count_lookup(self.name)
+        return self.value_list[self.nearest_index(x)]
+
+    def floor(self, x: float, default=None):
+        if self.name:
+            count_lookup(self.name)
+        i = self.floor_index(x)
+        return default if i is None else self.value_list[i]
+
+    def ceil(self, x: float, default=None):
+        if self.name:
+            count_lookup(self.name)
+        i = self.ceil_index(x)
+        return default if i is None else self.value_list[i]
+
+    def interp(self, x: float) -> float:
+        """Nội suy tuyến tính, giữ giá trị biên ngoài phạm vi khóa."""
+        if self.name:
+            count_lookup(self.name)
+        keys, values = self.key_list, self.value_list
+        if x <= keys[0]:
+            return values[0]
+        if x >= keys[-1]:
+            return values[-1]
+        i = bisect.bisect_left(keys, x)
+        x0, y0 = keys[i - 1], values[i - 1]
+        x1, y1 = keys[i], values[i]
+        return y0 + (y1 - y0) * (x - x0) / (x1 - x0)
+
+    # ---------------- Vector ----------------
+
+    def nearest_indices(self, x) -> np.ndarray:
+        """Bản vector của nearest_index."""
+        x = np.asarray(x, dtype=float)
+        keys = self.keys
+        if len(keys) == 1:
+            return np.zeros(x.shape, dtype=int)
+        idx = np.clip(np.searchsorted(keys, x), 1, len(keys) - 1)
+        take_left = (x - keys[idx - 1]) <= (keys[idx] - x)
+        out = np.where(take_left, idx - 1, idx)
+        out = np.where(x <= keys[0], 0, out)
+        out = np.where(x >= keys[-1], len(keys) - 1, out)
+        return np.where(np.isnan(x), 0, out)
+
+    def nearest_many(self, x) -> np.ndarray:
+        if self.name:
+            count_lookup(self.name)
+        return self.values[self.nearest_indices(x)]
+
+    def floor_many(self, x, default: float = math.nan) -> np.ndarray:
+        if self.name:
+            count_lookup(self.name)
+        idx = np.searchsorted(self.keys, np.asarray(x, dtype=float), side='right') - 1
+        return np.where(idx >= 0, self.values[np.clip(idx, 0, len(self) - 1)], default)
+
+    def ceil_many(self, x, default: float = math.nan) -> np.ndarray:
+        if self.name:
+            count_lookup(self.name)
+        idx = np.searchsorted(self.keys, np.asarray(x, dtype=float), side='left')
+        return np.where(idx < len(self), self.values[np.clip(idx, 0, len(self) - 1)], default)
+
+    def interp_many(self, x) -> np.ndarray:
+        """Bản vector của interp (cùng công thức nên cho cùng kết quả từng bit)."""
+        if self.name:
+            count_lookup(self.name)
+        x = np.asarray(x, dtype=float)
+        keys, values = self.keys, self.values
+        if len(keys) == 1:
+            return np.full(x.shape, values[0])
+        i = np.clip(np.searchsorted(keys, x, side='left'), 1, len(keys) - 1)
+        x0, x1 = keys[i - 1], keys[i]
+        y0, y1 = values[i - 1], values[i]
+        out = y0 + (y1 - y0) * (x - x0) / (x1 - x0)
+        out = np.where(x <= keys[0], values[0], out)
+        return np.where(x >= keys[-1], values[-1], out)
+
+
+class GridTable:
+    """Bảng 2 chiều {khóa hàng: {khóa cột: giá trị}}; các hàng có thể có bộ khóa cột khác nhau."""
+
+    def __init__(self, table: Dict[float, Dict[float, float]], name: str = ""):
+        self.name = name
+        # Các hàng không có tên: mỗi phép tra của GridTable chỉ được đếm một lần
+        self.rows = LookupTable(list(table.keys()), [LookupTable.from_dict(row) for row in table.values()])
+
+    def row(self, r: float) -> LookupTable:
+        """Hàng có khóa gần nhất."""
+        if self.name:
+            count_lookup(self.name)
+        return self.rows.nearest(r)
+
+    def nearest(self, r: float, c: float):
+        """Gần nhất theo hàng rồi gần nhất theo cột trong hàng đó."""
+        return self.row(r).nearest(c)
+
+    def bilinear(self, r: float, c: float) -> float:
+        """Nội suy theo cột trong từng hàng rồi nội suy theo hàng (giữ giá trị biên)."""
+        if self.name:
+            count_lookup(self.name)
+        at_c = [row.interp(c) for row in self.rows.value_list]
+        return LookupTable(self.rows.key_list, at_c).interp(r)
+
+    def nearest_many(self, r, c) -> np.ndarray:
+        if self.name:
+            count_lookup(self.name)
+        r = np.asarray(r, dtype=float)
+        c = np.broadcast_to(np.asarray(c, dtype=float), r.shape)
+        row_idx = self.rows.nearest_indices(r)
+        out = np.empty(r.shape, dtype=float)
+        for k, row in enumerate(self.rows.value_list):
+            mask = row_idx == k
+            if mask.any():
+                out[mask] = row.nearest_many(c[mask])
+        return out
+
+    def bilinear_many(self, r, c) -> np.ndarray:
+        if self.name:
+            count_lookup(self.name)
+        r = np.asarray(r, dtype=float)
+        flat_r = r.ravel()
+        flat_c = np.broadcast_to(np.asarray(c, dtype=float), r.shape).ravel()
+        # Giá trị của từng hàng tại cột c: mảng (số hàng, số điểm)
+        at_c = np.stack([row.interp_many(flat_c) for row in self.rows.value_list])
+        keys = self.rows.keys
+        if len(keys) == 1:
+            return at_c[0].reshape(r.shape)
+        cols = np.arange(flat_r.size)
+        i = np.clip(np.searchsorted(keys, flat_r, side='left'), 1, len(keys) - 1)
+        y0, y1 = at_c[i - 1, cols], at_c[i, cols]
+        out = y0 + (y1 - y0) * (flat_r - keys[i - 1]) / (keys[i] - keys[i - 1])
+        out = np.where(flat_r <= keys[0], at_c[0], out)
+        out = np.where(flat_r >= keys[-1], at_c[-1], out)
+        return out.reshape(r.shape)
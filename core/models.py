@@ -1,9 +1,14 @@
 # title="core/models.py" contentType="text/python"
 # core/models.py
 # -*- coding: utf-8 -*-
+import copy
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import List, Dict, Optional
+from typing import List, Dict, NamedTuple, Optional
+
+import numpy as np
+
+from .diagnostics import Diagnostic, MessageList, as_diagnostic
 
 class MaterialType(Enum):
     COAL = "Than đá"
@@ -96,6 +101,10 @@ class ConveyorParameters:
     gearbox_ratio_mode: str = "auto"
     # Tỉ số hộp số do người dùng nhập (>0 khi mode="manual") - dùng để tính tốc độ đầu ra động cơ
     gearbox_ratio_user: float = 0.0
+    # Chế độ chọn xích: "auto" (duyệt toàn bộ bảng tra) | "manual" (chỉ dùng chain_spec_designation)
+    chain_selection_mode: str = "auto"
+    # Mã xích được chỉ định khi chain_selection_mode="manual"
+    chain_spec_designation: str = ""
     # --- [KẾT THÚC NÂNG CẤP HỘP SỐ MANUAL] ---
     
     # --- [BẮT ĐẦU NÂNG CẤP TỐC ĐỘ BĂNG TỰ ĐỘNG] ---
@@ -114,7 +123,62 @@ class ConveyorParameters:
     
     db_path: str = ""
 
-@dataclass
+    # --- [BẮT ĐẦU NÂNG CẤP TUYẾN NHIỀU ĐOẠN] ---
+    # Tuyến băng: tuple các core.route.RouteSegment từ đuôi tới đầu. Rỗng = một đoạn dựng từ L_m/H_m;
+    # khi có tuyến, L_m/H_m được thay bằng tổng chiều dài và chênh cao của tuyến
+    route: tuple = ()
+    # --- [KẾT THÚC NÂNG CẤP TUYẾN NHIỀU ĐOẠN] ---
+
+    def replace(self, **changes) -> 'ConveyorParameters':
+        """
+        Bản sao với một số trường thay đổi; đối tượng gốc giữ nguyên.
+
+        Mọi trường đều là giá trị bất biến (số, chuỗi, bool, tuple tuyến) nên bản sao nông là đủ và rẻ
+        hơn nhiều so với copy.deepcopy hay dataclasses.replace (không chạy lại __init__).
+
+        Args:
+            **changes: Các trường cần thay đổi, ví dụ params.replace(B_mm=800, V_mps=None)
+
+        Returns:
+            ConveyorParameters mới
+
+        Raises:
+            TypeError: Nếu có trường không tồn tại
+        """
+        unknown = [name for name in changes if name not in self.__dataclass_fields__]
+        if unknown:
+            raise TypeError(f"ConveyorParameters không có trường: {', '.join(unknown)}")
+        clone = copy.copy(self)
+        clone.__dict__.update(changes)
+        return clone
+
+# --- [BẮT ĐẦU NÂNG CẤP KẾT QUẢ GỌN] ---
+# Số đoạn chia chiều dài băng của biểu đồ lực căng mặc định (51 điểm)
+PROFILE_POINTS = 50
+
+
+class ForceProfiles(NamedTuple):
+    """Biểu đồ lực dọc băng (mảng NumPy chỉ đọc, cùng số điểm)."""
+    distances_m: np.ndarray
+    friction_force: np.ndarray
+    lift_force: np.ndarray
+    t2: np.ndarray
+    tension: np.ndarray
+
+
+def _empty_profiles() -> ForceProfiles:
+    empty = np.empty(0)
+    empty.flags.writeable = False
+    return ForceProfiles(empty, empty, empty, empty, empty)
+
+
+_EMPTY_PROFILES = _empty_profiles()
+# --- [KẾT THÚC NÂNG CẤP KẾT QUẢ GỌN] ---
+
+
+# slots: không có __dict__ cho mỗi kết quả; các biểu đồ 51 điểm không lưu sẵn mà dựng lười
+# từ profile_length_m, profile_t2_N, friction_force, lift_force (xem profiles())
+@dataclass(slots=True)
 class CalculationResult:
     mass_flow_rate: float = 0.0
     Qt_effective_tph: float = 0.0
@@ -170,17 +234,24 @@ class CalculationResult:
     op_cost_maintenance_per_year: float = 0.0
     op_cost_total_per_year: float = 0.0
 
-    distances_m: List[float] = field(default_factory=list)
-    tension_profile: List[float] = field(default_factory=list)
-    lift_force_profile: List[float] = field(default_factory=list)
-    friction_force_profile: List[float] = field(default_factory=list)
-    t2_profile: List[float] = field(default_factory=list)
+    # Chiều dài dùng cho biểu đồ lực căng (0 = chưa có biểu đồ) và lực căng nền của biểu đồ
+    # (T2, hoặc F21 với truyền động kép)
+    profile_length_m: float = 0.0
+    profile_t2_N: float = 0.0
+    # Tuyến đã tính (băng một đoạn là tuyến một đoạn dựng từ L_m/H_m) và tải/hệ số ma sát để lan
+    # truyền lực căng quanh vòng băng (xem loop_profile())
+    route: tuple = ()
+    route_loads: Optional['RouteLoads'] = None
 
-    warnings: List[str] = field(default_factory=list)
+    # Cảnh báo dạng mã + tham số (core.diagnostics); câu thông báo chỉ được định dạng khi đọc warnings
+    diagnostics: List[Diagnostic] = field(default_factory=list)
     recommendations: List[str] = field(default_factory=list)
 
-    recommended_pulley_diameters_mm: Dict[str, float] = field(default_factory=dict)
-    recommended_idler_spacing_m: Dict[str, float] = field(default_factory=dict)
+    # Đường kính puly dẫn động đã tra (mm, chưa làm tròn) và khoảng cách con lăn đề xuất (m);
+    # None = chưa tính. Các dict recommended_* được dựng từ các giá trị này khi truy cập.
+    pulley_diameter_A_mm: Optional[float] = None
+    idler_spacing_carry_m: Optional[float] = None
+    idler_spacing_return_m: Optional[float] = None
     transition_distance_m: float = 0.0
 
     # --- [BẮT ĐẦU NÂNG CẤP] ---
@@ -221,8 +292,140 @@ class CalculationResult:
     cross_section_utilization_percent: float = 0.0 # % sử dụng tiết diện
     speed_warnings: List[str] = field(default_factory=list)  # Cảnh báo về tốc độ
     max_speed_allowed_mps: float = 0.0             # Tốc độ tối đa cho phép theo bảng tra (m/s)
+    recommended_speed_mps: float = 0.0             # Tốc độ khuyến nghị khi tự tính tốc độ (m/s)
     # --- [KẾT THÚC NÂNG CẤP TỐC ĐỘ BĂNG TỰ ĐỘNG] ---
 
+    # Thời gian từng giai đoạn và số lần tra bảng (chỉ có khi calculate(p, profile=True))
+    profile: Optional['CalculationProfile'] = None
+    # Trạng thái từng giai đoạn cho recalculate() (chỉ có khi calculate(p, track_stages=True))
+    stage_state: Optional['StageState'] = None
+
+    # (giá trị đầu vào, {số đoạn: ForceProfiles, ("loop", bước lưới): LoopProfile}) của các biểu đồ đã dựng
+    _profile_cache: Optional[tuple] = field(default=None, repr=False, compare=False)
+
+    # --- [BẮT ĐẦU NÂNG CẤP KẾT QUẢ GỌN] ---
+    def profiles(self, points: int = PROFILE_POINTS) -> ForceProfiles:
+        """
+        Biểu đồ lực dọc băng, dựng khi cần và được cache theo số đoạn.
+
+        Args:
+            points: Số đoạn chia chiều dài băng (mảng có points + 1 phần tử)
+
+        Returns:
+            ForceProfiles (mảng rỗng nếu kết quả chưa có biểu đồ)
+        """
+        L = self.profile_length_m
+        if L <= 0 or points < 1:
+            return _EMPTY_PROFILES
+        cache = self._profile_store()
+        profiles = cache.get(points)
+        if profiles is None:
+            # Cùng thứ tự phép tính với vòng lặp cũ của finalize_results (giá trị trùng từng bit)
+            distances = np.arange(points + 1) * L / points
+            if len(self.route) > 1:
+                # Tuyến nhiều đoạn: phân bố tổng lực theo tỉ trọng từng đoạn
+                from .route import route_force_profiles
+                friction, lift = route_force_profiles(self.route, self.route_loads, self.friction_force,
+                                                      self.lift_force, distances)
+            else:
+                ratio = distances / L
+                friction = self.friction_force * ratio
+                lift = self.lift_force * ratio
+            t2 = np.full(points + 1, float(self.profile_t2_N))
+            tension = t2 + friction + lift
+            for array in (distances, friction, lift, t2, tension):
+                array.flags.writeable = False
+            profiles = cache[points] = ForceProfiles(distances, friction, lift, t2, tension)
+        return profiles
+
+    def _profile_store(self) -> dict:
+        """Bộ cache biểu đồ, làm mới khi đầu vào đổi (hoặc kết quả là bản sao nông của kết quả khác)."""
+        inputs = (self.profile_length_m, self.profile_t2_N, self.friction_force, self.lift_force,
+                  self.route, self.route_loads)
+        cache = self._profile_cache
+        if cache is None or cache[0] != inputs:
+            cache = self._profile_cache = (inputs, {})
+        return cache[1]
+
+    def loop_profile(self, resolution_m: float = 1.0) -> Optional['LoopProfile']:
+        """
+        Lực căng quanh vòng băng kín (nhánh về rồi nhánh tải), dựng khi cần và được cache theo bước lưới.
+
+        Args:
+            resolution_m: Bước lớn nhất giữa hai nút (m)
+
+        Returns:
+            LoopProfile, hoặc None nếu kết quả chưa có tuyến/tải của tuyến
+        """
+        loads = self.route_loads
+        if loads is None or not self.route or self.profile_length_m <= 0:
+            return None
+        cache = self._profile_store()
+        key = ("loop", float(resolution_m))
+        loop = cache.get(key)
+        if loop is None:
+            from .route import propagate_loop
+            loop = cache[key] = propagate_loop(self.route, loads, self.profile_t2_N, resolution_m)
+        return loop
+
+    # Các thuộc tính cũ (51 điểm) trả về list như trước, giữ cho UI, báo cáo Excel/PDF và biểu đồ;
+    # mảng NumPy chỉ đọc lấy qua profiles()
+    @property
+    def distances_m(self) -> List[float]:
+        return self.profiles().distances_m.tolist()
+
+    @property
+    def tension_profile(self) -> List[float]:
+        return self.profiles().tension.tolist()
+
+    @property
+    def lift_force_profile(self) -> List[float]:
+        return self.profiles().lift_force.tolist()
+
+    @property
+    def friction_force_profile(self) -> List[float]:
+        return self.profiles().friction_force.tolist()
+
+    @property
+    def t2_profile(self) -> List[float]:
+        return self.profiles().t2.tolist()
+
+    @property
+    def recommended_pulley_diameters_mm(self) -> Dict[str, float]:
+        """Đường kính puly đề xuất theo loại (dict mới mỗi lần truy cập)."""
+        dia_A = self.pulley_diameter_A_mm
+        if dia_A is None:
+            return {}
+        return {
+            "Puly dẫn động/đầu (Loại A)": round(dia_A),
+            "Puly căng/đuôi (Loại B)": round(dia_A * 0.8),
+            "Puly dẫn hướng (Loại C)": round(dia_A * 0.6),
+        }
+
+    @property
+    def recommended_idler_spacing_m(self) -> Dict[str, float]:
+        """Khoảng cách con lăn đề xuất theo nhánh (dict mới mỗi lần truy cập)."""
+        if self.idler_spacing_carry_m is None:
+            return {}
+        return {
+            "Nhánh tải (đề xuất)": self.idler_spacing_carry_m,
+            "Nhánh về (đề xuất)": self.idler_spacing_return_m,
+        }
+    # --- [KẾT THÚC NÂNG CẤP KẾT QUẢ GỌN] ---
+
+    @property
+    def warnings(self) -> MessageList:
+        """
+        Câu cảnh báo để hiển thị/xuất báo cáo, định dạng từ diagnostics mỗi lần truy cập.
+
+        Thêm/sửa/xóa trên danh sách trả về được ghi thẳng vào diagnostics (chuỗi -> Diagnostic.text).
+        """
+        return MessageList(self.diagnostics)
+
+    @warnings.setter
+    def warnings(self, messages):
+        self.diagnostics = [as_diagnostic(m) for m in messages]
+
 # --- [BẮT ĐẦU NÂNG CẤP TRUYỀN ĐỘNG] ---
 # Model cho thông số xích
 @dataclass
@@ -245,8 +448,8 @@ class ChainSpec:
     ansi_code: str = ""                       # ANSI Standard Chain Code
     strand: int = 1                           # 1R/2R/3R -> 1/2/3
 
-# Model cho giải pháp truyền động hoàn chỉnh
-@dataclass
+# Model cho giải pháp truyền động hoàn chỉnh (slots: mỗi kết quả giữ một bản)
+@dataclass(slots=True)
 class TransmissionSolution:
     gearbox_ratio: float = 0.0  # Tỉ số truyền của hộp số (dùng để tính tốc độ đầu ra động cơ)
     drive_sprocket_teeth: int = 0  # Số răng nhông dẫn
@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 import math
 from .specs import STANDARD_WIDTHS, ACTIVE_MATERIAL_DB
+from .diagnostics import DiagCode, Diagnostic, format_messages
+from .formulas import cross_section_area_m2
 
 def optimize_belt_width(capacity_tph: float, density_tpm3: float, speed_mps: float) -> int:
     mass_flow = capacity_tph*1000/3600
@@ -46,90 +48,34 @@ def get_max_speed_from_table(belt_width_mm: int, material_characteristics: dict)
     Returns:
         float: Tốc độ tối đa cho phép (m/s)
     """
+    # Bảng tra được nạp một lần (core/speed_table.py), chỉ đọc lại khi file thay đổi
+    from .speed_table import SPEED_TABLE_REGISTRY, FALLBACK_MAX_SPEED_MPS
     try:
-        import pandas as pd
-        import os
-        
-        # Đường dẫn đến file CSV
-        csv_path = os.path.join(os.path.dirname(__file__), '..', 'data', 'hidden', 'Bang tra toc do bang tai.csv')
-        
-        if not os.path.exists(csv_path):
-            print(f"Warning: Không tìm thấy file bảng tra tốc độ: {csv_path}")
-            print("Sử dụng giá trị fallback an toàn: 2.0 m/s")
-            return 2.0  # Giá trị fallback an toàn hơn (thay vì 5.0)
-        
-        # Đọc file CSV
-        df = pd.read_csv(csv_path)
-        
-        # Tìm bề rộng băng gần nhất
-        available_widths = df['conveyor width (mm)'].dropna().tolist()
-        if not available_widths:
-            print("Warning: Không có dữ liệu bề rộng băng trong file CSV")
-            print("Sử dụng giá trị fallback an toàn: 2.0 m/s")
-            return 2.0  # Giá trị fallback an toàn hơn
-        
-        # Tìm bề rộng gần nhất (có thể nhỏ hơn hoặc bằng)
-        belt_width_mm = int(belt_width_mm)
-        # Lọc ra các bề rộng hợp lệ (chỉ số)
-        valid_widths = []
-        for width in available_widths:
-            try:
-                valid_widths.append(int(width))
-            except (ValueError, TypeError):
-                continue
-        
-        if not valid_widths:
-            print("Warning: Không có bề rộng băng hợp lệ trong file CSV")
-            print("Sử dụng giá trị fallback an toàn: 2.0 m/s")
-            return 2.0  # Giá trị fallback an toàn hơn
-        
-        closest_width = min(valid_widths, key=lambda x: abs(x - belt_width_mm))
-        
-        # Xác định cột tốc độ dựa trên đặc tính vật liệu
-        if material_characteristics.get('is_abrasive', False):
-            # Vật liệu hạt (ngũ cốc, than...) - checkbox "Granular materials"
-            speed_column = 'Granular materials (m/s)'
-        elif material_characteristics.get('is_corrosive', False):
-            # Vật liệu mài mòn (cát, xi măng, bột...) - checkbox "Coal and abrasive materials"
-            speed_column = 'Coal and abrasive materials (m/s)'
-        elif material_characteristics.get('is_dusty', False):
-            # Vật liệu cứng, có cạnh sắc (quặng, đá, kim loại...) - checkbox "Hard ores, rocks and materials with sharp edges"
-            speed_column = 'Hard ores, rocks and materials with sharp edges (m/s)'
-        else:
-            # Mặc định: vật liệu hạt (ngũ cốc, than...)
-            speed_column = 'Granular materials (m/s)'
-        
-        # Lấy tốc độ tối đa
-        row = df[df['conveyor width (mm)'] == closest_width]
-        if not row.empty:
-            max_speed = row[speed_column].iloc[0]
-            if pd.isna(max_speed):
-                # Nếu không có giá trị, sử dụng cột khác theo thứ tự ưu tiên:
-                # 1. Granular materials (vật liệu hạt - an toàn nhất)
-                # 2. Coal and abrasive materials (vật liệu mài mòn)
-                # 3. Hard ores, rocks and materials with sharp edges (vật liệu cứng - nguy hiểm nhất)
-                for col in ['Granular materials (m/s)', 'Coal and abrasive materials (m/s)', 'Hard ores, rocks and materials with sharp edges (m/s)']:
-                    if not pd.isna(row[col].iloc[0]):
-                        max_speed = row[col].iloc[0]
-                        break
-                else:
-                    print("Warning: Không có dữ liệu tốc độ trong file CSV")
-                    print("Sử dụng giá trị fallback an toàn: 2.0 m/s")
-                    max_speed = 2.0  # Giá trị fallback an toàn hơn
-            return float(max_speed)
-        
-        print("Warning: Không tìm thấy dữ liệu cho bề rộng băng")
-        print("Sử dụng giá trị fallback an toàn: 2.0 m/s")
-        return 2.0  # Giá trị fallback an toàn hơn
-        
+        return SPEED_TABLE_REGISTRY.max_speed(belt_width_mm, material_characteristics)
     except Exception as e:
-        print(f"Warning: Lỗi khi đọc bảng tra tốc độ: {e}")
-        print("Sử dụng giá trị fallback an toàn: 2.0 m/s")
-        return 2.0  # Giá trị fallback an toàn hơn
+        print(f"Warning: Lỗi khi tra bảng tốc độ: {e}")
+        print(f"Sử dụng giá trị fallback an toàn: {FALLBACK_MAX_SPEED_MPS} m/s")
+        return FALLBACK_MAX_SPEED_MPS
+
+def get_max_speeds_from_table(belt_widths_mm, material_characteristics: dict, interpolate: bool = False):
+    """
+    Tra tốc độ tối đa cho cả mảng bề rộng băng (cùng đặc tính vật liệu).
+
+    Args:
+        belt_widths_mm: Danh sách/mảng bề rộng băng (mm)
+        material_characteristics: Dict chứa các đặc tính vật liệu được chọn
+        interpolate: True = nội suy tuyến tính theo bề rộng, False = bề rộng gần nhất (như get_max_speed_from_table)
+
+    Returns:
+        np.ndarray: Tốc độ tối đa cho phép (m/s)
+    """
+    from .speed_table import SPEED_TABLE_REGISTRY
+    return SPEED_TABLE_REGISTRY.max_speeds(belt_widths_mm, material_characteristics, interpolate=interpolate)
 
 def calculate_belt_speed(capacity_tph: float, density_tpm3: float, belt_width_mm: int, 
                          particle_mm: float, material_name: str, trough_angle_deg: float = 20.0, 
-                         surcharge_angle_deg: float = 20.0, material_characteristics: dict = None) -> tuple:
+                         surcharge_angle_deg: float = 20.0, material_characteristics: dict = None,
+                         coded: bool = False) -> tuple:
     """
     Tính toán tốc độ băng cần thiết và khuyến nghị.
     
@@ -142,6 +88,8 @@ def calculate_belt_speed(capacity_tph: float, density_tpm3: float, belt_width_mm
         trough_angle_deg: Góc máng (độ)
         surcharge_angle_deg: Góc surcharge (độ)
         material_characteristics: Dict chứa đặc tính vật liệu được chọn
+        coded: True để nhận cảnh báo dạng Diagnostic (SPEED_ABOVE_RECOMMENDED, SPEED_ABOVE_MAX)
+            thay vì câu thông báo - dùng cho engine và bộ tối ưu
     
     Returns:
         tuple: (v_final, v_req, v_rec, area_m2, warnings, max_speed_allowed)
@@ -160,9 +108,7 @@ def calculate_belt_speed(capacity_tph: float, density_tpm3: float, belt_width_mm
     surcharge_angle_rad = math.radians(float(surcharge_angle_deg))
     
     # Cross-sectional area: bottom wedge + side rise with trough
-    A_bottom = 0.25 * belt_width_m * belt_width_m * math.tan(surcharge_angle_rad)
-    A_sides = (belt_width_m * belt_width_m / 8.0) * (1.0 - math.cos(trough_angle_rad))
-    area_m2 = max(0.0, A_bottom + A_sides)
+    area_m2 = cross_section_area_m2(belt_width_m, math.tan(surcharge_angle_rad), math.cos(trough_angle_rad))
     
     # 4) Tính tốc độ cần thiết (m/s)
     v_req = mass_flow_kgps / (density_kgm3 * area_m2)
@@ -188,23 +134,17 @@ def calculate_belt_speed(capacity_tph: float, density_tpm3: float, belt_width_mm
     
     # Cảnh báo về tốc độ vượt quá khuyến nghị
     if v_req > v_rec * (1 + BELT_SPEED_SAFETY_MARGIN):
-        warnings.append(
-            f"Tốc độ cần thiết ({v_req:.2f} m/s) vượt quá tốc độ khuyến nghị "
-            f"({v_rec:.2f} m/s) + {BELT_SPEED_SAFETY_MARGIN*100:.0f}% margin. "
-            f"Cân nhắc tăng bề rộng băng hoặc giảm lưu lượng."
-        )
+        warnings.append(Diagnostic(DiagCode.SPEED_ABOVE_RECOMMENDED, (v_req, v_rec, BELT_SPEED_SAFETY_MARGIN*100)))
     
     # Cảnh báo về tốc độ vượt quá tối đa cho phép
     if v_req > max_speed_allowed:
-        warnings.append(
-            f"⚠️ CẢNH BÁO: Tốc độ tính toán ({v_req:.2f} m/s) vượt quá tốc độ tối đa cho phép "
-            f"({max_speed_allowed:.2f} m/s) theo bảng tra cho bề rộng {belt_width_mm}mm. "
-            f"Thiết kế này KHÔNG TỐI ƯU - cần tăng bề rộng băng hoặc giảm lưu lượng."
-        )
+        warnings.append(Diagnostic(DiagCode.SPEED_ABOVE_MAX, (v_req, max_speed_allowed, belt_width_mm)))
     
     # 8) Tốc độ cuối cùng (có thể điều chỉnh theo logic nghiệp vụ)
     v_final = v_req
     
+    if not coded:
+        warnings = format_messages(warnings)
     return v_final, v_req, v_rec, area_m2, warnings, max_speed_allowed
 
 def optimize_belt_width_for_capacity(capacity_tph: float, density_tpm3: float, 
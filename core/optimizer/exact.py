@@ -0,0 +1,228 @@
+# core/optimizer/exact.py
+"""
+Bộ giải chính xác cho không gian thiết kế rời rạc: bề rộng → loại băng → hộp số → xích.
+
+Duyệt toàn bộ cây theo thứ tự cố định và cắt nhánh bằng các cận rẻ. Chỉ cắt những nhánh
+chắc chắn không hợp lệ, vì điểm fitness được chuẩn hóa min/max trên mọi cá thể hợp lệ:
+- Mức bề rộng: tốc độ tự động (giới hạn bảng tra tốc độ + capacity_from_geometry_tph, qua
+  calculate_belt_speed) chỉ phụ thuộc bề rộng nên được tính một lần cho mỗi bề rộng. Vượt năng
+  lực hình học hay vượt tốc độ bảng tra chỉ bị phạt trong fitness chứ không làm thiết kế không hợp
+  lệ; loại chúng sẽ đổi khoảng chuẩn hóa min/max (và thứ hạng) nên hai đại lượng này không dùng
+  để cắt nhánh, chỉ dùng để dựng tham số cho bước sau.
+- Mức băng tải: hệ số an toàn và chi phí không phụ thuộc hộp số/xích, nên một cặp (bề rộng,
+  loại băng) vi phạm sẽ loại cả cây con bên dưới. Cả hai được tính cho mọi cặp trong một lần
+  calculate_batch; kết quả băng tải của các cặp còn lại được lấy thẳng từ bảng (to_result,
+  trùng từng bit với calculate()) thay vì tính lại bằng calculate().
+- Mức hộp số: sai số vận tốc nhỏ nhất có thể đạt được với mọi cặp nhông (z1, z2) là cận dưới
+  cho sai số của bộ truyền động mà engine chọn, với bất kỳ xích nào. Sai số và độ bền xích được
+  đọc từ chính TransmissionGrid của engine (chế độ hộp số Manual, qua atlas khi đang bật).
+
+Kết quả là top-N thật sự theo cùng hàm fitness với Optimizer._evaluate_population, có tính tất định.
+"""
+import math
+from typing import List, Optional
+
+import numpy as np
+
+from .models import DesignCandidate
+from .optimizer import _design_params
+from core.engine import TransmissionGrid
+from core.transmission_atlas import active_transmission_atlas
+from core.specs import (
+    STANDARD_WIDTHS,
+    ACTIVE_BELT_SPECS,
+    STANDARD_GEARBOX_RATIOS,
+    ACTIVE_CHAIN_SPECS,
+)
+
+# Ngưỡng an toàn cứng: giống _check_design và bước làm mềm ràng buộc của Optimizer
+HARD_SAFETY_THRESHOLD = 4.0
+# Tên puly dẫn động mà attach_transmission dùng để lấy đường kính
+_DRIVE_PULLEY_KEY = 'Puly dẫn động/đầu (Loại A)'
+
+
+def design_space() -> tuple:
+    """
+    Các trục của không gian thiết kế theo thứ tự duyệt.
+
+    Returns:
+        tuple: (widths, belt_types, gearbox_ratios, chain_designations) - xích không trùng mã, giữ thứ tự CSDL
+    """
+    chains = list(ACTIVE_CHAIN_SPECS.unique_designations)
+    return list(STANDARD_WIDTHS), list(ACTIVE_BELT_SPECS.keys()), list(STANDARD_GEARBOX_RATIOS), chains
+
+
+class ExactSolver:
+    """Vét cạn có cắt nhánh trên không gian rời rạc, chấm điểm bằng chính Optimizer."""
+
+    def __init__(self, optimizer):
+        self.optimizer = optimizer
+        self.base_params = optimizer.base_params
+        self.settings = optimizer.settings
+        self.widths, self.belt_types, self.gearbox_ratios, self.chains = design_space()
+        self.sf_threshold = max(HARD_SAFETY_THRESHOLD, float(self.settings.min_belt_safety_factor))
+        self.budget_limit = self.settings.max_budget_usd * 1.5 if self.settings.max_budget_usd else None
+        # Thống kê
+        self.belt_stage_evaluations = 0
+        self.batch_belt_stages = 0
+        self.drive_stage_evaluations = 0
+        self.pruned_belt_stages = 0
+        self.pruned_drives = 0
+        self._stages = {}
+
+    @property
+    def space_size(self) -> int:
+        return len(self.widths) * len(self.belt_types) * len(self.gearbox_ratios) * len(self.chains)
+
+    def solve(self, top_n: int = 15, prune: bool = True) -> List[DesignCandidate]:
+        """
+        Tìm top-N thiết kế theo fitness.
+
+        Args:
+            top_n: Số thiết kế tốt nhất cần trả về
+            prune: Có cắt nhánh bằng cận hay không (False = vét cạn toàn bộ)
+
+        Returns:
+            List[DesignCandidate] đã sắp xếp theo fitness tăng dần (hòa thì theo thứ tự duyệt)
+        """
+        pairs = [(w, b) for w in self.widths for b in self.belt_types]
+        bounds = self._batch_belt_stages(pairs)
+
+        candidates = []
+        for width, belt_type in pairs:
+            bound = bounds.get((width, belt_type)) if prune else None
+            if bound is not None and self._belt_pruned(*bound):
+                self.pruned_belt_stages += 1
+                self.pruned_drives += len(self.gearbox_ratios) * len(self.chains)
+                continue
+            candidates.extend(self._branch_drives(self._belt_stage(width, belt_type), width, belt_type, prune))
+
+        valid_candidates = [c for c in candidates if c.is_valid]
+        if not valid_candidates:
+            # Giống GA: làm mềm ràng buộc trên toàn bộ không gian, chỉ giữ các nhánh đạt ngưỡng cứng
+            print("Optimizer: Exact search found no valid design. Trying to relax constraints...")
+            candidates = []
+            for width, belt_type in pairs:
+                belt_result = self._belt_stage(width, belt_type)[1]
+                if belt_result is None or getattr(belt_result, 'safety_factor', 0) < HARD_SAFETY_THRESHOLD:
+                    continue
+                candidates.extend(self._branch_drives(self._belt_stage(width, belt_type), width, belt_type, False))
+            valid_candidates = self.optimizer._relax_constraints(candidates)
+            if not valid_candidates:
+                return []
+
+        self.optimizer._assign_fitness(valid_candidates)
+        valid_candidates.sort(key=lambda c: c.fitness_score)
+
+        print(f"Optimizer: Exact search over {self.space_size} designs - "
+              f"{self.batch_belt_stages} batched + {self.belt_stage_evaluations} scalar belt stages, "
+              f"{self.drive_stage_evaluations} drive evaluations, "
+              f"pruned {self.pruned_belt_stages} belt stages / {self.pruned_drives} designs, "
+              f"{len(valid_candidates)} valid")
+        return valid_candidates[:top_n]
+
+    def _belt_stage(self, width: int, belt_type: str) -> tuple:
+        key = (width, belt_type)
+        if key not in self._stages:
+            self._stages[key] = self.optimizer._new_belt_stage(width, belt_type)
+            self.belt_stage_evaluations += 1
+        return self._stages[key]
+
+    def _batch_belt_stages(self, pairs: list) -> dict:
+        """
+        Tính bài toán con băng tải của mọi cặp (bề rộng, loại băng) trong một lần calculate_batch.
+
+        Kết quả của từng cặp được lưu làm belt stage (giống evaluate_belt_stage) để _branch_drives
+        dùng lại; hàng mà calculate() vô hướng sẽ ném lỗi (inf/nan trong bảng) được để lại cho
+        _belt_stage tính bằng calculate() để giữ đúng lỗi.
+
+        Returns:
+            dict: {(bề rộng, loại băng): (hệ số an toàn, chi phí)} - thiếu cặp nào thì cặp đó không có cận
+        """
+        from core.engine import calculate_batch
+        # Tốc độ tự động chỉ phụ thuộc bề rộng: một lần calculate_belt_speed cho mỗi bề rộng
+        speeds = {w: _design_params(self.base_params, (w, self.belt_types[0], 0.0, ""))
+                  for w in dict.fromkeys(w for w, _ in pairs)}
+        params_list = [speeds[w][0].replace(belt_type=b) for w, b in pairs]
+        try:
+            table = calculate_batch(params_list, with_transmission=False)
+        except Exception as e:
+            # Không có cận thì vẫn đúng, chỉ chậm hơn
+            print(f"Optimizer: Batch belt stage failed, exact search runs without belt pruning: {e}")
+            return {}
+        # Khi đang đo profile, belt stage phải được tính (và đo) bằng calculate()
+        reuse = self.optimizer.profile is None
+        bounds = {}
+        for i, (pair, params) in enumerate(zip(pairs, params_list)):
+            safety_factor = float(table.safety_factor[i])
+            cost = float(table.cost_capital_total[i])
+            if not (math.isfinite(safety_factor) and math.isfinite(cost)):
+                continue
+            bounds[pair] = (safety_factor, cost)
+            if reuse:
+                result = table.to_result(i)
+                auto_calculated_speed, speed_warnings = speeds[pair[0]][1], speeds[pair[0]][2]
+                self._stages[pair] = (params.replace(V_mps=result.belt_speed_mps), result, None,
+                                      auto_calculated_speed, speed_warnings)
+                self.batch_belt_stages += 1
+        return bounds
+
+    def _belt_pruned(self, safety_factor: float, cost: float) -> bool:
+        if safety_factor < self.sf_threshold:
+            return True
+        return self.budget_limit is not None and cost > self.budget_limit
+
+    def _branch_drives(self, belt_stage: tuple, width: int, belt_type: str, prune: bool) -> List[DesignCandidate]:
+        """Duyệt (hộp số, xích) trên một kết quả băng tải; bỏ các nhánh chắc chắn vượt sai số vận tốc."""
+        params, belt_result, error = belt_stage[0], belt_stage[1], belt_stage[2]
+        if prune and error is not None:
+            # Lỗi tính toán băng tải: mọi thiết kế bên dưới đều không hợp lệ
+            self.pruned_drives += len(self.gearbox_ratios) * len(self.chains)
+            return []
+        candidates = []
+        for gearbox_ratio in self.gearbox_ratios:
+            grid = self._drive_grid(params, belt_result, gearbox_ratio) if prune and belt_result is not None else None
+            over_limit = grid is not None and self._min_velocity_error(grid) > self.settings.max_velocity_error_percent
+            feasible_chains = self._feasible_chains(grid, belt_result) if over_limit else set()
+            for chain in self.chains:
+                if chain in feasible_chains:
+                    self.pruned_drives += 1
+                    continue
+                genes = (width, belt_type, gearbox_ratio, chain)
+                candidate = DesignCandidate(belt_width_mm=width, belt_type_name=belt_type,
+                                            gearbox_ratio=gearbox_ratio, chain_spec_designation=chain)
+                self.optimizer._apply_evaluation(candidate, self.optimizer._drive_stage(belt_stage, genes))
+                self.drive_stage_evaluations += 1
+                candidates.append(candidate)
+        return candidates
+
+    @staticmethod
+    def _drive_grid(params, belt_result, gearbox_ratio: float) -> Optional[TransmissionGrid]:
+        """
+        Lưới truyền động của engine với hộp số cho trước (chế độ Manual, mọi xích), như attach_transmission.
+
+        Returns:
+            TransmissionGrid, hoặc None nếu không dựng được lưới (thiếu tốc độ/puly hoặc không có cặp nhông nào)
+        """
+        pulley_diameter = belt_result.recommended_pulley_diameters_mm.get(_DRIVE_PULLEY_KEY, 500)
+        if not params.V_mps or not pulley_diameter or not gearbox_ratio > 0:
+            return None
+        manual = params.replace(gearbox_ratio_mode="Manual", gearbox_ratio_user=gearbox_ratio)
+        atlas = active_transmission_atlas()
+        if atlas is not None:
+            grid = atlas.grid(manual, ACTIVE_CHAIN_SPECS, pulley_diameter)[0]
+        else:
+            grid = TransmissionGrid(manual, ACTIVE_CHAIN_SPECS, pulley_diameter)
+        return None if grid.empty or grid.cell_g.size == 0 else grid
+
+    @staticmethod
+    def _min_velocity_error(grid: TransmissionGrid) -> float:
+        """Sai số vận tốc (%) nhỏ nhất trên các cặp nhông đạt số răng - không phụ thuộc loại xích."""
+        return float(grid.error[grid.cell_g, grid.cell_z].min())
+
+    @staticmethod
+    def _feasible_chains(grid: TransmissionGrid, belt_result) -> set:
+        """Mã các xích đủ bền với ít nhất một cặp nhông (cùng phép lọc bền của find_optimal_transmission)."""
+        force = grid.required_force(getattr(belt_result, 'required_power_kw', None))
+        columns = np.flatnonzero((~(force > grid.allowable_kN[None, :])).any(axis=0))
+        return {getattr(grid.chains[c], "designation", "") for c in columns}
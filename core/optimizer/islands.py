@@ -0,0 +1,291 @@
+# core/optimizer/islands.py
+"""
+GA mô hình đảo: nhiều quần thể con chạy song song trong các tiến trình riêng.
+
+Mỗi đảo là một Optimizer độc lập (cùng toán tử _tournament_selection/_crossover/_mutate, cùng
+OptimizerSettings) nhưng có tỉ lệ đột biến/lai ghép riêng, trải từ khai thác đến thăm dò. Sau mỗi
+migration_interval thế hệ, mỗi đảo gửi bộ gene của migration_size cá thể tốt nhất sang đảo kế tiếp
+(vòng tròn) qua một hàng đợi; đảo nhận thay các cá thể cuối quần thể bằng các cá thể di cư. Chỉ bộ
+gene được gửi qua hàng đợi, kết quả tính toán chỉ được gửi một lần khi đảo chạy xong.
+
+Kết quả của các đảo được gộp, bỏ trùng và chấm lại fitness trên cùng một tập (chuẩn hóa min/max
+chung) trước khi xếp hạng. Thời điểm di cư phụ thuộc tốc độ của từng tiến trình nên kết quả không
+hoàn toàn tất định như khi chạy một quần thể.
+"""
+import dataclasses
+import multiprocessing
+import queue
+import random
+import sys
+import threading
+from typing import List, NamedTuple
+
+from .models import DesignCandidate, OptimizerSettings
+from .optimizer import Optimizer, _init_worker, _pack_evaluation, _unpack_evaluation
+from .stopping import STOP_CANCELLED, STOP_COMPLETED, STOP_CONVERGED, STOP_LOW_DIVERSITY, STOP_TIME_BUDGET
+from core.specs import ACTIVE_MATERIAL_DB, ACTIVE_BELT_SPECS, ACTIVE_CHAIN_SPECS
+
+# Thông điệp từ các đảo về tiến trình chính
+_MSG_GENERATION = "generation"
+_MSG_DONE = "done"
+
+# Thứ tự ưu tiên khi gộp lý do dừng của các đảo thành Optimizer.stop_reason
+_STOP_PRIORITY = (STOP_CANCELLED, STOP_TIME_BUDGET, STOP_COMPLETED, STOP_CONVERGED, STOP_LOW_DIVERSITY)
+
+# Thời gian chờ mỗi lần đọc hàng đợi thông điệp (giây) - cũng là độ trễ tối đa khi hủy
+_POLL_INTERVAL_S = 0.2
+
+
+class IslandSpec(NamedTuple):
+    """Cấu hình riêng của một đảo."""
+    index: int
+    mutation_rate: float
+    crossover_rate: float
+    seed: int
+
+
+def island_specs(count: int, mutation_rate: float, crossover_rate: float, rng: random.Random) -> List[IslandSpec]:
+    """
+    Tỉ lệ đột biến/lai ghép của từng đảo: đảo đầu khai thác (đột biến thấp, lai ghép cao), đảo cuối thăm dò.
+
+    Args:
+        count: Số đảo
+        mutation_rate: Tỉ lệ đột biến cơ sở
+        crossover_rate: Tỉ lệ lai ghép cơ sở
+        rng: Nguồn seed cho từng đảo
+
+    Returns:
+        List[IslandSpec]
+    """
+    specs = []
+    for i in range(count):
+        t = i / (count - 1) if count > 1 else 0.5
+        mutation = min(0.5, mutation_rate * (0.6 + t))
+        crossover = min(0.95, max(0.5, crossover_rate + 0.1 - 0.25 * t))
+        specs.append(IslandSpec(i, mutation, crossover, rng.getrandbits(32)))
+    return specs
+
+
+def _island_settings(settings: OptimizerSettings) -> OptimizerSettings:
+    """
+    Cài đặt bên trong một đảo: đánh giá tuần tự (song song nằm ở mức đảo), không lồng đảo.
+
+    evaluation_backend="thread" nên đảo không bao giờ mở ProcessPool riêng (tránh mỗi đảo một cây tiến trình).
+    """
+    return dataclasses.replace(settings, islands=0, evaluation_backend="thread", max_workers=1,
+                               share_evaluation_cache=False, objective_mode="weighted")
+
+
+def _drain(inbox) -> list:
+    genes = []
+    while True:
+        try:
+            genes.extend(inbox.get_nowait())
+        except queue.Empty:
+            return genes
+
+
+def run_island(base_params, settings: OptimizerSettings, spec: IslandSpec, generations: int, population_size: int,
+               tournament_size: int, elitism_count: int, inbox, outbox, messages, cancel_event) -> None:
+    """
+    Vòng lặp GA của một đảo (chạy trong tiến trình hoặc luồng riêng).
+
+    Gửi (_MSG_GENERATION, đảo, thế hệ, fitness tốt nhất, độ đa dạng, số cá thể hợp lệ) sau mỗi thế hệ và
+    (_MSG_DONE, đảo, [(gene, kết quả đã nén)], số thế hệ, lý do dừng, cache hits, cache misses) khi xong.
+    """
+    random.seed(spec.seed)
+    optimizer = Optimizer(base_params, _island_settings(settings))
+    optimizer._cancel_event = cancel_event
+    optimizer._start_evaluation_cache()
+    optimizer._start_transmission_atlas()
+    stopping = optimizer._new_stopping()
+    interval = max(0, int(getattr(settings, "migration_interval", 5)))
+    migrants = max(0, int(getattr(settings, "migration_size", 2)))
+    try:
+        elitism_count = optimizer._prepare_run(generations, population_size, elitism_count)
+        optimizer._initialize_population(population_size)
+        for gen in range(generations):
+            immigrants = _drain(inbox)[:max(0, population_size - 1)]
+            if immigrants:
+                optimizer.population[-len(immigrants):] = [optimizer._create_safe_candidate(*genes) for genes in immigrants]
+
+            optimizer._evaluate_population()
+            optimizer.population.sort(key=lambda c: c.fitness_score)
+            valid_population = [c for c in optimizer.population if c.is_valid]
+            if not valid_population:
+                break
+            best_fitness = valid_population[0].fitness_score
+            diversity_score = optimizer._calculate_diversity(valid_population)
+            optimizer.generations_run = gen + 1
+            messages.put((_MSG_GENERATION, spec.index, gen + 1, best_fitness, diversity_score, len(valid_population)))
+            objective = stopping.objective(*optimizer._objective_arrays(valid_population))
+            stop_reason = stopping.observe(objective, diversity_score)
+            if stop_reason is not None:
+                optimizer.stop_reason = stop_reason
+                break
+
+            if interval and migrants and (gen + 1) % interval == 0:
+                outbox.put([optimizer._genes(c) for c in valid_population[:migrants]])
+            optimizer.population = optimizer._next_generation(valid_population, population_size, spec.mutation_rate,
+                                                              tournament_size, elitism_count, spec.crossover_rate,
+                                                              diversity_score)
+        optimizer._evaluate_population()
+    finally:
+        optimizer._stop_transmission_atlas()
+
+    packed = {}
+    for c in optimizer.population:
+        genes = optimizer._genes(c)
+        if c.is_valid and c.calculation_result is not None and genes not in packed:
+            evaluation = (c.calculation_result, c.is_valid, c.invalid_reasons,
+                          getattr(c, "auto_calculated_speed", None), getattr(c, "speed_warnings", None))
+            packed[genes] = _pack_evaluation(evaluation)
+    messages.put((_MSG_DONE, spec.index, list(packed.items()), optimizer.generations_run, optimizer.stop_reason,
+                  optimizer.cache_hits, optimizer.cache_misses))
+
+
+def _island_process(catalogs: tuple, *args) -> None:
+    """Điểm vào của tiến trình đảo: đồng bộ CSDL đang dùng rồi chạy run_island."""
+    base_params, settings, spec = args[0], args[1], args[2]
+    try:
+        _init_worker(base_params, settings, catalogs)
+        run_island(*args)
+    except Exception as e:
+        print(f"Optimizer: Island {spec.index} failed: {e}")
+        args[-2].put((_MSG_DONE, spec.index, [], 0, f"error: {e}", 0, 0))
+
+
+def run_islands(optimizer: Optimizer, count: int, generations: int, population_size: int, mutation_rate: float,
+                tournament_size: int, elitism_count: int, crossover_rate: float,
+                progress_callback=None) -> List[DesignCandidate]:
+    """
+    Chạy count đảo song song và trả về bảng xếp hạng gộp (tối đa 15 thiết kế).
+
+    Dùng tiến trình "spawn"; chạy các đảo bằng luồng khi đang chạy từ bản đóng gói (sys.frozen, chưa kiểm
+    chứng đa tiến trình) hoặc khi không khởi động được tiến trình.
+
+    Args:
+        optimizer: Optimizer của bài toán (nhận kết quả gộp, thống kê cache, best_so_far)
+        count: Số đảo
+        generations, population_size, ...: Như Optimizer.run (population_size là kích thước mỗi đảo)
+        progress_callback: Nhận GenerationStats mỗi khi một đảo xong một thế hệ (giá trị mới nhất của mọi đảo)
+
+    Returns:
+        List[DesignCandidate] theo fitness tăng dần
+    """
+    specs = island_specs(count, mutation_rate, crossover_rate, random.Random(random.getrandbits(64)))
+    catalogs = (dict(ACTIVE_MATERIAL_DB), dict(ACTIVE_BELT_SPECS), list(ACTIVE_CHAIN_SPECS))
+    # Giữ tham chiếu tới các hàng đợi đến hết lần chạy (tiến trình con mở lại chúng khi khởi động)
+    workers, inboxes, messages, cancel_event = _start_islands(optimizer, specs, catalogs, generations,
+                                                              population_size, tournament_size, elitism_count)
+    print(f"Optimizer: Running {count} islands x {population_size} candidates "
+          f"(migration every {getattr(optimizer.settings, 'migration_interval', 5)} generations)")
+
+    stopping = optimizer._new_stopping()
+    optimizer.cache_hits = optimizer.cache_misses = 0
+    latest = {}
+    finished = {}
+    while len(finished) < count:
+        if optimizer._cancel_event.is_set():
+            cancel_event.set()
+        try:
+            message = messages.get(timeout=_POLL_INTERVAL_S)
+        except queue.Empty:
+            if not any(w.is_alive() for w in workers):
+                print("Optimizer: Warning: island workers exited without reporting results")
+                break
+            continue
+        if message[0] == _MSG_GENERATION:
+            _, index, generation, best_fitness, diversity, valid_count = message
+            latest[index] = (best_fitness, diversity, valid_count)
+            optimizer.generations_run = max(optimizer.generations_run, generation)
+            if progress_callback is not None:
+                bests, diversities, valid_counts = zip(*latest.values())
+                optimizer._report_progress(progress_callback, generation - 1, generations, min(bests),
+                                           sum(bests) / len(bests), sum(diversities) / len(diversities),
+                                           sum(valid_counts), stopping)
+        else:
+            _, index, packed, generations_run, stop_reason, hits, misses = message
+            finished[index] = (packed, stop_reason)
+            optimizer.cache_hits += hits
+            optimizer.cache_misses += misses
+    for w in workers:
+        w.join(timeout=5)
+
+    reasons = {reason for _, reason in finished.values()}
+    optimizer.stop_reason = next((r for r in _STOP_PRIORITY if r in reasons), STOP_COMPLETED)
+    results = _merge(optimizer, [item for packed, _ in finished.values() for item in packed])
+    optimizer.best_so_far = results
+    print(f"Optimizer: Islands merged into {len(results)} ranked solutions "
+          f"(evaluation cache - hits: {optimizer.cache_hits}, misses: {optimizer.cache_misses})")
+    return results
+
+
+def _start_islands(optimizer: Optimizer, specs: List[IslandSpec], catalogs: tuple, generations: int,
+                   population_size: int, tournament_size: int, elitism_count: int) -> tuple:
+    """Khởi động các đảo (tiến trình, hoặc luồng khi chạy đóng gói/không tạo được tiến trình)."""
+    count = len(specs)
+    workers = []
+    if getattr(sys, "frozen", False):
+        return _start_island_threads(optimizer, specs, generations, population_size, tournament_size, elitism_count)
+    try:
+        ctx = multiprocessing.get_context("spawn")
+        inboxes = [ctx.Queue() for _ in range(count)]
+        messages = ctx.Queue()
+        cancel_event = ctx.Event()
+        for spec in specs:
+            args = (optimizer.base_params, optimizer.settings, spec, generations, population_size, tournament_size,
+                    elitism_count, inboxes[spec.index], inboxes[(spec.index + 1) % count], messages, cancel_event)
+            worker = ctx.Process(target=_island_process, args=(catalogs,) + args, daemon=True)
+            worker.start()
+            workers.append(worker)
+        return workers, inboxes, messages, cancel_event
+    except Exception as e:
+        print(f"Optimizer: Warning: Không khởi động được tiến trình đảo ({e}), chạy các đảo bằng luồng")
+        for worker in workers:
+            worker.terminate()
+    return _start_island_threads(optimizer, specs, generations, population_size, tournament_size, elitism_count)
+
+
+def _start_island_threads(optimizer: Optimizer, specs: List[IslandSpec], generations: int, population_size: int,
+                          tournament_size: int, elitism_count: int) -> tuple:
+    count = len(specs)
+    inboxes = [queue.Queue() for _ in range(count)]
+    messages = queue.Queue()
+    cancel_event = threading.Event()
+    workers = []
+    for spec in specs:
+        args = (optimizer.base_params, optimizer.settings, spec, generations, population_size, tournament_size,
+                elitism_count, inboxes[spec.index], inboxes[(spec.index + 1) % count], messages, cancel_event)
+        worker = threading.Thread(target=_island_thread, args=args, daemon=True)
+        worker.start()
+        workers.append(worker)
+    return workers, inboxes, messages, cancel_event
+
+
+def _island_thread(*args) -> None:
+    spec = args[2]
+    try:
+        run_island(*args)
+    except Exception as e:
+        print(f"Optimizer: Island {spec.index} failed: {e}")
+        args[-2].put((_MSG_DONE, spec.index, [], 0, f"error: {e}", 0, 0))
+
+
+def _merge(optimizer: Optimizer, packed_items: list) -> List[DesignCandidate]:
+    """Gộp kết quả các đảo, bỏ trùng theo bộ gene và chấm lại fitness trên toàn tập."""
+    candidates = {}
+    for genes, packed in packed_items:
+        if genes in candidates:
+            continue
+        candidate = DesignCandidate(*genes)
+        optimizer._apply_evaluation(candidate, _unpack_evaluation(packed))
+        # Các đảo chỉ gửi thiết kế hợp lệ (kể cả hợp lệ nhờ làm mềm ràng buộc)
+        candidate.is_valid = True
+        candidates[genes] = candidate
+    merged = list(candidates.values())
+    if not merged:
+        return []
+    optimizer._assign_fitness(merged)
+    merged.sort(key=lambda c: c.fitness_score)
+    return merged[:15]
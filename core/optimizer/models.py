@@ -15,7 +15,11 @@ class DesignCandidate:
     is_valid: bool = False # Thiết kế có hợp lệ không (ví dụ: có tìm được bộ truyền động không)
     fitness_score: float = float('inf') # Điểm E, càng thấp càng tốt
     calculation_result: CalculationResult | None = None # Kết quả chi tiết từ core.engine
-    invalid_reasons: list = field(default_factory=list) # Danh sách lý do không hợp lệ
+    invalid_reasons: list = field(default_factory=list) # Danh sách lý do không hợp lệ (core.diagnostics.Diagnostic)
+
+    # --- Chế độ Pareto (NSGA-II, xem core/optimizer/pareto.py) ---
+    pareto_rank: int | None = None # Bậc không trội (0 = mặt Pareto), None nếu chưa xếp
+    crowding_distance: float = 0.0 # Khoảng cách đám đông trong mặt của cá thể
 
 @dataclass
 class OptimizerSettings:
@@ -28,4 +32,42 @@ class OptimizerSettings:
     # --- Ràng buộc (ví dụ) ---
     max_budget_usd: float | None = None # Chi phí đầu tư tối đa
     min_belt_safety_factor: float = 8.0 # Hệ số an toàn băng tối thiểu
-    max_velocity_error_percent: float = 10.0 # Sai số vận tốc tối đa chấp nhận được (%)
\ No newline at end of file
+    max_velocity_error_percent: float = 10.0 # Sai số vận tốc tối đa chấp nhận được (%)
+
+    # --- Thực thi ---
+    objective_mode: str = "weighted" # "weighted" (một điểm fitness có trọng số) hoặc "pareto" (NSGA-II, trả về mặt Pareto)
+    population_encoding: str = "objects" # "objects" (DesignCandidate) hoặc "matrix" (ma trận chỉ số NumPy, xem core/optimizer/population.py)
+    evaluation_mode: str = "full" # "full" (calculate() cho từng cá thể) hoặc "decomposed" (băng tải × truyền động)
+    evaluation_backend: str = "thread" # "thread" (mặc định, như trước) hoặc "process" (đa tiến trình, giao diện bật khi không chạy từ bản đóng gói)
+    max_workers: int | None = None # Số worker đánh giá (None = tự động theo số CPU, tối đa 16)
+    cache_evaluations: bool = True # Cache kết quả đánh giá theo bộ gene trong một lần chạy
+    share_evaluation_cache: bool = False # Dùng chung cache giữa các lần chạy (cùng bài toán)
+    profile_evaluations: bool = False # Đo thời gian từng giai đoạn của engine, cộng dồn vào Optimizer.profile
+    use_transmission_atlas: bool = False # Dùng lại lưới truyền động theo (vận tốc, puly, hộp số, xích) giữa các lần đánh giá (kết quả không đổi)
+
+    # --- Mô hình đảo (xem core/optimizer/islands.py) ---
+    islands: int = 0 # Số quần thể con chạy song song trong các tiến trình riêng (<= 1 = một quần thể)
+    migration_interval: int = 5 # Số thế hệ giữa hai lần di cư (0 = không di cư)
+    migration_size: int = 2 # Số cá thể tốt nhất mỗi đảo gửi sang đảo kế tiếp mỗi lần di cư
+
+    # --- Dừng sớm (xem core/optimizer/stopping.py) ---
+    early_stopping: bool = False # Dừng khi đã hội tụ (giá trị tốt nhất đứng yên hoặc quần thể mất đa dạng); mặc định chạy đủ số thế hệ
+    stagnation_generations: int = 15 # Số thế hệ liên tiếp không cải thiện thì coi là hội tụ
+    min_relative_improvement: float = 1e-3 # Cải thiện tương đối tối thiểu để tính là tiến bộ
+    min_diversity: float = 0.05 # Ngưỡng đa dạng dưới đó quần thể được coi là đã co cụm
+    time_budget_s: float | None = None # Ngân sách thời gian (giây) cho một lần chạy, None = không giới hạn
+
+
+@dataclass(frozen=True)
+class GenerationStats:
+    """Thống kê một thế hệ, gửi cho progress_callback của Optimizer.run/run_pareto."""
+    generation: int # Thế hệ vừa đánh giá xong (đếm từ 1)
+    generations: int # Số thế hệ tối đa của lần chạy
+    best_fitness: float # Fitness tốt nhất (chế độ Pareto: fitness theo trọng số của cá thể đứng đầu mặt)
+    avg_fitness: float # Fitness trung bình của các cá thể hợp lệ
+    diversity: float # Độ đa dạng của quần thể hợp lệ (0-1)
+    valid_candidates: int # Số cá thể hợp lệ
+    evaluations: int # Số bộ gene đã thật sự chạy engine từ đầu lần chạy
+    cache_hits: int # Số lần lấy kết quả từ cache
+    elapsed_s: float # Thời gian từ lúc bắt đầu lần chạy (giây)
+    top: tuple = () # Các thiết kế tốt nhất hiện tại (tối đa 5, bản sao)
@@ -2,22 +2,41 @@
 import random
 import copy
 import math
-import sys # Added for flushing print statements
 import os
 import logging
-from concurrent.futures import ThreadPoolExecutor
-from typing import List, Tuple
+import hashlib
+import multiprocessing
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import fields, astuple
+from typing import Callable, List, Optional, Tuple
 
-from .models import DesignCandidate, OptimizerSettings
+import numpy as np
+
+from .models import DesignCandidate, GenerationStats, OptimizerSettings
+from .stopping import EarlyStopping, STOP_COMPLETED
 from core.models import ConveyorParameters, CalculationResult
-from core.engine import calculate
+from core.diagnostics import DiagCode, Diagnostic, Severity, severity_of
+from core.engine import calculate, attach_transmission
 from core.specs import (
     STANDARD_WIDTHS, 
     ACTIVE_BELT_SPECS, 
     STANDARD_GEARBOX_RATIOS, 
     ACTIVE_CHAIN_SPECS,
+    ACTIVE_MATERIAL_DB,
     MATERIAL_DB
 )
+from core.lookup_tables import LookupTable
+from core.tracing import get_tracer
+from core.profiling import CalculationProfile, profile_calculation
+from core.transmission_atlas import active_transmission_atlas, enable_transmission_atlas, disable_transmission_atlas
+
+# Bảng tra bề rộng chuẩn (tra bề rộng gần nhất)
+_STANDARD_WIDTH_TABLE = LookupTable(STANDARD_WIDTHS, STANDARD_WIDTHS)
+
+# Truy vết chi tiết (tắt mặc định, xem core/tracing.py)
+_trace = get_tracer(__name__)
 
 # Cải thiện BƯỚC 6: Thiết lập logging
 logger = logging.getLogger(__name__)
@@ -28,52 +47,755 @@ if not logger.handlers:
     logger.addHandler(handler)
     logger.setLevel(logging.INFO)
 
+# --- [BẮT ĐẦU NÂNG CẤP ĐÁNH GIÁ ĐA TIẾN TRÌNH] ---
+# Mọi trường của CalculationResult trừ cache biểu đồ (biểu đồ được dựng lười ở tiến trình nhận)
+_PACKED_RESULT_FIELDS = tuple(f.name for f in fields(CalculationResult) if f.name != "_profile_cache")
+
+# Trạng thái của tiến trình worker (được gán một lần bởi _init_worker)
+_WORKER_STATE = {}
+
+
+def evaluate_design(base_params: ConveyorParameters, settings: OptimizerSettings, genes: tuple):
+    """
+    Chạy core.engine.calculate và kiểm tra tính hợp lệ cho một bộ gene.
+
+    Hàm ở mức module (không phụ thuộc Optimizer) để dùng được cho cả ThreadPool và ProcessPool.
+
+    Args:
+        base_params: Tham số gốc của bài toán
+        settings: Cài đặt tối ưu hóa
+        genes: (belt_width_mm, belt_type_name, gearbox_ratio, chain_spec_designation)
+
+    Returns:
+        tuple: (calculation_result, is_valid, invalid_reasons, auto_calculated_speed, speed_warnings)
+    """
+    candidate_label = _candidate_label(genes)
+    params, auto_calculated_speed, speed_warnings = _design_params(base_params, genes)
+
+    try:
+        _trace.debug("evaluate_design", lambda: f"Evaluating candidate {candidate_label}")
+        result = calculate(params, profile=getattr(settings, "profile_evaluations", False))
+        _trace.debug("evaluate_design", lambda: f"Calculation completed for {candidate_label}")
+        is_valid, invalid_reasons = _check_design(result, settings, speed_warnings, candidate_label)
+        return result, is_valid, invalid_reasons, auto_calculated_speed, speed_warnings
+
+    except Exception as e:
+        # Nếu có lỗi trong quá trình tính toán, coi như không hợp lệ
+        _trace.error("evaluate_design", lambda: f"Calculation failed for {candidate_label}: {e}")
+        return _failed_evaluation(e, auto_calculated_speed, speed_warnings)
+
+
+def _candidate_label(genes: tuple) -> str:
+    belt_width_mm, belt_type_name, gearbox_ratio, chain_spec_designation = genes
+    return f"DesignCandidate(belt_width_mm={belt_width_mm}, belt_type_name={belt_type_name!r}, gearbox_ratio={gearbox_ratio}, chain_spec_designation={chain_spec_designation!r})"
+
+
+def _failed_evaluation(error: Exception, auto_calculated_speed, speed_warnings) -> tuple:
+    reason = Diagnostic(DiagCode.CALCULATION_ERROR, (str(error),))
+    result = CalculationResult(diagnostics=[reason])
+    return result, False, [reason], auto_calculated_speed, speed_warnings
+
+
+def _design_params(base_params: ConveyorParameters, genes: tuple):
+    """
+    Dựng ConveyorParameters cho một bộ gene (tốc độ băng tính theo chính bề rộng của gene).
+
+    Returns:
+        tuple: (params, auto_calculated_speed, speed_warnings)
+    """
+    belt_width_mm, belt_type_name, gearbox_ratio, chain_spec_designation = genes
+    candidate_label = _candidate_label(genes)
+    auto_calculated_speed = None
+    speed_warnings = None
+
+    # Bước 1: Tính tốc độ theo CHÍNH bề rộng của candidate
+    from core.optimize import calculate_belt_speed
+    
+    try:
+        # Lấy thông số từ base_params
+        capacity_tph = base_params.Qt_tph
+        density_tpm3 = base_params.density_tpm3
+        particle_mm = base_params.particle_size_mm
+        material_name = base_params.material
+        trough_angle_deg = 20.0  # Default, có thể cải thiện sau
+        surcharge_angle_deg = getattr(base_params, 'surcharge_angle_deg', 20.0) or 20.0
+        
+        # Cải thiện: Luôn lấy material_characteristics từ base_params
+        material_characteristics = {
+            'is_abrasive': getattr(base_params, 'is_abrasive', True),
+            'is_corrosive': getattr(base_params, 'is_corrosive', False),
+            'is_dusty': getattr(base_params, 'is_dusty', True)
+        }
+        
+        # Tối ưu/tính tốc độ theo CHÍNH bề rộng của candidate
+        v_final, v_req, v_rec, area_m2, speed_warnings, max_speed_allowed = calculate_belt_speed(
+            capacity_tph=capacity_tph,
+            density_tpm3=density_tpm3,
+            belt_width_mm=belt_width_mm,
+            particle_mm=particle_mm,
+            material_name=material_name,
+            trough_angle_deg=trough_angle_deg,
+            surcharge_angle_deg=surcharge_angle_deg,
+            material_characteristics=material_characteristics,  # Truyền material_characteristics
+            coded=True
+        )
+        
+        # Sử dụng bề rộng từ candidate và tốc độ được tính cho chính bề rộng đó
+        # Bản sao nông qua params.replace (engine không thay đổi tham số nên không cần deepcopy)
+        params = base_params.replace(
+            B_mm=belt_width_mm,  # Giữ nguyên bề rộng từ candidate
+            V_mps=v_final,  # Sử dụng tốc độ được tính cho chính bề rộng này
+            belt_type=belt_type_name,
+            # Chế độ manual để sử dụng gearbox_ratio của candidate
+            gearbox_ratio_mode="manual",
+            gearbox_ratio_user=gearbox_ratio,
+            # Truyền gene xích vào engine
+            chain_selection_mode="manual",
+            chain_spec_designation=chain_spec_designation,
+        )
+        
+        # Thông tin tốc độ sẽ được gán vào candidate để debug
+        auto_calculated_speed = v_final
+        
+    except Exception as e:
+        _trace.error("design_params", lambda: f"Failed to calculate auto speed for {candidate_label}: {e}")
+        # Fallback: sử dụng tham số gốc với tốc độ an toàn
+        params = base_params.replace(
+            B_mm=belt_width_mm,
+            V_mps=2.0,  # Tốc độ mặc định an toàn (đã được cải thiện từ 5.0 m/s)
+            belt_type=belt_type_name,
+            gearbox_ratio_mode="manual",
+            gearbox_ratio_user=gearbox_ratio,
+            chain_selection_mode="manual",
+            chain_spec_designation=chain_spec_designation,
+        )
+
+    return params, auto_calculated_speed, speed_warnings
+
+
+def _has_transmission(result: CalculationResult) -> bool:
+    """calculate() gán TransmissionSolution() rỗng khi không tìm được bộ truyền động."""
+    ts = getattr(result, 'transmission_solution', None)
+    return ts is not None and getattr(ts, 'drive_sprocket_teeth', 0) > 0
+
+
+# Cảnh báo của engine bị phạt trong fitness: vượt năng lực/bị khống chế bởi tiết diện
+_PENALIZED_RESULT_CODES = frozenset({DiagCode.CAPACITY_EXCEEDED, DiagCode.CAPACITY_LIMITED_BY_SECTION})
+
+# Mức phạt fitness theo mã lý do; cảnh báo engine/tốc độ bị gom vào lý do được phạt theo mức độ
+_REASON_PENALTIES = {
+    DiagCode.NO_TRANSMISSION: 0.5,
+    DiagCode.SF_BELOW_THRESHOLD: 0.6,
+    DiagCode.COST_TOO_HIGH: 0.2,
+    DiagCode.VELOCITY_ERROR_TOO_HIGH: 0.0,  # đã loại bỏ (is_valid=False), không phạt thêm
+    DiagCode.VELOCITY_ERROR_HIGH: 0.3,
+    DiagCode.CALCULATION_ERROR: 0.0,
+}
+_SEVERITY_PENALTIES = {Severity.CRITICAL: 0.4, Severity.WARNING: 0.3}
+_PENALTY_BY_CODE = {
+    code: _REASON_PENALTIES.get(code, _SEVERITY_PENALTIES.get(severity_of(code), 0.0)) for code in DiagCode
+}
+
+
+def _check_design(result: CalculationResult, settings: OptimizerSettings, speed_warnings, candidate_label: str):
+    """
+    Kiểm tra tính hợp lệ của kết quả tính toán theo ràng buộc của OptimizerSettings.
+
+    Returns:
+        tuple: (is_valid, invalid_reasons) với invalid_reasons là danh sách Diagnostic
+    """
+    # Kiểm tra tính hợp lệ - Làm mềm hơn để tìm được giải pháp
+    is_valid = True
+    invalid_reasons = []
+    
+    # Kiểm tra transmission_solution - Chỉ cảnh báo, không loại bỏ
+    if not _has_transmission(result):
+        _trace.warning("check_design", lambda: f"{candidate_label} - No transmission solution (will be penalized but not rejected)")
+        invalid_reasons.append(Diagnostic(DiagCode.NO_TRANSMISSION))
+        # Không set is_valid = False, chỉ penalize trong fitness
+    
+    # Kiểm tra safety_factor - Chỉ loại bỏ nếu quá thấp
+    safety_val = getattr(result, 'safety_factor', 0)
+    # Ngưỡng an toàn cứng: không bao giờ chấp nhận safety_factor < 4.0
+    hard_safety_threshold = 4.0
+    sf_threshold = max(hard_safety_threshold, float(settings.min_belt_safety_factor))
+    if safety_val < sf_threshold:
+        _trace.debug("check_design.invalid", lambda: f"{candidate_label} - Safety factor {safety_val} < {sf_threshold} (below hard threshold {hard_safety_threshold})")
+        is_valid = False
+        invalid_reasons.append(Diagnostic(DiagCode.SF_BELOW_THRESHOLD, (safety_val, sf_threshold, hard_safety_threshold)))
+    
+    # Kiểm tra budget - Chỉ loại bỏ nếu vượt quá nhiều
+    if settings.max_budget_usd:
+        cost_val = getattr(result, 'cost_capital_total', float('inf'))
+        if cost_val > settings.max_budget_usd * 1.5:  # Cho phép vượt 50%
+            _trace.debug("check_design.invalid", lambda: f"{candidate_label} - Cost {cost_val} > {settings.max_budget_usd * 1.5}")
+            is_valid = False
+            invalid_reasons.append(Diagnostic(DiagCode.COST_TOO_HIGH, (cost_val,)))
+    
+    # Kiểm tra sai số vận tốc - Cải tiến mới
+    if _has_transmission(result):
+        vel_err = getattr(result.transmission_solution, "velocity_error_percent", 0.0)
+        if vel_err > settings.max_velocity_error_percent:
+            _trace.debug("check_design.invalid", lambda: f"{candidate_label} - Velocity error {vel_err:.2f}% > {settings.max_velocity_error_percent}% (above threshold)")
+            is_valid = False
+            invalid_reasons.append(Diagnostic(DiagCode.VELOCITY_ERROR_TOO_HIGH, (vel_err, settings.max_velocity_error_percent)))
+        elif vel_err > 5.0:  # Cảnh báo nếu > 5% (ngưỡng cảnh báo cố định)
+            _trace.warning("check_design", lambda: f"{candidate_label} - Velocity error {vel_err:.2f}% above warning threshold 5%")
+            invalid_reasons.append(Diagnostic(DiagCode.VELOCITY_ERROR_HIGH, (vel_err,)))
+        
+        # Log sai số vận tốc để theo dõi
+        _trace.debug("check_design", lambda: f"{candidate_label} - Velocity error: {vel_err:.2f}%")
+    
+    # Kiểm tra các cảnh báo quan trọng - Chỉ cảnh báo
+    for diagnostic in result.diagnostics:
+        if diagnostic.code in _PENALIZED_RESULT_CODES:
+            _trace.warning("check_design", lambda: f"{candidate_label} - Warning: {diagnostic} (will be penalized)")
+            invalid_reasons.append(diagnostic)
+            # Không set is_valid = False, chỉ penalize
+    
+    # Gom speed_warnings vào invalid_reasons để bị phạt trong fitness
+    if speed_warnings:
+        invalid_reasons.extend(speed_warnings)
+    
+    _trace.debug("check_design", lambda: f"Candidate {candidate_label} - Valid: {is_valid}, Reasons: {[str(r) for r in invalid_reasons] if invalid_reasons else 'None'}")
+    return is_valid, invalid_reasons
+
+
+# --- [BẮT ĐẦU NÂNG CẤP TỐI ƯU PHÂN RÃ] ---
+def evaluate_belt_stage(base_params: ConveyorParameters, belt_width_mm: int, belt_type_name: str,
+                        profile: bool = False) -> tuple:
+    """
+    Bài toán con băng tải: chạy engine (không tìm bộ truyền động) cho một cặp (bề rộng, loại băng).
+
+    Phần băng tải/độ bền/công suất chỉ phụ thuộc bề rộng và loại băng nên được tính một lần
+    và dùng lại cho mọi tổ hợp (hộp số, xích).
+
+    Args:
+        profile: Gắn thời gian từng giai đoạn vào result.profile (xem core/profiling.py)
+
+    Returns:
+        tuple: (params, result, error, auto_calculated_speed, speed_warnings)
+    """
+    params, auto_calculated_speed, speed_warnings = _design_params(base_params, (belt_width_mm, belt_type_name, 0.0, ""))
+    try:
+        result = calculate(params, with_transmission=False, profile=profile)
+        # Engine không ghi ngược vào params: bộ truyền động dùng tốc độ băng đã chốt trong kết quả
+        return params.replace(V_mps=result.belt_speed_mps), result, None, auto_calculated_speed, speed_warnings
+    except Exception as e:
+        _trace.error("evaluate_belt_stage", lambda: f"Belt stage failed for {belt_width_mm}mm / {belt_type_name}: {e}")
+        return params, None, e, auto_calculated_speed, speed_warnings
+
+
+def evaluate_drive_stage(belt_stage: tuple, settings: OptimizerSettings, genes: tuple) -> tuple:
+    """
+    Bài toán con truyền động: tìm bộ truyền động cho (hộp số, xích) của gene trên kết quả băng tải đã có.
+
+    Kết quả giống evaluate_design cho cùng bộ gene.
+
+    Returns:
+        tuple: (calculation_result, is_valid, invalid_reasons, auto_calculated_speed, speed_warnings)
+    """
+    params, belt_result, error, auto_calculated_speed, speed_warnings = belt_stage
+    candidate_label = _candidate_label(genes)
+    if error is not None:
+        return _failed_evaluation(error, auto_calculated_speed, speed_warnings)
+    _, _, gearbox_ratio, chain_spec_designation = genes
+    try:
+        drive_params = params.replace(gearbox_ratio_user=gearbox_ratio, chain_spec_designation=chain_spec_designation)
+        # Bản sao nông: chỉ transmission_solution/gearbox_* được gán mới
+        result = copy.copy(belt_result)
+        attach_transmission(result, drive_params)
+        is_valid, invalid_reasons = _check_design(result, settings, speed_warnings, candidate_label)
+        return result, is_valid, invalid_reasons, auto_calculated_speed, speed_warnings
+    except Exception as e:
+        _trace.error("evaluate_drive_stage", lambda: f"Drive stage failed for {candidate_label}: {e}")
+        return _failed_evaluation(e, auto_calculated_speed, speed_warnings)
+# --- [KẾT THÚC NÂNG CẤP TỐI ƯU PHÂN RÃ] ---
+
+
+def _init_worker(base_params: ConveyorParameters, settings: OptimizerSettings, catalogs: tuple):
+    """Khởi tạo tiến trình worker: lưu bài toán và đồng bộ CSDL đang dùng (ACTIVE_*) từ tiến trình chính."""
+    from core import specs
+    material_db, belt_specs, chain_specs = catalogs
+    specs.ACTIVE_MATERIAL_DB.clear()
+    specs.ACTIVE_MATERIAL_DB.update(material_db)
+    specs.ACTIVE_BELT_SPECS.clear()
+    specs.ACTIVE_BELT_SPECS.update(belt_specs)
+    specs.ACTIVE_CHAIN_SPECS[:] = chain_specs
+    specs.bump_catalog_version()
+    if getattr(settings, "use_transmission_atlas", False):
+        enable_transmission_atlas()
+    _WORKER_STATE["base_params"] = base_params
+    _WORKER_STATE["settings"] = settings
+
+
+def _evaluate_genes_in_worker(genes: tuple) -> tuple:
+    """Hàm chạy trong tiến trình worker: nhận gene, trả về kết quả đã nén."""
+    evaluation = evaluate_design(_WORKER_STATE["base_params"], _WORKER_STATE["settings"], genes)
+    return _pack_evaluation(evaluation)
+
+
+def _pack_evaluation(evaluation: tuple) -> tuple:
+    """Nén kết quả đánh giá thành tuple giá trị các trường để truyền giữa tiến trình."""
+    result, is_valid, invalid_reasons, auto_calculated_speed, speed_warnings = evaluation
+    values = tuple(getattr(result, name) for name in _PACKED_RESULT_FIELDS)
+    return values, is_valid, invalid_reasons, auto_calculated_speed, speed_warnings
+
+
+def _unpack_evaluation(packed: tuple) -> tuple:
+    """Giải nén kết quả từ _pack_evaluation (biểu đồ lực căng dựng lại khi cần từ các trường vô hướng)."""
+    values, is_valid, invalid_reasons, auto_calculated_speed, speed_warnings = packed
+    result = CalculationResult(**dict(zip(_PACKED_RESULT_FIELDS, values)))
+    return result, is_valid, invalid_reasons, auto_calculated_speed, speed_warnings
+# --- [KẾT THÚC NÂNG CẤP ĐÁNH GIÁ ĐA TIẾN TRÌNH] ---
+
+# --- [BẮT ĐẦU NÂNG CẤP CACHE ĐÁNH GIÁ] ---
+class EvaluationCache:
+    """
+    Cache kết quả evaluate_design theo (fingerprint bài toán, bộ gene).
+
+    Kết quả được lưu và trả về nguyên đối tượng (không deepcopy); các cá thể có cùng
+    bộ gene dùng chung một CalculationResult.
+    """
+
+    def __init__(self):
+        self._store = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, fingerprint: str, genes: tuple):
+        evaluation = self._store.get((fingerprint, genes))
+        if evaluation is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return evaluation
+
+    def put(self, fingerprint: str, genes: tuple, evaluation: tuple):
+        self._store[(fingerprint, genes)] = evaluation
+
+    def clear(self):
+        self._store.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+
+# Cache dùng chung giữa các lần chạy (khi OptimizerSettings.share_evaluation_cache = True)
+SHARED_EVALUATION_CACHE = EvaluationCache()
+
+
+def problem_fingerprint(base_params: ConveyorParameters, settings: OptimizerSettings) -> str:
+    """Dấu vân tay của bài toán: tham số gốc, ràng buộc hợp lệ và CSDL đang dùng."""
+    payload = repr((
+        astuple(base_params),
+        settings.min_belt_safety_factor,
+        settings.max_budget_usd,
+        settings.max_velocity_error_percent,
+        sorted(ACTIVE_MATERIAL_DB.items()),
+        sorted(ACTIVE_BELT_SPECS.items()),
+        ACTIVE_CHAIN_SPECS,
+    ))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+# --- [KẾT THÚC NÂNG CẤP CACHE ĐÁNH GIÁ] ---
+
+
 class Optimizer:
     def __init__(self, base_params: ConveyorParameters, settings: OptimizerSettings):
         self.base_params = base_params
         self.settings = settings
         self.population: List[DesignCandidate] = []
+        self._process_pool = None
+        self._process_workers = 0
+        self._cache = None
+        self._fingerprint = ""
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._belt_stages = {}
+        self.drive_stage_evaluations = 0
+        # Profile cộng dồn của mọi lần đánh giá thật sự chạy engine (None khi không đo)
+        self.profile = None
+        self._owns_transmission_atlas = False
+        # Mặt Pareto của lần chạy run_pareto gần nhất
+        self.pareto_front = None
+        # Dừng sớm/hủy: kết quả tốt nhất hiện có luôn đọc được qua best_so_far (kể cả từ luồng khác)
+        self._cancel_event = threading.Event()
+        self.stop_reason = None
+        self.generations_run = 0
+        self.best_so_far: List[DesignCandidate] = []
+
+    def cancel(self):
+        """Yêu cầu dừng lần chạy hiện tại sau thế hệ đang đánh giá (an toàn khi gọi từ luồng khác)."""
+        self._cancel_event.set()
+
+    def _new_stopping(self) -> EarlyStopping:
+        self.stop_reason = STOP_COMPLETED
+        self.generations_run = 0
+        self.best_so_far = []
+        return EarlyStopping(self.settings, self._cancel_event)
 
-    def run(self, generations: int = 50, population_size: int = 100, mutation_rate: float = 0.1, tournament_size: int = 5, elitism_count: int = 10, crossover_rate: float = 0.8) -> List[DesignCandidate]:
-        """Chạy toàn bộ quá trình tối ưu hóa GA."""
+    def _report_progress(self, progress_callback, gen: int, generations: int, best_fitness: float, avg_fitness: float,
+                         diversity: float, valid_count: int, stopping: EarlyStopping):
+        """Gửi GenerationStats của thế hệ vừa xong; lỗi trong callback không làm dừng lần chạy."""
+        stats = GenerationStats(
+            generation=gen + 1,
+            generations=generations,
+            best_fitness=best_fitness,
+            avg_fitness=avg_fitness,
+            diversity=diversity,
+            valid_candidates=valid_count,
+            evaluations=self.cache_misses,
+            cache_hits=self.cache_hits,
+            elapsed_s=stopping.elapsed_s,
+            top=tuple(self.best_so_far[:5]),
+        )
         try:
-            # Kiểm tra file CSV bảng tra tốc độ trước khi chạy GA
-            csv_path = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'hidden', 'Bang tra toc do bang tai.csv')
-            if not os.path.exists(csv_path):
-                print(f"Warning: Không tìm thấy file bảng tra tốc độ: {csv_path}")
-                print("GA sẽ chạy với giá trị fallback an toàn (2.0 m/s)")
-                print("Điều này có thể ảnh hưởng đến độ chính xác của tối ưu hóa")
-            
-            # Cải thiện BƯỚC 5: Điều chỉnh elitism_count dựa trên số generations và population_size
-            if elitism_count <= 0:
-                # Tính toán elitism_count dựa trên số generations và population_size
-                if population_size >= 120:
-                    # Dân số lớn: elitism cao hơn
-                    if generations <= 30:
-                        elitism_count = max(10, population_size // 12)
-                    elif generations <= 50:
-                        elitism_count = max(15, population_size // 10)
-                    else:
-                        elitism_count = max(20, population_size // 8)
-                elif population_size >= 80:
-                    # Dân số trung bình
-                    if generations <= 30:
-                        elitism_count = max(8, population_size // 15)
-                    elif generations <= 50:
-                        elitism_count = max(12, population_size // 12)
-                    else:
-                        elitism_count = max(15, population_size // 10)
+            progress_callback(stats)
+        except Exception as e:
+            print(f"Optimizer: Warning: progress_callback failed ({e})")
+
+    def _stop(self, reason: str, gen: int):
+        self.stop_reason = reason
+        print(f"Optimizer: Stopping after generation {gen + 1} ({reason})")
+
+    def run(self, generations: int = 50, population_size: int = 100, mutation_rate: float = 0.1, tournament_size: int = 5, elitism_count: int = 10, crossover_rate: float = 0.8,
+            progress_callback: Optional[Callable[[GenerationStats], None]] = None) -> List[DesignCandidate]:
+        """
+        Chạy toàn bộ quá trình tối ưu hóa GA.
+
+        progress_callback (nếu có) được gọi trên luồng đang chạy sau mỗi thế hệ với GenerationStats.
+        """
+        if getattr(self.settings, "objective_mode", "weighted") == "pareto":
+            # Mặt Pareto xếp theo trọng số hiện tại (giữ nguyên kiểu trả về cho OptimizerWorker)
+            return self.run_pareto(generations, population_size, mutation_rate, crossover_rate, progress_callback).ranked(self.settings)
+        if getattr(self.settings, "islands", 0) > 1:
+            return self.run_islands(generations, population_size, mutation_rate, tournament_size, elitism_count, crossover_rate, progress_callback)
+        self._start_evaluation_cache()
+        self._start_transmission_atlas()
+        # Worker được khởi động một lần cho cả lần chạy và dùng lại qua các thế hệ
+        self._start_worker_pool()
+        try:
+            if getattr(self.settings, "population_encoding", "objects") == "matrix":
+                return self._run_matrix_generations(generations, population_size, mutation_rate, tournament_size, elitism_count, crossover_rate, progress_callback)
+            return self._run_generations(generations, population_size, mutation_rate, tournament_size, elitism_count, crossover_rate, progress_callback)
+        finally:
+            self._cancel_event.clear()
+            self._shutdown_worker_pool()
+            self._stop_transmission_atlas()
+            self._report_cache_stats()
+            self._report_profile()
+
+    # --- [BẮT ĐẦU NÂNG CẤP MÔ HÌNH ĐẢO] ---
+    def run_islands(self, generations: int = 50, population_size: int = 100, mutation_rate: float = 0.1, tournament_size: int = 5, elitism_count: int = 10, crossover_rate: float = 0.8,
+                    progress_callback: Optional[Callable[[GenerationStats], None]] = None) -> List[DesignCandidate]:
+        """
+        GA mô hình đảo: OptimizerSettings.islands quần thể con chạy song song trong các tiến trình riêng,
+        mỗi đảo có tỉ lệ đột biến/lai ghép riêng và trao đổi cá thể tốt nhất định kỳ (xem core/optimizer/islands.py).
+
+        Args:
+            population_size: Kích thước quần thể của mỗi đảo
+            progress_callback: Được gọi mỗi khi một đảo xong một thế hệ (best_fitness là tốt nhất giữa các đảo)
+
+        Returns:
+            List[DesignCandidate]: Bảng xếp hạng gộp của mọi đảo (fitness chấm lại trên cùng một tập)
+        """
+        from .islands import run_islands
+
+        try:
+            return run_islands(self, max(2, int(self.settings.islands)), generations, population_size, mutation_rate,
+                               tournament_size, elitism_count, crossover_rate, progress_callback)
+        finally:
+            self._cancel_event.clear()
+    # --- [KẾT THÚC NÂNG CẤP MÔ HÌNH ĐẢO] ---
+
+    # --- [BẮT ĐẦU NÂNG CẤP PARETO NSGA-II] ---
+    def run_pareto(self, generations: int = 50, population_size: int = 100, mutation_rate: float = 0.1, crossover_rate: float = 0.8,
+                   progress_callback: Optional[Callable[[GenerationStats], None]] = None):
+        """
+        Tối ưu đa mục tiêu NSGA-II (xem core/optimizer/pareto.py).
+
+        Không dùng trọng số của OptimizerSettings khi chọn lọc; kết quả là toàn bộ mặt Pareto,
+        có thể xếp hạng lại theo trọng số bất kỳ bằng ParetoFront.ranked mà không chạy lại engine.
+
+        Args:
+            generations: Số thế hệ
+            population_size: Kích thước quần thể cha mẹ
+            mutation_rate: Xác suất đột biến cơ sở (như _mutate)
+            crossover_rate: Xác suất lai ghép
+            progress_callback: Được gọi sau mỗi thế hệ với GenerationStats (top = mặt hiện tại xếp theo trọng số)
+
+        Returns:
+            ParetoFront (cũng được lưu vào self.pareto_front)
+        """
+        self._start_evaluation_cache()
+        self._start_transmission_atlas()
+        self._start_worker_pool()
+        try:
+            self.pareto_front = self._run_pareto_generations(generations, population_size, mutation_rate, crossover_rate, progress_callback)
+            return self.pareto_front
+        finally:
+            self._cancel_event.clear()
+            self._shutdown_worker_pool()
+            self._stop_transmission_atlas()
+            self._report_cache_stats()
+            self._report_profile()
+
+    def _run_pareto_generations(self, generations: int, population_size: int, mutation_rate: float, crossover_rate: float, progress_callback=None):
+        """Vòng lặp NSGA-II: cha mẹ + con → sắp xếp không trội → giữ population_size cá thể tốt nhất."""
+        from .pareto import ParetoFront, objective_matrix
+
+        stopping = self._new_stopping()
+        # Các thiết kế từng nằm trên mặt Pareto: hội tụ khi không còn phát hiện thiết kế mới
+        discovered = set()
+        self._initialize_population(population_size)
+        self._evaluate_results()
+        self.population = self._pareto_survivors(self.population, population_size)
+
+        for gen in range(generations):
+            parents = [c for c in self.population if c.is_valid]
+            if not parents:
+                print("Optimizer: No valid candidates found in population. Stopping.")
+                break
+            offspring = []
+            while len(offspring) < population_size:
+                parent1 = self._crowded_tournament(parents)
+                parent2 = self._crowded_tournament(parents)
+                if random.random() < crossover_rate:
+                    child1, child2 = self._crossover(parent1, parent2)
+                else:
+                    child1, child2 = copy.copy(parent1), copy.copy(parent2)
+                self._mutate(child1, mutation_rate)
+                self._mutate(child2, mutation_rate)
+                offspring.extend([child1, child2])
+
+            self.population = self.population + offspring[:population_size]
+            try:
+                self._evaluate_results()
+            except Exception as e:
+                print(f"Optimizer: Error evaluating generation {gen + 1}: {e}")
+            self.population = self._pareto_survivors(self.population, population_size)
+            front = [c for c in self.population if c.pareto_rank == 0]
+            print(f"Optimizer: Generation {gen + 1}/{generations} - Pareto front: {len(front)} designs")
+
+            self.best_so_far = ParetoFront(tuple(copy.copy(c) for c in front), objective_matrix(front, self.settings)).ranked(self.settings)
+            self.generations_run = gen + 1
+            if progress_callback is not None:
+                survivors = [c for c in self.population if c.is_valid]
+                scores = [c.fitness_score for c in self.best_so_far]
+                self._report_progress(progress_callback, gen, generations, scores[0] if scores else float('inf'),
+                                      sum(scores) / len(scores) if scores else 0.0,
+                                      self._calculate_diversity(survivors), len(survivors), stopping)
+            discovered.update(self._genes(c) for c in front)
+            stop_reason = stopping.observe(-float(len(discovered)))
+            if stop_reason is not None:
+                self._stop(stop_reason, gen)
+                break
+
+        front = [c for c in self.population if c.pareto_rank == 0]
+        print(f"Optimizer: Found {len(front)} Pareto-optimal solutions.")
+        return ParetoFront(tuple(front), objective_matrix(front, self.settings))
+
+    def _pareto_survivors(self, candidates: List[DesignCandidate], size: int) -> List[DesignCandidate]:
+        """
+        Chọn lọc môi trường của NSGA-II trên các bộ gene không trùng nhau.
+
+        Cá thể hợp lệ được gán pareto_rank/crowding_distance và xếp theo (bậc, -khoảng cách đám đông);
+        cá thể không hợp lệ chỉ lấp chỗ trống ở cuối.
+        """
+        from .pareto import (constraint_violation, crowded_order, crowding_distance,
+                             fast_non_dominated_sort, objective_matrix)
+
+        unique = {}
+        for c in candidates:
+            unique.setdefault(self._genes(c), c)
+        valid = [c for c in unique.values() if c.is_valid]
+        invalid = [c for c in unique.values() if not c.is_valid]
+        if valid:
+            F = objective_matrix(valid, self.settings)
+            ranks = fast_non_dominated_sort(F, constraint_violation(valid))
+            crowding = crowding_distance(F, ranks)
+            for c, rank, distance in zip(valid, ranks, crowding):
+                c.pareto_rank = int(rank)
+                c.crowding_distance = float(distance)
+            valid = [valid[i] for i in crowded_order(ranks, crowding)]
+        for c in invalid:
+            c.pareto_rank = None
+            c.crowding_distance = 0.0
+        return (valid + invalid)[:size]
+
+    @staticmethod
+    def _crowded_tournament(population: List[DesignCandidate]) -> DesignCandidate:
+        """Chọn lọc cặp theo toán tử so sánh đám đông: bậc thấp hơn, cùng bậc thì thưa hơn."""
+        a, b = random.choice(population), random.choice(population)
+        if (a.pareto_rank, -a.crowding_distance) <= (b.pareto_rank, -b.crowding_distance):
+            return a
+        return b
+    # --- [KẾT THÚC NÂNG CẤP PARETO NSGA-II] ---
+
+    def run_exact(self, top_n: int = 15, prune: bool = True) -> List[DesignCandidate]:
+        """
+        Tìm top-N thiết kế thật sự bằng vét cạn có cắt nhánh (xem core/optimizer/exact.py).
+
+        Cùng hàm fitness với GA, kết quả tất định (không phụ thuộc random).
+
+        Args:
+            top_n: Số thiết kế tốt nhất cần trả về
+            prune: Có cắt nhánh bằng cận hay không
+
+        Returns:
+            List[DesignCandidate] sắp xếp theo fitness tăng dần
+        """
+        from .exact import ExactSolver
+        self._start_profile()
+        self._start_transmission_atlas()
+        try:
+            solver = ExactSolver(self)
+            results = solver.solve(top_n=top_n, prune=prune)
+        finally:
+            self._stop_transmission_atlas()
+        self.drive_stage_evaluations = solver.drive_stage_evaluations
+        self._report_profile()
+        return results
+
+    def _start_evaluation_cache(self):
+        """Chuẩn bị cache đánh giá cho lần chạy (riêng hoặc dùng chung giữa các lần chạy)."""
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._belt_stages = {}
+        self.drive_stage_evaluations = 0
+        self._start_profile()
+        if not getattr(self.settings, "cache_evaluations", True):
+            self._cache = None
+            return
+        if getattr(self.settings, "share_evaluation_cache", False):
+            self._cache = SHARED_EVALUATION_CACHE
+        else:
+            self._cache = EvaluationCache()
+        self._fingerprint = problem_fingerprint(self.base_params, self.settings)
+
+    def _start_transmission_atlas(self):
+        """Bật atlas truyền động cho lần chạy (tắt lại khi xong nếu trước đó chưa bật)."""
+        self._owns_transmission_atlas = False
+        if getattr(self.settings, "use_transmission_atlas", False) and active_transmission_atlas() is None:
+            enable_transmission_atlas()
+            self._owns_transmission_atlas = True
+
+    def _stop_transmission_atlas(self):
+        atlas = active_transmission_atlas()
+        if atlas is not None and (atlas.hits or atlas.misses):
+            logger.info(f"Transmission atlas: {atlas.hits} hits, {atlas.misses} grids built")
+        if self._owns_transmission_atlas:
+            disable_transmission_atlas()
+            self._owns_transmission_atlas = False
+
+    def _start_profile(self):
+        self.profile = CalculationProfile() if getattr(self.settings, "profile_evaluations", False) else None
+
+    def _report_profile(self):
+        if self.profile is None or not self.profile.calculations:
+            return
+        print(f"Optimizer: Engine profile over {self.profile.calculations} engine calls")
+        print(self.profile.format())
+
+    def _is_decomposed(self) -> bool:
+        return getattr(self.settings, "evaluation_mode", "full") == "decomposed"
+
+    def _report_cache_stats(self):
+        if self._is_decomposed():
+            print(f"Optimizer: Decomposed mode - {len(self._belt_stages)} belt-stage engine calls, "
+                  f"{self.drive_stage_evaluations} drive-stage checks")
+        total = self.cache_hits + self.cache_misses
+        if self._cache is None or total == 0:
+            return
+        hit_rate = 100.0 * self.cache_hits / total
+        print(f"Optimizer: Evaluation cache - hits: {self.cache_hits}, misses: {self.cache_misses} "
+              f"(hit rate {hit_rate:.1f}%, {len(self._cache)} entries)")
+
+    def _worker_count(self) -> int:
+        """Số worker đánh giá: theo OptimizerSettings.max_workers hoặc tự động (tối đa 16)."""
+        max_workers = getattr(self.settings, "max_workers", None)
+        if max_workers and max_workers > 0:
+            return int(max_workers)
+        return min(os.cpu_count() or 8, 16)
+
+    def _start_worker_pool(self):
+        """Khởi động ProcessPool (nếu backend = "process"); lỗi thì quay về ThreadPool."""
+        self._process_pool = None
+        self._process_workers = 0
+        if getattr(self.settings, "evaluation_backend", "thread") != "process" or self._is_decomposed():
+            return
+        workers = self._worker_count()
+        if workers <= 1:
+            return
+        try:
+            from core.specs import ACTIVE_MATERIAL_DB
+            catalogs = (dict(ACTIVE_MATERIAL_DB), dict(ACTIVE_BELT_SPECS), list(ACTIVE_CHAIN_SPECS))
+            # "spawn" an toàn khi được gọi từ QThread (không fork tiến trình đang có nhiều luồng)
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.base_params, self.settings, catalogs),
+            )
+            self._process_workers = workers
+            logger.info(f"Using ProcessPool with max_workers={workers}")
+        except Exception as e:
+            print(f"Optimizer: Warning: Không khởi động được ProcessPool ({e}), dùng ThreadPool")
+            self._process_pool = None
+
+    def _shutdown_worker_pool(self):
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=True, cancel_futures=True)
+            self._process_pool = None
+            self._process_workers = 0
+
+    def _prepare_run(self, generations: int, population_size: int, elitism_count: int) -> int:
+        """Kiểm tra dữ liệu đầu vào của GA và trả về elitism_count (tự tính khi elitism_count <= 0)."""
+        # Kiểm tra file CSV bảng tra tốc độ trước khi chạy GA
+        csv_path = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'hidden', 'Bang tra toc do bang tai.csv')
+        if not os.path.exists(csv_path):
+            print(f"Warning: Không tìm thấy file bảng tra tốc độ: {csv_path}")
+            print("GA sẽ chạy với giá trị fallback an toàn (2.0 m/s)")
+            print("Điều này có thể ảnh hưởng đến độ chính xác của tối ưu hóa")
+        
+        # Cải thiện BƯỚC 5: Điều chỉnh elitism_count dựa trên số generations và population_size
+        if elitism_count <= 0:
+            # Tính toán elitism_count dựa trên số generations và population_size
+            if population_size >= 120:
+                # Dân số lớn: elitism cao hơn
+                if generations <= 30:
+                    elitism_count = max(10, population_size // 12)
+                elif generations <= 50:
+                    elitism_count = max(15, population_size // 10)
                 else:
-                    # Dân số nhỏ
-                    if generations <= 30:
-                        elitism_count = max(5, population_size // 20)
-                    elif generations <= 50:
-                        elitism_count = max(8, population_size // 15)
-                    else:
-                        elitism_count = max(10, population_size // 10)
-                
-                print(f"Optimizer: Auto-adjusted elitism_count to {elitism_count} based on {generations} generations and {population_size} population")
+                    elitism_count = max(20, population_size // 8)
+            elif population_size >= 80:
+                # Dân số trung bình
+                if generations <= 30:
+                    elitism_count = max(8, population_size // 15)
+                elif generations <= 50:
+                    elitism_count = max(12, population_size // 12)
+                else:
+                    elitism_count = max(15, population_size // 10)
+            else:
+                # Dân số nhỏ
+                if generations <= 30:
+                    elitism_count = max(5, population_size // 20)
+                elif generations <= 50:
+                    elitism_count = max(8, population_size // 15)
+                else:
+                    elitism_count = max(10, population_size // 10)
             
+            print(f"Optimizer: Auto-adjusted elitism_count to {elitism_count} based on {generations} generations and {population_size} population")
+        return elitism_count
+
+    def _run_generations(self, generations: int, population_size: int, mutation_rate: float, tournament_size: int, elitism_count: int, crossover_rate: float, progress_callback=None) -> List[DesignCandidate]:
+        """Vòng lặp GA (được gọi bởi run sau khi đã khởi động worker)."""
+        stopping = self._new_stopping()
+        try:
+            elitism_count = self._prepare_run(generations, population_size, elitism_count)
             self._initialize_population(population_size)
         except Exception as e:
             print(f"Optimizer: Failed to initialize population: {e}")
@@ -107,48 +829,22 @@ class Optimizer:
             # CẢI THIỆN: Duy trì đa dạng dân số
             diversity_score = self._calculate_diversity(valid_population)
             print(f"Optimizer: Generation {gen + 1} diversity score: {diversity_score:.3f}")
+
+            # Kết quả tốt nhất hiện có (bản sao nông để fitness không đổi theo các thế hệ sau)
+            self.best_so_far = [copy.copy(c) for c in valid_population[:15]]
+            self.generations_run = gen + 1
+            if progress_callback is not None:
+                self._report_progress(progress_callback, gen, generations, best_fitness, avg_fitness,
+                                      diversity_score, len(valid_population), stopping)
+            # fitness_score được chuẩn hóa lại mỗi thế hệ: hội tụ xét theo mục tiêu với khoảng chuẩn hóa cố định
+            objective = stopping.objective(*self._objective_arrays(valid_population))
+            stop_reason = stopping.observe(objective, diversity_score)
+            if stop_reason is not None:
+                self._stop(stop_reason, gen)
+                break
             
-            # Điều chỉnh mutation rate dựa trên diversity
-            adaptive_mutation_rate = mutation_rate
-            if diversity_score < 0.3:  # Đa dạng thấp
-                adaptive_mutation_rate = min(0.3, mutation_rate * 1.5)  # Tăng mutation
-                print(f"Optimizer: Low diversity detected, increasing mutation rate to {adaptive_mutation_rate:.3f}")
-            elif diversity_score > 0.7:  # Đa dạng cao
-                adaptive_mutation_rate = max(0.05, mutation_rate * 0.8)  # Giảm mutation
-                print(f"Optimizer: High diversity detected, decreasing mutation rate to {adaptive_mutation_rate:.3f}")
-
-            # Cải thiện BƯỚC 5: Điều chỉnh elitism_count động dựa trên chất lượng dân số
-            current_elitism_count = min(elitism_count, len(valid_population))
-            if len(valid_population) < elitism_count:
-                print(f"Optimizer: Warning: Only {len(valid_population)} valid candidates, reducing elitism from {elitism_count} to {current_elitism_count}")
-            
-            new_generation = valid_population[:current_elitism_count] # Giữ lại cá thể tinh hoa
-
-            # CẢI THIỆN: Sử dụng crossover_rate để quyết định có tạo con hay không
-            while len(new_generation) < population_size:
-                parent1 = self._tournament_selection(tournament_size, valid_population)
-                parent2 = self._tournament_selection(tournament_size, valid_population)
-                
-                # Sử dụng crossover_rate để quyết định có tạo con hay không
-                if random.random() < crossover_rate:
-                    child1, child2 = self._crossover(parent1, parent2)
-                    self._mutate(child1, adaptive_mutation_rate)
-                    self._mutate(child2, adaptive_mutation_rate)
-                    new_generation.extend([child1, child2])
-                else:
-                    # Nếu không crossover, chỉ mutate và copy parent
-                    child1 = copy.deepcopy(parent1)
-                    child2 = copy.deepcopy(parent2)
-                    self._mutate(child1, adaptive_mutation_rate * 1.5)  # Tăng mutation cho copy
-                    self._mutate(child2, adaptive_mutation_rate * 1.5)
-                    new_generation.extend([child1, child2])
-                
-                # Kiểm tra nếu đã đủ dân số
-                if len(new_generation) >= population_size:
-                    break
-            
-            # Cắt tỉa dân số về đúng kích thước mong muốn
-            self.population = new_generation[:population_size]
+            self.population = self._next_generation(valid_population, population_size, mutation_rate, tournament_size,
+                                                    elitism_count, crossover_rate, diversity_score)
 
         # Đánh giá lại lần cuối và trả về kết quả tốt nhất
         print("Optimizer: Final evaluation...")
@@ -157,6 +853,8 @@ class Optimizer:
         
         valid_results = [c for c in self.population if c.is_valid]
         print(f"Optimizer: Found {len(valid_results)} valid solutions.")
+        if valid_results:
+            self.best_so_far = valid_results[:15]
         
         # Hiển thị thống kê cuối cùng
         if valid_results:
@@ -183,14 +881,288 @@ class Optimizer:
         else:
             return valid_results  # Trả về tất cả nếu ít hơn 10
 
+    def _next_generation(self, valid_population: List[DesignCandidate], population_size: int, mutation_rate: float,
+                         tournament_size: int, elitism_count: int, crossover_rate: float, diversity_score: float) -> List[DesignCandidate]:
+        """Tạo thế hệ mới từ các cá thể hợp lệ đã xếp theo fitness: tinh hoa + con lai/đột biến."""
+        # Điều chỉnh mutation rate dựa trên diversity
+        adaptive_mutation_rate = mutation_rate
+        if diversity_score < 0.3:  # Đa dạng thấp
+            adaptive_mutation_rate = min(0.3, mutation_rate * 1.5)  # Tăng mutation
+            print(f"Optimizer: Low diversity detected, increasing mutation rate to {adaptive_mutation_rate:.3f}")
+        elif diversity_score > 0.7:  # Đa dạng cao
+            adaptive_mutation_rate = max(0.05, mutation_rate * 0.8)  # Giảm mutation
+            print(f"Optimizer: High diversity detected, decreasing mutation rate to {adaptive_mutation_rate:.3f}")
+
+        # Cải thiện BƯỚC 5: Điều chỉnh elitism_count động dựa trên chất lượng dân số
+        current_elitism_count = min(elitism_count, len(valid_population))
+        if len(valid_population) < elitism_count:
+            print(f"Optimizer: Warning: Only {len(valid_population)} valid candidates, reducing elitism from {elitism_count} to {current_elitism_count}")
+        
+        new_generation = valid_population[:current_elitism_count] # Giữ lại cá thể tinh hoa
+
+        # CẢI THIỆN: Sử dụng crossover_rate để quyết định có tạo con hay không
+        while len(new_generation) < population_size:
+            parent1 = self._tournament_selection(tournament_size, valid_population)
+            parent2 = self._tournament_selection(tournament_size, valid_population)
+            
+            # Sử dụng crossover_rate để quyết định có tạo con hay không
+            if random.random() < crossover_rate:
+                child1, child2 = self._crossover(parent1, parent2)
+                self._mutate(child1, adaptive_mutation_rate)
+                self._mutate(child2, adaptive_mutation_rate)
+                new_generation.extend([child1, child2])
+            else:
+                # Nếu không crossover, chỉ mutate và copy parent
+                # Bản sao nông là đủ: _mutate gán lại gene và bỏ kết quả cũ (kết quả không bị sửa tại chỗ)
+                child1 = copy.copy(parent1)
+                child2 = copy.copy(parent2)
+                self._mutate(child1, adaptive_mutation_rate * 1.5)  # Tăng mutation cho copy
+                self._mutate(child2, adaptive_mutation_rate * 1.5)
+                new_generation.extend([child1, child2])
+            
+            # Kiểm tra nếu đã đủ dân số
+            if len(new_generation) >= population_size:
+                break
+        
+        # Cắt tỉa dân số về đúng kích thước mong muốn
+        return new_generation[:population_size]
+
+    # --- [BẮT ĐẦU NÂNG CẤP QUẦN THỂ MA TRẬN] ---
+    def _run_matrix_generations(self, generations: int, population_size: int, mutation_rate: float, tournament_size: int, elitism_count: int, crossover_rate: float, progress_callback=None) -> List[DesignCandidate]:
+        """
+        Vòng lặp GA trên quần thể mã hóa số nguyên (xem core/optimizer/population.py).
+
+        Cùng chiến lược với _run_generations (tinh hoa, giải đấu 80/20, ba kiểu lai ghép, đột biến theo gene,
+        đột biến thích nghi theo độ đa dạng); DesignCandidate chỉ được dựng cho các thiết kế được báo cáo.
+        """
+        from . import population as pop_ops
+
+        stopping = self._new_stopping()
+        try:
+            elitism_count = self._prepare_run(generations, population_size, elitism_count)
+            tables = pop_ops.GeneTables.active()
+            rng = np.random.default_rng(random.getrandbits(64))
+            store = pop_ops.DesignEvaluations(tables)
+            population = self._initial_matrix(tables, rng, population_size)
+        except Exception as e:
+            print(f"Optimizer: Failed to initialize population: {e}")
+            return []
+        # Mẫu số độ đa dạng giống _calculate_diversity
+        denominators = np.array([len(STANDARD_WIDTHS), len(ACTIVE_BELT_SPECS), len(STANDARD_GEARBOX_RATIOS),
+                                 max(1, len(ACTIVE_CHAIN_SPECS.designations))])
+
+        for gen in range(generations):
+            codes, fitness = self._matrix_fitness(population, tables, store)
+            order = np.argsort(fitness, kind="stable")
+            ranked = order[np.isfinite(fitness[order])]
+            if not len(ranked):
+                print("Optimizer: No valid candidates found in population. Stopping.")
+                break
+            valid_population = population[ranked]
+            valid_fitness = fitness[ranked]
+            best_fitness = float(valid_fitness[0])
+            avg_fitness = float(valid_fitness.mean())
+            diversity_score = pop_ops.diversity(valid_population, denominators)
+            print(f"Optimizer: Generation {gen + 1}/{generations} - Best fitness: {best_fitness:.4f}, "
+                  f"Avg fitness: {avg_fitness:.4f}, diversity: {diversity_score:.3f}")
+
+            self.best_so_far = self._matrix_candidates(codes[ranked], valid_fitness, store, tables)
+            self.generations_run = gen + 1
+            if progress_callback is not None:
+                self._report_progress(progress_callback, gen, generations, best_fitness, avg_fitness,
+                                      diversity_score, len(ranked), stopping)
+            v = codes[ranked]
+            objective = stopping.objective(store.cost[v], store.power[v], store.safety[v], store.velocity_error[v],
+                                           store.has_transmission[v], store.penalty[v])
+            stop_reason = stopping.observe(objective, diversity_score)
+            if stop_reason is not None:
+                self._stop(stop_reason, gen)
+                break
+
+            adaptive_mutation_rate = mutation_rate
+            if diversity_score < 0.3:
+                adaptive_mutation_rate = min(0.3, mutation_rate * 1.5)
+            elif diversity_score > 0.7:
+                adaptive_mutation_rate = max(0.05, mutation_rate * 0.8)
+
+            elite = valid_population[:min(elitism_count, len(ranked))]
+            pairs = (population_size - len(elite) + 1) // 2
+            first = pop_ops.tournament_select(rng, valid_fitness, pairs, tournament_size)
+            second = pop_ops.tournament_select(rng, valid_fitness, pairs, tournament_size)
+            parents1, parents2 = valid_population[first], valid_population[second]
+            children1, children2 = pop_ops.crossover(rng, parents1, parents2)
+            crossed = rng.random(pairs) < crossover_rate
+            children1[~crossed] = parents1[~crossed]
+            children2[~crossed] = parents2[~crossed]
+            # Bản sao không lai ghép đột biến mạnh hơn 1.5 lần, thêm 1.5 lần nếu cha mẹ có fitness kém (> 5)
+            rates1 = np.where(crossed, 1.0, 1.5 * np.where(valid_fitness[first] > 5.0, 1.5, 1.0)) * adaptive_mutation_rate
+            rates2 = np.where(crossed, 1.0, 1.5 * np.where(valid_fitness[second] > 5.0, 1.5, 1.0)) * adaptive_mutation_rate
+            pop_ops.mutate(rng, children1, rates1, tables.sizes)
+            pop_ops.mutate(rng, children2, rates2, tables.sizes)
+            children = np.empty((2 * pairs, pop_ops.GENE_COUNT), dtype=population.dtype)
+            children[0::2], children[1::2] = children1, children2
+            population = np.concatenate([elite, children])[:population_size]
+
+        print("Optimizer: Final evaluation...")
+        codes, fitness = self._matrix_fitness(population, tables, store)
+        order = np.argsort(fitness, kind="stable")
+        ranked = order[np.isfinite(fitness[order])]
+        valid_results = self._matrix_candidates(codes[ranked], fitness[ranked], store, tables)
+        print(f"Optimizer: Found {len(valid_results)} valid solutions.")
+        if valid_results:
+            self.best_so_far = valid_results
+        return valid_results
+
+    def _initial_matrix(self, tables, rng: np.random.Generator, size: int) -> np.ndarray:
+        """Quần thể ban đầu mã hóa: các candidate an toàn (nếu mã hóa được) rồi đến cá thể ngẫu nhiên có định hướng."""
+        from .population import biased_population
+
+        safe_candidates, base_width, _, _ = self._safe_candidates()
+        seeds = []
+        for c in safe_candidates:
+            try:
+                seeds.append(tables.encode(self._genes(c)))
+            except ValueError:
+                continue
+        seeds = np.array(seeds, dtype=np.int64).reshape(-1, 4)[:size]
+        print(f"Optimizer: Initialized matrix population with {size} candidates ({len(seeds)} safe seeds)")
+        return np.concatenate([seeds, biased_population(rng, tables, size - len(seeds), base_width, self.base_params.belt_type)])
+
+    def _matrix_fitness(self, population: np.ndarray, tables, store) -> tuple:
+        """
+        Đánh giá các thiết kế chưa có trong store (qua cache theo bộ gene) và tính fitness của mọi hàng.
+
+        Returns:
+            tuple: (codes, fitness) - fitness = inf với hàng không hợp lệ
+        """
+        from .population import HARD_SAFETY_THRESHOLD, weighted_fitness
+
+        codes = tables.codes(population)
+        unique_codes = np.unique(codes)
+        missing = unique_codes[~store.evaluated[unique_codes]]
+        self.cache_hits += len(codes) - len(missing)
+        pending = []
+        for code in missing.tolist():
+            genes = tables.decode(tables.rows(np.array([code]))[0])
+            cached = self._cache.get(self._fingerprint, genes) if self._cache is not None else None
+            if cached is not None:
+                self._store_evaluation(store, code, cached)
+            else:
+                pending.append((code, genes))
+        self.cache_misses += len(pending)
+        evaluations = self._compute_evaluations([genes for _, genes in pending])
+        for code, genes in pending:
+            evaluation = evaluations[genes]
+            if self.profile is not None and not self._is_decomposed():
+                self.profile.add(evaluation[0].profile)
+            if self._cache is not None:
+                self._cache.put(self._fingerprint, genes, evaluation)
+            self._store_evaluation(store, code, evaluation)
+
+        valid = store.valid[codes]
+        if not valid.any():
+            # Làm mềm ràng buộc như _relax_constraints: chấp nhận thiết kế đạt ngưỡng an toàn cứng
+            valid = store.safety[codes] >= HARD_SAFETY_THRESHOLD
+            print(f"Optimizer: No valid candidates found in population, relaxed to {int(valid.sum())} above hard safety threshold")
+        fitness = np.full(len(codes), np.inf)
+        if valid.any():
+            v = codes[valid]
+            fitness[valid] = weighted_fitness(store.cost[v], store.power[v], store.safety[v], store.velocity_error[v],
+                                              store.has_transmission[v], store.penalty[v], self.settings)
+        return codes, fitness
+
+    @staticmethod
+    def _store_evaluation(store, code: int, evaluation: tuple):
+        reasons = evaluation[2] or ()
+        store.store(code, evaluation, _has_transmission(evaluation[0]),
+                    sum(_PENALTY_BY_CODE[reason.code] for reason in reasons))
+
+    def _matrix_candidates(self, codes: np.ndarray, fitness: np.ndarray, store, tables, limit: int = 15) -> List[DesignCandidate]:
+        """DesignCandidate cho tối đa limit thiết kế khác nhau đầu tiên (codes đã xếp theo fitness)."""
+        _, first = np.unique(codes, return_index=True)
+        candidates = []
+        for i in np.sort(first)[:limit]:
+            code = int(codes[i])
+            c = DesignCandidate(*tables.decode(tables.rows(np.array([code]))[0]))
+            self._apply_evaluation(c, store.evaluations[code])
+            c.is_valid = True
+            c.fitness_score = float(fitness[i])
+            candidates.append(c)
+        return candidates
+    # --- [KẾT THÚC NÂNG CẤP QUẦN THỂ MA TRẬN] ---
+
     def _initialize_population(self, size: int):
         """Tạo quần thể ban đầu một cách ngẫu nhiên."""
         self.population = []
+        safe_candidates, base_width, belt_types, chain_designations = self._safe_candidates()
+
+        # Thêm các candidate an toàn vào đầu quần thể
+        self.population.extend(safe_candidates)
+        print(f"Optimizer: Added {len(safe_candidates)} optimized safe candidates based on original parameters")
+        print(f"Optimizer: Safe candidates include: base_width={base_width}mm, alternative widths, gearbox ratios, belt types, and chain designations")
+
+        # Tạo các candidate ngẫu nhiên cho phần còn lại với cải tiến
+        remaining_size = size - len(safe_candidates)
+        
+        # CẢI THIỆN: Tạo candidate với chiến lược thông minh hơn
+        for i in range(remaining_size):
+            # Chiến lược 1: 40% khả năng chọn bề rộng gần với base_width
+            if random.random() < 0.4:
+                # Chọn từ 5 bề rộng gần nhất (tăng từ 3 lên 5)
+                nearby_widths = sorted(STANDARD_WIDTHS, key=lambda x: abs(x - base_width))[:5]
+                belt_width_mm = random.choice(nearby_widths)
+            # Chiến lược 2: 30% khả năng chọn bề rộng trung bình
+            elif random.random() < 0.7:
+                # Chọn từ bề rộng trung bình
+                mid_widths = sorted(STANDARD_WIDTHS)[len(STANDARD_WIDTHS)//4:3*len(STANDARD_WIDTHS)//4]
+                belt_width_mm = random.choice(mid_widths)
+            # Chiến lược 3: 30% khả năng chọn bề rộng bất kỳ
+            else:
+                belt_width_mm = random.choice(STANDARD_WIDTHS)
+            
+            # Chiến lược belt type: ưu tiên loại gốc
+            if random.random() < 0.6:
+                belt_type_name = self.base_params.belt_type
+            else:
+                belt_type_name = random.choice(belt_types)
+            
+            # Chiến lược gearbox: ưu tiên tỉ số gần với gốc
+            if random.random() < 0.5:
+                # Chọn từ 3 tỉ số gần nhất với tỉ số đầu tiên
+                base_ratio = STANDARD_GEARBOX_RATIOS[0]
+                nearby_ratios = sorted(STANDARD_GEARBOX_RATIOS, key=lambda x: abs(x - base_ratio))[:3]
+                gearbox_ratio = random.choice(nearby_ratios)
+            else:
+                gearbox_ratio = random.choice(STANDARD_GEARBOX_RATIOS)
+            
+            # Chiến lược chain: ưu tiên loại gốc
+            if random.random() < 0.6:
+                chain_spec_designation = chain_designations[0]
+            else:
+                chain_spec_designation = random.choice(chain_designations)
+            
+            candidate = DesignCandidate(
+                belt_width_mm=belt_width_mm,
+                belt_type_name=belt_type_name,
+                gearbox_ratio=gearbox_ratio,
+                chain_spec_designation=chain_spec_designation
+            )
+            self.population.append(candidate)
+        
+        print(f"Optimizer: Initialized population with {len(self.population)} candidates ({len(safe_candidates)} optimized safe + {remaining_size} random with bias)")
+
+    def _safe_candidates(self) -> tuple:
+        """
+        Các candidate "an toàn" dựng từ tham số gốc (đặt ở đầu quần thể ban đầu).
+
+        Returns:
+            tuple: (safe_candidates, base_width, belt_types, chain_designations)
+        """
         material_info = MATERIAL_DB.get(self.base_params.material, {})
         # v_max không được sử dụng trong logic khởi tạo, đã loại bỏ
         
         belt_types = list(ACTIVE_BELT_SPECS.keys())
-        chain_designations = [cs.designation for cs in ACTIVE_CHAIN_SPECS if cs.designation]
+        chain_designations = ACTIVE_CHAIN_SPECS.designations
 
         if not chain_designations:
             print("Optimizer: Warning: No chain specifications found. Using default.")
@@ -203,7 +1175,7 @@ class Optimizer:
             print(f"STANDARD_WIDTHS available: {STANDARD_WIDTHS}")
             
             # Tìm bề rộng gần nhất trong STANDARD_WIDTHS
-            closest_width = min(STANDARD_WIDTHS, key=lambda x: abs(x - base_width))
+            closest_width = _STANDARD_WIDTH_TABLE.nearest(base_width)
             print(f"Optimizer: Using closest standard width: {closest_width}mm (original: {base_width}mm)")
             base_width = closest_width
 
@@ -286,61 +1258,7 @@ class Optimizer:
                 gearbox_ratio=mid_gearbox,
                 chain_spec_designation=chain_designations[0] if chain_designations else ""
             ))
-
-        # Thêm các candidate an toàn vào đầu quần thể
-        self.population.extend(safe_candidates)
-        print(f"Optimizer: Added {len(safe_candidates)} optimized safe candidates based on original parameters")
-        print(f"Optimizer: Safe candidates include: base_width={base_width}mm, alternative widths, gearbox ratios, belt types, and chain designations")
-
-        # Tạo các candidate ngẫu nhiên cho phần còn lại với cải tiến
-        remaining_size = size - len(safe_candidates)
-        
-        # CẢI THIỆN: Tạo candidate với chiến lược thông minh hơn
-        for i in range(remaining_size):
-            # Chiến lược 1: 40% khả năng chọn bề rộng gần với base_width
-            if random.random() < 0.4:
-                # Chọn từ 5 bề rộng gần nhất (tăng từ 3 lên 5)
-                nearby_widths = sorted(STANDARD_WIDTHS, key=lambda x: abs(x - base_width))[:5]
-                belt_width_mm = random.choice(nearby_widths)
-            # Chiến lược 2: 30% khả năng chọn bề rộng trung bình
-            elif random.random() < 0.7:
-                # Chọn từ bề rộng trung bình
-                mid_widths = sorted(STANDARD_WIDTHS)[len(STANDARD_WIDTHS)//4:3*len(STANDARD_WIDTHS)//4]
-                belt_width_mm = random.choice(mid_widths)
-            # Chiến lược 3: 30% khả năng chọn bề rộng bất kỳ
-            else:
-                belt_width_mm = random.choice(STANDARD_WIDTHS)
-            
-            # Chiến lược belt type: ưu tiên loại gốc
-            if random.random() < 0.6:
-                belt_type_name = self.base_params.belt_type
-            else:
-                belt_type_name = random.choice(belt_types)
-            
-            # Chiến lược gearbox: ưu tiên tỉ số gần với gốc
-            if random.random() < 0.5:
-                # Chọn từ 3 tỉ số gần nhất với tỉ số đầu tiên
-                base_ratio = STANDARD_GEARBOX_RATIOS[0]
-                nearby_ratios = sorted(STANDARD_GEARBOX_RATIOS, key=lambda x: abs(x - base_ratio))[:3]
-                gearbox_ratio = random.choice(nearby_ratios)
-            else:
-                gearbox_ratio = random.choice(STANDARD_GEARBOX_RATIOS)
-            
-            # Chiến lược chain: ưu tiên loại gốc
-            if random.random() < 0.6:
-                chain_spec_designation = chain_designations[0]
-            else:
-                chain_spec_designation = random.choice(chain_designations)
-            
-            candidate = DesignCandidate(
-                belt_width_mm=belt_width_mm,
-                belt_type_name=belt_type_name,
-                gearbox_ratio=gearbox_ratio,
-                chain_spec_designation=chain_spec_designation
-            )
-            self.population.append(candidate)
-        
-        print(f"Optimizer: Initialized population with {len(self.population)} candidates ({len(safe_candidates)} optimized safe + {remaining_size} random with bias)")
+        return safe_candidates, base_width, belt_types, chain_designations
 
     def _calculate_diversity(self, population: List[DesignCandidate]) -> float:
         """Tính toán độ đa dạng của dân số dựa trên các tham số."""
@@ -363,7 +1281,7 @@ class Optimizer:
         gearbox_diversity = len(set(gearbox_ratios)) / len(STANDARD_GEARBOX_RATIOS)
         
         # Đa dạng chain
-        chain_diversity = len(set(chain_designations)) / len([cs.designation for cs in ACTIVE_CHAIN_SPECS if cs.designation])
+        chain_diversity = len(set(chain_designations)) / len(ACTIVE_CHAIN_SPECS.designations)
         
         # Tính trung bình có trọng số
         total_diversity = (width_diversity * 0.4 + belt_diversity * 0.2 + 
@@ -373,350 +1291,215 @@ class Optimizer:
 
     def _evaluate_population(self):
         """Đánh giá từng cá thể trong quần thể, chuẩn hóa và tính điểm fitness."""
+        valid_candidates = self._evaluate_results()
+        if valid_candidates:
+            self._assign_fitness(valid_candidates)
+
+    def _evaluate_results(self) -> List[DesignCandidate]:
+        """
+        Chạy engine cho các cá thể chưa được đánh giá (qua cache theo bộ gene).
+
+        Returns:
+            Các cá thể hợp lệ (sau khi làm mềm ràng buộc nếu không có cá thể nào hợp lệ)
+        """
         # Bước 1: Chạy tính toán cho các cá thể chưa được đánh giá
-        # Cải thiện BƯỚC 6: Giới hạn max_workers cho ThreadPool
-        max_workers = min(os.cpu_count() or 8, 16)  # Giới hạn tối đa 16 workers
-        logger.info(f"Using ThreadPool with max_workers={max_workers}")
-        
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            list(executor.map(self._evaluate_candidate, [c for c in self.population if c.calculation_result is None]))
+        # Tra cache theo bộ gene; mỗi bộ gene chưa gặp chỉ được tính một lần
+        to_compute = {}
+        for c in self.population:
+            if c.calculation_result is not None:
+                continue
+            genes = self._genes(c)
+            if genes in to_compute:
+                to_compute[genes].append(c)
+                self.cache_hits += 1
+                continue
+            cached = self._cache.get(self._fingerprint, genes) if self._cache is not None else None
+            if cached is not None:
+                self._apply_evaluation(c, cached)
+                self.cache_hits += 1
+            else:
+                to_compute[genes] = [c]
+                self.cache_misses += 1
+
+        for genes, evaluation in self._compute_evaluations(list(to_compute)).items():
+            if self.profile is not None and not self._is_decomposed():
+                self.profile.add(evaluation[0].profile)
+            if self._cache is not None:
+                self._cache.put(self._fingerprint, genes, evaluation)
+            for c in to_compute[genes]:
+                self._apply_evaluation(c, evaluation)
 
         valid_candidates = [c for c in self.population if c.is_valid]
         if not valid_candidates:
             print("Optimizer: No valid candidates found in population. Trying to relax constraints...")
-            
-            # Thử làm mềm tiêu chí để tìm được ít nhất một số candidate
-            relaxed_candidates = []
-            for c in self.population:
-                if hasattr(c, 'calculation_result') and c.calculation_result:
-                    # Kiểm tra safety factor với ngưỡng an toàn cứng
-                    safety_val = getattr(c.calculation_result, 'safety_factor', 0)
-                    # Ngưỡng an toàn cứng: không bao giờ chấp nhận safety_factor < 4.0
-                    hard_safety_threshold = 4.0
-                    if safety_val >= hard_safety_threshold:
-                        c.is_valid = True
-                        relaxed_candidates.append(c)
-                        print(f"Optimizer: Relaxed candidate {c} with safety factor {safety_val} (above hard threshold {hard_safety_threshold})")
-            
-            if relaxed_candidates:
-                valid_candidates = relaxed_candidates
-                print(f"Optimizer: Found {len(relaxed_candidates)} candidates after relaxing constraints (above hard safety threshold)")
-            else:
-                print("Optimizer: CRITICAL ERROR: No valid candidates found even after relaxing constraints.")
-                print("Optimizer: All candidates have safety factor below hard threshold of 4.0.")
-                print("Optimizer: This indicates serious issues with input parameters or design constraints.")
-                print("Optimizer: Please check:")
-                print("  - Material properties and density")
-                print("  - Belt specifications and capacity")
-                print("  - Safety requirements")
-                print("  - Budget constraints")
-                return
-
-        # Bước 2: Tìm min/max cho việc chuẩn hóa (với kiểm tra an toàn)
-        try:
-            min_cost = min(getattr(c.calculation_result, 'cost_capital_total', float('inf')) for c in valid_candidates)
-            max_cost = max(getattr(c.calculation_result, 'cost_capital_total', 0) for c in valid_candidates)
-            min_power = min(getattr(c.calculation_result, 'required_power_kw', float('inf')) for c in valid_candidates)
-            max_power = max(getattr(c.calculation_result, 'required_power_kw', 0) for c in valid_candidates)
-            min_safety = min(getattr(c.calculation_result, 'safety_factor', float('inf')) for c in valid_candidates)
-            max_safety = max(getattr(c.calculation_result, 'safety_factor', 0) for c in valid_candidates)
-            
-            # Cải tiến mới: Chuẩn hóa sai số vận tốc
-            velocity_errors = []
-            for c in valid_candidates:
-                if hasattr(c.calculation_result, 'transmission_solution') and c.calculation_result.transmission_solution:
-                    vel_err = getattr(c.calculation_result.transmission_solution, "velocity_error_percent", 0.0)
-                    velocity_errors.append(vel_err)
-            
-            if velocity_errors:
-                min_velocity_error = min(velocity_errors)
-                max_velocity_error = max(velocity_errors)
-                print(f"DEBUG: Velocity error range: [{min_velocity_error:.2f}%, {max_velocity_error:.2f}%]")
-            else:
-                min_velocity_error = max_velocity_error = 0.0
+            valid_candidates = self._relax_constraints(self.population)
+        return valid_candidates
 
-            # Cải thiện: Kiểm tra và xử lý các trường hợp đặc biệt
-            logger.debug(f"Fitness calculation - Cost range: [{min_cost:.2f}, {max_cost:.2f}], "
-                  f"Power range: [{min_power:.2f}, {max_power:.2f}], "
-                  f"Safety range: [{min_safety:.2f}, {max_safety:.2f}]")
-            
-            # Kiểm tra nếu có giá trị vô cùng
-            if min_cost == float('inf') or max_cost == 0:
-                print("Warning: Invalid cost range detected, using fallback values")
-                min_cost, max_cost = 0.0, 100000.0  # Fallback values
-            
-            if min_power == float('inf') or max_power == 0:
-                print("Warning: Invalid power range detected, using fallback values")
-                min_power, max_power = 0.0, 1000.0  # Fallback values
-            
-            if min_safety == float('inf') or max_safety == 0:
-                print("Warning: Invalid safety range detected, using fallback values")
-                min_safety, max_safety = 1.0, 20.0  # Fallback values
+    def _relax_constraints(self, candidates: List[DesignCandidate]) -> List[DesignCandidate]:
+        """Đánh dấu hợp lệ các cá thể đạt ngưỡng an toàn cứng khi không còn cá thể hợp lệ nào.
 
-            # Bước 3: Tính điểm fitness cho từng cá thể hợp lệ
-            for c in valid_candidates:
-                cost = getattr(c.calculation_result, 'cost_capital_total', 0)
-                power = getattr(c.calculation_result, 'required_power_kw', 0)
-                safety = getattr(c.calculation_result, 'safety_factor', 0)
+        Returns:
+            Danh sách cá thể được chấp nhận sau khi làm mềm (rỗng nếu không có).
+        """
+        # Thử làm mềm tiêu chí để tìm được ít nhất một số candidate
+        relaxed_candidates = []
+        for c in candidates:
+            if hasattr(c, 'calculation_result') and c.calculation_result:
+                # Kiểm tra safety factor với ngưỡng an toàn cứng
+                safety_val = getattr(c.calculation_result, 'safety_factor', 0)
+                # Ngưỡng an toàn cứng: không bao giờ chấp nhận safety_factor < 4.0
+                hard_safety_threshold = 4.0
+                if safety_val >= hard_safety_threshold:
+                    c.is_valid = True
+                    relaxed_candidates.append(c)
+                    print(f"Optimizer: Relaxed candidate {c} with safety factor {safety_val} (above hard threshold {hard_safety_threshold})")
+        
+        if relaxed_candidates:
+            print(f"Optimizer: Found {len(relaxed_candidates)} candidates after relaxing constraints (above hard safety threshold)")
+        else:
+            print("Optimizer: CRITICAL ERROR: No valid candidates found even after relaxing constraints.")
+            print("Optimizer: All candidates have safety factor below hard threshold of 4.0.")
+            print("Optimizer: This indicates serious issues with input parameters or design constraints.")
+            print("Optimizer: Please check:")
+            print("  - Material properties and density")
+            print("  - Belt specifications and capacity")
+            print("  - Safety requirements")
+            print("  - Budget constraints")
+        return relaxed_candidates
+
+    @staticmethod
+    def _objective_arrays(candidates: List[DesignCandidate]) -> tuple:
+        """
+        Đại lượng của từng cá thể cho population.weighted_fitness.
+
+        Returns:
+            tuple: (cost, power, safety, velocity_error, has_transmission, penalty) dạng np.ndarray
+        """
+        results = [c.calculation_result for c in candidates]
+        has_transmission = np.array([_has_transmission(r) for r in results], dtype=bool)
+        velocity_error = np.array([getattr(r.transmission_solution, "velocity_error_percent", 0.0) if t else 0.0
+                                   for r, t in zip(results, has_transmission)], dtype=float)
+        cost = np.array([getattr(r, 'cost_capital_total', 0) for r in results], dtype=float)
+        power = np.array([getattr(r, 'required_power_kw', 0) for r in results], dtype=float)
+        safety = np.array([getattr(r, 'safety_factor', 0) for r in results], dtype=float)
+        # Phạt theo mã lý do (xem _REASON_PENALTIES); phạt SF thấp được cộng trong weighted_fitness
+        penalty = np.array([sum(_PENALTY_BY_CODE[reason.code] for reason in c.invalid_reasons)
+                            for c in candidates], dtype=float)
+        return cost, power, safety, velocity_error, has_transmission, penalty
+
+    def _assign_fitness(self, valid_candidates: List[DesignCandidate]):
+        """Chuẩn hóa min/max trên các cá thể hợp lệ và tính điểm fitness (càng thấp càng tốt) bằng population.weighted_fitness."""
+        from .population import weighted_fitness
+        if not valid_candidates:
+            return
+        try:
+            cost, power, safety, velocity_error, has_transmission, penalty = self._objective_arrays(valid_candidates)
+            _trace.debug("assign_fitness", lambda: f"Fitness calculation - Cost range: [{cost.min():.2f}, {cost.max():.2f}], "
+                                                   f"Power range: [{power.min():.2f}, {power.max():.2f}], "
+                                                   f"Safety range: [{safety.min():.2f}, {safety.max():.2f}]")
+
+            fitness = weighted_fitness(cost, power, safety, velocity_error, has_transmission, penalty, self.settings)
+            for c, score in zip(valid_candidates, fitness.tolist()):
+                c.fitness_score = score
 
-                # Cải thiện: Xử lý trường hợp đặc biệt khi tất cả giá trị giống nhau
-                if max_cost > min_cost:
-                    cost_norm = (cost - min_cost) / (max_cost - min_cost)
-                else:
-                    cost_norm = 0.5  # Giá trị trung bình nếu tất cả cost giống nhau
-                
-                if max_power > min_power:
-                    power_norm = (power - min_power) / (max_power - min_power)
-                else:
-                    power_norm = 0.5  # Giá trị trung bình nếu tất cả power giống nhau
-                
-                # Cải thiện tính toán safety_norm để xử lý trường hợp max_safety == min_safety
-                if max_safety > min_safety:
-                    safety_norm = (safety - min_safety) / (max_safety - min_safety)
-                else:
-                    # Nếu tất cả candidate có safety giống nhau, ưu tiên safety cao hơn
-                    target_safety = self.settings.min_belt_safety_factor
-                    if target_safety > 0:
-                        # Penalty nếu safety thấp hơn target, thưởng nếu cao hơn
-                        if safety >= target_safety:
-                            safety_norm = 0.0  # Không penalty cho safety tốt
-                        else:
-                            safety_norm = (target_safety - safety) / target_safety  # Penalty tăng dần
-                    else:
-                        safety_norm = 0.5  # Giá trị trung bình nếu không có target
-                
-                # Cải tiến mới: Chuẩn hóa sai số vận tốc
-                velocity_error_norm = 0.0
-                if hasattr(c.calculation_result, 'transmission_solution') and c.calculation_result.transmission_solution:
-                    vel_err = getattr(c.calculation_result.transmission_solution, "velocity_error_percent", 0.0)
-                    if max_velocity_error > min_velocity_error:
-                        velocity_error_norm = (vel_err - min_velocity_error) / (max_velocity_error - min_velocity_error)
-                    else:
-                        velocity_error_norm = 0.0  # Không có sự khác biệt
-                else:
-                    velocity_error_norm = 1.0  # Penalty cao nếu không có transmission solution
-
-                # Tính fitness cơ bản với cải thiện (tích hợp sai số vận tốc)
-                base_fitness = (
-                    self.settings.w_cost * cost_norm
-                    + self.settings.w_power * power_norm
-                    - self.settings.w_safety * safety_norm
-                    + self.settings.w_velocity_error * velocity_error_norm
-                )
-                
-                # Log chi tiết để debug (bao gồm sai số vận tốc)
-                vel_err = getattr(c.calculation_result.transmission_solution, "velocity_error_percent", 0.0) if hasattr(c.calculation_result, 'transmission_solution') and c.calculation_result.transmission_solution else 0.0
-                print(f"DEBUG: Candidate {c.belt_width_mm}mm - Cost: {cost:.2f} (norm: {cost_norm:.3f}), "
-                      f"Power: {power:.2f} (norm: {power_norm:.3f}), "
-                      f"Safety: {safety:.2f} (norm: {safety_norm:.3f}), "
-                      f"Velocity Error: {vel_err:.2f}% (norm: {velocity_error_norm:.3f}), "
-                      f"Base fitness: {base_fitness:.3f}")
-                
-                # Penalize các vấn đề (nhưng không loại bỏ hoàn toàn)
-                penalty = 0.0
-                if hasattr(c, 'invalid_reasons'):
-                    for reason in c.invalid_reasons:
-                        if "No transmission solution" in reason:
-                            penalty += 0.5  # Tăng penalty từ 30% lên 50% cho không có transmission
-                        elif "CẢNH BÁO" in reason or "⚠️" in reason:
-                            penalty += 0.4  # Tăng penalty từ 20% lên 40% cho cảnh báo nghiêm trọng
-                        elif "Warning:" in reason:
-                            penalty += 0.3  # Tăng penalty từ 20% lên 30% cho warnings thông thường
-                        elif "Cost too high" in reason:
-                            penalty += 0.2  # Tăng penalty từ 10% lên 20% cho cost cao
-                        elif "Safety factor too low" in reason:
-                            penalty += 0.6  # Thêm penalty cao cho safety factor thấp
-                        elif "vượt năng lực tiết diện" in reason or "bị khống chế bởi tiết diện" in reason:
-                            penalty += 0.4  # Thêm penalty cho vấn đề tiết diện
-                        elif "tốc độ" in reason.lower() and ("vượt quá" in reason or "cao" in reason):
-                            penalty += 0.35  # Thêm penalty cho vấn đề tốc độ
-                        elif "High velocity error" in reason:
-                            penalty += 0.25  # Thêm penalty cho sai số vận tốc cao
-                
-                # Thêm penalty dựa trên safety factor nếu quá thấp
-                if safety < self.settings.min_belt_safety_factor:
-                    safety_penalty = (self.settings.min_belt_safety_factor - safety) / self.settings.min_belt_safety_factor
-                    penalty += safety_penalty * 0.3  # Penalty tối đa 30% cho safety thấp
-                
-                final_fitness = base_fitness + penalty
-                
-                # Validation: Đảm bảo fitness score không vô cùng
-                if not (float('-inf') < final_fitness < float('inf')):
-                    print(f"Warning: Invalid fitness score detected for candidate {c.belt_width_mm}mm: {final_fitness}")
-                    print(f"  Base fitness: {base_fitness}, Penalty: {penalty}")
-                    # Sử dụng giá trị fallback an toàn
-                    final_fitness = 10.0  # Giá trị fallback cao (fitness càng thấp càng tốt)
-                
-                c.fitness_score = final_fitness
-                
-                # Log penalty để debug
-                if penalty > 0:
-                    print(f"DEBUG: Candidate {c.belt_width_mm}mm - Penalty: {penalty:.3f}, Final fitness: {final_fitness:.3f}")
-            
             # Log tổng kết fitness calculation
-            fitness_scores = [c.fitness_score for c in valid_candidates]
-            if fitness_scores:
-                min_fitness = min(fitness_scores)
-                max_fitness = max(fitness_scores)
-                avg_fitness = sum(fitness_scores) / len(fitness_scores)
-                print(f"DEBUG: Fitness summary - Min: {min_fitness:.3f}, Max: {max_fitness:.3f}, Avg: {avg_fitness:.3f}")
-                
-                # Sắp xếp candidates theo fitness để debug
-                sorted_candidates = sorted(valid_candidates, key=lambda x: x.fitness_score)
-                print(f"DEBUG: Top 3 candidates by fitness:")
-                for i, candidate in enumerate(sorted_candidates[:3]):
-                    vel_err = getattr(candidate.calculation_result.transmission_solution, "velocity_error_percent", 0.0) if hasattr(candidate.calculation_result, 'transmission_solution') and candidate.calculation_result.transmission_solution else 0.0
-                    print(f"  {i+1}. Width: {candidate.belt_width_mm}mm, Fitness: {candidate.fitness_score:.3f}, Velocity Error: {vel_err:.2f}%")
-                
+            _trace.debug("assign_fitness", lambda: f"Fitness summary - Min: {fitness.min():.3f}, Max: {fitness.max():.3f}, "
+                                                   f"Avg: {fitness.mean():.3f}")
+            # Sắp xếp candidates theo fitness để debug (chỉ khi đang bật truy vết)
+            if _trace.enabled:
+                _trace.debug("assign_fitness", "Top 3 candidates by fitness:")
+                for rank, i in enumerate(np.argsort(fitness, kind="stable")[:3]):
+                    candidate = valid_candidates[i]
+                    _trace.debug("assign_fitness", lambda: f"  {rank+1}. Width: {candidate.belt_width_mm}mm, "
+                                                           f"Fitness: {candidate.fitness_score:.3f}, "
+                                                           f"Velocity Error: {velocity_error[i]:.2f}%")
+
         except Exception as e:
             print(f"Optimizer: Error in fitness calculation: {e}")
             # Fallback: gán fitness score đơn giản
             for c in valid_candidates:
                 c.fitness_score = 1.0  # Default fitness score
 
+    @staticmethod
+    def _genes(candidate: DesignCandidate) -> tuple:
+        return (candidate.belt_width_mm, candidate.belt_type_name, candidate.gearbox_ratio, candidate.chain_spec_designation)
+
+    def _compute_evaluations(self, genes_list: List[tuple]) -> dict:
+        """Chạy evaluate_design cho danh sách bộ gene (ProcessPool nếu có, ngược lại ThreadPool)."""
+        if not genes_list:
+            return {}
+        if self._is_decomposed():
+            return self._compute_decomposed(genes_list)
+        if self._process_pool is not None:
+            try:
+                # Chỉ gửi gene (tuple gọn) sang worker, nhận về kết quả đã nén
+                chunksize = max(1, len(genes_list) // (self._process_workers * 4))
+                packed = list(self._process_pool.map(_evaluate_genes_in_worker, genes_list, chunksize=chunksize))
+                return {genes: _unpack_evaluation(p) for genes, p in zip(genes_list, packed)}
+            except BrokenProcessPool as e:
+                print(f"Optimizer: Warning: ProcessPool bị lỗi ({e}), chuyển sang ThreadPool")
+                self._process_pool = None
+                self._process_workers = 0
+
+        # Cải thiện BƯỚC 6: Giới hạn max_workers cho ThreadPool
+        max_workers = self._worker_count()
+        logger.debug(f"Using ThreadPool with max_workers={max_workers}")
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            evaluations = list(executor.map(lambda genes: evaluate_design(self.base_params, self.settings, genes), genes_list))
+        return dict(zip(genes_list, evaluations))
+
+    def _compute_decomposed(self, genes_list: List[tuple]) -> dict:
+        """Chế độ phân rã: engine chạy một lần cho mỗi (bề rộng, loại băng), sau đó chỉ giải bộ truyền động."""
+        evaluations = {}
+        for genes in genes_list:
+            belt_key = (genes[0], genes[1])
+            belt_stage = self._belt_stages.get(belt_key)
+            if belt_stage is None:
+                belt_stage = self._new_belt_stage(genes[0], genes[1])
+                self._belt_stages[belt_key] = belt_stage
+            evaluations[genes] = self._drive_stage(belt_stage, genes)
+            self.drive_stage_evaluations += 1
+        return evaluations
+
+    def _new_belt_stage(self, belt_width_mm: int, belt_type_name: str) -> tuple:
+        """evaluate_belt_stage cho bài toán hiện tại, cộng profile (nếu đang đo) vào self.profile."""
+        belt_stage = evaluate_belt_stage(self.base_params, belt_width_mm, belt_type_name, profile=self.profile is not None)
+        if self.profile is not None and belt_stage[1] is not None:
+            self.profile.add(belt_stage[1].profile)
+        return belt_stage
+
+    def _drive_stage(self, belt_stage: tuple, genes: tuple) -> tuple:
+        """
+        evaluate_drive_stage; khi đang đo, thời gian tìm bộ truyền động được cộng vào self.profile
+        và result.profile của thiết kế = profile băng tải + profile truyền động.
+        """
+        if self.profile is None:
+            return evaluate_drive_stage(belt_stage, self.settings, genes)
+        with profile_calculation(count_calculation=False) as drive_profile:
+            evaluation = evaluate_drive_stage(belt_stage, self.settings, genes)
+        self.profile.add(drive_profile)
+        result = evaluation[0]
+        if result is not belt_stage[1] and getattr(result, "profile", None) is not None:
+            result.profile = result.profile.merged(drive_profile)
+        return evaluation
+
     def _evaluate_candidate(self, candidate: DesignCandidate):
         """Chạy core.engine.calculate và kiểm tra tính hợp lệ cho một cá thể."""
-        # Bước 1: Tính tốc độ theo CHÍNH bề rộng của candidate
-        from core.optimize import calculate_belt_speed
-        
-        try:
-            # Lấy thông số từ base_params
-            capacity_tph = self.base_params.Qt_tph
-            density_tpm3 = self.base_params.density_tpm3
-            particle_mm = self.base_params.particle_size_mm
-            material_name = self.base_params.material
-            trough_angle_deg = 20.0  # Default, có thể cải thiện sau
-            surcharge_angle_deg = getattr(self.base_params, 'surcharge_angle_deg', 20.0) or 20.0
-            
-            # Cải thiện: Luôn lấy material_characteristics từ base_params
-            material_characteristics = {
-                'is_abrasive': getattr(self.base_params, 'is_abrasive', True),
-                'is_corrosive': getattr(self.base_params, 'is_corrosive', False),
-                'is_dusty': getattr(self.base_params, 'is_dusty', True)
-            }
-            
-            # Tối ưu/tính tốc độ theo CHÍNH bề rộng của candidate
-            v_final, v_req, v_rec, area_m2, speed_warnings, max_speed_allowed = calculate_belt_speed(
-                capacity_tph=capacity_tph,
-                density_tpm3=density_tpm3,
-                belt_width_mm=candidate.belt_width_mm,
-                particle_mm=particle_mm,
-                material_name=material_name,
-                trough_angle_deg=trough_angle_deg,
-                surcharge_angle_deg=surcharge_angle_deg,
-                material_characteristics=material_characteristics  # Truyền material_characteristics
-            )
-            
-            # Sử dụng bề rộng từ candidate và tốc độ được tính cho chính bề rộng đó
-            params = copy.deepcopy(self.base_params)
-            params.B_mm = candidate.belt_width_mm  # Giữ nguyên bề rộng từ candidate
-            params.V_mps = v_final  # Sử dụng tốc độ được tính cho chính bề rộng này
-            params.belt_type = candidate.belt_type_name
-            # Chế độ manual để sử dụng gearbox_ratio của candidate
-            params.gearbox_ratio_mode = "manual"
-            params.gearbox_ratio_user = candidate.gearbox_ratio
-            
-            # Truyền gene xích vào engine nếu engine hỗ trợ
-            if hasattr(params, "chain_selection_mode"):
-                params.chain_selection_mode = "manual"
-            if hasattr(params, "chain_spec_designation"):
-                params.chain_spec_designation = candidate.chain_spec_designation
-            
-            # Lưu thông tin tốc độ vào candidate để debug
-            candidate.auto_calculated_speed = v_final
-            candidate.speed_warnings = speed_warnings
-            
-        except Exception as e:
-            print(f"DEBUG ERROR: Failed to calculate auto speed for {candidate}: {e}")
-            # Fallback: sử dụng tham số gốc với tốc độ an toàn
-            params = copy.deepcopy(self.base_params)
-            params.B_mm = candidate.belt_width_mm
-            params.V_mps = 2.0  # Tốc độ mặc định an toàn (đã được cải thiện từ 5.0 m/s)
-            params.belt_type = candidate.belt_type_name
-            params.gearbox_ratio_mode = "manual"
-            params.gearbox_ratio_user = candidate.gearbox_ratio
-            
-            # Truyền gene xích vào engine nếu engine hỗ trợ (fallback)
-            if hasattr(params, "chain_selection_mode"):
-                params.chain_selection_mode = "manual"
-            if hasattr(params, "chain_spec_designation"):
-                params.chain_spec_designation = candidate.chain_spec_designation
-
-        try:
-            print(f"DEBUG: Evaluating candidate {candidate}")
-            result = calculate(params)
-            candidate.calculation_result = result
-            print(f"DEBUG: Calculation completed for {candidate}")
-
-            # Kiểm tra tính hợp lệ - Làm mềm hơn để tìm được giải pháp
-            is_valid = True
-            invalid_reasons = []
-            
-            # Kiểm tra transmission_solution - Chỉ cảnh báo, không loại bỏ
-            if not hasattr(result, 'transmission_solution') or result.transmission_solution is None:
-                print(f"DEBUG WARNING: {candidate} - No transmission solution (will be penalized but not rejected)")
-                invalid_reasons.append("No transmission solution")
-                # Không set is_valid = False, chỉ penalize trong fitness
-            
-            # Kiểm tra safety_factor - Chỉ loại bỏ nếu quá thấp
-            safety_val = getattr(result, 'safety_factor', 0)
-            # Ngưỡng an toàn cứng: không bao giờ chấp nhận safety_factor < 4.0
-            hard_safety_threshold = 4.0
-            sf_threshold = max(hard_safety_threshold, float(self.settings.min_belt_safety_factor))
-            if safety_val < sf_threshold:
-                print(f"DEBUG INVALID: {candidate} - Safety factor {safety_val} < {sf_threshold} (below hard threshold {hard_safety_threshold})")
-                is_valid = False
-                invalid_reasons.append(f"Safety factor too low: {safety_val} < {sf_threshold} (hard threshold: {hard_safety_threshold})")
-            
-            # Kiểm tra budget - Chỉ loại bỏ nếu vượt quá nhiều
-            if self.settings.max_budget_usd:
-                cost_val = getattr(result, 'cost_capital_total', float('inf'))
-                if cost_val > self.settings.max_budget_usd * 1.5:  # Cho phép vượt 50%
-                    print(f"DEBUG INVALID: {candidate} - Cost {cost_val} > {self.settings.max_budget_usd * 1.5}")
-                    is_valid = False
-                    invalid_reasons.append(f"Cost too high: {cost_val}")
-            
-            # Kiểm tra sai số vận tốc - Cải tiến mới
-            if hasattr(result, 'transmission_solution') and result.transmission_solution:
-                vel_err = getattr(result.transmission_solution, "velocity_error_percent", 0.0)
-                if vel_err > self.settings.max_velocity_error_percent:
-                    print(f"DEBUG INVALID: {candidate} - Velocity error {vel_err:.2f}% > {self.settings.max_velocity_error_percent}% (above threshold)")
-                    is_valid = False
-                    invalid_reasons.append(f"Velocity error too high: {vel_err:.2f}% > {self.settings.max_velocity_error_percent}%")
-                elif vel_err > 5.0:  # Cảnh báo nếu > 5% (ngưỡng cảnh báo cố định)
-                    print(f"DEBUG WARNING: {candidate} - Velocity error {vel_err:.2f}% above warning threshold 5%")
-                    invalid_reasons.append(f"Warning: High velocity error: {vel_err:.2f}%")
-                
-                # Log sai số vận tốc để theo dõi
-                print(f"DEBUG: {candidate} - Velocity error: {vel_err:.2f}%")
-            
-            # Kiểm tra các cảnh báo quan trọng - Chỉ cảnh báo
-            if hasattr(result, 'warnings') and result.warnings:
-                for warning in result.warnings:
-                    if "vượt năng lực tiết diện" in warning or "bị khống chế bởi tiết diện" in warning:
-                        print(f"DEBUG WARNING: {candidate} - Warning: {warning} (will be penalized)")
-                        invalid_reasons.append(f"Warning: {warning}")
-                        # Không set is_valid = False, chỉ penalize
-            
-            # Gom speed_warnings vào invalid_reasons để bị phạt trong fitness
-            if getattr(candidate, "speed_warnings", None):
-                for w in candidate.speed_warnings:
-                    invalid_reasons.append(f"Warning: {w}")
-            
-            # Lưu lý do không hợp lệ để debug
-            if invalid_reasons:
-                candidate.invalid_reasons = invalid_reasons
-            
-            candidate.is_valid = is_valid
-            print(f"DEBUG: Candidate {candidate} - Valid: {is_valid}, Reasons: {invalid_reasons if invalid_reasons else 'None'}")
+        self._apply_evaluation(candidate, evaluate_design(self.base_params, self.settings, self._genes(candidate)))
 
-        except Exception as e:
-            # Nếu có lỗi trong quá trình tính toán, coi như không hợp lệ
-            print(f"DEBUG ERROR: Calculation failed for {candidate}: {e}")
-            candidate.is_valid = False
-            candidate.calculation_result = CalculationResult()
-            candidate.calculation_result.warnings.append(f"Lỗi tính toán: {e}")
-            candidate.invalid_reasons = [f"Lỗi tính toán: {e}"]
+    def _apply_evaluation(self, candidate: DesignCandidate, evaluation: tuple):
+        """Gán kết quả của evaluate_design vào cá thể."""
+        result, is_valid, invalid_reasons, auto_calculated_speed, speed_warnings = evaluation
+        candidate.calculation_result = result
+        candidate.is_valid = is_valid
+        # Lưu lý do không hợp lệ để debug (bản sao danh sách, kết quả có thể dùng chung qua cache)
+        if invalid_reasons:
+            candidate.invalid_reasons = list(invalid_reasons)
+        # Lưu thông tin tốc độ vào candidate để debug
+        if auto_calculated_speed is not None:
+            candidate.auto_calculated_speed = auto_calculated_speed
+            candidate.speed_warnings = speed_warnings
 
     def _create_safe_candidate(self, belt_width_mm: int = None, belt_type_name: str = None, 
                               gearbox_ratio: float = None, chain_spec_designation: str = None) -> DesignCandidate:
@@ -725,23 +1508,23 @@ class Optimizer:
             # Validation và fallback cho từng gene
             if belt_width_mm is None or belt_width_mm not in STANDARD_WIDTHS:
                 belt_width_mm = random.choice(STANDARD_WIDTHS)
-                print(f"DEBUG: Invalid belt_width_mm, using fallback: {belt_width_mm}mm")
+                _trace.debug("create_safe_candidate", lambda: f"Invalid belt_width_mm, using fallback: {belt_width_mm}mm")
             
             if belt_type_name is None or belt_type_name not in ACTIVE_BELT_SPECS:
                 belt_type_name = random.choice(list(ACTIVE_BELT_SPECS.keys()))
-                print(f"DEBUG: Invalid belt_type_name, using fallback: {belt_type_name}")
+                _trace.debug("create_safe_candidate", lambda: f"Invalid belt_type_name, using fallback: {belt_type_name}")
             
             if gearbox_ratio is None or gearbox_ratio not in STANDARD_GEARBOX_RATIOS:
                 gearbox_ratio = random.choice(STANDARD_GEARBOX_RATIOS)
-                print(f"DEBUG: Invalid gearbox_ratio, using fallback: {gearbox_ratio}")
+                _trace.debug("create_safe_candidate", lambda: f"Invalid gearbox_ratio, using fallback: {gearbox_ratio}")
             
             if chain_spec_designation is None:
-                chain_designations = [cs.designation for cs in ACTIVE_CHAIN_SPECS if cs.designation]
+                chain_designations = ACTIVE_CHAIN_SPECS.designations
                 if chain_designations:
                     chain_spec_designation = random.choice(chain_designations)
                 else:
                     chain_spec_designation = "05B"  # Default fallback
-                print(f"DEBUG: Invalid chain_spec_designation, using fallback: {chain_spec_designation}")
+                _trace.debug("create_safe_candidate", lambda: f"Invalid chain_spec_designation, using fallback: {chain_spec_designation}")
             
             # Tạo candidate với các gene đã được validate
             candidate = DesignCandidate(
@@ -757,7 +1540,7 @@ class Optimizer:
             return candidate
             
         except Exception as e:
-            print(f"DEBUG: Error creating safe candidate: {e}, using hardcoded fallback")
+            _trace.debug("create_safe_candidate", lambda: f"Error creating safe candidate: {e}, using hardcoded fallback")
             # Hardcoded fallback cuối cùng
             return DesignCandidate(
                 belt_width_mm=600,
@@ -791,11 +1574,11 @@ class Optimizer:
         # 80% khả năng chọn best, 20% khả năng chọn random để duy trì đa dạng
         if random.random() < 0.8:
             selected = tournament[0]  # Chọn best
-            print(f"DEBUG: Tournament selection: Best candidate selected (fitness: {selected.fitness_score:.3f})")
+            _trace.debug("tournament_selection", lambda: f"Tournament selection: Best candidate selected (fitness: {selected.fitness_score:.3f})")
         else:
             # Chọn random từ tournament để duy trì đa dạng
             selected = random.choice(tournament)
-            print(f"DEBUG: Tournament selection: Random candidate selected (fitness: {selected.fitness_score:.3f}) for diversity")
+            _trace.debug("tournament_selection", lambda: f"Tournament selection: Random candidate selected (fitness: {selected.fitness_score:.3f}) for diversity")
         
         return selected
 
@@ -873,7 +1656,7 @@ class Optimizer:
             child2.invalid_reasons = []
             
             # Log crossover method để debug
-            print(f"DEBUG: Crossover method: {crossover_method} for parents {parent1.belt_width_mm}mm and {parent2.belt_width_mm}mm")
+            _trace.debug("crossover", lambda: f"Crossover method: {crossover_method} for parents {parent1.belt_width_mm}mm and {parent2.belt_width_mm}mm")
             
         except Exception as e:
             print(f"Optimizer: Error in crossover: {e}")
@@ -886,7 +1669,7 @@ class Optimizer:
     def _mutate(self, candidate: DesignCandidate, mutation_rate: float):
         """Thực hiện đột biến gen với một xác suất nhất định và cải tiến."""
         belt_types = list(ACTIVE_BELT_SPECS.keys())
-        chain_designations = [cs.designation for cs in ACTIVE_CHAIN_SPECS if cs.designation]
+        chain_designations = ACTIVE_CHAIN_SPECS.designations
 
         if not chain_designations:
             chain_designations = ["05B", "08A", "16B"]  # Default fallback
@@ -904,7 +1687,7 @@ class Optimizer:
             # Nếu fitness score cao (kém), tăng mutation rate
             if candidate.fitness_score > 5.0:  # Fitness càng thấp càng tốt
                 adaptive_factor = 1.5
-                print(f"DEBUG: High fitness score detected ({candidate.fitness_score:.3f}), increasing mutation rate by {adaptive_factor}x")
+                _trace.debug("mutate", lambda: f"High fitness score detected ({candidate.fitness_score:.3f}), increasing mutation rate by {adaptive_factor}x")
             else:
                 adaptive_factor = 1.0
         else:
@@ -940,7 +1723,7 @@ class Optimizer:
         
         # Log mutations để debug
         if mutations_applied:
-            print(f"DEBUG: Mutations applied to candidate {candidate.belt_width_mm}mm: {', '.join(mutations_applied)}")
+            _trace.debug("mutate", lambda: f"Mutations applied to candidate {candidate.belt_width_mm}mm: {', '.join(mutations_applied)}")
         
         # Sau khi đột biến, reset kết quả để được đánh giá lại
         candidate.calculation_result = None
@@ -0,0 +1,224 @@
+# core/optimizer/pareto.py
+"""
+Chế độ đa mục tiêu NSGA-II: trả về toàn bộ mặt Pareto thay vì một điểm fitness có trọng số.
+
+Mỗi thiết kế hợp lệ được mô tả bằng một hàng của ma trận mục tiêu (đều là cực tiểu hóa):
+chi phí đầu tư, công suất yêu cầu, -hệ số an toàn, sai số vận tốc và mức phạt (cùng bảng phạt
+với Optimizer._assign_fitness). Sắp xếp không trội nhanh và khoảng cách đám đông được tính trên
+ma trận NumPy, không phụ thuộc trọng số của OptimizerSettings.
+
+Các thiết kế chỉ được chấp nhận nhờ bước làm mềm ràng buộc (Optimizer._relax_constraints) vẫn mang
+lý do loại bỏ của _check_design; chúng bị xếp sau mọi thiết kế thỏa ràng buộc (trội có ràng buộc).
+
+Vì mặt Pareto không phụ thuộc trọng số, giao diện có thể xếp hạng lại theo bất kỳ trọng số nào
+bằng ParetoFront.ranked mà không cần chạy lại engine:
+
+    front = optimizer.run_pareto(generations=40, population_size=80)
+    front.ranked(w_cost=0.2, w_safety=0.8)[:10]
+"""
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .models import DesignCandidate, OptimizerSettings
+from .optimizer import _PENALTY_BY_CODE, _has_transmission
+from core.diagnostics import DiagCode
+
+# Tên các cột của ma trận mục tiêu (đều cực tiểu hóa)
+OBJECTIVES = ("cost", "power", "safety", "velocity_error", "penalty")
+# Cột được cộng thẳng vào điểm xếp hạng (không chuẩn hóa), như mức phạt trong fitness có trọng số
+_PENALTY_COLUMN = OBJECTIVES.index("penalty")
+
+# Lý do khiến _check_design loại bỏ thiết kế (is_valid=False trước khi làm mềm ràng buộc)
+_REJECTING_CODES = frozenset({
+    DiagCode.SF_BELOW_THRESHOLD,
+    DiagCode.COST_TOO_HIGH,
+    DiagCode.VELOCITY_ERROR_TOO_HIGH,
+    DiagCode.CALCULATION_ERROR,
+})
+
+# Số hàng mỗi khối khi dựng ma trận trội (giới hạn bộ nhớ tạm n × khối × số mục tiêu)
+_DOMINANCE_BLOCK = 512
+
+
+def objective_matrix(candidates: Sequence[DesignCandidate], settings: OptimizerSettings) -> np.ndarray:
+    """
+    Ma trận mục tiêu (cá thể × OBJECTIVES) của các cá thể đã được đánh giá.
+
+    Thiết kế không có bộ truyền động nhận sai số vận tốc bằng ngưỡng tối đa cho phép
+    (OptimizerSettings.max_velocity_error_percent) và đã bị phạt NO_TRANSMISSION.
+
+    Args:
+        candidates: Các cá thể có calculation_result
+        settings: Cài đặt tối ưu hóa (ngưỡng SF tối thiểu, sai số vận tốc tối đa)
+
+    Returns:
+        np.ndarray float (n, len(OBJECTIVES))
+    """
+    min_sf = settings.min_belt_safety_factor
+    rows = []
+    for c in candidates:
+        result = c.calculation_result
+        safety = getattr(result, 'safety_factor', 0)
+        if _has_transmission(result):
+            velocity_error = getattr(result.transmission_solution, "velocity_error_percent", 0.0)
+        else:
+            velocity_error = settings.max_velocity_error_percent
+        penalty = sum(_PENALTY_BY_CODE[reason.code] for reason in c.invalid_reasons)
+        if safety < min_sf:
+            penalty += (min_sf - safety) / min_sf * 0.3
+        rows.append((getattr(result, 'cost_capital_total', 0), getattr(result, 'required_power_kw', 0),
+                     -safety, velocity_error, penalty))
+    matrix = np.array(rows, dtype=float).reshape(len(rows), len(OBJECTIVES))
+    # Giá trị không hữu hạn (lỗi tính toán) bị đẩy về cuối mọi mục tiêu
+    matrix[~np.isfinite(matrix)] = np.finfo(float).max
+    return matrix
+
+
+def constraint_violation(candidates: Sequence[DesignCandidate]) -> np.ndarray:
+    """Số ràng buộc bị vi phạm của từng cá thể (0 = thỏa mọi ràng buộc của _check_design)."""
+    return np.array([sum(1 for reason in c.invalid_reasons if reason.code in _REJECTING_CODES)
+                     for c in candidates], dtype=np.int64)
+
+
+def dominance_matrix(F: np.ndarray) -> np.ndarray:
+    """
+    D[i, j] = True nếu hàng i trội hàng j (không kém hơn ở mọi mục tiêu và tốt hơn ở ít nhất một).
+
+    Args:
+        F: Ma trận mục tiêu (n, m), cực tiểu hóa
+
+    Returns:
+        np.ndarray bool (n, n)
+    """
+    n = len(F)
+    D = np.empty((n, n), dtype=bool)
+    for start in range(0, n, _DOMINANCE_BLOCK):
+        block = F[start:start + _DOMINANCE_BLOCK, None, :]
+        D[start:start + _DOMINANCE_BLOCK] = (block <= F[None]).all(axis=2) & (block < F[None]).any(axis=2)
+    return D
+
+
+def fast_non_dominated_sort(F: np.ndarray, violation: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Sắp xếp không trội nhanh (Deb và cộng sự, 2002).
+
+    Args:
+        F: Ma trận mục tiêu (n, m), cực tiểu hóa
+        violation: Mức vi phạm ràng buộc của từng hàng; hàng vi phạm ít hơn luôn trội hàng vi phạm
+            nhiều hơn, cùng mức thì so theo mục tiêu
+
+    Returns:
+        np.ndarray int (n,): bậc của từng hàng (0 = mặt Pareto)
+    """
+    n = len(F)
+    ranks = np.full(n, -1, dtype=np.int64)
+    if n == 0:
+        return ranks
+    if violation is not None and np.any(violation != violation[0]):
+        offset = 0
+        for level in np.unique(violation):
+            members = np.flatnonzero(violation == level)
+            ranks[members] = fast_non_dominated_sort(F[members]) + offset
+            offset = ranks[members].max() + 1
+        return ranks
+    D = dominance_matrix(F)
+    # Số hàng còn lại đang trội mỗi hàng; mỗi mặt là các hàng không còn bị trội
+    dominated_by = D.sum(axis=0)
+    remaining = np.ones(n, dtype=bool)
+    front = 0
+    while remaining.any():
+        current = remaining & (dominated_by == 0)
+        ranks[current] = front
+        remaining &= ~current
+        dominated_by -= D[current].sum(axis=0)
+        front += 1
+    return ranks
+
+
+def crowding_distance(F: np.ndarray, ranks: np.ndarray) -> np.ndarray:
+    """
+    Khoảng cách đám đông của từng hàng trong mặt của nó.
+
+    Hai đầu mút của mỗi mục tiêu nhận vô cùng; các hàng khác cộng khoảng cách chuẩn hóa giữa
+    hai hàng kề nhau theo từng mục tiêu.
+
+    Args:
+        F: Ma trận mục tiêu (n, m)
+        ranks: Bậc từ fast_non_dominated_sort
+
+    Returns:
+        np.ndarray float (n,)
+    """
+    distance = np.zeros(len(F))
+    for front in np.unique(ranks):
+        members = np.flatnonzero(ranks == front)
+        if len(members) <= 2:
+            distance[members] = np.inf
+            continue
+        Ff = F[members]
+        order = np.argsort(Ff, axis=0, kind="stable")
+        sorted_F = np.take_along_axis(Ff, order, axis=0)
+        span = sorted_F[-1] - sorted_F[0]
+        gaps = np.zeros_like(sorted_F)
+        gaps[1:-1] = (sorted_F[2:] - sorted_F[:-2]) / np.where(span > 0, span, 1.0)
+        gaps[0] = gaps[-1] = np.inf
+        local = np.zeros(Ff.shape)
+        np.put_along_axis(local, order, gaps, axis=0)
+        distance[members] = local.sum(axis=1)
+    return distance
+
+
+def crowded_order(ranks: np.ndarray, crowding: np.ndarray) -> np.ndarray:
+    """Thứ tự chọn lọc của NSGA-II: bậc tăng dần, cùng bậc thì khoảng cách đám đông giảm dần."""
+    return np.lexsort((-crowding, ranks))
+
+
+class ParetoFront(NamedTuple):
+    """Mặt Pareto cuối cùng: các thiết kế không trội và ma trận mục tiêu tương ứng (cùng thứ tự)."""
+    candidates: Tuple[DesignCandidate, ...]
+    objectives: np.ndarray       # (n, len(OBJECTIVES)), cực tiểu hóa; cột "safety" là -SF
+
+    def column(self, name: str) -> np.ndarray:
+        """Một mục tiêu theo giá trị thật (SF dương)."""
+        values = self.objectives[:, OBJECTIVES.index(name)]
+        return -values if name == "safety" else values
+
+    def weighted_scores(self, w_cost: float = 0.6, w_power: float = 0.3, w_safety: float = 0.1,
+                        w_velocity_error: float = 0.1) -> np.ndarray:
+        """
+        Điểm có trọng số của mọi thiết kế trên mặt (càng thấp càng tốt).
+
+        Mỗi mục tiêu được chuẩn hóa min/max trên chính mặt Pareto (cố định sau khi chạy, không
+        phụ thuộc quần thể của từng thế hệ); mức phạt được cộng thẳng như fitness có trọng số.
+
+        Returns:
+            np.ndarray float (n,)
+        """
+        if not len(self.candidates):
+            return np.zeros(0)
+        F = self.objectives
+        low = F.min(axis=0)
+        span = F.max(axis=0) - low
+        normalized = np.where(span > 0, (F - low) / np.where(span > 0, span, 1.0), 0.0)
+        weights = np.array([w_cost, w_power, w_safety, w_velocity_error, 0.0])
+        return normalized @ weights + F[:, _PENALTY_COLUMN]
+
+    def ranked(self, settings: Optional[OptimizerSettings] = None, **weights) -> List[DesignCandidate]:
+        """
+        Thiết kế trên mặt xếp theo điểm có trọng số; fitness_score của từng thiết kế được gán lại.
+
+        Args:
+            settings: Lấy trọng số từ OptimizerSettings (w_cost, w_power, w_safety, w_velocity_error)
+            **weights: Trọng số ghi đè (cùng tên)
+
+        Returns:
+            List[DesignCandidate] theo điểm tăng dần
+        """
+        if settings is not None:
+            weights = {"w_cost": settings.w_cost, "w_power": settings.w_power, "w_safety": settings.w_safety,
+                       "w_velocity_error": settings.w_velocity_error, **weights}
+        scores = self.weighted_scores(**weights)
+        for candidate, score in zip(self.candidates, scores):
+            candidate.fitness_score = float(score)
+        return [self.candidates[i] for i in np.argsort(scores, kind="stable")]
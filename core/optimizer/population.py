@@ -0,0 +1,271 @@
+# core/optimizer/population.py
+"""
+Quần thể mã hóa số nguyên cho GA (OptimizerSettings.population_encoding = "matrix").
+
+Mỗi cá thể là một hàng (bề rộng, loại băng, hộp số, xích) gồm các chỉ số vào GeneTables, cả
+quần thể là một ma trận NumPy (n, 4). Chọn lọc, lai ghép và đột biến được vector hóa trên toàn
+quần thể theo đúng các quy tắc của Optimizer._tournament_selection/_crossover/_mutate; kết quả
+đánh giá được lưu theo mã phẳng của thiết kế (DesignEvaluations) nên fitness của mọi hàng chỉ là
+phép lấy chỉ số mảng. DesignCandidate chỉ được dựng cho các thiết kế được báo cáo.
+"""
+from dataclasses import dataclass
+from typing import Tuple
+
+import numpy as np
+
+from .models import OptimizerSettings
+
+GENE_COUNT = 4
+WIDTH, BELT, GEARBOX, CHAIN = range(GENE_COUNT)
+
+# Hệ số đột biến theo gene (như Optimizer._mutate): bề rộng, loại băng, hộp số, xích
+_GENE_MUTATION_FACTORS = np.array([1.2, 0.8, 1.0, 0.9])
+# Trọng số độ đa dạng theo gene (như Optimizer._calculate_diversity)
+_DIVERSITY_WEIGHTS = np.array([0.4, 0.2, 0.3, 0.1])
+# Ngưỡng an toàn cứng khi làm mềm ràng buộc (như Optimizer._relax_constraints)
+HARD_SAFETY_THRESHOLD = 4.0
+
+
+@dataclass(frozen=True)
+class GeneTables:
+    """Bảng giá trị của từng gene; một cá thể mã hóa là bộ chỉ số vào các bảng này."""
+    widths: tuple
+    belt_types: tuple
+    gearbox_ratios: tuple
+    chains: tuple
+
+    @classmethod
+    def active(cls) -> 'GeneTables':
+        """Bảng gene theo CSDL đang dùng (cùng không gian với bộ giải chính xác)."""
+        from .exact import design_space
+        widths, belt_types, gearbox_ratios, chains = design_space()
+        return cls(tuple(widths), tuple(belt_types), tuple(gearbox_ratios), tuple(chains))
+
+    @property
+    def sizes(self) -> np.ndarray:
+        return np.array([len(self.widths), len(self.belt_types), len(self.gearbox_ratios), len(self.chains)])
+
+    @property
+    def space_size(self) -> int:
+        return int(np.prod(self.sizes))
+
+    def codes(self, population: np.ndarray) -> np.ndarray:
+        """Mã phẳng (0 .. space_size - 1) của từng hàng."""
+        return np.ravel_multi_index(population.T, tuple(self.sizes))
+
+    def rows(self, codes: np.ndarray) -> np.ndarray:
+        """Hàng chỉ số của các mã phẳng."""
+        return np.stack(np.unravel_index(codes, tuple(self.sizes)), axis=1)
+
+    def decode(self, row) -> tuple:
+        """Bộ gene (belt_width_mm, belt_type_name, gearbox_ratio, chain_spec_designation) của một hàng."""
+        w, b, g, c = (int(i) for i in row)
+        return self.widths[w], self.belt_types[b], self.gearbox_ratios[g], self.chains[c]
+
+    def encode(self, genes: tuple) -> Tuple[int, int, int, int]:
+        """
+        Hàng chỉ số của một bộ gene.
+
+        Raises:
+            ValueError: Nếu một gene không có trong bảng
+        """
+        width, belt_type, gearbox_ratio, chain = genes
+        return (self.widths.index(width), self.belt_types.index(belt_type),
+                self.gearbox_ratios.index(gearbox_ratio), self.chains.index(chain))
+
+
+class DesignEvaluations:
+    """Các đại lượng dùng cho fitness, lưu theo mã phẳng của thiết kế (mảng dày trên toàn không gian)."""
+
+    def __init__(self, tables: GeneTables):
+        n = tables.space_size
+        self.evaluated = np.zeros(n, dtype=bool)
+        self.valid = np.zeros(n, dtype=bool)
+        self.cost = np.zeros(n)
+        self.power = np.zeros(n)
+        self.safety = np.zeros(n)
+        self.velocity_error = np.zeros(n)
+        self.has_transmission = np.zeros(n, dtype=bool)
+        self.penalty = np.zeros(n)
+        # Kết quả đầy đủ của evaluate_design (để dựng DesignCandidate cho các thiết kế được báo cáo)
+        self.evaluations = {}
+
+    def store(self, code: int, evaluation: tuple, has_transmission: bool, reason_penalty: float):
+        result, is_valid = evaluation[0], evaluation[1]
+        self.evaluations[code] = evaluation
+        self.evaluated[code] = True
+        self.valid[code] = is_valid
+        self.cost[code] = getattr(result, 'cost_capital_total', 0)
+        self.power[code] = getattr(result, 'required_power_kw', 0)
+        self.safety[code] = getattr(result, 'safety_factor', 0)
+        self.has_transmission[code] = has_transmission
+        if has_transmission:
+            self.velocity_error[code] = getattr(result.transmission_solution, "velocity_error_percent", 0.0)
+        self.penalty[code] = reason_penalty
+
+
+def biased_population(rng: np.random.Generator, tables: GeneTables, n: int, base_width: int,
+                      base_belt_type: str) -> np.ndarray:
+    """
+    n cá thể ngẫu nhiên theo cùng chiến lược với Optimizer._initialize_population.
+
+    Bề rộng: 40% trong 5 bề rộng gần base_width, 42% trong nửa giữa, còn lại bất kỳ; loại băng và xích
+    ưu tiên giá trị gốc (60%); hộp số 50% trong 3 tỉ số gần tỉ số đầu tiên.
+
+    Returns:
+        np.ndarray int (n, GENE_COUNT)
+    """
+    widths = np.array(tables.widths)
+    ratios = np.array(tables.gearbox_ratios)
+    nearby_widths = np.argsort(np.abs(widths - base_width), kind="stable")[:5]
+    by_width = np.argsort(widths, kind="stable")
+    mid_widths = by_width[len(widths) // 4:3 * len(widths) // 4]
+    nearby_ratios = np.argsort(np.abs(ratios - ratios[0]), kind="stable")[:3]
+    base_belt = tables.belt_types.index(base_belt_type) if base_belt_type in tables.belt_types else 0
+
+    population = rng.integers(0, tables.sizes, (n, GENE_COUNT))
+    r_width, r_mid, r_belt, r_ratio, r_chain = rng.random((5, n))
+    near = r_width < 0.4
+    mid = ~near & (r_mid < 0.7)
+    population[near, WIDTH] = rng.choice(nearby_widths, near.sum())
+    population[mid, WIDTH] = rng.choice(mid_widths, mid.sum())
+    population[r_belt < 0.6, BELT] = base_belt
+    near_ratio = r_ratio < 0.5
+    population[near_ratio, GEARBOX] = rng.choice(nearby_ratios, near_ratio.sum())
+    population[r_chain < 0.6, CHAIN] = 0
+    return population
+
+
+def tournament_select(rng: np.random.Generator, fitness: np.ndarray, n: int, tournament_size: int,
+                      p_best: float = 0.8) -> np.ndarray:
+    """
+    n lần chọn lọc giải đấu: với xác suất p_best lấy cá thể tốt nhất giải, còn lại lấy ngẫu nhiên trong giải.
+
+    Args:
+        rng: Bộ sinh số ngẫu nhiên
+        fitness: Fitness của quần thể ứng viên (càng thấp càng tốt)
+        n: Số cá thể cần chọn
+        tournament_size: Số cá thể mỗi giải
+
+    Returns:
+        np.ndarray int (n,): chỉ số vào fitness
+    """
+    size = max(1, min(tournament_size, len(fitness)))
+    entrants = rng.integers(0, len(fitness), (n, size))
+    rows = np.arange(n)
+    best = entrants[rows, np.argmin(fitness[entrants], axis=1)]
+    random_pick = entrants[rows, rng.integers(0, size, n)]
+    return np.where(rng.random(n) < p_best, best, random_pick)
+
+
+def crossover(rng: np.random.Generator, parents1: np.ndarray, parents2: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Lai ghép từng cặp bằng một trong ba phương pháp chọn ngẫu nhiên: một điểm, hai điểm, đồng đều.
+
+    Returns:
+        (children1, children2) cùng kích thước với cha mẹ
+    """
+    n = len(parents1)
+    j = np.arange(GENE_COUNT)
+    method = rng.integers(0, 3, n)
+    single = j < rng.integers(1, GENE_COUNT, n)[:, None]
+    point1 = rng.integers(1, GENE_COUNT - 1, n)
+    point2 = rng.integers(point1 + 1, GENE_COUNT)
+    two_point = (j < point1[:, None]) | (j >= point2[:, None])
+    uniform = rng.random((n, GENE_COUNT)) < 0.5
+    from_first = np.choose(method[:, None], (single, two_point, uniform))
+    return np.where(from_first, parents1, parents2), np.where(from_first, parents2, parents1)
+
+
+def mutate(rng: np.random.Generator, population: np.ndarray, rates: np.ndarray, sizes: np.ndarray) -> np.ndarray:
+    """
+    Đột biến tại chỗ: mỗi gene được thay bằng giá trị ngẫu nhiên với xác suất rates[i] × hệ số của gene.
+
+    Args:
+        rates: Xác suất đột biến cơ sở của từng hàng
+        sizes: Số giá trị của từng gene (GeneTables.sizes)
+
+    Returns:
+        population (đã sửa tại chỗ)
+    """
+    hits = rng.random(population.shape) < rates[:, None] * _GENE_MUTATION_FACTORS
+    draws = rng.integers(0, sizes, population.shape)
+    population[hits] = draws[hits]
+    return population
+
+
+def diversity(population: np.ndarray, denominators: np.ndarray) -> float:
+    """Độ đa dạng (0-1): số giá trị khác nhau của từng gene trên số giá trị có thể, lấy trung bình có trọng số."""
+    if len(population) <= 1:
+        return 0.0
+    distinct = np.array([len(np.unique(population[:, k])) for k in range(GENE_COUNT)])
+    return float(np.dot(distinct / denominators, _DIVERSITY_WEIGHTS))
+
+
+def _normalized(values: np.ndarray, low: float, high: float, flat: float) -> np.ndarray:
+    if high > low:
+        return (values - low) / (high - low)
+    return np.full(len(values), flat)
+
+
+def fitness_bounds(cost: np.ndarray, power: np.ndarray, safety: np.ndarray, velocity_error: np.ndarray,
+                   has_transmission: np.ndarray) -> tuple:
+    """
+    Khoảng chuẩn hóa min/max của weighted_fitness (kèm giá trị thay thế khi khoảng không hợp lệ).
+
+    Returns:
+        tuple: ((min, max) chi phí, (min, max) công suất, (min, max) hệ số an toàn, (min, max) sai số vận tốc)
+    """
+    min_cost, max_cost = cost.min(), cost.max()
+    min_power, max_power = power.min(), power.max()
+    min_safety, max_safety = safety.min(), safety.max()
+    if not np.isfinite(min_cost) or max_cost == 0:
+        min_cost, max_cost = 0.0, 100000.0
+    if not np.isfinite(min_power) or max_power == 0:
+        min_power, max_power = 0.0, 1000.0
+    if not np.isfinite(min_safety) or max_safety == 0:
+        min_safety, max_safety = 1.0, 20.0
+    errors = velocity_error[has_transmission]
+    velocity_bounds = (errors.min(), errors.max()) if len(errors) else (0.0, 0.0)
+    return (min_cost, max_cost), (min_power, max_power), (min_safety, max_safety), velocity_bounds
+
+
+def weighted_fitness(cost: np.ndarray, power: np.ndarray, safety: np.ndarray, velocity_error: np.ndarray,
+                     has_transmission: np.ndarray, penalty: np.ndarray, settings: OptimizerSettings,
+                     bounds: tuple = None) -> np.ndarray:
+    """
+    Fitness có trọng số của các cá thể hợp lệ (dùng chung cho vòng lặp ma trận và Optimizer._assign_fitness).
+
+    Args:
+        cost, power, safety, velocity_error, has_transmission: Đại lượng của từng cá thể hợp lệ
+        penalty: Tổng mức phạt theo mã lý do (chưa gồm phạt hệ số an toàn thấp)
+        settings: Trọng số và ngưỡng SF tối thiểu
+        bounds: Khoảng chuẩn hóa cố định (fitness_bounds); None = min/max của chính các cá thể này
+
+    Returns:
+        np.ndarray float: fitness (càng thấp càng tốt)
+    """
+    if bounds is None:
+        bounds = fitness_bounds(cost, power, safety, velocity_error, has_transmission)
+    (min_cost, max_cost), (min_power, max_power), (min_safety, max_safety), (low, high) = bounds
+
+    cost_norm = _normalized(cost, min_cost, max_cost, 0.5)
+    power_norm = _normalized(power, min_power, max_power, 0.5)
+    target_safety = settings.min_belt_safety_factor
+    if max_safety > min_safety:
+        safety_norm = (safety - min_safety) / (max_safety - min_safety)
+    elif target_safety > 0:
+        safety_norm = np.where(safety >= target_safety, 0.0, (target_safety - safety) / target_safety)
+    else:
+        safety_norm = np.full(len(safety), 0.5)
+
+    velocity_norm = np.where(has_transmission, _normalized(velocity_error, low, high, 0.0), 1.0)
+
+    fitness = (settings.w_cost * cost_norm + settings.w_power * power_norm
+               - settings.w_safety * safety_norm + settings.w_velocity_error * velocity_norm)
+    total_penalty = penalty.copy()
+    if target_safety > 0:
+        low_safety = safety < target_safety
+        total_penalty[low_safety] += (target_safety - safety[low_safety]) / target_safety * 0.3
+    fitness = fitness + total_penalty
+    return np.where(np.isfinite(fitness), fitness, 10.0)
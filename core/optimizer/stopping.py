@@ -0,0 +1,108 @@
+# core/optimizer/stopping.py
+"""
+Điều kiện dừng của GA: hội tụ, ngân sách thời gian và hủy từ bên ngoài.
+
+Optimizer tạo một EarlyStopping mới cho mỗi lần chạy và gọi observe sau khi đánh giá mỗi thế hệ.
+Hai tiêu chí hội tụ chỉ áp dụng khi OptimizerSettings.early_stopping = True (mặc định tắt để các lần
+gọi Optimizer.run hiện có vẫn chạy đủ số thế hệ); ngân sách thời gian và hủy luôn có hiệu lực.
+Vòng lặp dừng khi:
+- Giá trị tốt nhất không cải thiện quá OptimizerSettings.min_relative_improvement trong
+  stagnation_generations thế hệ liên tiếp (hội tụ). Giá trị này là mục tiêu có trọng số với khoảng
+  chuẩn hóa cố định từ thế hệ đầu (objective), không phải fitness_score: fitness_score được chuẩn hóa
+  min/max lại mỗi thế hệ nên thiết kế tốt nhất luôn có điểm gần như không đổi dù chi phí vẫn giảm;
+- Độ đa dạng của quần thể dưới min_diversity và giá trị tốt nhất đã đứng yên một phần ba cửa sổ;
+- Hết time_budget_s giây kể từ khi bắt đầu chạy;
+- Optimizer.cancel() được gọi (ví dụ từ luồng giao diện).
+
+Việc kiểm tra là hợp tác: một thế hệ đang đánh giá dở luôn được đánh giá xong, nên kết quả trả về
+luôn là các thiết kế đã được tính đầy đủ.
+"""
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+
+from .models import OptimizerSettings
+
+# Lý do dừng (Optimizer.stop_reason)
+STOP_COMPLETED = "completed"
+STOP_CONVERGED = "converged"
+STOP_LOW_DIVERSITY = "low_diversity"
+STOP_TIME_BUDGET = "time_budget"
+STOP_CANCELLED = "cancelled"
+
+
+class EarlyStopping:
+    """Theo dõi giá trị tốt nhất qua các thế hệ và quyết định khi nào dừng (giá trị càng thấp càng tốt)."""
+
+    def __init__(self, settings: OptimizerSettings, cancel_event: Optional[threading.Event] = None):
+        self.settings = settings
+        self.enabled = getattr(settings, "early_stopping", False)
+        self.window = max(1, int(getattr(settings, "stagnation_generations", 15)))
+        self.min_improvement = float(getattr(settings, "min_relative_improvement", 1e-3))
+        self.min_diversity = float(getattr(settings, "min_diversity", 0.05))
+        self.time_budget_s = getattr(settings, "time_budget_s", None)
+        self.cancel_event = cancel_event if cancel_event is not None else threading.Event()
+        self.best = float('inf')
+        self.stagnant_generations = 0
+        # Khoảng chuẩn hóa của objective, cố định từ thế hệ đầu tiên (population.fitness_bounds)
+        self.bounds: Optional[tuple] = None
+        self._started = time.perf_counter()
+
+    @property
+    def elapsed_s(self) -> float:
+        return time.perf_counter() - self._started
+
+    def interrupted(self) -> Optional[str]:
+        """Lý do dừng do bên ngoài (hủy hoặc hết thời gian), None nếu còn được chạy tiếp."""
+        if self.cancel_event.is_set():
+            return STOP_CANCELLED
+        if self.time_budget_s is not None and self.elapsed_s >= self.time_budget_s:
+            return STOP_TIME_BUDGET
+        return None
+
+    def objective(self, cost: np.ndarray, power: np.ndarray, safety: np.ndarray, velocity_error: np.ndarray,
+                  has_transmission: np.ndarray, penalty: np.ndarray) -> float:
+        """
+        Giá trị tốt nhất của một thế hệ để truyền cho observe, so sánh được giữa các thế hệ.
+
+        Cùng công thức với population.weighted_fitness nhưng khoảng chuẩn hóa được lấy một lần từ các
+        cá thể hợp lệ của thế hệ đầu tiên và giữ nguyên cho cả lần chạy.
+
+        Returns:
+            float: mục tiêu có trọng số nhỏ nhất (càng thấp càng tốt)
+        """
+        from .population import fitness_bounds, weighted_fitness
+        if self.bounds is None:
+            self.bounds = fitness_bounds(cost, power, safety, velocity_error, has_transmission)
+        return float(weighted_fitness(cost, power, safety, velocity_error, has_transmission, penalty,
+                                      self.settings, bounds=self.bounds).min())
+
+    def observe(self, best: float, diversity: Optional[float] = None) -> Optional[str]:
+        """
+        Ghi nhận kết quả của một thế hệ.
+
+        Args:
+            best: Giá trị tốt nhất của thế hệ (càng thấp càng tốt)
+            diversity: Độ đa dạng của quần thể (0-1), None nếu không dùng tiêu chí đa dạng
+
+        Returns:
+            Lý do dừng (STOP_*) hoặc None nếu chạy tiếp
+        """
+        threshold = self.min_improvement * max(abs(self.best), 1e-9) if self.best != float('inf') else 0.0
+        if best < self.best - threshold:
+            self.best = best
+            self.stagnant_generations = 0
+        else:
+            self.stagnant_generations += 1
+
+        reason = self.interrupted()
+        if reason is not None or not self.enabled:
+            return reason
+        if self.stagnant_generations >= self.window:
+            return STOP_CONVERGED
+        if (diversity is not None and diversity < self.min_diversity
+                and self.stagnant_generations >= max(1, self.window // 3)):
+            return STOP_LOW_DIVERSITY
+        return None
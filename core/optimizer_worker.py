@@ -1,21 +1,53 @@
 # core/optimizer_worker.py
 # -*- coding: utf-8 -*-
 
+import time
+
 from PySide6.QtCore import QObject, Signal, Slot
 from core.models import ConveyorParameters
-from core.optimizer.models import OptimizerSettings
+from core.optimizer.models import GenerationStats, OptimizerSettings
 from core.optimizer.optimizer import Optimizer
+from core.optimizer.stopping import STOP_CANCELLED, STOP_CONVERGED, STOP_LOW_DIVERSITY, STOP_TIME_BUDGET
+
+# Khoảng cách tối thiểu giữa hai lần phát tiến độ (giây), để không làm nghẽn luồng giao diện
+PROGRESS_INTERVAL_S = 0.25
+
 
 class OptimizerWorker(QObject):
     """Worker to run the optimization process in a separate thread."""
     finished = Signal(list)  # Emits list of DesignCandidate results
     progress = Signal(int)   # Emits progress percentage
     status = Signal(str)   # Emits status updates
+    generation = Signal(object)  # Emits GenerationStats (throttled, top-5 candidates for the live table)
 
     def __init__(self, base_params: ConveyorParameters, opt_settings: OptimizerSettings):
         super().__init__()
         self.base_params = base_params
         self.opt_settings = opt_settings
+        self.optimizer = None
+        self._last_progress_emit = 0.0
+
+    def cancel(self):
+        """
+        Yêu cầu dừng tối ưu hóa; kết quả tốt nhất hiện có vẫn được phát qua finished.
+
+        Gọi trực tiếp từ luồng giao diện (run() đang chặn luồng của worker nên slot qua hàng đợi
+        sẽ không được xử lý kịp); Optimizer.cancel an toàn khi gọi từ luồng khác.
+        """
+        if self.optimizer is not None:
+            self.optimizer.cancel()
+
+    def _on_generation(self, stats: GenerationStats):
+        """progress_callback của Optimizer: phát tín hiệu tiến độ, tối đa một lần mỗi PROGRESS_INTERVAL_S."""
+        now = time.perf_counter()
+        if stats.generation < stats.generations and now - self._last_progress_emit < PROGRESS_INTERVAL_S:
+            return
+        self._last_progress_emit = now
+        self.progress.emit(int(100 * stats.generation / max(1, stats.generations)))
+        self.generation.emit(stats)
+        self.status.emit(f"⚡ Thế hệ {stats.generation}/{stats.generations} - fitness tốt nhất {stats.best_fitness:.4f}, "
+                         f"đa dạng {stats.diversity:.2f}, {stats.evaluations} lần tính ({stats.cache_hits} từ cache), "
+                         f"{stats.elapsed_s:.1f} s")
 
     @Slot()
     def run(self):
@@ -32,6 +64,7 @@ class OptimizerWorker(QObject):
             
             self.status.emit("🔧 Khởi tạo bộ tối ưu hóa...")
             optimizer = Optimizer(self.base_params, self.opt_settings)
+            self.optimizer = optimizer
             
             # Cải thiện BƯỚC 6: Điều chỉnh parameters trong OptimizerWorker
             # Tính toán parameters dựa trên độ phức tạp của bài toán
@@ -94,9 +127,17 @@ class OptimizerWorker(QObject):
                 mutation_rate=mutation_rate,
                 tournament_size=tournament_size,
                 elitism_count=elitism_count,
-                crossover_rate=crossover_rate  # Thêm crossover rate
+                crossover_rate=crossover_rate,  # Thêm crossover rate
+                progress_callback=self._on_generation
             )
             
+            if optimizer.stop_reason == STOP_CANCELLED:
+                self.status.emit(f"⏹️ Đã dừng theo yêu cầu sau {optimizer.generations_run} thế hệ - trả về kết quả tốt nhất hiện có.")
+            elif optimizer.stop_reason == STOP_TIME_BUDGET:
+                self.status.emit(f"⏱️ Hết ngân sách thời gian sau {optimizer.generations_run} thế hệ - trả về kết quả tốt nhất hiện có.")
+            elif optimizer.stop_reason in (STOP_CONVERGED, STOP_LOW_DIVERSITY):
+                self.status.emit(f"🎯 Đã hội tụ sau {optimizer.generations_run}/{generations} thế hệ.")
+
             if results:
                 self.status.emit(f"✅ Tối ưu hóa hoàn tất! Tìm thấy {len(results)} giải pháp hợp lệ.")
                 self.finished.emit(results)
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""
+Đo thời gian theo từng giai đoạn của một lần tính (calculate(p, profile=True)).
+
+Engine đánh dấu các giai đoạn bằng stage("tên"); các bảng tra gọi count_lookup("tên bảng").
+Cả hai chỉ ghi khi thread hiện tại đang có một CalculationProfile được kích hoạt bởi
+profile_calculation(), nên khi không đo thì chi phí gần như bằng 0.
+
+    with profile_calculation() as prof:
+        ...
+    print(prof.format())
+
+Optimizer cộng dồn các profile của mọi lần đánh giá bằng CalculationProfile.add().
+"""
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+# Thứ tự hiển thị các giai đoạn của CalculationStrategy.execute / attach_transmission
+STAGE_ORDER = (
+    "auto_speed",
+    "geometry_capacity",
+    "resistances_power",
+    "tensions",
+    "finalize",
+    "costs",
+    "pulleys_idlers",
+    "transmission",
+)
+
+_local = threading.local()
+# Số profile đang kích hoạt trên mọi thread (0 = bỏ qua ngay, không tra thread-local)
+_active_count = 0
+_count_lock = threading.Lock()
+
+
+@dataclass
+class CalculationProfile:
+    """Thời gian (giây) và số lần gọi theo giai đoạn, số lần tra bảng theo tên bảng."""
+    stages: Dict[str, float] = field(default_factory=dict)
+    stage_calls: Dict[str, int] = field(default_factory=dict)
+    lookups: Dict[str, int] = field(default_factory=dict)
+    total_s: float = 0.0
+    calculations: int = 0
+    # Số lần tính theo lớp CalculationStrategy (CEMAStrategy, DINStrategy...)
+    strategies: Dict[str, int] = field(default_factory=dict)
+
+    def record_stage(self, name: str, elapsed_s: float):
+        self.stages[name] = self.stages.get(name, 0.0) + elapsed_s
+        self.stage_calls[name] = self.stage_calls.get(name, 0) + 1
+
+    def record_lookup(self, name: str):
+        self.lookups[name] = self.lookups.get(name, 0) + 1
+
+    def record_strategy(self, name: str):
+        self.strategies[name] = self.strategies.get(name, 0) + 1
+
+    def add(self, other: Optional['CalculationProfile']) -> 'CalculationProfile':
+        """Cộng dồn một profile khác vào profile này (bỏ qua None)."""
+        if other is None:
+            return self
+        for name, elapsed in other.stages.items():
+            self.stages[name] = self.stages.get(name, 0.0) + elapsed
+        for target, source in ((self.stage_calls, other.stage_calls),
+                               (self.lookups, other.lookups),
+                               (self.strategies, other.strategies)):
+            for name, count in source.items():
+                target[name] = target.get(name, 0) + count
+        self.total_s += other.total_s
+        self.calculations += other.calculations
+        return self
+
+    def merged(self, other: Optional['CalculationProfile']) -> 'CalculationProfile':
+        """Profile mới = self + other (không thay đổi self)."""
+        return CalculationProfile().add(self).add(other)
+
+    @property
+    def other_s(self) -> float:
+        """Thời gian không thuộc giai đoạn nào (dựng kết quả, cảnh báo...)."""
+        return max(0.0, self.total_s - sum(self.stages.values()))
+
+    def ordered_stages(self) -> List[str]:
+        known = [name for name in STAGE_ORDER if name in self.stages]
+        return known + sorted(name for name in self.stages if name not in STAGE_ORDER)
+
+    def to_dict(self) -> dict:
+        return {
+            "total_s": self.total_s,
+            "calculations": self.calculations,
+            "stages": {name: {"seconds": self.stages[name], "calls": self.stage_calls.get(name, 0)}
+                       for name in self.ordered_stages()},
+            "other_s": self.other_s,
+            "lookups": dict(Counter(self.lookups).most_common()),
+            "strategies": dict(self.strategies),
+        }
+
+    def format(self) -> str:
+        """Bảng tóm tắt dạng văn bản: thời gian, số lần gọi, trung bình và tỷ lệ từng giai đoạn."""
+        total = self.total_s or sum(self.stages.values()) or 1e-12
+        lines = [f"Profile: {self.calculations} calculation(s), total {self.total_s * 1000:.2f} ms"]
+        rows = [(name, self.stages[name], self.stage_calls.get(name, 0)) for name in self.ordered_stages()]
+        if self.total_s:
+            rows.append(("(other)", self.other_s, 0))
+        for name, elapsed, calls in rows:
+            mean = f"{elapsed / calls * 1000:9.3f} ms/call" if calls else " " * 16
+            lines.append(f"  {name:<20} {elapsed * 1000:10.2f} ms {calls:8d} calls {mean} {100.0 * elapsed / total:6.1f}%")
+        if self.lookups:
+            lines.append("  lookups: " + ", ".join(f"{name}={count}" for name, count in Counter(self.lookups).most_common()))
+        return "\n".join(lines)
+
+
+class _Stage:
+    """Context manager đo một giai đoạn của profile đang kích hoạt."""
+    __slots__ = ("profile", "name", "start")
+
+    def __init__(self, profile: CalculationProfile, name: str):
+        self.profile = profile
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.profile.record_stage(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+def active_profile() -> Optional[CalculationProfile]:
+    """Profile đang kích hoạt của thread hiện tại (None nếu không đo)."""
+    if not _active_count:
+        return None
+    stack = getattr(_local, "stack", None)
+    return stack[-1] if stack else None
+
+
+def stage(name: str):
+    """
+    Đo một giai đoạn: with stage("tensions"): ...
+
+    Trả về context manager rỗng khi thread hiện tại không đo.
+    """
+    profile = active_profile()
+    return _NULL_STAGE if profile is None else _Stage(profile, name)
+
+
+def count_lookup(name: str):
+    """Đếm một lần tra bảng (không làm gì khi không đo)."""
+    if not _active_count:
+        return
+    stack = getattr(_local, "stack", None)
+    if stack:
+        stack[-1].record_lookup(name)
+
+
+@contextmanager
+def profile_calculation(profile: Optional[CalculationProfile] = None, count_calculation: bool = True):
+    """
+    Kích hoạt một profile cho thread hiện tại trong khối with.
+
+    Args:
+        profile: Profile để ghi vào (None = tạo mới)
+        count_calculation: Tăng calculations (False khi khối chỉ là phần tiếp theo của một lần tính,
+            ví dụ chỉ tìm bộ truyền động); thời gian của khối luôn được cộng vào total_s
+
+    Yields:
+        CalculationProfile
+    """
+    global _active_count
+    profile = CalculationProfile() if profile is None else profile
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    stack.append(profile)
+    with _count_lock:
+        _active_count += 1
+    start = time.perf_counter()
+    try:
+        yield profile
+    finally:
+        profile.total_s += time.perf_counter() - start
+        if count_calculation:
+            profile.calculations += 1
+        stack.pop()
+        with _count_lock:
+            _active_count -= 1
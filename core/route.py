@@ -0,0 +1,391 @@
+# -*- coding: utf-8 -*-
+"""
+Tuyến băng nhiều đoạn và lan truyền lực căng quanh vòng băng kín (vector hóa).
+
+Tuyến là một tuple các RouteSegment theo chiều chạy của nhánh tải (từ đuôi tới đầu): mỗi đoạn có
+chiều dài, độ chênh cao, khoảng cách con lăn, mức chất tải và góc cong của riêng nó. Tuyến rỗng
+(mặc định của ConveyorParameters.route) là băng một đoạn dựng từ L_m/H_m như trước.
+
+Lực căng được lan truyền từ nhánh chùng tại puly dẫn (T2): nhánh về từ đầu tới đuôi, rồi nhánh
+tải từ đuôi về đầu. Trên mỗi bước dài Δ, lực cản phân bố a (N/m) và đoạn cong (hệ số e^{μ·θ/ℓ}
+trên mỗi mét) cho nghiệm chính xác
+
+    T_sau = m·T_trước + a·(m - 1)/c,   m = e^{c·Δ}   (T_sau = T_trước + a·Δ khi c = 0)
+
+nên cả vòng băng là một phép truy hồi tuyến tính, giải bằng cumprod/cumsum trên hàng chục nghìn
+nút trong vài mili giây. Hệ số ma sát được hiệu chỉnh để tổng lực ma sát của tuyến đồng đều bằng
+đúng lực ma sát của tiêu chuẩn đang dùng (CEMA, DIN 22101, ISO 5048).
+
+    route = (RouteSegment(800.0, 0.0), RouteSegment(350.0, 42.0, load_fraction=1.0, curve_angle_deg=8.0))
+    result = calculate(params.replace(route=route))
+    loop = result.loop_profile(resolution_m=0.5)
+"""
+import math
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .specs import G
+
+
+@dataclass(frozen=True)
+class RouteSegment:
+    """
+    Một đoạn tuyến băng (theo chiều chạy của nhánh tải).
+
+    Args:
+        length_m: Chiều dài đoạn (m, > 0)
+        lift_m: Độ chênh cao từ đầu tới cuối đoạn (m, âm khi đổ dốc)
+        carry_idler_spacing_m: Khoảng cách con lăn nhánh tải (None = theo tham số chung)
+        return_idler_spacing_m: Khoảng cách con lăn nhánh về (None = theo tham số chung)
+        load_fraction: Mức chất tải của nhánh tải (0 = chạy không tải, 1 = đầy tải; đoạn trước điểm nạp liệu là 0)
+        curve_angle_deg: Tổng góc đổi hướng của đoạn cong (độ, đứng hoặc ngang)
+        name: Tên đoạn (hiển thị)
+    """
+    length_m: float
+    lift_m: float = 0.0
+    carry_idler_spacing_m: Optional[float] = None
+    return_idler_spacing_m: Optional[float] = None
+    load_fraction: float = 1.0
+    curve_angle_deg: float = 0.0
+    name: str = ""
+
+    def __post_init__(self):
+        if not self.length_m > 0:
+            raise ValueError(f"Chiều dài đoạn tuyến phải > 0 (nhận {self.length_m})")
+        if not 0.0 <= self.load_fraction <= 1.0:
+            raise ValueError(f"Mức chất tải phải trong [0, 1] (nhận {self.load_fraction})")
+        if self.curve_angle_deg < 0:
+            raise ValueError(f"Góc cong phải ≥ 0 (nhận {self.curve_angle_deg})")
+        for spacing in (self.carry_idler_spacing_m, self.return_idler_spacing_m):
+            if spacing is not None and not spacing > 0:
+                raise ValueError(f"Khoảng cách con lăn phải > 0 (nhận {spacing})")
+
+
+class RouteLoads(NamedTuple):
+    """Tải trên mét và hệ số ma sát đã hiệu chỉnh dùng để lan truyền lực căng trên tuyến."""
+    friction_coeff: float       # f: lực ma sát trên mét = f·G·(tổng khối lượng trên mét)
+    belt_kgpm: float
+    material_kgpm: float
+    carry_idler_kg: float       # Khối lượng phần quay của một bộ con lăn nhánh tải
+    return_idler_kg: float
+    carry_spacing_m: float      # Khoảng cách con lăn chung (cho đoạn không tự khai báo)
+    return_spacing_m: float
+
+    @classmethod
+    def calibrated(cls, friction_N: float, length_m: float, belt_kgpm: float, material_kgpm: float,
+                   carry_idler_kg: float, return_idler_kg: float,
+                   carry_spacing_m: float, return_spacing_m: float) -> 'RouteLoads':
+        """
+        Hiệu chỉnh f sao cho tuyến một đoạn đồng đều dài length_m có đúng lực ma sát friction_N.
+
+        Args:
+            friction_N: Lực ma sát của tiêu chuẩn tính cho cả băng (N)
+            length_m: Chiều dài băng dùng khi tính friction_N
+            Các tham số còn lại: tải trên mét và con lăn như trong công thức DIN 22101
+
+        Returns:
+            RouteLoads
+        """
+        w = 2.0 * belt_kgpm + carry_idler_kg / carry_spacing_m + return_idler_kg / return_spacing_m + material_kgpm
+        denom = G * length_m * w
+        f = friction_N / denom if denom > 0 else 0.0
+        return cls(f, belt_kgpm, material_kgpm, carry_idler_kg, return_idler_kg, carry_spacing_m, return_spacing_m)
+
+
+class LoopProfile(NamedTuple):
+    """Lực căng tại các nút quanh vòng băng, bắt đầu từ nhánh chùng tại puly dẫn (mảng chỉ đọc)."""
+    distance_m: np.ndarray      # Quãng đường dọc băng từ puly dẫn
+    position_m: np.ndarray      # Vị trí trên tuyến tính từ đuôi (nhánh về đi từ L về 0)
+    elevation_m: np.ndarray     # Cao độ so với đuôi băng
+    carrying: np.ndarray        # True với các nút thuộc nhánh tải
+    tension_N: np.ndarray
+
+    @property
+    def max_tension_N(self) -> float:
+        return float(self.tension_N.max()) if len(self.tension_N) else 0.0
+
+    @property
+    def min_tension_N(self) -> float:
+        return float(self.tension_N.min()) if len(self.tension_N) else 0.0
+
+
+def route_length(route: Sequence[RouteSegment]) -> float:
+    """Tổng chiều dài tuyến (m)."""
+    return float(sum(seg.length_m for seg in route))
+
+
+def route_lift(route: Sequence[RouteSegment]) -> float:
+    """Chênh cao từ đuôi tới đầu băng (m)."""
+    return float(sum(seg.lift_m for seg in route))
+
+
+def resolve_route_params(p):
+    """
+    Tham số có L_m/H_m khớp với tuyến (giữ nguyên p khi tuyến rỗng).
+
+    Args:
+        p: ConveyorParameters
+
+    Returns:
+        ConveyorParameters với L_m = tổng chiều dài, H_m = chênh cao đầu-đuôi của tuyến
+    """
+    route = p.route
+    if not route:
+        return p
+    L, H = route_length(route), route_lift(route)
+    if p.L_m == L and p.H_m == H:
+        return p
+    return p.replace(L_m=L, H_m=H)
+
+
+def describe_route(route: Sequence[RouteSegment]) -> str:
+    """Mô tả ngắn của tuyến (dùng khi xuất báo cáo)."""
+    if not route:
+        return ""
+    return "; ".join(
+        f"{seg.name or i + 1}: L={seg.length_m:g} m, H={seg.lift_m:g} m, tải={seg.load_fraction:.0%}"
+        + (f", cong={seg.curve_angle_deg:g}°" if seg.curve_angle_deg else "")
+        for i, seg in enumerate(route))
+
+
+# ---------------- Lan truyền lực căng ----------------
+
+class _Segments(NamedTuple):
+    length: np.ndarray
+    lift: np.ndarray
+    load: np.ndarray
+    carry_spacing: np.ndarray   # nan = theo RouteLoads
+    return_spacing: np.ndarray
+    curve_rad: np.ndarray
+
+
+@lru_cache(maxsize=64)
+def _segment_arrays(route: Tuple[RouteSegment, ...]) -> _Segments:
+    def column(values):
+        arr = np.array(values, dtype=float)
+        arr.flags.writeable = False
+        return arr
+    return _Segments(
+        column([seg.length_m for seg in route]),
+        column([seg.lift_m for seg in route]),
+        column([seg.load_fraction for seg in route]),
+        column([np.nan if seg.carry_idler_spacing_m is None else seg.carry_idler_spacing_m for seg in route]),
+        column([np.nan if seg.return_idler_spacing_m is None else seg.return_idler_spacing_m for seg in route]),
+        column([math.radians(seg.curve_angle_deg) for seg in route]),
+    )
+
+
+def _strand_rates(seg: _Segments, loads: RouteLoads) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Lực cản phân bố a (N/m) và hệ số đoạn cong c (1/m) của từng đoạn.
+
+    Returns:
+        (a_tải, c_tải, a_về, c_về) theo thứ tự đoạn của tuyến; nhánh về chạy ngược tuyến nên
+        độ chênh cao đổi dấu
+    """
+    lc = np.where(np.isnan(seg.carry_spacing), loads.carry_spacing_m, seg.carry_spacing)
+    lr = np.where(np.isnan(seg.return_spacing), loads.return_spacing_m, seg.return_spacing)
+    fG = loads.friction_coeff * G
+    q_carry = loads.belt_kgpm + seg.load * loads.material_kgpm
+    grade = seg.lift / seg.length
+    a_carry = fG * (q_carry + loads.carry_idler_kg / lc) + G * q_carry * grade
+    a_return = fG * (loads.belt_kgpm + loads.return_idler_kg / lr) - G * loads.belt_kgpm * grade
+    c = loads.friction_coeff * seg.curve_rad / seg.length
+    return a_carry, c, a_return, c
+
+
+def _propagate(t_start: float, a: np.ndarray, c: np.ndarray, step: np.ndarray) -> np.ndarray:
+    """Lực căng tại các nút (len(step) + 1) của truy hồi T_sau = m·T + cộng thêm."""
+    tension = np.empty(len(step) + 1)
+    tension[0] = t_start
+    curved = c > 0
+    if not curved.any():
+        np.cumsum(a * step, out=tension[1:])
+        tension[1:] += t_start
+        return tension
+    growth = np.exp(c * step)
+    added = np.where(curved, a * (growth - 1.0) / np.where(curved, c, 1.0), a * step)
+    scale = np.cumprod(growth)
+    tension[1:] = scale * (t_start + np.cumsum(added / scale))
+    return tension
+
+
+def loop_coefficients(route: Tuple[RouteSegment, ...], loads: RouteLoads) -> Tuple[float, float]:
+    """
+    Hệ số (A, B) của cả vòng băng: T1 = A·T2 + B.
+
+    A = 1 khi tuyến không có đoạn cong; B là tổng lực cản khi T2 = 0.
+    """
+    seg = _segment_arrays(route)
+    a_carry, c_carry, a_return, c_return = _strand_rates(seg, loads)
+    a = np.concatenate((a_return[::-1], a_carry))
+    c = np.concatenate((c_return[::-1], c_carry))
+    step = np.concatenate((seg.length[::-1], seg.length))
+    if not (c > 0).any():
+        return 1.0, float(np.sum(a * step))
+    return float(np.prod(np.exp(c * step))), float(_propagate(0.0, a, c, step)[-1])
+
+
+def loop_coefficients_many(route: Tuple[RouteSegment, ...], loads: RouteLoads,
+                           load_fractions: np.ndarray) -> Tuple[float, np.ndarray, np.ndarray]:
+    """
+    Hệ số vòng băng cho nhiều trạng thái chất tải cùng lúc.
+
+    Lực cản tại mỗi bước tuyến tính theo mức chất tải nên B = Σ a_j·w_j với trọng số w_j chỉ phụ
+    thuộc tuyến: mọi trạng thái được tính bằng một phép nhân ma trận.
+
+    Args:
+        route: Tuyến
+        loads: Tải và hệ số ma sát đã hiệu chỉnh (material_kgpm là tải đầy)
+        load_fractions: Mảng (số trạng thái × số đoạn) mức chất tải của nhánh tải
+
+    Returns:
+        (A, B theo trạng thái, lực nâng vật liệu theo trạng thái)
+    """
+    seg = _segment_arrays(route)
+    a_carry, c_carry, a_return, c_return = _strand_rates(seg._replace(load=np.zeros(len(seg.length))), loads)
+    # Phần lực cản do vật liệu trên mỗi mét nhánh tải khi chất đầy
+    per_load = loads.material_kgpm * (loads.friction_coeff * G + G * seg.lift / seg.length)
+    c = np.concatenate((c_return[::-1], c_carry))
+    step = np.concatenate((seg.length[::-1], seg.length))
+    curved = c > 0
+    growth = np.exp(c * step)
+    gain = np.where(curved, (growth - 1.0) / np.where(curved, c, 1.0), step)
+    # Hệ số khuếch đại của các bước phía sau: Π_{k>j} m_k
+    after = np.concatenate((np.cumprod(growth[::-1])[::-1][1:], [1.0]))
+    weight = gain * after
+    n = len(seg.length)
+    w_return, w_carry = weight[:n][::-1], weight[n:]
+    fractions = np.atleast_2d(np.asarray(load_fractions, dtype=float))
+    B = float(a_return @ w_return + a_carry @ w_carry) + fractions @ (per_load * w_carry)
+    lift = G * loads.material_kgpm * (fractions @ seg.lift)
+    return float(np.prod(growth)), B, lift
+
+
+def route_drive_forces(route: Tuple[RouteSegment, ...], loads: RouteLoads,
+                       e_ratio: float) -> Tuple[float, float, bool]:
+    """
+    Lực ma sát và lực nâng vật liệu tại puly dẫn của tuyến.
+
+    Với đoạn cong, lực vòng phụ thuộc T2: T1 = e·T2 (Euler–Eytelwein) và T1 = A·T2 + B cho
+    T2 = B/(e - A), lực vòng Fu = (e - 1)·T2.
+
+    Args:
+        route: Tuyến
+        loads: Tải và hệ số ma sát đã hiệu chỉnh
+        e_ratio: e^{μθ} của puly dẫn
+
+    Returns:
+        (lực ma sát N, lực nâng vật liệu N, False nếu đoạn cong vượt khả năng truyền lực của puly
+        và lực vòng được tính bỏ qua đoạn cong)
+    """
+    seg = _segment_arrays(route)
+    lift = G * loads.material_kgpm * float(np.sum(seg.load * seg.lift))
+    A, B = loop_coefficients(route, loads)
+    if A == 1.0:
+        return B - lift, lift, True
+    if e_ratio > A:
+        return (e_ratio - 1.0) * B / (e_ratio - A) - lift, lift, True
+    # Lực cản khi bỏ qua đoạn cong
+    curve_free = loop_coefficients(tuple(
+        RouteSegment(s.length_m, s.lift_m, s.carry_idler_spacing_m, s.return_idler_spacing_m, s.load_fraction)
+        for s in route), loads)[1]
+    return curve_free - lift, lift, False
+
+
+def propagate_loop(route: Tuple[RouteSegment, ...], loads: RouteLoads, t_start: float,
+                   resolution_m: float = 1.0) -> LoopProfile:
+    """
+    Lực căng quanh vòng băng kín với bước không lớn hơn resolution_m.
+
+    Args:
+        route: Tuyến
+        loads: Tải và hệ số ma sát đã hiệu chỉnh
+        t_start: Lực căng nhánh chùng tại puly dẫn (N)
+        resolution_m: Bước lớn nhất giữa hai nút (m)
+
+    Returns:
+        LoopProfile với 2·Σ ceil(ℓ/resolution_m) + 1 nút
+    """
+    if not resolution_m > 0:
+        raise ValueError(f"Bước lưới phải > 0 (nhận {resolution_m})")
+    seg = _segment_arrays(route)
+    a_carry, c_carry, a_return, c_return = _strand_rates(seg, loads)
+    counts = np.maximum(1, np.ceil(seg.length / resolution_m)).astype(np.int64)
+    step = seg.length / counts
+    rise = seg.lift / counts
+
+    # Nhánh về: từ đầu (đoạn cuối của tuyến) về đuôi; nhánh tải: từ đuôi về đầu
+    rev = slice(None, None, -1)
+    steps = np.concatenate((np.repeat(step[rev], counts[rev]), np.repeat(step, counts)))
+    a = np.concatenate((np.repeat(a_return[rev], counts[rev]), np.repeat(a_carry, counts)))
+    c = np.concatenate((np.repeat(c_return[rev], counts[rev]), np.repeat(c_carry, counts)))
+    rises = np.concatenate((-np.repeat(rise[rev], counts[rev]), np.repeat(rise, counts)))
+    n_return = int(counts.sum())
+
+    tension = _propagate(float(t_start), a, c, steps)
+    distance = np.concatenate(([0.0], np.cumsum(steps)))
+    length = float(seg.length.sum())
+    position = np.concatenate((length - distance[:n_return + 1], distance[n_return + 1:] - distance[n_return]))
+    elevation = np.concatenate(([float(seg.lift.sum())], np.cumsum(rises) + float(seg.lift.sum())))
+    carrying = np.zeros(len(tension), dtype=bool)
+    carrying[n_return + 1:] = True
+    for array in (distance, position, elevation, carrying, tension):
+        array.flags.writeable = False
+    return LoopProfile(distance, position, elevation, carrying, tension)
+
+
+def route_force_profiles(route: Tuple[RouteSegment, ...], loads: Optional[RouteLoads], friction_N: float,
+                         lift_N: float, positions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Lực ma sát và lực nâng tích lũy tới các vị trí trên tuyến (cho biểu đồ dọc băng).
+
+    Tổng friction_N/lift_N được phân bố theo tỉ trọng của từng đoạn; nếu tổng lực nâng vật liệu
+    của tuyến bằng 0 (lên rồi xuống dốc) thì lực nâng được tính trực tiếp từ cao độ.
+
+    Args:
+        route: Tuyến
+        loads: Tải của tuyến (None = phân bố ma sát theo chiều dài)
+        friction_N: Tổng lực ma sát
+        lift_N: Tổng lực nâng
+        positions: Vị trí tính từ đuôi (m)
+
+    Returns:
+        (ma sát tích lũy, lực nâng tích lũy)
+    """
+    seg = _segment_arrays(route)
+    starts = np.concatenate(([0.0], np.cumsum(seg.length)[:-1]))
+    idx = np.clip(np.searchsorted(starts, positions, side="right") - 1, 0, len(starts) - 1)
+    ratio = np.clip((positions - starts[idx]) / seg.length[idx], 0.0, 1.0)
+
+    if loads is None:
+        weight = seg.length
+    else:
+        lc = np.where(np.isnan(seg.carry_spacing), loads.carry_spacing_m, seg.carry_spacing)
+        lr = np.where(np.isnan(seg.return_spacing), loads.return_spacing_m, seg.return_spacing)
+        weight = seg.length * (2.0 * loads.belt_kgpm + loads.carry_idler_kg / lc + loads.return_idler_kg / lr
+                               + seg.load * loads.material_kgpm)
+    friction = friction_N * _cumulative_share(weight, idx, ratio)
+
+    lifted = seg.load * seg.lift
+    total_lift = float(lifted.sum())
+    if total_lift != 0.0:
+        lift = lift_N * _cumulative_share(lifted, idx, ratio)
+    elif loads is not None:
+        before = np.concatenate(([0.0], np.cumsum(lifted)[:-1]))
+        lift = G * loads.material_kgpm * (before[idx] + lifted[idx] * ratio)
+    else:
+        lift = np.zeros(len(positions))
+    return friction, lift
+
+
+def _cumulative_share(amount: np.ndarray, idx: np.ndarray, ratio: np.ndarray) -> np.ndarray:
+    total = float(amount.sum())
+    if total == 0.0:
+        return np.zeros(len(idx))
+    share = amount / total
+    before = np.concatenate(([0.0], np.cumsum(share)[:-1]))
+    return before[idx] + share[idx] * ratio
@@ -6,6 +6,8 @@ Dựa trên tiêu chuẩn và hướng dẫn tính toán băng tải
 
 from typing import Optional, Union
 
+from .profiling import count_lookup
+
 # =========================
 # SAFETY FACTOR LOOKUP TABLES (from PDF)
 # =========================
@@ -118,6 +120,7 @@ def lookup_sf_design(
     Raises:
         KeyError: Nếu không tìm thấy giá trị trong bảng tra
     """
+    count_lookup("sf_design")
     g = "A" if str(group).strip().upper() == "A" else "B"
     lump = _normalize_lump(lump_ge_30mm)
     bucket = _bucketize_duty_minutes(belt_type, duty_minutes)
@@ -1,5 +1,5 @@
 # -*- coding: utf-8 -*-
-from typing import List
+from typing import List, Optional
 try:
     from .models import MaterialType, BeltType
 except ImportError:
@@ -89,19 +89,21 @@ CHAIN_TENSILE_STRENGTH_SAFETY_FACTOR = 4
 PREFERRED_CHAIN_RATIO = 1.9
 PREFERRED_CHAIN_RANGE = (1.6, 2.2)
 
-def load_chain_data() -> List['ChainSpec']:
+def load_chain_data(csv_path: Optional[str] = None) -> 'ChainCatalog':
     """
-    Tải dữ liệu xích từ file Bang tra 1.csv
-    Trả về danh sách các ChainSpec với dữ liệu thực từ CSV
+    Tải dữ liệu xích từ file Bang tra 1.csv (hoặc một catalog của nhà cung cấp cùng định dạng cột)
+    Trả về ChainCatalog (list ChainSpec có chỉ mục) với dữ liệu thực từ CSV
     """
     from .models import ChainSpec
+    from .chain_catalog import ChainCatalog
     import csv
     import os
     
     chain_specs = []
     
     # Đường dẫn đến file CSV (sử dụng dữ liệu đã cập nhật có Measuring Load & Tensile Strength thực)
-    csv_path = os.path.join(os.path.dirname(__file__), '..', 'data', 'Bang tra 1.csv')
+    if csv_path is None:
+        csv_path = os.path.join(os.path.dirname(__file__), '..', 'data', 'Bang tra 1.csv')
     
     try:
         with open(csv_path, 'r', encoding='utf-8') as file:
@@ -172,9 +174,26 @@ def load_chain_data() -> List['ChainSpec']:
     except Exception as e:
         print(f"Lỗi khi đọc file CSV: {e}")
     
-    return chain_specs
+    return ChainCatalog(chain_specs)
 
 # Danh sách xích đã tải (cache)
 ACTIVE_CHAIN_SPECS = load_chain_data()
 
+# --- [BẮT ĐẦU NÂNG CẤP CACHE TÍNH TOÁN] ---
+# Phiên bản của bộ CSDL đang dùng (ACTIVE_MATERIAL_DB, ACTIVE_BELT_SPECS, ACTIVE_CHAIN_SPECS).
+# Nơi nào thay CSDL (load_database, worker của optimizer) gọi bump_catalog_version() để các cache
+# dựa trên CSDL (xem core/calc_cache.py) tự hết hiệu lực.
+_catalog_version = 0
+
+
+def catalog_version() -> int:
+    return _catalog_version
+
+
+def bump_catalog_version() -> int:
+    global _catalog_version
+    _catalog_version += 1
+    return _catalog_version
+# --- [KẾT THÚC NÂNG CẤP CACHE TÍNH TOÁN] ---
+
 # --- [KẾT THÚC NÂNG CẤP TRUYỀN ĐỘNG] ---
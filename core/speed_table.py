@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+"""
+Bảng tra tốc độ băng tối đa (data/hidden/Bang tra toc do bang tai.csv) được nạp một lần.
+
+SpeedTableRegistry đọc file CSV bằng pandas một lần, lưu dưới dạng mảng đã sắp xếp theo bề rộng
+và chỉ đọc lại khi mtime của file thay đổi. Các hàm tra cứu (gần nhất, nội suy, theo mảng)
+trả về cùng giá trị với get_max_speed_from_table trước đây.
+"""
+import os
+import bisect
+import hashlib
+import threading
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from .profiling import count_lookup
+from .tracing import get_tracer
+
+_trace = get_tracer(__name__)
+
+SPEED_TABLE_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'hidden', 'Bang tra toc do bang tai.csv')
+
+# Giá trị fallback an toàn khi không có bảng tra / không có dữ liệu
+FALLBACK_MAX_SPEED_MPS = 2.0
+
+WIDTH_COLUMN = 'conveyor width (mm)'
+GRANULAR_COLUMN = 'Granular materials (m/s)'
+ABRASIVE_COLUMN = 'Coal and abrasive materials (m/s)'
+HARD_COLUMN = 'Hard ores, rocks and materials with sharp edges (m/s)'
+# Thứ tự cột dùng khi ô của cột cần tra bị trống (an toàn nhất trước)
+SPEED_COLUMNS = (GRANULAR_COLUMN, ABRASIVE_COLUMN, HARD_COLUMN)
+
+
+def speed_column_for(material_characteristics: dict) -> str:
+    """
+    Chọn cột tốc độ theo đặc tính vật liệu (checkbox trên giao diện).
+
+    Args:
+        material_characteristics: Dict có các khóa is_abrasive, is_corrosive, is_dusty
+
+    Returns:
+        str: Tên cột tốc độ trong bảng tra
+    """
+    if material_characteristics.get('is_abrasive', False):
+        # Vật liệu hạt (ngũ cốc, than...) - checkbox "Granular materials"
+        return GRANULAR_COLUMN
+    if material_characteristics.get('is_corrosive', False):
+        # Vật liệu mài mòn (cát, xi măng, bột...) - checkbox "Coal and abrasive materials"
+        return ABRASIVE_COLUMN
+    if material_characteristics.get('is_dusty', False):
+        # Vật liệu cứng, có cạnh sắc (quặng, đá, kim loại...) - checkbox "Hard ores, rocks and materials with sharp edges"
+        return HARD_COLUMN
+    # Mặc định: vật liệu hạt (ngũ cốc, than...)
+    return GRANULAR_COLUMN
+
+
+class SpeedLimitTable:
+    """Bảng tra đã chỉ mục: bề rộng tăng dần và tốc độ tối đa (đã xử lý ô trống) cho từng cột vật liệu."""
+
+    def __init__(self, widths: np.ndarray, speeds: Dict[str, np.ndarray], file_order: np.ndarray = None):
+        self.widths = widths
+        self.speeds = speeds
+        # Thứ tự hàng trong file, dùng để chọn giữa hai bề rộng cách đều (giống cách tra cũ)
+        self.file_order = np.arange(len(widths)) if file_order is None else file_order
+        self._width_list = [int(w) for w in widths]
+        self._speed_lists = {col: [float(v) for v in values] for col, values in speeds.items()}
+
+    @classmethod
+    def from_dataframe(cls, df) -> 'SpeedLimitTable':
+        """
+        Dựng bảng từ DataFrame của file CSV.
+
+        Mỗi bề rộng giữ hàng xuất hiện đầu tiên; ô trống được thay bằng cột khác theo SPEED_COLUMNS,
+        nếu cả hàng đều trống thì dùng FALLBACK_MAX_SPEED_MPS.
+        """
+        widths = []
+        rows = []
+        seen = set()
+        for _, row in df.iterrows():
+            try:
+                width = int(row[WIDTH_COLUMN])
+            except (ValueError, TypeError):
+                continue
+            if width in seen:
+                continue
+            seen.add(width)
+            widths.append(width)
+            rows.append([_as_speed(row.get(col)) for col in SPEED_COLUMNS])
+
+        order = np.argsort(np.asarray(widths, dtype=int), kind='stable')
+        raw = np.asarray(rows, dtype=float).reshape(len(widths), len(SPEED_COLUMNS))[order]
+        speeds = {}
+        for k, col in enumerate(SPEED_COLUMNS):
+            resolved = raw[:, k].copy()
+            for j in range(len(SPEED_COLUMNS)):
+                missing = np.isnan(resolved)
+                resolved[missing] = raw[missing, j]
+            speeds[col] = np.where(np.isnan(resolved), FALLBACK_MAX_SPEED_MPS, resolved)
+        return cls(np.asarray(widths, dtype=int)[order], speeds, order)
+
+    def __len__(self) -> int:
+        return len(self.widths)
+
+    def nearest_index(self, widths_mm) -> np.ndarray:
+        """Chỉ số bề rộng gần nhất trong bảng (cách đều thì lấy hàng đứng trước trong file)."""
+        w = np.asarray(widths_mm, dtype=float)
+        right = np.clip(np.searchsorted(self.widths, w, side='left'), 0, len(self.widths) - 1)
+        left = np.clip(right - 1, 0, len(self.widths) - 1)
+        d_left = np.abs(w - self.widths[left])
+        d_right = np.abs(self.widths[right] - w)
+        use_left = (d_left < d_right) | ((d_left == d_right) & (self.file_order[left] <= self.file_order[right]))
+        return np.where(use_left, left, right)
+
+    def nearest(self, belt_width_mm: int, material_characteristics: dict) -> float:
+        """Tốc độ tối đa tại bề rộng gần nhất trong bảng."""
+        w = int(belt_width_mm)
+        widths = self._width_list
+        right = min(bisect.bisect_left(widths, w), len(widths) - 1)
+        left = max(right - 1, 0)
+        d_left, d_right = abs(w - widths[left]), abs(widths[right] - w)
+        if d_left < d_right or (d_left == d_right and self.file_order[left] <= self.file_order[right]):
+            right = left
+        return self._speed_lists[speed_column_for(material_characteristics)][right]
+
+    def interpolated(self, belt_width_mm: float, material_characteristics: dict) -> float:
+        """Tốc độ tối đa nội suy tuyến tính theo bề rộng (giữ nguyên giá trị biên ngoài phạm vi bảng)."""
+        speeds = self.speeds[speed_column_for(material_characteristics)]
+        return float(np.interp(float(belt_width_mm), self.widths, speeds))
+
+    def batch(self, widths_mm: Sequence[float], material_characteristics: dict, interpolate: bool = False) -> np.ndarray:
+        """
+        Tra tốc độ tối đa cho cả mảng bề rộng cùng một loại vật liệu.
+
+        Args:
+            widths_mm: Mảng bề rộng (mm)
+            material_characteristics: Đặc tính vật liệu
+            interpolate: True = nội suy, False = bề rộng gần nhất
+
+        Returns:
+            np.ndarray tốc độ tối đa (m/s)
+        """
+        speeds = self.speeds[speed_column_for(material_characteristics)]
+        if interpolate:
+            return np.interp(np.asarray(widths_mm, dtype=float), self.widths, speeds)
+        return speeds[self.nearest_index(np.asarray(widths_mm, dtype=float).astype(int))]
+
+
+def _as_speed(value) -> float:
+    try:
+        speed = float(value)
+    except (ValueError, TypeError):
+        return float('nan')
+    return speed
+
+
+class SpeedTableRegistry:
+    """Nạp bảng tra tốc độ một lần và chỉ nạp lại khi mtime của file thay đổi."""
+
+    def __init__(self, path: str = SPEED_TABLE_PATH):
+        self.path = path
+        self.loads = 0
+        self._lock = threading.Lock()
+        self._table: Optional[SpeedLimitTable] = None
+        self._mtime_ns: Optional[int] = None
+        self._checked = False
+        # (mtime_ns, kích thước) -> sha1 nội dung file, cho cache_key
+        self._digest: tuple = (None, "")
+
+    def get(self) -> Optional[SpeedLimitTable]:
+        """
+        Lấy bảng tra hiện hành.
+
+        Returns:
+            SpeedLimitTable, hoặc None nếu không có file / file không có bề rộng hợp lệ
+        """
+        try:
+            mtime_ns = os.stat(self.path).st_mtime_ns
+        except OSError:
+            mtime_ns = None
+        if self._checked and mtime_ns == self._mtime_ns:
+            return self._table
+        with self._lock:
+            if not (self._checked and mtime_ns == self._mtime_ns):
+                if mtime_ns is None:
+                    _trace.warning("missing_file", lambda: f"Không tìm thấy file bảng tra tốc độ: {self.path}, "
+                                                           f"dùng giá trị fallback an toàn {FALLBACK_MAX_SPEED_MPS} m/s")
+                    self._table = None
+                else:
+                    self._table = self._load()
+                self._mtime_ns = mtime_ns
+                self._checked = True
+            return self._table
+
+    @property
+    def cache_key(self) -> str:
+        """
+        Dấu vân tay (sha1) nội dung file bảng tra, dùng trong khóa cache kết quả.
+
+        Chỉ băm lại khi mtime/kích thước file thay đổi; không có file thì trả về "missing".
+        """
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return "missing"
+        state = (st.st_mtime_ns, st.st_size)
+        if state != self._digest[0]:
+            try:
+                with open(self.path, "rb") as f:
+                    digest = hashlib.sha1(f.read()).hexdigest()
+            except OSError:
+                return "unreadable"
+            self._digest = (state, digest)
+        return self._digest[1]
+
+    def invalidate(self):
+        """Buộc đọc lại file ở lần tra tiếp theo."""
+        with self._lock:
+            self._checked = False
+
+    def _load(self) -> Optional[SpeedLimitTable]:
+        try:
+            import pandas as pd
+            table = SpeedLimitTable.from_dataframe(pd.read_csv(self.path))
+            self.loads += 1
+        except Exception as e:
+            _trace.warning("read_error", lambda: f"Lỗi khi đọc bảng tra tốc độ: {e}, "
+                                                 f"dùng giá trị fallback an toàn {FALLBACK_MAX_SPEED_MPS} m/s")
+            return None
+        if not len(table):
+            _trace.warning("empty_table", lambda: f"Không có bề rộng băng hợp lệ trong {self.path}, "
+                                                  f"dùng giá trị fallback an toàn {FALLBACK_MAX_SPEED_MPS} m/s")
+            return None
+        return table
+
+    def max_speed(self, belt_width_mm: int, material_characteristics: dict, interpolate: bool = False) -> float:
+        """Tốc độ tối đa cho một bề rộng (fallback an toàn nếu không có bảng tra)."""
+        count_lookup("speed_limit")
+        table = self.get()
+        if table is None:
+            return FALLBACK_MAX_SPEED_MPS
+        if interpolate:
+            return table.interpolated(belt_width_mm, material_characteristics)
+        return table.nearest(belt_width_mm, material_characteristics)
+
+    def max_speeds(self, widths_mm: Sequence[float], material_characteristics: dict, interpolate: bool = False) -> np.ndarray:
+        """Tốc độ tối đa cho mảng bề rộng (fallback an toàn nếu không có bảng tra)."""
+        count_lookup("speed_limit")
+        table = self.get()
+        if table is None:
+            return np.full(len(widths_mm), FALLBACK_MAX_SPEED_MPS, dtype=float)
+        return table.batch(widths_mm, material_characteristics, interpolate=interpolate)
+
+
+# Registry dùng chung cho toàn chương trình
+SPEED_TABLE_REGISTRY = SpeedTableRegistry()
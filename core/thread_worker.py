@@ -1,57 +1,69 @@
 # -*- coding: utf-8 -*-
 from PySide6.QtCore import QThread, Signal
 from .models import ConveyorParameters, CalculationResult
+from .diagnostics import DiagCode, Diagnostic
 from .validators import validate_input_ranges, validate_material_compatibility
-from .engine import calculate
+from .calc_cache import cached_calculate
+from .incremental import recalculate
+from .tracing import get_tracer
 import traceback
 import logging
 
+_trace = get_tracer(__name__)
+
 class CalculationThread(QThread):
     progress_updated = Signal(int)
     calculation_finished = Signal(object)
     status_updated = Signal(str)
 
-    def __init__(self, params: ConveyorParameters):
+    def __init__(self, params: ConveyorParameters, previous_result: CalculationResult = None):
         super().__init__()
         self.params = params
+        # Kết quả lần tính trước (có stage_state) để chỉ tính lại phần bị ảnh hưởng
+        self.previous_result = previous_result
 
     def run(self):
         try:
             self.status_updated.emit("Đang kiểm tra dữ liệu đầu vào...")
-            print(f"DEBUG: Bắt đầu tính toán với params: {self.params}")
+            _trace.debug("run", lambda: f"Bắt đầu tính toán với params: {self.params}")
             
             warns = []
             warns += validate_input_ranges(self.params)
             warns += validate_material_compatibility(self.params)
-            print(f"DEBUG: Validation warnings: {warns}")
+            _trace.debug("run", lambda: f"Validation warnings: {warns}")
             self.progress_updated.emit(15)
 
             self.status_updated.emit("Đang tính toán tải trọng và tiết diện...")
             self.progress_updated.emit(45)
 
-            print("DEBUG: Gọi hàm calculate()...")
-            res = calculate(self.params)
-            print(f"DEBUG: Kết quả từ calculate(): {res}")
-            print(f"DEBUG: Các giá trị chính: motor_power_kw={res.motor_power_kw}, required_power_kw={res.required_power_kw}")
+            _trace.debug("run", "Gọi hàm calculate()...")
+            if getattr(self.previous_result, "stage_state", None) is not None:
+                # Chỉ chạy lại các giai đoạn phụ thuộc vào tham số đã đổi
+                res = recalculate(self.previous_result, self.params)
+            else:
+                # Qua cache kết quả: tính lại cùng bộ tham số trên cùng CSDL không chạy lại engine
+                res = cached_calculate(self.params, track_stages=True)
+            _trace.debug("run", lambda: f"Kết quả từ calculate(): {res}")
+            _trace.debug("run", lambda: f"Các giá trị chính: motor_power_kw={res.motor_power_kw}, required_power_kw={res.required_power_kw}")
             
             # Thêm validation warnings vào kết quả
-            res.warnings.extend(warns)
+            res.diagnostics.extend(Diagnostic.text(w) for w in warns)
 
             self.progress_updated.emit(90)
             self.status_updated.emit("Đang hoàn thiện kết quả...")
 
             self.progress_updated.emit(100)
             self.status_updated.emit("Tính toán hoàn tất.")
-            print(f"DEBUG: Kết quả cuối cùng: {res}")
+            _trace.debug("run", lambda: f"Kết quả cuối cùng: {res}")
             
         except Exception as e:
-            print(f"DEBUG: Exception xảy ra: {e}")
-            print(f"DEBUG: Traceback: {traceback.format_exc()}")
+            _trace.debug("run", lambda: f"Exception xảy ra: {e}")
+            _trace.debug("run", lambda: f"Traceback: {traceback.format_exc()}")
             
             # Tạo kết quả rỗng với warning về lỗi
             res = CalculationResult()
-            res.warnings.append(f"Lỗi tính toán: {e}")
+            res.diagnostics.append(Diagnostic(DiagCode.CALCULATION_ERROR, (str(e),)))
             logging.error(f"Lỗi tính toán: {e}", exc_info=True)
         
-        print(f"DEBUG: Emit kết quả: {res}")
+        _trace.debug("run", lambda: f"Emit kết quả: {res}")
         self.calculation_finished.emit(res)
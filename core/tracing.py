@@ -0,0 +1,304 @@
+# -*- coding: utf-8 -*-
+"""
+Truy vết có cấu trúc thay cho các dòng print(f"DEBUG ...").
+
+Mỗi module lấy một Tracer bằng get_tracer(__name__) và ghi sự kiện có tên + mức độ:
+
+    _trace = get_tracer(__name__)
+    _trace.debug("tension", lambda: f"T1={T1}, T2={T2}")
+
+Khi module không được bật, lời gọi trả về ngay (không format chuỗi, không ghi stdout).
+Thông điệp có thể là chuỗi hoặc hàm trả về chuỗi (chỉ được gọi khi sự kiện thật sự được ghi).
+
+Bật theo module (tiền tố tên module):
+    enable("core.engine")                # DEBUG trở lên, ghi vào ring buffer
+    enable("core", level=WARNING, echo=True)
+hoặc qua biến môi trường CONVEYOR_TRACE="core.engine:DEBUG,core.optimizer:INFO".
+
+Lấy toàn bộ vết của một lần tính:
+    with capture() as trace:
+        calculate(params)
+    trace.to_json("trace.json")
+"""
+import itertools
+import json
+import os
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field, asdict
+from typing import Callable, Dict, List, Optional, Union
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+OFF = 100
+
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING", ERROR: "ERROR", OFF: "OFF"}
+_NAME_TO_LEVEL = {name: level for level, name in LEVEL_NAMES.items()}
+
+# Số sự kiện tối đa giữ trong ring buffer
+DEFAULT_BUFFER_SIZE = 10_000
+
+Message = Union[str, Callable[[], str], None]
+
+
+@dataclass
+class TraceEvent:
+    """Một sự kiện truy vết."""
+    seq: int
+    timestamp: float
+    thread: int
+    module: str
+    level: int
+    event: str
+    message: str = ""
+    fields: Dict = field(default_factory=dict)
+
+    @property
+    def level_name(self) -> str:
+        return LEVEL_NAMES.get(self.level, str(self.level))
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["level"] = self.level_name
+        return data
+
+    def format(self) -> str:
+        extra = " ".join(f"{k}={v}" for k, v in self.fields.items())
+        text = " ".join(part for part in (self.message, extra) if part)
+        return f"{self.level_name} [{self.module}] {self.event}: {text}"
+
+
+class Tracer:
+    """Bộ ghi sự kiện của một module. level = OFF khi module không được bật."""
+
+    __slots__ = ("module", "level")
+
+    def __init__(self, module: str):
+        self.module = module
+        self.level = OFF
+
+    @property
+    def enabled(self) -> bool:
+        return self.level < OFF
+
+    def is_enabled_for(self, level: int) -> bool:
+        return level >= self.level
+
+    def debug(self, event: str, message: Message = None, **fields):
+        if self.level > DEBUG:
+            return
+        _emit(self, DEBUG, event, message, fields)
+
+    def info(self, event: str, message: Message = None, **fields):
+        if self.level > INFO:
+            return
+        _emit(self, INFO, event, message, fields)
+
+    def warning(self, event: str, message: Message = None, **fields):
+        if self.level > WARNING:
+            return
+        _emit(self, WARNING, event, message, fields)
+
+    def error(self, event: str, message: Message = None, **fields):
+        if self.level > ERROR:
+            return
+        _emit(self, ERROR, event, message, fields)
+
+
+class TraceCapture:
+    """Các sự kiện được ghi trong một khối capture() (chỉ của thread đã mở capture)."""
+
+    def __init__(self):
+        self.events: List[TraceEvent] = []
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    def counts(self) -> Counter:
+        """Số sự kiện theo (module, event)."""
+        return Counter((e.module, e.event) for e in self.events)
+
+    def to_dicts(self) -> List[dict]:
+        return [e.to_dict() for e in self.events]
+
+    def to_json(self, path: Optional[str] = None, indent: int = 2) -> str:
+        """
+        Xuất vết ra JSON.
+
+        Args:
+            path: Đường dẫn file (None = chỉ trả về chuỗi)
+            indent: Thụt lề JSON
+
+        Returns:
+            Chuỗi JSON
+        """
+        text = json.dumps(self.to_dicts(), ensure_ascii=False, indent=indent, default=repr)
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+        return text
+
+
+# ---------------- Trạng thái toàn cục ----------------
+
+_lock = threading.Lock()
+_tracers: Dict[str, Tracer] = {}
+# Tiền tố module -> mức tối thiểu ("" = mọi module)
+_rules: Dict[str, int] = {}
+_echo = False
+_buffer: deque = deque(maxlen=DEFAULT_BUFFER_SIZE)
+_captures: Dict[int, List[TraceCapture]] = {}
+_seq = itertools.count()
+
+
+def get_tracer(module: str) -> Tracer:
+    """Lấy (hoặc tạo) Tracer cho module."""
+    with _lock:
+        tracer = _tracers.get(module)
+        if tracer is None:
+            tracer = Tracer(module)
+            tracer.level = _level_for(module)
+            _tracers[module] = tracer
+        return tracer
+
+
+def enable(module_prefix: str = "", level: Union[int, str] = DEBUG, echo: Optional[bool] = None):
+    """
+    Bật truy vết cho các module có tên bắt đầu bằng module_prefix.
+
+    Args:
+        module_prefix: Tiền tố tên module ("" = tất cả)
+        level: Mức tối thiểu (DEBUG/INFO/WARNING/ERROR hoặc tên mức)
+        echo: True để in sự kiện ra stdout (như các dòng DEBUG cũ), None = giữ nguyên
+    """
+    global _echo
+    with _lock:
+        _rules[module_prefix] = _parse_level(level)
+        if echo is not None:
+            _echo = bool(echo)
+        _refresh_levels()
+
+
+def disable(module_prefix: Optional[str] = None):
+    """Tắt truy vết của một tiền tố (None = tắt toàn bộ)."""
+    global _echo
+    with _lock:
+        if module_prefix is None:
+            _rules.clear()
+            _echo = False
+        else:
+            _rules[module_prefix] = OFF
+        _refresh_levels()
+
+
+def configure_from_env(value: Optional[str] = None):
+    """
+    Cấu hình từ chuỗi dạng "core.engine:DEBUG,core.optimizer:INFO" (mặc định đọc CONVEYOR_TRACE).
+
+    Thêm ":echo" vào cuối một mục để in sự kiện ra stdout, ví dụ "core:DEBUG:echo".
+    """
+    value = os.environ.get("CONVEYOR_TRACE", "") if value is None else value
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        parts = item.split(":")
+        prefix = parts[0] if parts[0] not in ("*", "all") else ""
+        level = parts[1] if len(parts) > 1 and parts[1] else DEBUG
+        enable(prefix, level, echo=True if "echo" in parts[2:] else None)
+
+
+def set_buffer_size(size: int):
+    """Đổi kích thước ring buffer (giữ lại các sự kiện mới nhất)."""
+    global _buffer
+    with _lock:
+        _buffer = deque(_buffer, maxlen=size)
+
+
+def recent_events(limit: Optional[int] = None) -> List[TraceEvent]:
+    """Các sự kiện gần nhất trong ring buffer (cũ → mới)."""
+    events = list(_buffer)
+    return events[-limit:] if limit else events
+
+
+def clear_buffer():
+    _buffer.clear()
+
+
+@contextmanager
+def capture(module_prefix: str = "core", level: Union[int, str] = DEBUG):
+    """
+    Ghi lại mọi sự kiện của thread hiện tại trong khối with (ví dụ cho một lần calculate()).
+
+    Tạm bật truy vết cho module_prefix và khôi phục cấu hình cũ khi kết thúc.
+
+    Yields:
+        TraceCapture
+    """
+    cap = TraceCapture()
+    thread_id = threading.get_ident()
+    with _lock:
+        saved_rule = _rules.get(module_prefix)
+        _rules[module_prefix] = min(_parse_level(level), saved_rule if saved_rule is not None else OFF)
+        _captures.setdefault(thread_id, []).append(cap)
+        _refresh_levels()
+    try:
+        yield cap
+    finally:
+        with _lock:
+            _captures[thread_id].remove(cap)
+            if not _captures[thread_id]:
+                del _captures[thread_id]
+            if saved_rule is None:
+                _rules.pop(module_prefix, None)
+            else:
+                _rules[module_prefix] = saved_rule
+            _refresh_levels()
+
+
+# ---------------- Nội bộ ----------------
+
+def _parse_level(level: Union[int, str]) -> int:
+    if isinstance(level, str):
+        return _NAME_TO_LEVEL.get(level.strip().upper(), DEBUG)
+    return int(level)
+
+
+def _level_for(module: str) -> int:
+    """Mức của quy tắc có tiền tố dài nhất khớp với module."""
+    best_len = -1
+    level = OFF
+    for prefix, rule_level in _rules.items():
+        if (not prefix or module == prefix or module.startswith(prefix + ".")) and len(prefix) > best_len:
+            best_len = len(prefix)
+            level = rule_level
+    return level
+
+
+def _refresh_levels():
+    for tracer in _tracers.values():
+        tracer.level = _level_for(tracer.module)
+
+
+def _emit(tracer: Tracer, level: int, event: str, message: Message, fields: dict):
+    if callable(message):
+        message = message()
+    record = TraceEvent(
+        seq=next(_seq),
+        timestamp=time.time(),
+        thread=threading.get_ident(),
+        module=tracer.module,
+        level=level,
+        event=event,
+        message="" if message is None else str(message),
+        fields=fields,
+    )
+    _buffer.append(record)
+    for cap in _captures.get(record.thread, ()):
+        cap.events.append(record)
+    if _echo:
+        print(record.format())
+
+
+configure_from_env()
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+Atlas truyền động: lưới (hộp số × răng nhông dẫn × xích) dựng sẵn, dùng lại cho mọi công suất.
+
+Với một motor_rpm, một chế độ hộp số và một bộ xích, mọi đại lượng của find_optimal_transmission trừ
+lực kéo xích chỉ phụ thuộc vận tốc băng và đường kính puly (tức tốc độ puly yêu cầu). Atlas giữ các
+TransmissionGrid đã dựng theo khóa (vận tốc, puly, motor_rpm, hộp số, bộ xích); các ô của lưới được
+xếp sẵn theo các tiêu chí xếp hạng nên với một công suất bất kỳ, nghiệm chỉ cần một lần quét lọc bền.
+
+Trục công suất được giải chính xác (không chia nút), trục tốc độ puly là các giá trị thực gặp phải:
+nghiệm thay đổi theo từng bước làm tròn số răng z2 nên nội suy giữa các nút tốc độ cho nghiệm sai.
+Kết quả luôn trùng từng bit với tìm kiếm đầy đủ; các trường hợp hòa giữa hai cặp răng quay về
+xếp hạng đầy đủ trên lưới đã dựng.
+
+Atlas chỉ nằm trong bộ nhớ, không ghi đĩa như core/calc_cache.py: dựng và xếp hạng một lưới mất khoảng
+0.2 ms, ngang với thời gian unpickle lưới đó (~35 KB) chưa kể đọc file và băm khóa, nên tầng đĩa không
+làm nhanh hơn. Ngoài ra khóa của danh sách xích thường dùng id() của từng ChainSpec, không bền giữa các
+lần chạy. Kết quả cuối đã được lưu qua cache calculate() khi cần.
+
+    enable_transmission_atlas()          # hoặc biến môi trường CONVEYOR_TRANSMISSION_ATLAS=1
+    ...
+    disable_transmission_atlas()
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from .chain_catalog import ChainCatalog
+from .tracing import get_tracer
+
+_trace = get_tracer(__name__)
+
+# Số lưới tối đa giữ trong bộ nhớ (mỗi lưới khoảng 20-60 KB)
+DEFAULT_CAPACITY = 256
+
+
+class TransmissionAtlas:
+    """Bộ nhớ LRU các TransmissionGrid theo khóa (vận tốc, puly, motor_rpm, hộp số, bộ xích)."""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._grids: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._grids)
+
+    @staticmethod
+    def key(calculation_params, chain_specs: list, pulley_diameter: float) -> tuple:
+        use_manual = (calculation_params.gearbox_ratio_mode.lower() == "manual" and calculation_params.gearbox_ratio_user > 0)
+        return (
+            calculation_params.V_mps,
+            pulley_diameter,
+            calculation_params.motor_rpm,
+            calculation_params.gearbox_ratio_user if use_manual else None,
+            # ChainCatalog: token nội dung; list thường: danh tính từng ChainSpec
+            # (atlas giữ tham chiếu tới các xích nên id không bị dùng lại)
+            chain_specs.cache_key if isinstance(chain_specs, ChainCatalog) else tuple(map(id, chain_specs)),
+        )
+
+    def grid(self, calculation_params, chain_specs: list, pulley_diameter: float) -> tuple:
+        """
+        Lưới cho bộ tham số (dựng mới nếu chưa có).
+
+        Args:
+            calculation_params: Tham số có V_mps, motor_rpm, gearbox_ratio_mode, gearbox_ratio_user
+            chain_specs: Danh sách xích
+            pulley_diameter: Đường kính puly dẫn động (mm)
+
+        Returns:
+            (TransmissionGrid, True nếu lưới đã có sẵn trong atlas)
+        """
+        key = self.key(calculation_params, chain_specs, pulley_diameter)
+        with self._lock:
+            entry = self._grids.get(key)
+            if entry is not None:
+                self._grids.move_to_end(key)
+                self.hits += 1
+                return entry[0], True
+        from .engine import TransmissionGrid
+        grid = TransmissionGrid(calculation_params, chain_specs, pulley_diameter)
+        with self._lock:
+            self.misses += 1
+            self._grids[key] = (grid, tuple(chain_specs))
+            while len(self._grids) > self.capacity:
+                self._grids.popitem(last=False)
+        return grid, False
+
+    def clear(self):
+        with self._lock:
+            self._grids.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+_active: Optional[TransmissionAtlas] = None
+
+
+def active_transmission_atlas() -> Optional[TransmissionAtlas]:
+    """Atlas đang bật (None nếu chưa bật)."""
+    return _active
+
+
+def enable_transmission_atlas(capacity: int = DEFAULT_CAPACITY) -> TransmissionAtlas:
+    """
+    Bật atlas truyền động cho find_optimal_transmission (giữ atlas hiện có nếu đã bật).
+
+    Returns:
+        TransmissionAtlas đang dùng
+    """
+    global _active
+    if _active is None:
+        _active = TransmissionAtlas(capacity)
+        _trace.info("enable", lambda: f"Bật atlas truyền động (capacity={capacity})")
+    else:
+        _active.capacity = capacity
+    return _active
+
+
+def disable_transmission_atlas():
+    """Tắt atlas và giải phóng các lưới đã dựng."""
+    global _active
+    if _active is not None:
+        _trace.info("disable", lambda: f"Tắt atlas truyền động (hits={_active.hits}, misses={_active.misses})")
+    _active = None
+
+
+def configure_from_env(value: Optional[str] = None):
+    """Bật atlas khi CONVEYOR_TRANSMISSION_ATLAS là "1"/"true"/"on" hoặc số lưới tối đa."""
+    value = (os.environ.get("CONVEYOR_TRANSMISSION_ATLAS", "") if value is None else value).strip().lower()
+    if not value or value in ("0", "false", "off"):
+        return
+    enable_transmission_atlas(int(value) if value.isdigit() and int(value) > 1 else DEFAULT_CAPACITY)
+
+
+configure_from_env()
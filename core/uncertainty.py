@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+Lan truyền độ không chắc chắn bằng Monte Carlo (vector hóa).
+
+Các tham số đầu vào như khối lượng riêng, hệ số ma sát puly, hệ số ma sát f của tiêu chuẩn hay
+lưu lượng thường chỉ biết gần đúng. Module này rút hàng chục nghìn mẫu từ các phân phối do người
+dùng khai báo và đẩy toàn bộ qua pipeline vector hóa của core.batch (lực cản CEMA/DIN/ISO, lực
+căng, hệ số an toàn) trong một lượt, thay vì gọi calculate() cho từng mẫu.
+
+    result = propagate_uncertainty(params, {
+        "density_tpm3": Distribution.normal(1.6, 0.1, low=0.5),
+        "mu_pulley": Distribution.uniform(0.25, 0.35),
+        FRICTION_FACTOR: Distribution.triangular(0.018, 0.022, 0.03),
+    }, n_samples=20000, seed=1)
+    result.percentiles()["safety_factor"]      # P5, P50, P95
+    result.prob_sf_below_warning
+"""
+import dataclasses
+from dataclasses import dataclass
+from typing import Dict, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .models import ConveyorParameters
+from .safety_factors import get_sf_warning_thresholds
+
+# Tên "tham số" cho hệ số ma sát f của tiêu chuẩn (không phải trường của ConveyorParameters)
+FRICTION_FACTOR = "friction_factor"
+
+DEFAULT_PERCENTILES = (5.0, 50.0, 95.0)
+
+_PARAM_FIELDS = {f.name: f for f in dataclasses.fields(ConveyorParameters)}
+
+
+@dataclass(frozen=True)
+class Distribution:
+    """
+    Phân phối của một tham số đầu vào.
+
+    Dùng các hàm tạo normal/lognormal/uniform/triangular; low/high cắt mẫu về khoảng vật lý hợp lệ.
+    """
+    kind: str
+    a: float
+    b: float = 0.0
+    c: float = 0.0
+    low: Optional[float] = None
+    high: Optional[float] = None
+
+    @classmethod
+    def normal(cls, mean: float, std: float, low: Optional[float] = None,
+               high: Optional[float] = None) -> 'Distribution':
+        return cls("normal", mean, std, low=low, high=high)
+
+    @classmethod
+    def lognormal(cls, median: float, sigma: float) -> 'Distribution':
+        """Phân phối loga chuẩn theo trung vị và độ lệch chuẩn của log."""
+        return cls("lognormal", median, sigma)
+
+    @classmethod
+    def uniform(cls, low: float, high: float) -> 'Distribution':
+        return cls("uniform", low, high)
+
+    @classmethod
+    def triangular(cls, low: float, mode: float, high: float) -> 'Distribution':
+        return cls("triangular", low, mode, high)
+
+    def sample(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        """
+        Rút n mẫu.
+
+        Args:
+            rng: Bộ sinh số ngẫu nhiên NumPy
+            n: Số mẫu
+
+        Returns:
+            Mảng float n phần tử
+
+        Raises:
+            ValueError: Nếu loại phân phối không được hỗ trợ
+        """
+        if self.kind == "normal":
+            values = rng.normal(self.a, self.b, n)
+        elif self.kind == "lognormal":
+            values = rng.lognormal(np.log(self.a), self.b, n)
+        elif self.kind == "uniform":
+            values = rng.uniform(self.a, self.b, n)
+        elif self.kind == "triangular":
+            values = rng.triangular(self.a, self.b, self.c, n)
+        else:
+            raise ValueError(f"Không hỗ trợ phân phối: {self.kind}")
+        if self.low is not None or self.high is not None:
+            values = np.clip(values, self.low, self.high)
+        return values
+
+
+class UncertaintyResult(NamedTuple):
+    """Mẫu đầu vào và các đại lượng đầu ra theo từng mẫu."""
+    samples: Dict[str, np.ndarray]
+    required_power_kw: np.ndarray
+    motor_power_kw: np.ndarray
+    max_tension_N: np.ndarray
+    safety_factor: np.ndarray
+    sf_warning_thresholds: Tuple[float, float]   # (vàng, đỏ) theo get_sf_warning_thresholds
+
+    @property
+    def n_samples(self) -> int:
+        return len(self.safety_factor)
+
+    def percentiles(self, q: Sequence[float] = DEFAULT_PERCENTILES) -> Dict[str, np.ndarray]:
+        """
+        Phân vị của các đại lượng đầu ra.
+
+        Args:
+            q: Các phân vị (0-100)
+
+        Returns:
+            {tên đại lượng: mảng giá trị theo q}
+        """
+        return {
+            "required_power_kw": np.percentile(self.required_power_kw, q),
+            "motor_power_kw": np.percentile(self.motor_power_kw, q),
+            "max_tension_N": np.percentile(self.max_tension_N, q),
+            "safety_factor": np.percentile(self.safety_factor, q),
+        }
+
+    @property
+    def prob_sf_below_warning(self) -> float:
+        """Xác suất SF thực dưới ngưỡng cảnh báo vàng."""
+        return float(np.mean(self.safety_factor < self.sf_warning_thresholds[0]))
+
+    @property
+    def prob_sf_below_critical(self) -> float:
+        """Xác suất SF thực dưới ngưỡng cảnh báo đỏ."""
+        return float(np.mean(self.safety_factor < self.sf_warning_thresholds[1]))
+
+
+def propagate_uncertainty(params: ConveyorParameters, distributions: Mapping[str, Distribution],
+                          n_samples: int = 20000, seed: Optional[int] = None) -> UncertaintyResult:
+    """
+    Rút mẫu các tham số không chắc chắn và tính toàn bộ các mẫu trong một lượt vector hóa.
+
+    Args:
+        params: Tham số gốc (các trường không có phân phối giữ nguyên)
+        distributions: {tên trường ConveyorParameters hoặc FRICTION_FACTOR: Distribution}
+        n_samples: Số mẫu
+        seed: Hạt giống của bộ sinh số ngẫu nhiên (cùng seed cho cùng kết quả)
+
+    Returns:
+        UncertaintyResult
+
+    Raises:
+        TypeError: Nếu có tên không phải trường số của ConveyorParameters
+    """
+    from .batch import ConveyorParameterTable, calculate_batch
+
+    unknown = [name for name in distributions if name != FRICTION_FACTOR and name not in _PARAM_FIELDS]
+    if unknown:
+        raise TypeError(f"ConveyorParameters không có trường: {', '.join(unknown)}")
+    rng = np.random.default_rng(seed)
+    samples = {}
+    for name, dist in distributions.items():
+        values = dist.sample(rng, n_samples)
+        base = getattr(params, name, None)
+        if isinstance(base, int) and not isinstance(base, bool):
+            values = np.rint(values).astype(np.int64)
+        values.flags.writeable = False
+        samples[name] = values
+
+    variants = {name: values for name, values in samples.items() if name != FRICTION_FACTOR}
+    if not variants:
+        variants = {"Qt_tph": np.full(n_samples, params.Qt_tph)}
+    table = ConveyorParameterTable.from_variants(params, **variants)
+    results = calculate_batch(table, with_transmission=False, friction_factor=samples.get(FRICTION_FACTOR))
+    return UncertaintyResult(
+        samples,
+        results.required_power_kw,
+        results.motor_power_kw,
+        results.max_tension,
+        results.safety_factor,
+        get_sf_warning_thresholds(params.belt_type),
+    )
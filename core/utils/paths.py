@@ -169,6 +169,12 @@ def get_config_dir():
     ensure_dir(config_dir)
     return config_dir
 
+def get_cache_dir():
+    """Lấy thư mục cache"""
+    cache_dir = os.path.join(get_user_data_dir(), "cache")
+    ensure_dir(cache_dir)
+    return cache_dir
+
 
 __all__ = [
     "get_app_data_dir",
@@ -4,6 +4,8 @@ Utility functions for trough calculations.
 import re
 import math
 
+from ..formulas import cross_section_area_m2, geometric_capacity_tph
+
 def parse_trough_label(label: str, default_deg: float = 20.0) -> float:
     """Parse a trough angle label to numeric degrees.
 
@@ -45,18 +47,9 @@ def capacity_from_geometry_tph(
     surcharge_angle_rad = math.radians(float(surcharge_angle_deg))
 
     # Cross-sectional area: bottom wedge + side rise with trough
-    A_bottom = 0.25 * belt_width_m * belt_width_m * math.tan(surcharge_angle_rad)
-    A_sides = (belt_width_m * belt_width_m / 8.0) * (1.0 - math.cos(trough_angle_rad))
-    total_area_m2 = max(0.0, A_bottom + A_sides)
-
-    # Volume flow (m3/s) = area * speed
-    V = max(0.05, float(belt_speed_mps))
-    volume_flow_m3ps = total_area_m2 * V
-
-    # Density: input is tonnes/m3 → convert to kg/m3 for calculation then back to TPH
-    rho_kgm3 = max(0.1, float(material_density_tpm3)) * 1000.0
+    total_area_m2 = cross_section_area_m2(belt_width_m, math.tan(surcharge_angle_rad), math.cos(trough_angle_rad))
 
-    # TPH = m3/s * kg/m3 * 3600 / 1000
-    qt_calc_tph = volume_flow_m3ps * rho_kgm3 * 3.6
+    # TPH = area * speed (>= 0.05 m/s) * density (>= 0.1 t/m3, as kg/m3) * 3600 / 1000
+    qt_calc_tph = geometric_capacity_tph(total_area_m2, float(belt_speed_mps), float(material_density_tpm3))
 
     return qt_calc_tph, total_area_m2
@@ -8,6 +8,7 @@ Báo cáo bao gồm trang tổng quan (dashboard) với biểu đồ, các sheet
 import pandas as pd
 from datetime import datetime
 from core.models import CalculationResult, ConveyorParameters
+from core.route import describe_route
 
 def export_excel_report(path: str, params: ConveyorParameters, result: CalculationResult):
     """
@@ -139,7 +140,9 @@ def _write_inputs_sheet(writer, params, formats):
     sheet_name = "Input_Parameters"
     
     # Chuyển đổi object thành dictionary để dễ xử lý
-    params_dict = vars(params)
+    params_dict = dict(vars(params))
+    # Tuyến (tuple các đoạn) được ghi thành chuỗi mô tả
+    params_dict["route"] = describe_route(getattr(params, "route", ()))
     
     df_inputs = pd.DataFrame(list(params_dict.items()), columns=["Thông số", "Giá trị"])
     df_inputs.to_excel(writer, sheet_name=sheet_name, index=False, startrow=1)
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Fixture dùng chung cho bộ kiểm thử: tạo ConveyorParameters và so sánh kết quả với calculate() vô hướng.
+
+Chạy từ thư mục gốc: python -m pytest -q
+"""
+import dataclasses
+import math
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.models import CalculationResult, ConveyorParameters  # noqa: E402
+
+# Bộ tham số gốc đầy đủ (ConveyorParameters không có giá trị mặc định cho các trường này)
+BASE_PARAMS = dict(
+    calculation_standard="CEMA", project_name="test", designer="test", client="test", location="test",
+    material="Than đá", density_tpm3=0.9, particle_size_mm=30, angle_repose_deg=35, material_temp_c=25,
+    is_abrasive=False, is_corrosive=False, is_dusty=False, Qt_tph=500, L_m=120, H_m=10, inclination_deg=5,
+    operating_hours=16, B_mm=1000, belt_type="Vải EP (Polyester)", belt_thickness_mm=12,
+    trough_angle_label="35°", surcharge_angle_deg=20, carrying_idler_spacing_m=1.2, return_idler_spacing_m=3.0,
+    drive_type="Head drive", motor_efficiency=0.95, gearbox_efficiency=0.96, mu_pulley=0.35, wrap_deg=210,
+    Kt_start=1.25, ambient_temp_c=30, humidity_percent=60, altitude_m=100, dusty_environment=False,
+    corrosive_environment=False, explosion_proof=False,
+)
+
+# Vài biến thể phủ các nhánh chính: tiêu chuẩn, kiểu truyền động, tốc độ tự tính/nhập tay,
+# hộp số manual, băng phẳng, băng dốc xuống và lưu lượng vượt tiết diện
+VARIANTS = {
+    "cema_auto_speed": dict(V_mps=None),
+    "din_fixed_speed": dict(calculation_standard="DIN 22101", V_mps=2.5, B_mm=800),
+    "iso_dual_drive": dict(calculation_standard="ISO 5048", drive_type="Dual drive", V_mps=3.15,
+                           L_m=800, H_m=40, Qt_tph=1500, B_mm=1200),
+    "tail_drive_manual_gearbox": dict(drive_type="Tail drive", V_mps=1.6, gearbox_ratio_mode="manual",
+                                      gearbox_ratio_user=40.0, motor_rpm=960),
+    "flat_belt_decline": dict(trough_angle_label="0° (phẳng)", H_m=-5, V_mps=1.25, Qt_tph=50, B_mm=650),
+    "over_capacity": dict(Qt_tph=2500, B_mm=500, V_mps=None, is_abrasive=True, is_dusty=True),
+}
+
+# Trường không so sánh: gắn thêm theo tùy chọn gọi hoặc là cache nội bộ
+_SKIP_FIELDS = {"profile", "stage_state", "_profile_cache"}
+
+
+def make_params(**overrides) -> ConveyorParameters:
+    """ConveyorParameters từ BASE_PARAMS với các trường thay đổi."""
+    values = dict(BASE_PARAMS)
+    values.update(overrides)
+    return ConveyorParameters(**values)
+
+
+def _same(a, b) -> bool:
+    if isinstance(a, float) and isinstance(b, float) and math.isnan(a) and math.isnan(b):
+        return True
+    if isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+        return np.array_equal(np.asarray(a), np.asarray(b), equal_nan=True)
+    return a == b
+
+
+def result_differences(a: CalculationResult, b: CalculationResult) -> list:
+    """Danh sách tên trường khác nhau giữa hai kết quả (so sánh chính xác, không dung sai)."""
+    diffs = [f.name for f in dataclasses.fields(CalculationResult)
+             if f.name not in _SKIP_FIELDS and not _same(getattr(a, f.name), getattr(b, f.name))]
+    for name in ("warnings", "recommended_pulley_diameters_mm", "recommended_idler_spacing_m",
+                 "distances_m", "tension_profile", "t2_profile"):
+        if not _same(getattr(a, name), getattr(b, name)):
+            diffs.append(name)
+    return diffs
+
+
+@pytest.fixture(params=sorted(VARIANTS))
+def params(request) -> ConveyorParameters:
+    """Từng biến thể trong VARIANTS."""
+    return make_params(**VARIANTS[request.param])
+
+
+@pytest.fixture
+def all_params() -> list:
+    """Mọi biến thể trong VARIANTS theo thứ tự tên."""
+    return [make_params(**VARIANTS[name]) for name in sorted(VARIANTS)]
+
+
+@pytest.fixture
+def assert_same_result():
+    """Hàm kiểm tra hai CalculationResult trùng từng trường."""
+    def check(actual: CalculationResult, expected: CalculationResult):
+        diffs = result_differences(actual, expected)
+        assert not diffs, "Các trường khác calculate(): " + ", ".join(
+            f"{name}={getattr(actual, name)!r} (mong đợi {getattr(expected, name)!r})" for name in diffs)
+    return check
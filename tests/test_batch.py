@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""calculate_batch() phải cho đúng kết quả của calculate() vô hướng trên từng hàng."""
+import numpy as np
+import pytest
+
+from core.batch import ConveyorParameterTable, calculate_batch
+from core.engine import calculate
+
+
+@pytest.mark.parametrize("with_transmission", [False, True])
+def test_rows_match_scalar_calculate(all_params, assert_same_result, with_transmission):
+    table = calculate_batch(all_params, with_transmission=with_transmission)
+    assert len(table) == len(all_params)
+    for i, p in enumerate(all_params):
+        expected = calculate(p, with_transmission=with_transmission)
+        assert_same_result(table.to_result(i), expected)
+        assert table.warnings(i) == expected.warnings
+        assert table["safety_factor"][i] == expected.safety_factor
+
+
+def test_from_variants_matches_from_params(all_params):
+    base = all_params[0]
+    widths = np.array([500, 650, 800, 1000, 1200], dtype=float)
+    capacities = np.array([50.0, 200.0, 500.0, 900.0, 1500.0])
+    table = ConveyorParameterTable.from_variants(base, B_mm=widths, Qt_tph=capacities)
+    rows = [base.replace(B_mm=int(b), Qt_tph=float(q)) for b, q in zip(widths, capacities)]
+
+    batch = calculate_batch(table, with_transmission=False)
+    reference = calculate_batch(rows, with_transmission=False)
+    for name in ("safety_factor", "motor_power_kw", "max_tension", "cost_capital_total", "belt_speed_mps"):
+        np.testing.assert_array_equal(batch[name], reference[name])
+
+
+def test_empty_batch():
+    assert len(calculate_batch([], with_transmission=False)) == 0
+
+
+def test_repeated_rows_share_one_transmission_grid(all_params, monkeypatch):
+    from core import transmission_atlas
+    built = []
+    original = transmission_atlas.TransmissionAtlas.grid
+
+    def counting_grid(self, *args):
+        grid, cached = original(self, *args)
+        built.append(cached)
+        return grid, cached
+
+    monkeypatch.setattr(transmission_atlas.TransmissionAtlas, "grid", counting_grid)
+    rows = [all_params[0]] * 4
+    table = calculate_batch(rows)
+    expected = calculate(all_params[0]).transmission_solution
+    assert all(s == expected for s in table.transmission_solutions)
+    # Hàng đầu dựng lưới, các hàng sau dùng lại
+    assert built == [False, True, True, True]
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""Cache kết quả theo nội dung: kết quả tra từ cache phải trùng calculate() và không bị chia sẻ giữa các lần gọi."""
+import os
+
+import pytest
+
+from core import calc_cache, specs
+from core.calc_cache import CalculationCache, cached_calculate, calculation_key, configure_calculation_cache
+from core.engine import calculate
+
+
+@pytest.fixture
+def swap_catalog(monkeypatch):
+    """Giả lập load_database: sửa CSDL tại chỗ rồi tăng phiên bản (được khôi phục sau test)."""
+    monkeypatch.setattr(specs, "_catalog_version", specs.catalog_version())
+    monkeypatch.setattr(calc_cache, "_fingerprint_state", calc_cache._fingerprint_state)
+
+    def swap():
+        monkeypatch.setitem(specs.ACTIVE_MATERIAL_DB, "Vật liệu thử", {"density": 1.0, "v_max": 2.0})
+        specs.bump_catalog_version()
+    return swap
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    """Cache dùng chung trỏ vào thư mục tạm; trạng thái cũ được khôi phục sau mỗi test."""
+    monkeypatch.setattr(calc_cache, "_cache", None)
+    monkeypatch.setattr(calc_cache, "_enabled", True)
+    return configure_calculation_cache(directory=str(tmp_path / "calculations"))
+
+
+@pytest.mark.parametrize("with_transmission", [False, True])
+def test_cached_result_matches_calculate(cache, params, with_transmission, assert_same_result):
+    expected = calculate(params, with_transmission=with_transmission)
+    first = cached_calculate(params, with_transmission=with_transmission)
+    second = cached_calculate(params, with_transmission=with_transmission)
+    assert (cache.misses, cache.memory_hits) == (1, 1)
+    assert_same_result(first, expected)
+    assert_same_result(second, expected)
+    # Mỗi lần tra là một bản sao mới: sửa kết quả đã nhận không ảnh hưởng cache
+    assert second is not first
+    second.warnings.append("đã sửa")
+    assert_same_result(cached_calculate(params, with_transmission=with_transmission), expected)
+
+
+def test_disk_tier_survives_new_cache(cache, all_params, assert_same_result):
+    p = all_params[0]
+    expected = cached_calculate(p)
+    reopened = CalculationCache(directory=cache.directory)
+    result = reopened.get(calculation_key(p))
+    assert reopened.disk_hits == 1
+    assert_same_result(result, expected)
+    assert CalculationCache(directory=cache.directory, persist=False).get(calculation_key(p)) is None
+
+
+def test_key_covers_params_options_and_catalog(all_params, swap_catalog):
+    p = all_params[0]
+    key = calculation_key(p)
+    assert calculation_key(p.replace()) == key
+    assert calculation_key(p.replace(B_mm=p.B_mm + 200)) != key
+    assert calculation_key(p, with_transmission=False) != key
+    assert calculation_key(p, track_stages=True) != key
+    # Khóa theo nội dung: nạp lại cùng CSDL giữ nguyên khóa, CSDL khác thì đổi khóa
+    specs.bump_catalog_version()
+    assert calculation_key(p) == key
+    swap_catalog()
+    assert calculation_key(p) != key
+
+
+def test_key_covers_speed_table(all_params, tmp_path, monkeypatch):
+    from core.speed_table import SPEED_TABLE_REGISTRY, WIDTH_COLUMN, SPEED_COLUMNS
+    table = tmp_path / "speed.csv"
+    table.write_text(",".join((WIDTH_COLUMN,) + SPEED_COLUMNS) + "\n800,3.0,2.5,2.0\n", encoding="utf-8")
+    monkeypatch.setattr(SPEED_TABLE_REGISTRY, "path", str(table))
+    monkeypatch.setattr(calc_cache, "_fingerprint_state", calc_cache._fingerprint_state)
+    p = all_params[0]
+    key = calculation_key(p)
+    assert calculation_key(p) == key
+    # Sửa giới hạn tốc độ trong file CSV: khóa phải đổi dù CSDL không đổi
+    table.write_bytes(table.read_bytes() + b"1000,3.5,3.0,2.5\n")
+    assert calculation_key(p) != key
+    table.unlink()
+    assert calculation_key(p) != key
+
+
+def test_catalog_change_clears_memory(cache, all_params, swap_catalog):
+    p = all_params[0]
+    cached_calculate(p, with_transmission=False)
+    assert len(cache) == 1
+    swap_catalog()
+    cached_calculate(p, with_transmission=False)
+    assert len(cache) == 1 and cache.misses == 2
+
+
+def test_memory_and_disk_eviction(tmp_path, all_params):
+    results = {calculation_key(p.replace(L_m=100 + i)): calculate(p.replace(L_m=100 + i), with_transmission=False)
+               for i, p in enumerate(all_params[:1] * 6)}
+    probe = CalculationCache(directory=str(tmp_path), persist=False)
+    probe.put("probe", next(iter(results.values())))
+    size = probe._memory_size
+    cache = CalculationCache(directory=str(tmp_path / "c"), memory_bytes=int(size * 2.5), disk_bytes=int(size * 3.5))
+    keys = list(results)
+    for key in keys:
+        cache.put(key, results[key])
+    # Bộ nhớ giữ 2 kết quả mới nhất, đĩa giữ không quá dung lượng cho phép
+    assert list(cache._memory) == keys[-2:]
+    on_disk = [os.path.basename(path)[:-4] for path, _, _ in cache._scan()]
+    assert 0 < len(on_disk) <= 3 and set(on_disk) <= set(keys)
+    assert sum(s for _, s, _ in cache._scan()) <= cache.disk_bytes
+    cache.clear(disk=True)
+    assert len(cache) == 0 and cache._scan() == []
+
+
+def test_disabled_cache_calls_calculate(monkeypatch, all_params, assert_same_result):
+    monkeypatch.setattr(calc_cache, "_cache", None)
+    monkeypatch.setattr(calc_cache, "_enabled", True)
+    assert configure_calculation_cache(enabled=False) is None
+    assert calc_cache.get_calculation_cache() is None
+    p = all_params[0]
+    assert_same_result(cached_calculate(p, with_transmission=False), calculate(p, with_transmission=False))
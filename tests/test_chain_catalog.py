@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""ChainCatalog có chỉ mục: mọi truy vấn phải trả về đúng những gì một vòng quét list ChainSpec trả về."""
+import math
+import pickle
+import random
+
+import numpy as np
+import pytest
+
+from core.chain_catalog import ChainCatalog, chain_columns
+from core.models import ChainSpec
+from core.specs import ACTIVE_CHAIN_SPECS, CHAIN_TENSILE_STRENGTH_SAFETY_FACTOR
+
+
+def vendor_catalog(n=600, seed=3) -> ChainCatalog:
+    """Catalog lớn giả lập: bước xích trùng nhau, mã lặp theo strand, một số xích thiếu dữ liệu bền."""
+    rng = random.Random(seed)
+    pitches = [6.35, 8.0, 9.525, 12.7, 15.875, 19.05, 25.4, 31.75, 38.1, 50.8]
+    chains = []
+    for i in range(n):
+        pitch = rng.choice(pitches)
+        code = f"{int(pitch * 8 / 12.7):02d}{rng.choice('AB')}"
+        chains.append(ChainSpec(
+            designation=f"V{i % 150}/{code}", pitch_mm=pitch, weight_kgpm=round(rng.uniform(0.1, 12.0), 2),
+            tensile_strength_min_kn=rng.choice([0.0, round(rng.uniform(4.0, 900.0), 1)]),
+            iso_code=code, ansi_code=str(rng.choice([25, 35, 40, 50, 60, 80])), strand=rng.randint(1, 3)))
+    return ChainCatalog(chains)
+
+
+@pytest.fixture(params=["active", "vendor"])
+def catalog(request):
+    return ACTIVE_CHAIN_SPECS if request.param == "active" else vendor_catalog()
+
+
+def allowable(chain, safety_factor=CHAIN_TENSILE_STRENGTH_SAFETY_FACTOR):
+    return chain.tensile_strength_min_kn / safety_factor if chain.tensile_strength_min_kn > 0 else math.inf
+
+
+def test_designation_and_code_indexes(catalog):
+    chains = list(catalog)
+    designations = tuple(c.designation for c in chains if c.designation)
+    assert catalog.designations == designations
+    assert catalog.unique_designations == tuple(dict.fromkeys(designations))
+    for designation in list(dict.fromkeys(designations))[:20] + ["không có"]:
+        expected = [c for c in chains if c.designation == designation]
+        assert catalog.by_designation(designation) == expected
+        assert list(catalog.subset(designation)) == expected
+        assert catalog.subset(designation) is catalog.subset(designation)
+    for code in ({c.iso_code for c in chains} | {c.ansi_code for c in chains}) - {""}:
+        assert catalog.by_code(code) == [c for c in chains if code in (c.iso_code, c.ansi_code)]
+    for strand in (1, 2, 3, 4):
+        assert catalog.with_strand(strand) == [c for c in chains if c.strand == strand]
+
+
+@pytest.mark.parametrize("low,high", [(-math.inf, math.inf), (8.0, 19.05), (12.7, 12.7), (13.0, 15.0), (60.0, 90.0)])
+def test_pitch_range_matches_scan(catalog, low, high):
+    expected = sorted((c for c in catalog if low <= c.pitch_mm <= high), key=lambda c: c.pitch_mm)
+    assert catalog.pitch_between(low, high) == expected
+
+
+@pytest.mark.parametrize("min_kN", [0.0, 5.0, 20.0, 75.5, 1e6])
+@pytest.mark.parametrize("safety_factor", [None, 2.5])
+def test_allowable_queries_match_scan(catalog, min_kN, safety_factor):
+    sf = CHAIN_TENSILE_STRENGTH_SAFETY_FACTOR if safety_factor is None else safety_factor
+    matching = [c for c in catalog if allowable(c, sf) >= min_kN]
+    assert catalog.with_allowable(min_kN, safety_factor) == sorted(matching, key=lambda c: c.pitch_mm)
+    assert catalog.with_allowable(min_kN, safety_factor, sort_by="allowable") == \
+        sorted(matching, key=lambda c: allowable(c, sf))
+    assert catalog.with_allowable(min_kN, safety_factor, sort_by="catalog") == matching
+
+
+def test_transmission_columns_match_chain_columns(catalog):
+    chains, pitch, allowable_kN, weight = catalog.transmission_columns(CHAIN_TENSILE_STRENGTH_SAFETY_FACTOR)
+    expected = chain_columns(list(catalog), CHAIN_TENSILE_STRENGTH_SAFETY_FACTOR)
+    assert list(chains) == expected[0]
+    for actual, reference in zip((pitch, allowable_kN, weight), expected[1:]):
+        np.testing.assert_array_equal(actual, reference)
+        assert not actual.flags.writeable
+
+
+def test_mutation_invalidates_indexes():
+    catalog = vendor_catalog(n=50)
+    key = catalog.cache_key
+    first = catalog.designations
+    extra = ChainSpec(designation="EXTRA", pitch_mm=7.0, tensile_strength_min_kn=10.0, iso_code="X1", strand=1)
+    catalog.append(extra)
+    assert catalog.cache_key != key
+    assert catalog.designations == first + ("EXTRA",)
+    assert catalog.by_code("X1") == [extra]
+    assert extra in catalog.pitch_between(7.0, 7.0)
+    catalog[:] = catalog[:10]
+    assert catalog.by_designation("EXTRA") == []
+    assert len(catalog.designations) == 10
+
+
+def test_pickle_round_trip():
+    catalog = vendor_catalog(n=40)
+    catalog.with_allowable(10.0)
+    restored = pickle.loads(pickle.dumps(catalog))
+    assert isinstance(restored, ChainCatalog)
+    assert list(restored) == list(catalog)
+    assert restored.with_allowable(10.0) == catalog.with_allowable(10.0)
+    with pytest.raises(ValueError):
+        catalog.with_allowable(1.0, sort_by="weight")
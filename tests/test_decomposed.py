@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""Chế độ phân rã (băng tải × truyền động) phải cho đúng kết quả của đánh giá đầy đủ."""
+import itertools
+
+import pytest
+
+from core.engine import attach_transmission, calculate
+from core.optimizer.models import OptimizerSettings
+from core.optimizer.optimizer import Optimizer, _has_transmission, evaluate_belt_stage, evaluate_design, evaluate_drive_stage
+
+# Có cả tổ hợp tìm được và không tìm được bộ truyền động (500 mm, i=60, xích 25/05B)
+GENES = list(itertools.product(
+    (500, 800),
+    ("Vải EP (Polyester)", "Dây thép (ST)"),
+    (40, 60),
+    ("25/05B (ANSI/ISO)", "80/16A (ANSI/ISO)"),
+))
+
+
+def test_attach_transmission_matches_calculate(params, assert_same_result):
+    result = calculate(params, with_transmission=False)
+    # Engine đã chốt tốc độ băng trong kết quả; bộ truyền động dùng tốc độ đó
+    attach_transmission(result, params.replace(V_mps=result.belt_speed_mps))
+    assert_same_result(result, calculate(params))
+
+
+@pytest.mark.parametrize("genes", GENES, ids=lambda g: f"{g[0]}-{g[2]}-{g[3][:2]}")
+def test_drive_stage_matches_evaluate_design(make_base, assert_same_result, genes):
+    base, settings = make_base
+    belt_stage = evaluate_belt_stage(base, genes[0], genes[1])
+    decomposed = evaluate_drive_stage(belt_stage, settings, genes)
+    full = evaluate_design(base, settings, genes)
+
+    assert_same_result(decomposed[0], full[0])
+    assert decomposed[1:] == full[1:]
+
+
+def test_optimizer_modes_agree(make_base, assert_same_result):
+    base, settings = make_base
+    full = Optimizer(base, settings)._compute_evaluations(GENES)
+    decomposed_optimizer = Optimizer(base, OptimizerSettings(evaluation_mode="decomposed", evaluation_backend="thread"))
+    decomposed = decomposed_optimizer._compute_evaluations(GENES)
+
+    # Engine chỉ chạy một lần cho mỗi cặp (bề rộng, loại băng)
+    assert len(decomposed_optimizer._belt_stages) == 4
+    assert any(_has_transmission(evaluation[0]) for evaluation in full.values())
+    assert not all(_has_transmission(evaluation[0]) for evaluation in full.values())
+    for genes in GENES:
+        assert_same_result(decomposed[genes][0], full[genes][0])
+        assert decomposed[genes][1:] == full[genes][1:]
+
+
+@pytest.fixture
+def make_base(all_params):
+    """Bài toán nhỏ (tốc độ tự tính, đa số gene có bộ truyền động) và cài đặt đánh giá bằng luồng."""
+    base = all_params[0].replace(V_mps=None, Qt_tph=15, B_mm=800, L_m=20, H_m=0)
+    return base, OptimizerSettings(evaluation_backend="thread")
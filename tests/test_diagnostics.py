@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""Chẩn đoán có mã: câu thông báo định dạng lại phải trùng với cảnh báo dạng chuỗi của engine trước đây."""
+import pytest
+
+from core.diagnostics import DiagCode, Diagnostic, Severity, as_diagnostic, format_messages, severity_of
+from core.engine import calculate
+from core.models import CalculationResult
+
+# (cảnh báo, khuyến nghị) của calculate() trước khi chuyển sang chẩn đoán có mã, theo tên biến thể trong conftest
+LEGACY_MESSAGES = {'cema_auto_speed': (('Lưu lượng yêu cầu đang tiệm cận năng lực tiết diện (100.0%).',
+                      '⚠️ Hệ số an toàn thực tế QUÁ THẤP (SF = 0.43 < 8.0).',
+                      'Mức sử dụng cường độ đai cao (233.8%).',
+                      '🔍 T_allow = 10000 N/m có vẻ không hợp lý (kiểm tra đơn vị)',
+                      '🔍 SF thiết kế = 0.0 có vẻ không hợp lý',
+                      '🔍 SF thực = 0.4276771261322703 có vẻ không hợp lý'),
+                     ('Cân nhắc tăng bề rộng hoặc chọn đai bền hơn (ST).',
+                      'KIỂM TRA NGAY: Thiết kế có thể không an toàn!',
+                      'Cân nhắc tăng bề rộng băng hoặc chọn đai bền hơn.')),
+ 'din_fixed_speed': (('⚠️ CẢNH BÁO: Tốc độ người dùng nhập (2.50 m/s) vượt quá tốc độ tối đa cho phép (2.00 m/s) '
+                      'theo bảng tra cho bề rộng 800mm. Thiết kế này KHÔNG TỐI ƯU - cần tăng bề rộng băng hoặc '
+                      'giảm lưu lượng.',
+                      '⚠️ Hệ số an toàn thực tế QUÁ THẤP (SF = 0.70 < 8.0).',
+                      'Mức sử dụng cường độ đai cao (143.0%).',
+                      '🔍 T_allow = 10000 N/m có vẻ không hợp lý (kiểm tra đơn vị)',
+                      '🔍 SF thiết kế = 0.0 có vẻ không hợp lý',
+                      '🔍 SF thực = 0.6991979195724317 có vẻ không hợp lý'),
+                     ('Cân nhắc tăng bề rộng hoặc chọn đai bền hơn (ST).',
+                      'KIỂM TRA NGAY: Thiết kế có thể không an toàn!',
+                      'Cân nhắc tăng bề rộng băng hoặc chọn đai bền hơn.')),
+ 'flat_belt_decline': (('⚠️ Hệ số an toàn thực tế QUÁ THẤP (SF = 2.25 < 8.0).',
+                        '🔍 T_allow = 10000 N/m có vẻ không hợp lý (kiểm tra đơn vị)',
+                        '🔍 SF thiết kế = 0.0 có vẻ không hợp lý'),
+                       ('Cân nhắc tăng bề rộng hoặc chọn đai bền hơn (ST).',
+                        'KIỂM TRA NGAY: Thiết kế có thể không an toàn!')),
+ 'iso_dual_drive': (('⚠️ CẢNH BÁO: Tốc độ người dùng nhập (3.15 m/s) vượt quá tốc độ tối đa cho phép (2.00 m/s) '
+                     'theo bảng tra cho bề rộng 1200mm. Thiết kế này KHÔNG TỐI ƯU - cần tăng bề rộng băng hoặc '
+                     'giảm lưu lượng.',
+                     'Tính toán truyền động kép hiện tại dựa trên phương pháp CEMA (Mục 6.2, PDF), bỏ qua lựa '
+                     'chọn ISO 5048.',
+                     '⚠️ Hệ số an toàn thực tế QUÁ THẤP (SF = 0.12 < 8.0).',
+                     'Mức sử dụng cường độ đai cao (815.2%).',
+                     '🔍 T_allow = 10000 N/m có vẻ không hợp lý (kiểm tra đơn vị)',
+                     '🔍 SF thiết kế = 0.0 có vẻ không hợp lý',
+                     '🔍 SF thực = 0.1226720857855453 có vẻ không hợp lý'),
+                    ('Cân nhắc tăng bề rộng hoặc chọn đai bền hơn (ST).',
+                     'KIỂM TRA NGAY: Thiết kế có thể không an toàn!',
+                     'Cân nhắc tăng bề rộng băng hoặc chọn đai bền hơn.')),
+ 'over_capacity': (('Tốc độ cần thiết (27.17 m/s) vượt quá tốc độ khuyến nghị (4.50 m/s) + 15% margin. Cân nhắc '
+                    'tăng bề rộng băng hoặc giảm lưu lượng.',
+                    '⚠️ CẢNH BÁO: Tốc độ tính toán (27.17 m/s) vượt quá tốc độ tối đa cho phép (2.00 m/s) theo '
+                    'bảng tra cho bề rộng 500mm. Thiết kế này KHÔNG TỐI ƯU - cần tăng bề rộng băng hoặc giảm lưu '
+                    'lượng.',
+                    'Lưu lượng yêu cầu đang tiệm cận năng lực tiết diện (100.0%).',
+                    '⚠️ Hệ số an toàn thực tế QUÁ THẤP (SF = 0.76 < 8.0).',
+                    'Mức sử dụng cường độ đai cao (131.1%).',
+                    '🔍 T_allow = 10000 N/m có vẻ không hợp lý (kiểm tra đơn vị)',
+                    '🔍 SF thiết kế = 0.0 có vẻ không hợp lý',
+                    '🔍 SF thực = 0.7629802129519662 có vẻ không hợp lý'),
+                   ('Cân nhắc tăng bề rộng hoặc chọn đai bền hơn (ST).',
+                    'KIỂM TRA NGAY: Thiết kế có thể không an toàn!',
+                    'Cân nhắc tăng bề rộng băng hoặc chọn đai bền hơn.')),
+ 'tail_drive_manual_gearbox': (('⚠️ Hệ số an toàn thực tế QUÁ THẤP (SF = 0.44 < 8.0).',
+                                'Mức sử dụng cường độ đai cao (227.8%).',
+                                '🔍 T_allow = 10000 N/m có vẻ không hợp lý (kiểm tra đơn vị)',
+                                '🔍 SF thiết kế = 0.0 có vẻ không hợp lý',
+                                '🔍 SF thực = 0.438949276212789 có vẻ không hợp lý'),
+                               ('Cân nhắc tăng bề rộng hoặc chọn đai bền hơn (ST).',
+                                'KIỂM TRA NGAY: Thiết kế có thể không an toàn!',
+                                'Cân nhắc tăng bề rộng băng hoặc chọn đai bền hơn.'))}
+
+
+def test_messages_match_legacy_strings(params, request):
+    name = request.node.callspec.id
+    warnings, recommendations = LEGACY_MESSAGES[name]
+    result = calculate(params)
+    assert tuple(result.warnings) == warnings
+    assert tuple(result.recommendations) == recommendations
+    assert all(isinstance(d, Diagnostic) and d.code != DiagCode.TEXT for d in result.diagnostics)
+
+
+@pytest.mark.parametrize("code", list(DiagCode), ids=lambda c: c.name)
+def test_every_code_has_template(code):
+    args = ("x",) if code in (DiagCode.TEXT, DiagCode.CALCULATION_ERROR) else (1.5, 2.5, 3.5, 4.5, 5.5)
+    d = Diagnostic(code, args)
+    assert isinstance(d.message, str) and d.message
+    assert d.severity is severity_of(code)
+    assert str(d) == d.message
+
+
+def test_free_text_round_trip():
+    result = CalculationResult()
+    result.warnings = ["Kiểm tra đầu vào", Diagnostic(DiagCode.SF_LOW, (5.2, 6.0))]
+    assert result.diagnostics[0] == Diagnostic.text("Kiểm tra đầu vào")
+    assert result.diagnostics[1].severity == Severity.CRITICAL
+    assert result.warnings == format_messages(result.diagnostics)
+    assert as_diagnostic(result.diagnostics[1]) is result.diagnostics[1]
+    # Thêm/sửa qua warnings được ghi vào diagnostics như danh sách chuỗi cũ
+    result.warnings.append("được lưu")
+    assert result.diagnostics[2] == Diagnostic.text("được lưu")
+    result.warnings.extend(["a", "b"])
+    result.warnings[0] = "đã sửa"
+    del result.warnings[-1]
+    assert result.warnings == ["đã sửa", result.diagnostics[1].message, "được lưu", "a"]
+    assert result.warnings[1:2] == [result.diagnostics[1].message]
+
+
+def test_belt_speed_warnings_formatted_unless_coded():
+    from core.optimize import calculate_belt_speed
+    from core.specs import ACTIVE_MATERIAL_DB
+    args = (2000.0, 1.6, 500, 50.0, next(iter(ACTIVE_MATERIAL_DB)))
+    chars = {"is_abrasive": True, "is_corrosive": False, "is_dusty": False}
+    *values, messages, v_max = calculate_belt_speed(*args, material_characteristics=chars)
+    *coded_values, coded, coded_v_max = calculate_belt_speed(*args, material_characteristics=chars, coded=True)
+    assert (values, v_max) == (coded_values, coded_v_max)
+    assert [d.code for d in coded] == [DiagCode.SPEED_ABOVE_RECOMMENDED, DiagCode.SPEED_ABOVE_MAX]
+    assert messages == format_messages(coded) and all(isinstance(m, str) for m in messages)
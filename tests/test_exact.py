@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""Vét cạn có cắt nhánh: cắt nhánh và dùng lại kết quả calculate_batch không làm đổi top-N."""
+import pytest
+
+from core.optimizer.exact import ExactSolver
+from core.optimizer.models import OptimizerSettings
+from core.optimizer.optimizer import Optimizer, evaluate_belt_stage
+
+
+@pytest.fixture
+def small_problem(all_params):
+    return all_params[0].replace(V_mps=None, Qt_tph=15, B_mm=800, L_m=60, H_m=5)
+
+
+def summary(optimizer, candidates):
+    return [(optimizer._genes(c), c.fitness_score, c.is_valid, [str(r) for r in c.invalid_reasons],
+             c.calculation_result.safety_factor, c.calculation_result.cost_capital_total,
+             c.calculation_result.transmission_solution) for c in candidates]
+
+
+def test_batch_belt_stages_match_scalar(small_problem, assert_same_result):
+    solver = ExactSolver(Optimizer(small_problem, OptimizerSettings()))
+    pairs = [(w, b) for w in solver.widths for b in solver.belt_types]
+    bounds = solver._batch_belt_stages(pairs)
+    assert solver.batch_belt_stages == len(pairs) == len(bounds)
+    for width, belt_type in pairs:
+        params, result, error, speed, speed_warnings = solver._stages[(width, belt_type)]
+        expected = evaluate_belt_stage(small_problem, width, belt_type)
+        assert error is None and expected[2] is None
+        assert_same_result(result, expected[1])
+        assert params == expected[0]
+        assert (speed, speed_warnings) == (expected[3], expected[4])
+        assert bounds[(width, belt_type)] == (result.safety_factor, result.cost_capital_total)
+
+
+def test_pruning_keeps_top_n(small_problem):
+    settings = OptimizerSettings(min_belt_safety_factor=10)
+    pruned_optimizer = Optimizer(small_problem, settings)
+    pruned = pruned_optimizer.run_exact(top_n=10, prune=True)
+    exhaustive_optimizer = Optimizer(small_problem, settings)
+    exhaustive = exhaustive_optimizer.run_exact(top_n=10, prune=False)
+    assert pruned
+    assert summary(pruned_optimizer, pruned) == summary(exhaustive_optimizer, exhaustive)
+
+
+def test_velocity_error_pruning_keeps_top_n(small_problem):
+    # Sai số vận tốc cho phép rất nhỏ: nhiều hộp số bị cắt theo cận của TransmissionGrid
+    settings = OptimizerSettings(max_velocity_error_percent=0.05)
+    pruned_solver = ExactSolver(Optimizer(small_problem, settings))
+    pruned = pruned_solver.solve(top_n=10, prune=True)
+    exhaustive_solver = ExactSolver(Optimizer(small_problem, settings))
+    exhaustive = exhaustive_solver.solve(top_n=10, prune=False)
+    assert summary(pruned_solver.optimizer, pruned) == summary(exhaustive_solver.optimizer, exhaustive)
+    belt_level = pruned_solver.pruned_belt_stages * len(pruned_solver.gearbox_ratios) * len(pruned_solver.chains)
+    assert pruned_solver.pruned_drives > belt_level
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+"""Công thức dùng chung: bản vô hướng (calculate) và bản mảng (calculate_batch) phải trùng từng bit."""
+import math
+
+import numpy as np
+
+from core import formulas
+
+
+def test_scalar_and_array_agree_bit_for_bit():
+    eff = np.array([1500.0, 2.5e4, 7.0])
+    e_ratio = np.array([1.0, math.exp(0.35 * math.radians(210.0)), 1.0 + 1e-7])
+    T1, T2 = formulas.euler_eytelwein(eff, e_ratio)
+    for i in range(eff.size):
+        assert formulas.euler_eytelwein(float(eff[i]), float(e_ratio[i])) == (T1[i], T2[i])
+
+    labels = np.array(["Phân phối lý thuyết", "Phân phối 2/1 (66/33)", "Phân phối đều (50/50)"], dtype=object)
+    e1 = math.exp(0.3 * math.radians(200.0))
+    e_sum = math.exp(0.3 * math.radians(200.0) * 2)
+    arrays = formulas.dual_drive_distribution(np.full(3, 900.0), np.full(3, 120.0), np.full(3, e1),
+                                              np.full(3, e_sum), labels)
+    for i, label in enumerate(labels):
+        assert formulas.dual_drive_distribution(900.0, 120.0, e1, e_sum, label) == tuple(a[i] for a in arrays)
+
+
+def test_scalar_branches_do_not_divide_by_zero():
+    # e^(μθ) = 1 (μ = 0): nhánh không được chọn không được chia cho 0
+    assert formulas.euler_eytelwein(100.0, 1.0) == (1100.0, 1000.0)
+    Fp1, Fp2, F21, F22, method = formulas.dual_drive_distribution(90.0, 10.0, 1.0, 1.0, "Phân phối 2/1 (66/33)")
+    assert (F21, F22, method) == (Fp1 * 10, Fp2 * 10, "Tỷ lệ 2/1")
+
+
+def test_costs_use_whole_idler_counts():
+    costs = formulas.capital_and_operating_costs(800, 20.0, 50.0, 1.2, 3.0, 10.0, 0.0, 8.0, 16, 10.0, 13.9, 12.2)
+    # ceil(20 / 1.2) = 17 con lăn tải, ceil(20 / 3) = 7 con lăn về
+    assert costs["cost_idlers"] == 24 * (30.0 + 0.8 * 80.0)
+    array_costs = formulas.capital_and_operating_costs(np.array([800.0]), np.array([20.0]), 50.0, np.array([1.2]),
+                                                       np.array([3.0]), np.array([10.0]), np.zeros(1), np.array([8.0]),
+                                                       np.array([16.0]), np.array([10.0]), 13.9, 12.2)
+    assert {k: v[0] for k, v in array_costs.items()} == costs
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""recalculate() phải cho đúng kết quả của calculate() trên bộ tham số mới, chỉ chạy lại giai đoạn cần thiết."""
+import pytest
+
+from core.engine import calculate
+from core.incremental import affected_stages, recalculate
+
+CHANGES = [
+    {"motor_rpm": 960},
+    {"operating_hours": 20},
+    {"H_m": 25},
+    {"L_m": 300, "Kt_start": 1.4},
+    {"Qt_tph": 900},
+    {"B_mm": 1200, "belt_type": "Dây thép (ST)"},
+    {"V_mps": 1.6},
+    {"V_mps": None},
+    {"drive_type": "Dual drive"},
+    {"gearbox_ratio_mode": "manual", "gearbox_ratio_user": 40.0},
+    {"trough_angle_label": "20°", "surcharge_angle_deg": 10},
+]
+
+
+@pytest.mark.parametrize("changes", CHANGES, ids=lambda c: "+".join(c))
+def test_matches_full_calculation(params, assert_same_result, changes):
+    prev = calculate(params, track_stages=True)
+    snapshot = calculate(params)
+    result = recalculate(prev, changes)
+
+    assert_same_result(result, calculate(params.replace(**changes)))
+    # prev_result không bị thay đổi
+    assert_same_result(prev, snapshot)
+
+
+def test_chained_recalculations(params, assert_same_result):
+    result = calculate(params, track_stages=True)
+    current = params
+    for changes in CHANGES:
+        current = current.replace(**changes)
+        result = recalculate(result, current)
+        assert_same_result(result, calculate(current))
+
+
+def test_only_affected_stages_rerun(all_params):
+    prev = calculate(all_params[0].replace(V_mps=2.0), track_stages=True)
+    assert prev.stage_state.recomputed == ("load", "tensions", "finalize", "costs", "pulleys_idlers", "transmission")
+    assert recalculate(prev, {"motor_rpm": 960}).stage_state.recomputed == ("transmission",)
+    assert recalculate(prev, {"operating_hours": 20}).stage_state.recomputed == ("costs",)
+    assert recalculate(prev, {}).stage_state.recomputed == ()
+    assert set(recalculate(prev, {"H_m": 25}).stage_state.recomputed) <= set(affected_stages({"H_m"}))
+
+
+def test_with_transmission_toggle(params, assert_same_result):
+    prev = calculate(params, with_transmission=False, track_stages=True)
+    assert_same_result(recalculate(prev, {}, with_transmission=True), calculate(params))
+    prev = calculate(params, track_stages=True)
+    assert_same_result(recalculate(prev, {}, with_transmission=False), calculate(params, with_transmission=False))
+
+
+def test_requires_stage_state(params):
+    with pytest.raises(ValueError):
+        recalculate(calculate(params), {"motor_rpm": 960})
+    with pytest.raises(TypeError):
+        recalculate(calculate(params, track_stages=True), {"no_such_field": 1})
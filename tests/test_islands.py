@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""GA mô hình đảo: kết quả gộp phải là các đánh giá vô hướng của từng bộ gene, luồng và tiến trình đều chạy được."""
+import queue
+import random
+import sys
+import threading
+
+import pytest
+
+from core.optimizer import islands
+from core.optimizer.models import OptimizerSettings
+from core.optimizer.optimizer import Optimizer, _pack_evaluation, evaluate_design
+from core.optimizer.stopping import STOP_COMPLETED
+
+
+@pytest.fixture
+def small_problem(all_params):
+    return all_params[0].replace(V_mps=None, Qt_tph=15, B_mm=800, L_m=20, H_m=0)
+
+
+def run_islands(base, seed=5, **settings):
+    random.seed(seed)
+    optimizer = Optimizer(base, OptimizerSettings(islands=2, migration_interval=1, **settings))
+    return optimizer, optimizer.run(generations=3, population_size=16, elitism_count=2)
+
+
+def check_merged(optimizer, ranked, base, assert_same_result):
+    assert ranked and len(ranked) <= 15
+    genes = [optimizer._genes(c) for c in ranked]
+    assert len(set(genes)) == len(genes)
+    scores = [c.fitness_score for c in ranked]
+    assert scores == sorted(scores)
+    for c in ranked[:4]:
+        assert_same_result(c.calculation_result, evaluate_design(base, optimizer.settings, optimizer._genes(c))[0])
+    assert optimizer.stop_reason == STOP_COMPLETED
+
+
+def test_island_threads_report_scalar_evaluations(small_problem, monkeypatch, capsys, assert_same_result):
+    # Bản đóng gói chạy các đảo bằng luồng
+    monkeypatch.setattr(sys, "frozen", True, raising=False)
+    optimizer, ranked = run_islands(small_problem, evaluation_backend="thread")
+    out = capsys.readouterr().out
+    assert "failed" not in out and "Running 2 islands" in out
+    check_merged(optimizer, ranked, small_problem, assert_same_result)
+
+
+def test_island_processes(small_problem, capsys, assert_same_result):
+    optimizer, ranked = run_islands(small_problem)
+    out = capsys.readouterr().out
+    # Không quay về luồng và không đảo nào lỗi
+    assert "chạy các đảo bằng luồng" not in out and "failed" not in out and "exited without" not in out
+    check_merged(optimizer, ranked, small_problem, assert_same_result)
+
+
+def test_run_island_migrates_best_genes(small_problem):
+    settings = OptimizerSettings(migration_interval=1, migration_size=2)
+    spec = islands.IslandSpec(0, 0.1, 0.8, seed=3)
+    inbox, outbox, messages = queue.Queue(), queue.Queue(), queue.Queue()
+    immigrant = (650, "Vải EP (Polyester)", 40, "25/05B (ANSI/ISO)")
+    inbox.put([immigrant])
+    islands.run_island(small_problem, settings, spec, 3, 12, 3, 2, inbox, outbox, messages, threading.Event())
+
+    # Di cư sau mỗi thế hệ: 2 bộ gene tốt nhất mỗi lần
+    sent = islands._drain(outbox)
+    assert len(sent) == 2 * 3 and not islands._drain(inbox)
+    received = []
+    while not messages.empty():
+        received.append(messages.get())
+    assert [m[0] for m in received] == [islands._MSG_GENERATION] * 3 + [islands._MSG_DONE]
+    _, index, packed, generations_run, stop_reason, _, _ = received[-1]
+    assert (index, generations_run, stop_reason) == (0, 3, STOP_COMPLETED)
+    assert packed and len({genes for genes, _ in packed}) == len(packed)
+
+
+def test_merge_dedupes_and_rescores(small_problem):
+    optimizer = Optimizer(small_problem, OptimizerSettings())
+    genes = [(450, "Vải EP (Polyester)", g, "35/06B (ANSI/ISO)") for g in (100, 80, 60, 50)]
+    packed = [(g, _pack_evaluation(evaluate_design(small_problem, optimizer.settings, g))) for g in genes]
+    merged = islands._merge(optimizer, packed + packed[:2])
+    assert sorted(optimizer._genes(c) for c in merged) == sorted(genes)
+    scores = [c.fitness_score for c in merged]
+    optimizer._assign_fitness(merged)
+    assert scores == [c.fitness_score for c in merged] == sorted(scores)
+    assert islands._merge(optimizer, []) == []
+
+
+def test_island_specs_and_settings():
+    specs = islands.island_specs(4, 0.1, 0.8, random.Random(1))
+    assert [s.index for s in specs] == [0, 1, 2, 3]
+    mutation = [s.mutation_rate for s in specs]
+    crossover = [s.crossover_rate for s in specs]
+    assert mutation == sorted(mutation) and crossover == sorted(crossover, reverse=True)
+    assert all(0 < m <= 0.5 for m in mutation) and all(0.5 <= c <= 0.95 for c in crossover)
+    assert specs == islands.island_specs(4, 0.1, 0.8, random.Random(1))
+    inner = islands._island_settings(OptimizerSettings(islands=4, evaluation_backend="process", max_workers=8))
+    assert (inner.islands, inner.evaluation_backend, inner.max_workers) == (0, "thread", 1)
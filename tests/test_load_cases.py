@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""Ma trận trường hợp tải: khớp calculate() ở trường hợp đầy tải và khớp đánh giá từng trường hợp riêng."""
+import numpy as np
+import pytest
+
+from core.engine import calculate, calculate_load_cases
+from core.load_cases import LOAD_ON_DECLINES, LOAD_ON_INCLINES, LoadCase, default_load_cases
+from core.route import RouteSegment
+
+_COLUMNS = ("friction_N", "lift_N", "effective_tension_N", "T1_N", "T2_N", "max_tension_N",
+            "required_power_kw", "safety_factor")
+
+
+def test_full_load_matches_scalar_calculate(all_params):
+    # Truyền động đơn trên tuyến không dốc xuống: trường hợp đầy tải là đúng thiết kế của calculate()
+    # (truyền động kép gộp hai puly, đoạn dốc xuống giữ dấu lực nâng nên khác mô hình của engine)
+    checked = 0
+    for p in all_params:
+        if p.drive_type == "Dual drive" or p.H_m < 0:
+            continue
+        result, matrix = calculate_load_cases(p)
+        expected = calculate(p, with_transmission=False)
+        i = matrix.index("Đầy tải")
+        for column, field in (("effective_tension_N", "effective_tension"), ("T2_N", "T2"),
+                              ("max_tension_N", "max_tension"), ("friction_N", "friction_force"),
+                              ("lift_N", "lift_force"), ("required_power_kw", "required_power_kw"),
+                              ("safety_factor", "safety_factor")):
+            assert getattr(matrix, column)[i] == pytest.approx(getattr(expected, field), rel=1e-12), column
+        checked += 1
+    assert checked >= 3
+
+
+def test_vectorized_matches_one_case_at_a_time(params):
+    cases = default_load_cases(params.Kt_start) + (LoadCase("Nửa tải", 0.5), LoadCase("Quá tải dốc lên", 1.2, LOAD_ON_INCLINES))
+    _, matrix = calculate_load_cases(params, cases)
+    for i, case in enumerate(cases):
+        _, single = calculate_load_cases(params, [case])
+        for column in _COLUMNS:
+            np.testing.assert_allclose(getattr(single, column)[0], getattr(matrix, column)[i], rtol=1e-12, atol=1e-9)
+
+
+def test_multi_segment_route(all_params):
+    route = (RouteSegment(100, 0), RouteSegment(200, 30), RouteSegment(150, -10))
+    p = all_params[0].replace(route=route, V_mps=2.0)
+    _, matrix = calculate_load_cases(p)
+    empty, full = matrix.index("Băng rỗng"), matrix.index("Đầy tải")
+    assert matrix.max_tension_N[full] > matrix.max_tension_N[empty]
+    assert matrix.governing_tension.name == "Khởi động đầy tải"
+    assert matrix.governing_safety == matrix.governing_tension
+    # Khi dừng, lực hãm quán tính làm lực vòng nhỏ hơn trường hợp chỉ chất tải trên đoạn dốc xuống
+    stop = matrix.index("Dừng/hãm, tải trên đoạn dốc xuống")
+    _, declines = calculate_load_cases(p, [LoadCase("dốc xuống", load_on=LOAD_ON_DECLINES)])
+    assert matrix.effective_tension_N[stop] < declines.effective_tension_N[0]
+    assert set(matrix.governing()) == {"max_tension", "required_power", "safety_factor"}
+
+
+def test_default_cases_and_validation():
+    names = [case.name for case in default_load_cases(1.4)]
+    assert names[:2] == ["Băng rỗng", "Đầy tải"]
+    assert default_load_cases(1.4)[3].inertia_factor == pytest.approx(0.4)
+    with pytest.raises(ValueError):
+        LoadCase("x", load_on="everywhere")
+    with pytest.raises(ValueError):
+        LoadCase("x", load_fraction=-1.0)
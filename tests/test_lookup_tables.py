@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""Bảng tra đã biên dịch: so với các phép quét min(dict, key=...) và vòng nội suy cũ của engine."""
+import math
+
+import numpy as np
+import pytest
+
+from core import engine
+from core.lookup_tables import GridTable, LookupTable
+
+# Có các điểm cách đều hai khóa (tie), ngoài phạm vi và NaN
+POINTS = [-50, 0, 350, 400, 450, 575, 600, 725, 850, 900, 950, 1100, 1500, 1700, 1900, 2000, 2500, math.nan]
+
+# Bảng K kiểu Bảng 4 (góc máng → {góc mái → K}), khóa không theo thứ tự
+K_TABLE = {
+    35: {20: 0.1509, 0: 0.1019, 10: 0.1258, 30: 0.1780},
+    20: {0: 0.0649, 10: 0.0877, 20: 0.1111, 30: 0.1360},
+    45: {0: 0.1154, 10: 0.1380, 20: 0.1610, 30: 0.1854},
+}
+
+
+def reference_nearest_key(table, x):
+    return min(sorted(table), key=lambda k: abs(k - x))
+
+
+def reference_interp(table, x):
+    """_interpolate_k trước khi biên dịch bảng (sắp xếp lại khóa ở mỗi lần gọi)."""
+    keys = sorted(table.keys())
+    if x <= keys[0]:
+        return table[keys[0]]
+    if x >= keys[-1]:
+        return table[keys[-1]]
+    for i in range(len(keys) - 1):
+        if keys[i] <= x <= keys[i + 1]:
+            x0, y0 = keys[i], table[keys[i]]
+            x1, y1 = keys[i + 1], table[keys[i + 1]]
+            return y0 + (y1 - y0) * (x - x0) / (x1 - x0)
+
+
+def reference_bilinear(grid, r, c):
+    return reference_interp({row: reference_interp(grid[row], c) for row in grid}, r)
+
+
+@pytest.mark.parametrize("table", [
+    engine.MOVING_PARTS_WEIGHT_CEMA_KG,
+    engine.IDLER_BASE_WEIGHTS_KG,
+    engine.IDLER_SPACING_LC_LOW_M,
+    engine.IDLER_SPACING_LC_HIGH_M,
+], ids=["moving_parts", "idler_weights", "spacing_low", "spacing_high"])
+def test_nearest_matches_min_scan(table):
+    compiled = LookupTable.from_dict(table)
+    for x in POINTS:
+        key = reference_nearest_key(table, x)
+        assert compiled.nearest_key(x) == key
+        assert compiled.nearest(x) == table[key]
+    if not isinstance(next(iter(table.values())), tuple):
+        np.testing.assert_array_equal(compiled.nearest_many(POINTS), [compiled.nearest(x) for x in POINTS])
+
+
+def test_engine_helpers_match_min_scan():
+    for width in [400, 575, 725, 900, 1300, 2100]:
+        assert engine.get_moving_parts_weight_cema(width) == \
+            engine.MOVING_PARTS_WEIGHT_CEMA_KG[reference_nearest_key(engine.MOVING_PARTS_WEIGHT_CEMA_KG, width)]
+        assert engine.get_idler_base_weights(width) == \
+            engine.IDLER_BASE_WEIGHTS_KG[reference_nearest_key(engine.IDLER_BASE_WEIGHTS_KG, width)]
+        for capacity, table in ((500, engine.IDLER_SPACING_LC_LOW_M), (2000, engine.IDLER_SPACING_LC_HIGH_M)):
+            assert engine.get_default_spacings(width, capacity) == (table[reference_nearest_key(table, width)], 3.0)
+
+
+def test_grid_nearest_matches_nested_scan():
+    for belt_cat, factors in engine.TRANSITION_DISTANCE_FACTORS.items():
+        compiled = engine.TRANSITION_FACTOR_TABLES[belt_cat]
+        for angle in [0, 10, 20, 27.5, 35, 40, 45, 60]:
+            row = factors[reference_nearest_key(factors, angle)]
+            for width in POINTS[:-1]:
+                assert compiled.nearest(angle, width) == row[reference_nearest_key(row, width)]
+    carry = engine.IDLER_SPACING_CARRY_M
+    for width in POINTS[:-1]:
+        row = carry[reference_nearest_key(carry, width)]
+        for density in [400, 800, 1200, 1600, 2000, 2400, 3000]:
+            assert engine.IDLER_SPACING_CARRY_TABLE.nearest(width, density) == row[reference_nearest_key(row, density)]
+
+
+def test_ceil_with_first_row_fallback_matches_st_scan():
+    st_values = sorted(int(s.replace("ST-", "")) for s in engine.PULLEY_DIAMETERS_ST_MM)
+    for required in [0, 315, 630, 1000.5, 2500, 5400, 10000]:
+        expected = min(st_values, key=lambda x: float('inf') if x < required else x - required)
+        idx = engine.PULLEY_ST_TABLE.ceil_index(required)
+        assert engine.PULLEY_ST_TABLE.key_list[0 if idx is None else idx] == expected
+
+
+def test_interp_matches_reference_loop():
+    rng = np.random.default_rng(0)
+    angles = np.concatenate([[-5.0, 0.0, 10.0, 30.0, 45.0], rng.uniform(-10, 40, 40)])
+    for trough, row in K_TABLE.items():
+        compiled = LookupTable.from_dict(row)
+        expected = [reference_interp(row, a) for a in angles]
+        assert [compiled.interp(a) for a in angles] == expected
+        np.testing.assert_array_equal(compiled.interp_many(angles), expected)
+
+
+def test_bilinear_matches_reference_loop():
+    grid = GridTable(K_TABLE)
+    rng = np.random.default_rng(1)
+    troughs = rng.uniform(10, 50, 30)
+    surcharges = rng.uniform(-5, 35, 30)
+    expected = [reference_bilinear(K_TABLE, r, c) for r, c in zip(troughs, surcharges)]
+    assert [grid.bilinear(r, c) for r, c in zip(troughs, surcharges)] == expected
+    np.testing.assert_array_equal(grid.bilinear_many(troughs, surcharges), expected)
+    np.testing.assert_array_equal(grid.nearest_many(troughs, surcharges),
+                                  [grid.nearest(r, c) for r, c in zip(troughs, surcharges)])
+
+
+def test_floor_ceil_and_empty_table():
+    table = LookupTable([30, 10, 20], ["c", "a", "b"])
+    assert [table.floor(x) for x in (5, 10, 15, 30, 35)] == [None, "a", "a", "c", "c"]
+    assert [table.ceil(x) for x in (5, 10, 15, 30, 35)] == ["a", "a", "b", "c", None]
+    numeric = LookupTable([30, 10, 20], [3.0, 1.0, 2.0])
+    np.testing.assert_array_equal(numeric.floor_many([5, 15, 35]), [math.nan, 1.0, 3.0])
+    np.testing.assert_array_equal(numeric.ceil_many([5, 15, 35]), [1.0, 2.0, math.nan])
+    with pytest.raises(ValueError):
+        LookupTable([], [])
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""Các cách đánh giá quần thể (tiến trình, luồng, cache) phải cho cùng kết quả tối ưu."""
+import random
+
+import pytest
+
+from core.optimizer.models import OptimizerSettings
+from core.optimizer.optimizer import SHARED_EVALUATION_CACHE, Optimizer
+
+
+def run_ga(base, seed=5, **settings):
+    random.seed(seed)
+    optimizer = Optimizer(base, OptimizerSettings(**settings))
+    ranked = optimizer.run(generations=4, population_size=30, elitism_count=2)
+    return optimizer, [(c.belt_width_mm, c.belt_type_name, c.gearbox_ratio, c.chain_spec_designation,
+                        c.fitness_score, c.calculation_result.T1) for c in ranked]
+
+
+@pytest.fixture
+def small_problem(all_params):
+    """Bài toán nhỏ có nhiều thiết kế hợp lệ (tốc độ tự tính)."""
+    return all_params[0].replace(V_mps=None, Qt_tph=15, B_mm=800, L_m=20, H_m=0)
+
+
+def test_process_pool_matches_threads(small_problem, capsys):
+    _, threads = run_ga(small_problem, evaluation_backend="thread")
+    capsys.readouterr()
+    _, processes = run_ga(small_problem, evaluation_backend="process", max_workers=2)
+    # Không quay về ThreadPool giữa chừng (lỗi khởi động hoặc BrokenProcessPool)
+    assert "ThreadPool" not in capsys.readouterr().out
+    assert threads and processes == threads
+
+
+def test_evaluation_cache_does_not_change_results(small_problem):
+    uncached_optimizer, uncached = run_ga(small_problem, evaluation_backend="thread", cache_evaluations=False)
+    cached_optimizer, cached = run_ga(small_problem, evaluation_backend="thread")
+    assert cached == uncached
+    # Mỗi bộ gene chỉ chạy engine một lần: số lần chạy thật = số bộ gene khác nhau
+    assert cached_optimizer.cache_hits > 0
+    assert cached_optimizer.cache_misses < uncached_optimizer.cache_misses + uncached_optimizer.cache_hits
+
+
+def test_shared_cache_reused_between_runs(small_problem):
+    SHARED_EVALUATION_CACHE.clear()
+    try:
+        first_optimizer, first = run_ga(small_problem, evaluation_backend="thread", share_evaluation_cache=True)
+        second_optimizer, second = run_ga(small_problem, evaluation_backend="thread", share_evaluation_cache=True)
+        assert second == first
+        assert second_optimizer.cache_misses == 0
+    finally:
+        SHARED_EVALUATION_CACHE.clear()
+
+
+def test_default_backend_is_threads(small_problem):
+    # Đa tiến trình chỉ bật khi được yêu cầu (giao diện chọn "process" khi không chạy từ bản đóng gói)
+    optimizer = Optimizer(small_problem, OptimizerSettings())
+    assert optimizer.settings.evaluation_backend == "thread"
+    optimizer._start_worker_pool()
+    assert optimizer._process_pool is None
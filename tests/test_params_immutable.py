@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""Engine không ghi ngược vào ConveyorParameters: có thể bỏ deepcopy ở phía gọi."""
+import copy
+import dataclasses
+
+import pytest
+
+from core.engine import calculate
+from core.optimizer.optimizer import _design_params, evaluate_belt_stage
+
+
+@pytest.mark.parametrize("with_transmission", [False, True])
+def test_calculate_leaves_params_unchanged(params, with_transmission, assert_same_result):
+    snapshot = copy.deepcopy(params)
+    first = calculate(params, with_transmission=with_transmission)
+    assert vars(params) == vars(snapshot)
+    # Gọi lại trên cùng đối tượng và trên bản deepcopy (cách phía gọi làm trước đây) cho cùng kết quả
+    assert_same_result(calculate(params, with_transmission=with_transmission), first)
+    assert_same_result(calculate(snapshot, with_transmission=with_transmission), first)
+
+
+def test_replace_matches_dataclasses_replace(params):
+    changes = dict(B_mm=650, V_mps=None, belt_type="Dây thép (ST)", gearbox_ratio_mode="manual",
+                   gearbox_ratio_user=31.5)
+    snapshot = copy.deepcopy(params)
+    clone = params.replace(**changes)
+    assert clone is not params
+    assert vars(clone) == vars(dataclasses.replace(params, **changes))
+    assert vars(params) == vars(snapshot)
+    with pytest.raises(TypeError):
+        params.replace(no_such_field=1)
+
+
+def test_optimizer_stages_leave_base_unchanged(all_params):
+    base = all_params[0].replace(V_mps=None, Qt_tph=15, B_mm=800, L_m=20, H_m=0)
+    snapshot = copy.deepcopy(base)
+    params, _, _ = _design_params(base, (650, "Vải EP (Polyester)", 40.0, "25/05B (ANSI/ISO)"))
+    assert (params.B_mm, params.gearbox_ratio_user, params.chain_spec_designation) == (650, 40.0, "25/05B (ANSI/ISO)")
+    stage_params, result, error, _, _ = evaluate_belt_stage(base, 650, "Vải EP (Polyester)")
+    assert error is None
+    # Tốc độ băng đã chốt đi qua params của giai đoạn, không ghi vào base
+    assert stage_params.V_mps == result.belt_speed_mps
+    assert vars(base) == vars(snapshot)
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""NSGA-II vector hóa: so với cách bóc từng mặt và tính khoảng cách đám đông bằng vòng lặp thuần Python."""
+import math
+
+import numpy as np
+import pytest
+
+from core.optimizer.pareto import crowded_order, crowding_distance, dominance_matrix, fast_non_dominated_sort
+
+
+def dominates(a, b, va=0, vb=0) -> bool:
+    if va != vb:
+        return va < vb
+    return all(x <= y for x, y in zip(a, b)) and any(x < y for x, y in zip(a, b))
+
+
+def reference_ranks(F, violation=None) -> list:
+    """Bóc lần lượt các mặt: mặt k là các hàng không bị hàng còn lại nào trội."""
+    v = [0] * len(F) if violation is None else list(violation)
+    rows = [tuple(row) for row in F]
+    ranks = [-1] * len(rows)
+    remaining = set(range(len(rows)))
+    front = 0
+    while remaining:
+        current = {i for i in remaining if not any(dominates(rows[j], rows[i], v[j], v[i]) for j in remaining)}
+        for i in current:
+            ranks[i] = front
+        remaining -= current
+        front += 1
+    return ranks
+
+
+def reference_crowding(F, ranks) -> list:
+    """Khoảng cách đám đông theo Deb và cộng sự (2002), từng mặt và từng mục tiêu."""
+    distance = [0.0] * len(F)
+    for front in set(ranks):
+        members = [i for i, r in enumerate(ranks) if r == front]
+        if len(members) <= 2:
+            for i in members:
+                distance[i] = math.inf
+            continue
+        for m in range(F.shape[1]):
+            ordered = sorted(members, key=lambda i: F[i, m])  # sorted ổn định như argsort(kind="stable")
+            span = F[ordered[-1], m] - F[ordered[0], m]
+            distance[ordered[0]] = distance[ordered[-1]] = math.inf
+            for k in range(1, len(ordered) - 1):
+                if span > 0:
+                    distance[ordered[k]] += (F[ordered[k + 1], m] - F[ordered[k - 1], m]) / span
+    return distance
+
+
+def random_objectives(seed, n, m, integer):
+    rng = np.random.default_rng(seed)
+    # Mục tiêu nguyên tạo nhiều hàng trùng/hòa; mục tiêu thực có tương quan âm như chi phí và độ an toàn
+    if integer:
+        return rng.integers(0, 5, size=(n, m)).astype(float)
+    x = rng.random((n, 1))
+    return np.hstack([x, 1.0 - x + 0.2 * rng.random((n, 1)), rng.random((n, m - 2))])
+
+
+@pytest.mark.parametrize("seed,n,m,integer", [(1, 40, 2, False), (2, 60, 3, True), (3, 80, 5, False), (4, 25, 4, True)])
+def test_ranks_and_crowding_match_reference(seed, n, m, integer):
+    F = random_objectives(seed, n, m, integer)
+    ranks = fast_non_dominated_sort(F)
+    assert ranks.tolist() == reference_ranks(F)
+    crowding = crowding_distance(F, ranks)
+    np.testing.assert_allclose(crowding, reference_crowding(F, ranks.tolist()), rtol=1e-12)
+
+
+def test_constrained_domination():
+    F = random_objectives(5, 50, 3, False)
+    violation = np.random.default_rng(5).integers(0, 3, 50)
+    ranks = fast_non_dominated_sort(F, violation)
+    assert ranks.tolist() == reference_ranks(F, violation)
+    # Mọi hàng thỏa ràng buộc đứng trước mọi hàng vi phạm
+    assert ranks[violation == 0].max() < ranks[violation > 0].min()
+
+
+def test_dominance_blocks_match_single_pass(monkeypatch):
+    import core.optimizer.pareto as pareto
+    F = random_objectives(6, 70, 3, True)
+    expected = dominance_matrix(F)
+    monkeypatch.setattr(pareto, "_DOMINANCE_BLOCK", 16)
+    np.testing.assert_array_equal(pareto.dominance_matrix(F), expected)
+
+
+def test_crowded_order_and_edge_cases():
+    ranks = np.array([1, 0, 0, 1])
+    crowding = np.array([0.5, 1.0, np.inf, 2.0])
+    assert crowded_order(ranks, crowding).tolist() == [2, 1, 3, 0]
+    assert fast_non_dominated_sort(np.empty((0, 3))).size == 0
+    assert fast_non_dominated_sort(np.ones((4, 2))).tolist() == [0, 0, 0, 0]
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""Quần thể ma trận: fitness, độ đa dạng và kết quả báo cáo phải khớp cách làm trên DesignCandidate."""
+import random
+
+import numpy as np
+import pytest
+
+from core.optimizer import population as pop_ops
+from core.optimizer.models import DesignCandidate, OptimizerSettings
+from core.optimizer.optimizer import (ACTIVE_BELT_SPECS, ACTIVE_CHAIN_SPECS, STANDARD_GEARBOX_RATIOS, STANDARD_WIDTHS,
+                                      Optimizer, evaluate_design)
+from core.optimizer.population import GeneTables
+
+
+@pytest.fixture
+def small_problem(all_params):
+    return all_params[0].replace(V_mps=None, Qt_tph=15, B_mm=800, L_m=20, H_m=0)
+
+
+@pytest.fixture(scope="module")
+def tables():
+    return GeneTables.active()
+
+
+def sample_rows(tables, n, seed):
+    rng = np.random.default_rng(seed)
+    rows = rng.integers(0, tables.sizes, (n, pop_ops.GENE_COUNT))
+    # Dồn về vùng có thiết kế hợp lệ (bề rộng nhỏ, xích đầu bảng) và giữ vài hàng trùng
+    rows[: n // 2, pop_ops.WIDTH] = rng.integers(0, 4, n // 2)
+    rows[: n // 2, pop_ops.CHAIN] = rng.integers(0, 3, n // 2)
+    rows[-3:] = rows[:3]
+    return rows
+
+
+def test_weighted_fitness_matches_assign_fitness(small_problem, tables):
+    settings = OptimizerSettings()
+    optimizer = Optimizer(small_problem, settings)
+    store = pop_ops.DesignEvaluations(tables)
+    candidates, codes = [], []
+    # Bề rộng 400, 450 và 1000 mm: có thiết kế hợp lệ cả có và không có bộ truyền động
+    rows = [(w, b, g, c) for w in (1, 2, 9) for b in range(len(tables.belt_types))
+            for g in range(len(tables.gearbox_ratios)) for c in (0, 3)]
+    for row in np.array(rows):
+        genes = tables.decode(row)
+        evaluation = evaluate_design(small_problem, settings, genes)
+        c = DesignCandidate(*genes)
+        optimizer._apply_evaluation(c, evaluation)
+        if c.is_valid:
+            code = int(tables.codes(row[None, :])[0])
+            optimizer._store_evaluation(store, code, evaluation)
+            candidates.append(c)
+            codes.append(code)
+    has_transmission = store.has_transmission[codes]
+    assert len(candidates) > 5 and has_transmission.any() and not has_transmission.all()
+
+    optimizer._assign_fitness(candidates)
+    fitness = pop_ops.weighted_fitness(store.cost[codes], store.power[codes], store.safety[codes],
+                                       store.velocity_error[codes], has_transmission, store.penalty[codes], settings)
+    np.testing.assert_array_equal(fitness, [c.fitness_score for c in candidates])
+
+
+def test_diversity_matches_objects(small_problem, tables):
+    optimizer = Optimizer(small_problem, OptimizerSettings())
+    denominators = np.array([len(STANDARD_WIDTHS), len(ACTIVE_BELT_SPECS), len(STANDARD_GEARBOX_RATIOS),
+                             len(ACTIVE_CHAIN_SPECS.designations)])
+    for seed in range(3):
+        rows = sample_rows(tables, 40, seed)
+        expected = optimizer._calculate_diversity([DesignCandidate(*tables.decode(r)) for r in rows])
+        assert pop_ops.diversity(rows, denominators) == pytest.approx(expected, rel=1e-12)
+
+
+def run_matrix(base, seed):
+    random.seed(seed)
+    optimizer = Optimizer(base, OptimizerSettings(population_encoding="matrix", evaluation_backend="thread"))
+    return optimizer, optimizer.run(generations=4, population_size=30, elitism_count=2)
+
+
+def test_matrix_run_reports_scalar_evaluations(small_problem, assert_same_result):
+    optimizer, ranked = run_matrix(small_problem, seed=5)
+    assert ranked and all(c.is_valid for c in ranked)
+    genes = [optimizer._genes(c) for c in ranked]
+    assert len(set(genes)) == len(genes)
+    scores = [c.fitness_score for c in ranked]
+    assert scores == sorted(scores)
+    for c in ranked[:5]:
+        expected = evaluate_design(small_problem, optimizer.settings, optimizer._genes(c))
+        assert_same_result(c.calculation_result, expected[0])
+    # Cùng seed cho cùng kết quả
+    _, again = run_matrix(small_problem, seed=5)
+    assert [optimizer._genes(c) for c in again] == genes
+    assert [c.fitness_score for c in again] == scores
+
+
+def test_encoding_round_trip(tables):
+    rows = sample_rows(tables, 50, seed=2)
+    np.testing.assert_array_equal(tables.rows(tables.codes(rows)), rows)
+    for row in rows[:10]:
+        assert tables.encode(tables.decode(row)) == tuple(int(i) for i in row)
+    with pytest.raises(ValueError):
+        tables.encode((123, tables.belt_types[0], tables.gearbox_ratios[0], tables.chains[0]))
+
+
+def test_operators_keep_genes_in_range(tables):
+    rng = np.random.default_rng(4)
+    parents1, parents2 = sample_rows(tables, 200, 5), sample_rows(tables, 200, 6)
+    child1, child2 = pop_ops.crossover(rng, parents1, parents2)
+    # Mỗi gene của con lấy từ một trong hai cha mẹ, hai con bù nhau
+    assert np.all((child1 == parents1) | (child1 == parents2))
+    np.testing.assert_array_equal(child1 + child2, parents1 + parents2)
+
+    unchanged = parents1.copy()
+    pop_ops.mutate(rng, unchanged, np.zeros(len(unchanged)), tables.sizes)
+    np.testing.assert_array_equal(unchanged, parents1)
+    mutated = pop_ops.mutate(rng, parents1.copy(), np.full(len(parents1), 0.8), tables.sizes)
+    assert np.all((mutated >= 0) & (mutated < tables.sizes)) and np.any(mutated != parents1)
+
+    fitness = rng.random(100)
+    picks = pop_ops.tournament_select(rng, fitness, 500, tournament_size=5, p_best=1.0)
+    assert picks.min() >= 0 and picks.max() < 100
+    assert fitness[picks].mean() < fitness.mean()
+
+    initial = pop_ops.biased_population(rng, tables, 300, 800, tables.belt_types[0])
+    assert initial.shape == (300, pop_ops.GENE_COUNT)
+    assert np.all((initial >= 0) & (initial < tables.sizes))
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""Profile theo giai đoạn: calculate(p, profile=True) phải cho cùng kết quả, chỉ thêm result.profile."""
+import random
+import threading
+
+import pytest
+
+from core import profiling
+from core.engine import calculate
+from core.optimizer.models import OptimizerSettings
+from core.optimizer.optimizer import Optimizer
+from core.profiling import CalculationProfile, count_lookup, profile_calculation, stage
+
+
+@pytest.mark.parametrize("with_transmission", [False, True])
+def test_profile_does_not_change_result(params, with_transmission, assert_same_result):
+    expected = calculate(params, with_transmission=with_transmission)
+    actual = calculate(params, with_transmission=with_transmission, profile=True)
+    assert_same_result(actual, expected)
+    assert expected.profile is None
+
+    prof = actual.profile
+    assert prof.calculations == 1 and prof.total_s > 0
+    assert sum(prof.strategies.values()) == 1
+    stages = prof.ordered_stages()
+    for name in ("geometry_capacity", "tensions", "finalize", "costs", "pulleys_idlers"):
+        assert name in stages
+    assert ("transmission" in stages) == (with_transmission and actual.transmission_solution is not None)
+    assert all(t >= 0 for t in prof.stages.values()) and sum(prof.stages.values()) <= prof.total_s
+    assert prof.lookups and all(n > 0 for n in prof.lookups.values())
+    # Sau khi đo xong không còn profile nào được kích hoạt
+    assert profiling.active_profile() is None
+
+
+def test_stage_and_lookup_are_noops_without_profile():
+    assert stage("tensions") is profiling._NULL_STAGE
+    count_lookup("bảng")
+    with profile_calculation() as outer:
+        with stage("a"):
+            count_lookup("bảng")
+        with profile_calculation(count_calculation=False) as inner:
+            count_lookup("khác")
+        count_lookup("bảng")
+    assert outer.lookups == {"bảng": 2} and inner.lookups == {"khác": 1}
+    assert outer.stage_calls == {"a": 1}
+    assert (outer.calculations, inner.calculations) == (1, 0)
+
+
+def test_profiles_are_per_thread():
+    seen = {}
+
+    def worker():
+        seen["profile"] = profiling.active_profile()
+        count_lookup("luồng khác")
+
+    with profile_calculation() as prof:
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+    assert seen["profile"] is None and prof.lookups == {}
+
+
+def test_add_merged_and_report():
+    a = CalculationProfile(stages={"tensions": 0.2, "zeta": 0.1}, stage_calls={"tensions": 2, "zeta": 1},
+                           lookups={"sf_design": 3}, total_s=0.5, calculations=2, strategies={"CEMAStrategy": 2})
+    b = CalculationProfile(stages={"tensions": 0.1, "finalize": 0.05}, stage_calls={"tensions": 1, "finalize": 1},
+                           lookups={"sf_design": 1, "speed_limit": 2}, total_s=0.2, calculations=1,
+                           strategies={"DINStrategy": 1})
+    total = a.merged(b)
+    assert a.calculations == 2 and a.stages["tensions"] == 0.2
+    assert total.stages == pytest.approx({"tensions": 0.3, "zeta": 0.1, "finalize": 0.05})
+    assert total.stage_calls == {"tensions": 3, "zeta": 1, "finalize": 1}
+    assert total.lookups == {"sf_design": 4, "speed_limit": 2}
+    assert total.strategies == {"CEMAStrategy": 2, "DINStrategy": 1}
+    assert (total.calculations, total.total_s) == (3, pytest.approx(0.7))
+    assert total.add(None) is total
+    # Giai đoạn chuẩn theo thứ tự của STAGE_ORDER, giai đoạn lạ xếp sau
+    assert total.ordered_stages() == ["tensions", "finalize", "zeta"]
+    data = total.to_dict()
+    assert list(data["stages"]) == ["tensions", "finalize", "zeta"]
+    assert data["other_s"] == pytest.approx(0.25)
+    text = total.format()
+    assert text.startswith("Profile: 3 calculation(s)") and "(other)" in text and "sf_design=4" in text
+
+
+def test_optimizer_profile_does_not_change_ranking(all_params, capsys):
+    base = all_params[0].replace(V_mps=None, Qt_tph=15, B_mm=800, L_m=20, H_m=0)
+
+    def run(profile):
+        random.seed(5)
+        optimizer = Optimizer(base, OptimizerSettings(profile_evaluations=profile, evaluation_backend="thread"))
+        ranked = optimizer.run(generations=3, population_size=16, elitism_count=2)
+        return optimizer, [(optimizer._genes(c), c.fitness_score) for c in ranked]
+
+    plain, expected = run(False)
+    profiled, actual = run(True)
+    assert actual == expected
+    assert plain.profile is None and profiled.profile.calculations > 0
+    assert "Engine profile over" in capsys.readouterr().out
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""Tiến độ theo thế hệ: progress_callback nhận một GenerationStats mỗi thế hệ và không làm đổi kết quả."""
+import random
+
+import pytest
+
+from core.optimizer.models import GenerationStats, OptimizerSettings
+from core.optimizer.optimizer import Optimizer
+
+GENERATIONS = 4
+
+
+@pytest.fixture
+def small_problem(all_params):
+    return all_params[0].replace(V_mps=None, Qt_tph=15, B_mm=800, L_m=20, H_m=0)
+
+
+def run(base, progress_callback=None, **settings):
+    random.seed(5)
+    optimizer = Optimizer(base, OptimizerSettings(evaluation_backend="thread", **settings))
+    ranked = optimizer.run(generations=GENERATIONS, population_size=16, elitism_count=2,
+                           progress_callback=progress_callback)
+    return optimizer, [(optimizer._genes(c), c.fitness_score) for c in ranked]
+
+
+@pytest.mark.parametrize("mode", [dict(), dict(population_encoding="matrix"), dict(objective_mode="pareto")])
+def test_one_stats_per_generation_and_same_result(small_problem, mode):
+    _, expected = run(small_problem, **mode)
+    received = []
+    optimizer, actual = run(small_problem, received.append, **mode)
+    assert actual == expected
+
+    assert all(isinstance(s, GenerationStats) for s in received)
+    assert [s.generation for s in received] == list(range(1, GENERATIONS + 1))
+    assert {s.generations for s in received} == {GENERATIONS}
+    elapsed = [s.elapsed_s for s in received]
+    assert elapsed == sorted(elapsed)
+    evaluations = [s.evaluations + s.cache_hits for s in received]
+    assert evaluations == sorted(evaluations) and evaluations[0] > 0
+    for s in received:
+        assert s.valid_candidates > 0 and 0.0 <= s.diversity <= 1.0
+        assert 0 < len(s.top) <= 5 and all(c.is_valid for c in s.top)
+        assert s.best_fitness == pytest.approx(s.top[0].fitness_score)
+    if "objective_mode" not in mode:
+        assert all(s.best_fitness <= s.avg_fitness for s in received)
+
+
+def test_top_is_a_snapshot(small_problem):
+    received, scores_at_callback = [], []
+
+    def on_progress(stats):
+        received.append(stats)
+        scores_at_callback.append([c.fitness_score for c in stats.top])
+
+    optimizer, _ = run(small_problem, on_progress)
+    # Các thế hệ sau không sửa các thiết kế đã gửi đi
+    assert [[c.fitness_score for c in s.top] for s in received] == scores_at_callback
+    assert all(c is not d for s in received for c in s.top for d in optimizer.population)
+
+
+def test_failing_callback_does_not_stop_run(small_problem, capsys):
+    _, expected = run(small_problem)
+
+    def broken(stats):
+        raise RuntimeError("lỗi giao diện")
+
+    optimizer, actual = run(small_problem, broken)
+    assert actual == expected and optimizer.generations_run == GENERATIONS
+    out = capsys.readouterr().out
+    assert out.count("progress_callback failed (lỗi giao diện)") == GENERATIONS
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""CalculationResult dạng slots: biểu đồ lực dựng lười phải trùng với biểu đồ tính sẵn trước đây."""
+import copy
+import pickle
+
+import pytest
+
+from core.engine import calculate
+from core.models import CalculationResult
+
+
+def reference_profiles(p, r):
+    """Vòng lặp của finalize_results trước khi biểu đồ được dựng lười (51 điểm)."""
+    n = 50
+    L = max(p.L_m, 1.0)
+    distances = [i * L / n for i in range(n + 1)]
+    friction = [r.friction_force * (d / L) for d in distances]
+    lift = [r.lift_force * (d / L) for d in distances]
+    t2_base = r.F21 if p.drive_type == "Dual drive" else r.T2
+    t2 = [t2_base for _ in distances]
+    tension = [t2_base + friction[i] + lift[i] for i in range(len(distances))]
+    return distances, friction, lift, t2, tension
+
+
+def test_profiles_match_eager_lists(params):
+    r = calculate(params)
+    distances, friction, lift, t2, tension = reference_profiles(params, r)
+    assert r.distances_m == distances
+    assert r.friction_force_profile == friction
+    assert r.lift_force_profile == lift
+    assert r.t2_profile == t2
+    assert r.tension_profile == tension
+    # Thuộc tính cũ vẫn là list như trước (UI dùng "if result.t2_profile:")
+    assert all(type(getattr(r, name)) is list for name in
+               ("distances_m", "friction_force_profile", "lift_force_profile", "t2_profile", "tension_profile"))
+
+
+def test_slotted_and_picklable(params, assert_same_result):
+    r = calculate(params)
+    assert not hasattr(r, "__dict__")
+    with pytest.raises(AttributeError):
+        r.not_a_field = 1
+    assert_same_result(pickle.loads(pickle.dumps(r)), r)
+
+
+def test_profiles_cached_and_read_only(params):
+    r = calculate(params)
+    assert r.profiles() is r.profiles()
+    with pytest.raises(ValueError):
+        r.profiles().tension[0] = 0.0
+    # Sửa list trả về không ảnh hưởng biểu đồ đã cache
+    r.tension_profile[0] = 0.0
+    assert r.tension_profile[0] == r.profiles().tension[0] != 0.0
+    coarse = r.profiles(10)
+    assert len(coarse.distances_m) == 11
+    assert coarse.distances_m[-1] == r.distances_m[-1]
+
+
+def test_copy_rebuilds_after_change(params):
+    r = calculate(params)
+    before = r.profiles()
+    clone = copy.copy(r)
+    clone.friction_force = r.friction_force * 2
+    assert clone.friction_force_profile != r.friction_force_profile
+    assert r.profiles() is before
+
+
+def test_empty_result_has_no_profiles():
+    r = CalculationResult()
+    assert r.distances_m == [] and not r.tension_profile
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""Tuyến nhiều đoạn: tuyến một đoạn phải cho lại kết quả của L_m/H_m, lan truyền vector hóa khớp vòng lặp từng nút."""
+import dataclasses
+import math
+
+import numpy as np
+import pytest
+
+from conftest import result_differences
+from core.engine import calculate
+from core.route import (RouteLoads, RouteSegment, loop_coefficients, loop_coefficients_many, propagate_loop,
+                        route_drive_forces)
+from core.specs import G
+
+LOADS = RouteLoads(0.02, 20.0, 80.0, 13.9, 12.2, 1.2, 3.0)
+
+ROUTE = (
+    RouteSegment(300.0, 0.0, load_fraction=0.0, name="trước điểm nạp"),
+    RouteSegment(450.0, 35.0, carry_idler_spacing_m=1.0, curve_angle_deg=6.0),
+    RouteSegment(120.5, -8.0, return_idler_spacing_m=2.4),
+    RouteSegment(80.0, 12.0, load_fraction=0.5, curve_angle_deg=3.0),
+)
+
+
+def assert_close(a, b, name):
+    if dataclasses.is_dataclass(a) and type(a) is type(b):
+        for field in dataclasses.fields(a):
+            assert_close(getattr(a, field.name), getattr(b, field.name), f"{name}.{field.name}")
+    elif isinstance(a, (float, np.ndarray)) or (isinstance(a, list) and all(isinstance(x, float) for x in a)):
+        np.testing.assert_allclose(a, b, rtol=1e-9, atol=1e-9, err_msg=name)
+    else:
+        assert a == b, name
+
+
+def assert_close_results(actual, expected, allowed=()):
+    """Chỉ được lệch cỡ sai số làm tròn (tuyến tính lực qua tổng các bước thay vì công thức tiêu chuẩn)."""
+    for name in result_differences(actual, expected):
+        if name not in allowed:
+            assert_close(getattr(actual, name), getattr(expected, name), name)
+
+
+def uniform_route(p, pieces):
+    return tuple(RouteSegment(p.L_m / pieces, p.H_m / pieces) for _ in range(pieces))
+
+
+@pytest.mark.parametrize("pieces", [1, 4])
+def test_uniform_route_matches_plain_length_and_lift(params, pieces):
+    expected = calculate(params)
+    actual = calculate(params.replace(route=uniform_route(params, pieces)))
+    # Truyền động kép giữ công thức CEMA trên tổng tuyến và thêm một chẩn đoán thông tin
+    allowed = {"route"} | ({"diagnostics", "warnings"} if params.drive_type == "Dual drive" else set())
+    assert_close_results(actual, expected, allowed)
+    assert expected.route == (RouteSegment(params.L_m, params.H_m),)
+
+
+def reference_loop(route, loads, t_start, resolution_m):
+    """Lan truyền từng nút bằng vòng lặp thuần Python (nhánh về từ đầu về đuôi, rồi nhánh tải)."""
+    steps = []
+    for seg, carrying in [(s, False) for s in reversed(route)] + [(s, True) for s in route]:
+        lc = seg.carry_idler_spacing_m or loads.carry_spacing_m
+        lr = seg.return_idler_spacing_m or loads.return_spacing_m
+        grade = seg.lift_m / seg.length_m
+        if carrying:
+            q = loads.belt_kgpm + seg.load_fraction * loads.material_kgpm
+            a = loads.friction_coeff * G * (q + loads.carry_idler_kg / lc) + G * q * grade
+        else:
+            a = loads.friction_coeff * G * (loads.belt_kgpm + loads.return_idler_kg / lr) - G * loads.belt_kgpm * grade
+        c = loads.friction_coeff * math.radians(seg.curve_angle_deg) / seg.length_m
+        n = max(1, math.ceil(seg.length_m / resolution_m))
+        steps += [(a, c, seg.length_m / n)] * n
+    tension = [t_start]
+    for a, c, dx in steps:
+        t = tension[-1]
+        tension.append(t * math.exp(c * dx) + a * (math.exp(c * dx) - 1.0) / c if c > 0 else t + a * dx)
+    return np.array(tension)
+
+
+@pytest.mark.parametrize("resolution_m", [0.5, 7.0, 1000.0])
+def test_propagation_matches_node_loop(resolution_m):
+    loop = propagate_loop(ROUTE, LOADS, 5000.0, resolution_m)
+    expected = reference_loop(ROUTE, LOADS, 5000.0, resolution_m)
+    np.testing.assert_allclose(loop.tension_N, expected, rtol=1e-9)
+    assert len(loop.tension_N) == 2 * sum(max(1, math.ceil(s.length_m / resolution_m)) for s in ROUTE) + 1
+    length = sum(s.length_m for s in ROUTE)
+    assert loop.distance_m[-1] == pytest.approx(2 * length)
+    assert loop.position_m[0] == pytest.approx(length) and loop.position_m[-1] == pytest.approx(length)
+    assert loop.elevation_m[0] == pytest.approx(loop.elevation_m[-1])
+    assert loop.carrying.sum() == (len(loop.tension_N) - 1) // 2
+    # T1 = A·T2 + B
+    A, B = loop_coefficients(ROUTE, LOADS)
+    assert loop.tension_N[-1] == pytest.approx(A * 5000.0 + B, rel=1e-9)
+
+
+def test_load_states_match_single_coefficients():
+    fractions = np.array([[0.0, 0.0, 0.0, 0.0], [0.0, 1.0, 1.0, 0.5], [1.0, 1.0, 1.0, 1.0], [0.3, 0.0, 0.7, 0.1]])
+    A, B, lift = loop_coefficients_many(ROUTE, LOADS, fractions)
+    for k, row in enumerate(fractions):
+        route = tuple(RouteSegment(s.length_m, s.lift_m, s.carry_idler_spacing_m, s.return_idler_spacing_m,
+                                   float(f), s.curve_angle_deg) for s, f in zip(ROUTE, row))
+        A_k, B_k = loop_coefficients(route, LOADS)
+        assert A == pytest.approx(A_k, rel=1e-12)
+        assert B[k] == pytest.approx(B_k, rel=1e-9)
+        assert lift[k] == pytest.approx(G * LOADS.material_kgpm * sum(s.lift_m * s.load_fraction for s in route))
+
+
+def test_curves_beyond_grip_are_flagged():
+    A, _ = loop_coefficients(ROUTE, LOADS)
+    friction, lift, gripped = route_drive_forces(ROUTE, LOADS, A * 1.5)
+    assert gripped and friction > 0
+    _, _, gripped = route_drive_forces(ROUTE, LOADS, A * 0.9)
+    assert not gripped
+
+
+def test_segment_validation():
+    for bad in (dict(length_m=0.0), dict(length_m=10.0, load_fraction=1.5),
+                dict(length_m=10.0, curve_angle_deg=-1.0), dict(length_m=10.0, carry_idler_spacing_m=0.0)):
+        with pytest.raises(ValueError):
+            RouteSegment(**bad)
+    with pytest.raises(ValueError):
+        propagate_loop(ROUTE, LOADS, 0.0, resolution_m=0.0)
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""Bảng tra tốc độ đã chỉ mục phải trả về đúng giá trị của cách tra bằng pandas mỗi lần gọi trước đây."""
+import os
+
+import numpy as np
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from core.speed_table import FALLBACK_MAX_SPEED_MPS, SPEED_COLUMNS, WIDTH_COLUMN, SpeedTableRegistry  # noqa: E402
+
+# Hàng không theo thứ tự, bề rộng trùng, ô trống và một hàng trống hoàn toàn
+CSV = ",".join(f'"{c}"' for c in (WIDTH_COLUMN,) + tuple(SPEED_COLUMNS)) + """
+800,3.35,2.62,2.13
+400,2.5,2.3,1.8
+650,3.0,,1.9
+1000,,3.0,2.5
+1400,,,
+800,9.9,9.9,9.9
+1200,4.19,3.35,2.9
+,1.0,1.0,1.0
+"""
+
+CHARACTERISTICS = [
+    {},
+    {"is_abrasive": True},
+    {"is_corrosive": True},
+    {"is_dusty": True},
+    {"is_corrosive": True, "is_dusty": True},
+]
+
+
+def reference_max_speed(csv_path, belt_width_mm, material_characteristics):
+    """get_max_speed_from_table trước khi có registry (đọc CSV mỗi lần gọi)."""
+    df = pd.read_csv(csv_path)
+    valid_widths = [int(w) for w in df[WIDTH_COLUMN].dropna().tolist()]
+    closest = min(valid_widths, key=lambda x: abs(x - int(belt_width_mm)))
+    if material_characteristics.get("is_abrasive", False):
+        column = SPEED_COLUMNS[0]
+    elif material_characteristics.get("is_corrosive", False):
+        column = SPEED_COLUMNS[1]
+    elif material_characteristics.get("is_dusty", False):
+        column = SPEED_COLUMNS[2]
+    else:
+        column = SPEED_COLUMNS[0]
+    row = df[df[WIDTH_COLUMN] == closest]
+    speed = row[column].iloc[0]
+    if pd.isna(speed):
+        for col in SPEED_COLUMNS:
+            if not pd.isna(row[col].iloc[0]):
+                return float(row[col].iloc[0])
+        return FALLBACK_MAX_SPEED_MPS
+    return float(speed)
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "speed.csv"
+    path.write_text(CSV, encoding="utf-8")
+    return str(path)
+
+
+@pytest.mark.parametrize("characteristics", CHARACTERISTICS)
+def test_matches_per_call_lookup(csv_path, characteristics):
+    registry = SpeedTableRegistry(csv_path)
+    widths = [300, 400, 500, 525, 650, 700, 725, 800, 900, 1000, 1100, 1200, 1300, 1400, 2000]
+    expected = [reference_max_speed(csv_path, w, characteristics) for w in widths]
+    assert [registry.max_speed(w, characteristics) for w in widths] == expected
+    np.testing.assert_array_equal(registry.max_speeds(widths, characteristics), expected)
+    assert registry.loads == 1
+
+
+def test_interpolation_between_rows(csv_path):
+    registry = SpeedTableRegistry(csv_path)
+    assert registry.max_speed(725, {}, interpolate=True) == pytest.approx((3.0 + 3.35) / 2)
+    assert registry.max_speed(100, {}, interpolate=True) == 2.5
+    np.testing.assert_allclose(registry.max_speeds([400, 725], {}, interpolate=True), [2.5, 3.175])
+
+
+def test_reloads_only_when_file_changes(csv_path):
+    registry = SpeedTableRegistry(csv_path)
+    assert registry.max_speed(800, {}) == 3.35
+    registry.max_speed(1200, {})
+    assert registry.loads == 1
+    with open(csv_path, "a", encoding="utf-8") as f:
+        f.write("1600,5.0,4.0,3.5\n")
+    stat = os.stat(csv_path)
+    os.utime(csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert registry.max_speed(1600, {}) == 5.0
+    assert registry.loads == 2
+
+
+def test_missing_file_falls_back(tmp_path):
+    registry = SpeedTableRegistry(str(tmp_path / "missing.csv"))
+    assert registry.max_speed(800, {}) == FALLBACK_MAX_SPEED_MPS
+    np.testing.assert_array_equal(registry.max_speeds([500, 800], {}), [FALLBACK_MAX_SPEED_MPS] * 2)
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""Dừng sớm: mặc định chạy đủ thế hệ như trước; hết giờ hoặc hủy vẫn trả về các thiết kế đã tính đầy đủ."""
+import random
+
+import numpy as np
+import pytest
+
+from core.optimizer.models import OptimizerSettings
+from core.optimizer.optimizer import Optimizer, evaluate_design
+from core.optimizer.population import weighted_fitness
+from core.optimizer.stopping import (STOP_CANCELLED, STOP_COMPLETED, STOP_CONVERGED, STOP_LOW_DIVERSITY,
+                                     STOP_TIME_BUDGET, EarlyStopping)
+
+
+@pytest.fixture
+def small_problem(all_params):
+    return all_params[0].replace(V_mps=None, Qt_tph=15, B_mm=800, L_m=20, H_m=0)
+
+
+def run(base, generations=4, **settings):
+    random.seed(5)
+    optimizer = Optimizer(base, OptimizerSettings(evaluation_backend="thread", **settings))
+    ranked = optimizer.run(generations=generations, population_size=16, elitism_count=2)
+    return optimizer, [(optimizer._genes(c), c.fitness_score) for c in ranked]
+
+
+def test_observe_without_early_stopping_never_converges():
+    stopping = EarlyStopping(OptimizerSettings(stagnation_generations=2, min_diversity=0.5))
+    assert all(stopping.observe(1.0, diversity=0.0) is None for _ in range(10))
+    assert stopping.stagnant_generations == 9
+
+
+def test_observe_converges_and_detects_low_diversity():
+    stopping = EarlyStopping(OptimizerSettings(early_stopping=True, stagnation_generations=3, min_diversity=0.0))
+    # Cải thiện nhỏ hơn min_relative_improvement không được tính là tiến bộ
+    assert [stopping.observe(v) for v in (10.0, 9.0, 8.9999, 9.5, 9.0)] == [None] * 4 + [STOP_CONVERGED]
+    assert stopping.best == 9.0
+
+    stopping = EarlyStopping(OptimizerSettings(early_stopping=True, stagnation_generations=6, min_diversity=0.1))
+    assert stopping.observe(5.0, diversity=0.01) is None
+    assert stopping.observe(5.0, diversity=0.5) is None
+    assert stopping.observe(5.0, diversity=0.01) == STOP_LOW_DIVERSITY
+
+
+def test_objective_keeps_running_while_best_design_improves():
+    # Thiết kế tốt nhất rẻ hơn sau mỗi thế hệ; fitness_score (chuẩn hóa min/max lại mỗi thế hệ) của nó vẫn không đổi
+    settings = OptimizerSettings(early_stopping=True, stagnation_generations=2)
+    normalized, stable = EarlyStopping(settings), EarlyStopping(settings)
+    per_generation_best, reasons = [], []
+    for best_cost in (1000.0, 900.0, 800.0, 700.0, 600.0):
+        arrays = (np.array([best_cost, 2000.0]), np.array([10.0, 20.0]), np.array([8.0, 8.0]),
+                  np.array([1.0, 3.0]), np.array([True, True]), np.zeros(2))
+        best = float(weighted_fitness(*arrays, settings).min())
+        per_generation_best.append(best)
+        normalized.observe(best)
+        reasons.append(stable.observe(stable.objective(*arrays)))
+    assert len(set(per_generation_best)) == 1 and normalized.stagnant_generations >= settings.stagnation_generations
+    assert reasons == [None] * 5 and stable.stagnant_generations == 0
+
+
+@pytest.mark.parametrize("encoding", ["objects", "matrix"])
+def test_stops_only_when_objective_stalls(small_problem, encoding, monkeypatch):
+    observed = []
+    original = EarlyStopping.objective
+
+    def spy(self, *arrays):
+        observed.append(original(self, *arrays))
+        return observed[-1]
+
+    monkeypatch.setattr(EarlyStopping, "objective", spy)
+    optimizer, ranked = run(small_problem, generations=30, early_stopping=True, stagnation_generations=3,
+                            min_relative_improvement=0.0, population_encoding=encoding)
+    assert ranked and optimizer.stop_reason == STOP_CONVERGED and len(observed) == optimizer.generations_run
+    # Dừng vì hội tụ chỉ khi mục tiêu (khoảng chuẩn hóa cố định) không giảm trong 3 thế hệ cuối
+    assert min(observed[-3:]) >= min(observed[:-3])
+
+
+def test_time_budget_and_cancel_always_apply():
+    assert EarlyStopping(OptimizerSettings(time_budget_s=0.0)).observe(1.0) == STOP_TIME_BUDGET
+    stopping = EarlyStopping(OptimizerSettings())
+    assert stopping.interrupted() is None
+    stopping.cancel_event.set()
+    assert stopping.observe(1.0) == STOP_CANCELLED
+
+
+def test_defaults_keep_full_run(small_problem):
+    optimizer, expected = run(small_problem)
+    assert (optimizer.stop_reason, optimizer.generations_run) == (STOP_COMPLETED, 4)
+    # Bật dừng sớm nhưng không tiêu chí nào thỏa: cùng kết quả với mặc định
+    _, actual = run(small_problem, early_stopping=True, stagnation_generations=100, min_diversity=0.0)
+    assert actual == expected
+
+
+def test_early_stopping_stops_on_stagnation(small_problem, capsys):
+    optimizer, ranked = run(small_problem, generations=30, early_stopping=True, stagnation_generations=1,
+                            min_relative_improvement=1.0)
+    assert optimizer.stop_reason == STOP_CONVERGED and optimizer.generations_run == 2
+    assert ranked and "Stopping after generation 2 (converged)" in capsys.readouterr().out
+
+
+def test_time_budget_returns_evaluated_designs(small_problem, assert_same_result):
+    optimizer, ranked = run(small_problem, generations=30, time_budget_s=0.0)
+    assert (optimizer.stop_reason, optimizer.generations_run) == (STOP_TIME_BUDGET, 1)
+    assert ranked and [(optimizer._genes(c), c.fitness_score) for c in optimizer.best_so_far] == ranked
+    best = optimizer.best_so_far[0]
+    assert_same_result(best.calculation_result, evaluate_design(small_problem, optimizer.settings, ranked[0][0])[0])
+
+
+def test_cancel_from_callback_keeps_best_so_far(small_problem):
+    optimizer = None
+    snapshots = []
+
+    def on_progress(stats):
+        snapshots.append([(optimizer._genes(c), c.fitness_score) for c in optimizer.best_so_far])
+        if stats.generation == 2:
+            optimizer.cancel()
+
+    random.seed(5)
+    optimizer = Optimizer(small_problem, OptimizerSettings(evaluation_backend="thread"))
+    ranked = optimizer.run(generations=10, population_size=16, elitism_count=2, progress_callback=on_progress)
+    assert (optimizer.stop_reason, optimizer.generations_run) == (STOP_CANCELLED, 2)
+    assert len(snapshots) == 2 and ranked
+    # best_so_far luôn là các thiết kế hợp lệ đã xếp theo fitness
+    assert all(s == sorted(s, key=lambda item: item[1]) for s in snapshots)
+    # Cờ hủy được xóa sau lần chạy: lần chạy sau chạy đủ
+    optimizer.run(generations=2, population_size=16, elitism_count=2)
+    assert (optimizer.stop_reason, optimizer.generations_run) == (STOP_COMPLETED, 2)
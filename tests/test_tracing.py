@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""Truy vết theo module: khi tắt, calculate() cho cùng kết quả và không in gì; khi bật, sự kiện được ghi đúng chỗ."""
+import json
+
+import pytest
+
+from core import tracing
+from core.engine import calculate
+
+
+@pytest.fixture(autouse=True)
+def clean_tracing():
+    """Mỗi test bắt đầu với truy vết tắt hoàn toàn và buffer rỗng."""
+    tracing.disable()
+    tracing.clear_buffer()
+    yield
+    tracing.disable()
+    tracing.clear_buffer()
+    tracing.set_buffer_size(tracing.DEFAULT_BUFFER_SIZE)
+
+
+def test_capture_does_not_change_result(params, capsys, assert_same_result):
+    expected = calculate(params)
+    assert capsys.readouterr().out == ""
+    with tracing.capture() as trace:
+        actual = calculate(params)
+    assert_same_result(actual, expected)
+    # capture() chỉ ghi vào bộ nhớ, không in gì ra stdout
+    assert capsys.readouterr().out == ""
+    counts = trace.counts()
+    assert counts[("core.engine", "belt_weight")] > 0
+    assert all(module.startswith("core") for module, _ in counts)
+    # Hết khối with thì truy vết tắt lại
+    assert not tracing.get_tracer("core.engine").enabled
+    calculate(params)
+    assert len(tracing.recent_events()) == len(trace)
+
+
+def test_disabled_tracer_skips_lazy_messages():
+    tracer = tracing.get_tracer("tests.lazy")
+    calls = []
+
+    def message():
+        calls.append(1)
+        return "đã format"
+
+    tracer.debug("event", message)
+    assert calls == [] and tracing.recent_events() == []
+    tracing.enable("tests", level=tracing.INFO)
+    tracer.debug("event", message)
+    tracer.info("event", message, value=3)
+    assert calls == [1]
+    (event,) = tracing.recent_events()
+    assert (event.level_name, event.message, event.fields) == ("INFO", "đã format", {"value": 3})
+
+
+def test_longest_prefix_wins_and_disable():
+    engine = tracing.get_tracer("tests.a.engine")
+    other = tracing.get_tracer("tests.b")
+    tracing.enable("tests", level="WARNING")
+    tracing.enable("tests.a", level="DEBUG")
+    assert engine.level == tracing.DEBUG and other.level == tracing.WARNING
+    tracing.disable("tests.a")
+    assert not engine.enabled and other.enabled
+    tracing.disable()
+    assert not engine.enabled and not other.enabled
+
+
+def test_configure_from_env_and_echo(capsys):
+    tracer = tracing.get_tracer("tests.env")
+    tracing.configure_from_env("tests.env:info:echo, other:ERROR")
+    assert tracer.level == tracing.INFO
+    assert tracing.get_tracer("other.module").level == tracing.ERROR
+    tracer.debug("hidden", "không in")
+    tracer.info("shown", "x", n=1)
+    assert capsys.readouterr().out.strip() == "INFO [tests.env] shown: x n=1"
+
+
+def test_ring_buffer_and_json(tmp_path):
+    tracing.set_buffer_size(3)
+    tracer = tracing.get_tracer("tests.buffer")
+    with tracing.capture("tests") as trace:
+        for i in range(5):
+            tracer.debug("step", i=i)
+    assert [e.fields["i"] for e in tracing.recent_events()] == [2, 3, 4]
+    assert [e.fields["i"] for e in tracing.recent_events(limit=1)] == [4]
+    # capture() giữ mọi sự kiện, không bị giới hạn bởi ring buffer
+    assert len(trace) == 5
+    path = tmp_path / "trace.json"
+    trace.to_json(str(path))
+    data = json.loads(path.read_text(encoding="utf-8"))
+    assert [d["fields"]["i"] for d in data] == list(range(5))
+    assert {d["level"] for d in data} == {"DEBUG"}
+
+
+def test_speed_table_warnings_go_through_tracer(tmp_path, capsys):
+    from core.speed_table import SpeedTableRegistry
+    registry = SpeedTableRegistry(str(tmp_path / "không có.csv"))
+    with tracing.capture("core.speed_table", level=tracing.WARNING) as trace:
+        assert registry.max_speed(800, {}) == 2.0
+    assert capsys.readouterr().out == ""
+    (event,) = trace.events
+    assert (event.level_name, event.event) == ("WARNING", "missing_file") and "không có.csv" in event.message
+
+
+def test_geometry_fallback_traceback_is_traced(params, monkeypatch):
+    from core import engine
+
+    def broken(label, default_deg=20.0):
+        raise ValueError("nhãn hỏng")
+
+    monkeypatch.setattr(engine, "parse_trough_label", broken)
+    with tracing.capture("core.engine", level=tracing.ERROR) as trace:
+        result = engine.CalculationResult()
+        result.belt_speed_mps = params.V_mps or 2.0
+        strategy = engine.get_strategy(params, result, {}, {})
+        strategy._compute_geometry_capacity()
+    (event,) = trace.events
+    assert event.level_name == "ERROR" and "Traceback" in event.message and "nhãn hỏng" in event.message
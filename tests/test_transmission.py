@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""Tìm bộ truyền động vector hóa (TransmissionGrid) phải chọn đúng nghiệm của vòng lặp vô hướng ban đầu."""
+import math
+
+import pytest
+
+from core.engine import find_optimal_transmission
+from core.models import TransmissionSolution
+from core.specs import ACTIVE_CHAIN_SPECS, CHAIN_TENSILE_STRENGTH_SAFETY_FACTOR, PREFERRED_CHAIN_RATIO, STANDARD_GEARBOX_RATIOS
+
+
+def reference_transmission(p, chain_specs, pulley_diameter, required_power_kw=None):
+    """Vòng lặp hộp số × z1 × xích và xếp hạng của find_optimal_transmission trước khi vector hóa."""
+    target_velocity, motor_rpm = p.V_mps, p.motor_rpm
+    rpm_pulley_required = (target_velocity * 60) / (math.pi * pulley_diameter / 1000)
+    use_manual = p.gearbox_ratio_mode.lower() == "manual" and p.gearbox_ratio_user > 0
+    solutions = []
+    for gearbox_ratio in ([p.gearbox_ratio_user] if use_manual else STANDARD_GEARBOX_RATIOS):
+        output_rpm = motor_rpm / gearbox_ratio
+        i_target = output_rpm / rpm_pulley_required
+        if i_target < 1.2 or i_target > 3.0:
+            if not use_manual:
+                continue
+            i_target = max(1.2, min(3.0, i_target))
+        for z1 in range(17, 26):
+            z2 = round(z1 * i_target)
+            if z2 < z1 or z2 > 120:
+                continue
+            i_total = gearbox_ratio * (z2 / z1)
+            velocity = (motor_rpm / i_total) * (math.pi * pulley_diameter / 1000) / 60
+            error = abs(velocity - target_velocity) / target_velocity * 100
+            for chain in chain_specs:
+                v_chain = max((chain.pitch_mm / 1000.0) * z1 * (output_rpm / 60.0), 1e-9)
+                force = (required_power_kw * 1000.0 / v_chain) / 1000.0 if required_power_kw else 0.5
+                allowable = (chain.tensile_strength_min_kn / CHAIN_TENSILE_STRENGTH_SAFETY_FACTOR
+                             if chain.tensile_strength_min_kn > 0.0 else float("inf"))
+                if force > allowable:
+                    continue
+                s = TransmissionSolution(
+                    gearbox_ratio=gearbox_ratio, drive_sprocket_teeth=z1, driven_sprocket_teeth=z2,
+                    chain_pitch_mm=chain.pitch_mm, actual_belt_velocity=velocity, error=error,
+                    chain_designation=chain.designation, total_transmission_ratio=i_total, chain_spec=chain,
+                    required_force_kN=force, allowable_kN=allowable, safety_margin=allowable / max(force, 1e-9),
+                    chain_weight_kgpm=chain.weight_kgpm)
+                s.gearbox_ratio_mode = "Manual" if use_manual else "Auto"
+                s.motor_output_rpm = output_rpm
+                s.actual_velocity_mps = velocity
+                s.velocity_error_percent = error
+                s.allowable_force_kN = allowable
+                s.chain_weight_kg_per_m = chain.weight_kgpm
+                solutions.append(s)
+    if not solutions:
+        return None
+    unique = {}
+    for s in solutions:
+        key = (s.drive_sprocket_teeth, s.driven_sprocket_teeth)
+        if key not in unique or s.error < unique[key].error:
+            unique[key] = s
+    last = (lambda s: -s.safety_margin * 0.1) if use_manual else (lambda s: -s.gearbox_ratio * 0.001)
+    return min(unique.values(), key=lambda s: (
+        s.error,
+        abs(s.driven_sprocket_teeth / s.drive_sprocket_teeth - PREFERRED_CHAIN_RATIO),
+        (s.drive_sprocket_teeth + s.driven_sprocket_teeth) * 0.1,
+        s.chain_spec.pitch_mm * 0.01,
+        last(s),
+    ))
+
+
+CASES = [
+    # (thay đổi tham số, đường kính puly, công suất yêu cầu)
+    (dict(V_mps=2.0), 500, 15.0),
+    (dict(V_mps=1.25, motor_rpm=960), 400, 4.0),
+    (dict(V_mps=3.15, motor_rpm=2900), 800, 250.0),
+    (dict(V_mps=2.5), 630, None),
+    (dict(V_mps=2.0), 500, 5000.0),  # quá tải với mọi xích
+    (dict(V_mps=1.6, gearbox_ratio_mode="manual", gearbox_ratio_user=40.0), 500, 10.0),
+    (dict(V_mps=2.0, gearbox_ratio_mode="manual", gearbox_ratio_user=100.0), 500, 10.0),  # i_s bị kẹp
+]
+
+
+@pytest.mark.parametrize("changes,pulley_diameter,power", CASES)
+def test_matches_scalar_search(all_params, changes, pulley_diameter, power):
+    p = all_params[0].replace(**changes)
+    expected = reference_transmission(p, list(ACTIVE_CHAIN_SPECS), pulley_diameter, power)
+    actual = find_optimal_transmission(p, ACTIVE_CHAIN_SPECS, pulley_diameter, power, use_atlas=False)
+    assert actual == expected
+
+
+def test_plain_chain_list(all_params):
+    p = all_params[0].replace(V_mps=2.0)
+    chains = [c for c in ACTIVE_CHAIN_SPECS if c.strand == 1 and c.pitch_mm >= 19.05]
+    expected = reference_transmission(p, chains, 500, 8.0)
+    assert expected is not None
+    assert find_optimal_transmission(p, chains, 500, 8.0) == expected
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""Atlas truyền động: dùng lại lưới giữa các công suất mà không đổi nghiệm."""
+import pytest
+
+from core.engine import calculate, find_optimal_transmission
+from core.specs import ACTIVE_CHAIN_SPECS
+from core.transmission_atlas import active_transmission_atlas, disable_transmission_atlas, enable_transmission_atlas
+
+POWERS = [None, 0.5, 4.0, 15.0, 60.0, 250.0, 5000.0]
+
+
+@pytest.fixture
+def atlas():
+    assert active_transmission_atlas() is None
+    yield enable_transmission_atlas()
+    disable_transmission_atlas()
+
+
+@pytest.mark.parametrize("changes", [dict(V_mps=2.0), dict(V_mps=1.6, gearbox_ratio_mode="manual", gearbox_ratio_user=40.0)])
+def test_grid_reused_across_powers(all_params, atlas, changes):
+    p = all_params[0].replace(**changes)
+    expected = [find_optimal_transmission(p, ACTIVE_CHAIN_SPECS, 500, power, use_atlas=False) for power in POWERS]
+    actual = [find_optimal_transmission(p, ACTIVE_CHAIN_SPECS, 500, power) for power in POWERS]
+
+    assert actual == expected
+    assert (atlas.misses, atlas.hits) == (1, len(POWERS) - 1)
+
+
+def test_calculate_unchanged(params, atlas, assert_same_result):
+    expected = calculate(params)
+    assert_same_result(calculate(params), expected)
+    assert_same_result(calculate(params), expected)
+    assert atlas.hits >= 1
+
+
+def test_capacity_evicts_oldest(all_params):
+    atlas = enable_transmission_atlas(capacity=2)
+    try:
+        p = all_params[0]
+        for v in (1.0, 2.0, 3.0):
+            find_optimal_transmission(p.replace(V_mps=v), ACTIVE_CHAIN_SPECS, 500, 10.0)
+        assert len(atlas) == 2
+        find_optimal_transmission(p.replace(V_mps=1.0), ACTIVE_CHAIN_SPECS, 500, 10.0)
+        assert atlas.misses == 4
+    finally:
+        disable_transmission_atlas()
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""Monte Carlo vector hóa: từng mẫu phải cho đúng kết quả của calculate() trên bộ tham số của mẫu đó."""
+import numpy as np
+import pytest
+
+from core.engine import calculate
+from core.uncertainty import FRICTION_FACTOR, Distribution, propagate_uncertainty
+
+DISTRIBUTIONS = {
+    "density_tpm3": Distribution.normal(0.9, 0.1, low=0.5),
+    "mu_pulley": Distribution.uniform(0.25, 0.35),
+    "Qt_tph": Distribution.triangular(200, 500, 800),
+    "L_m": Distribution.lognormal(120, 0.2),
+}
+
+
+def test_samples_match_scalar_calculate(params):
+    result = propagate_uncertainty(params, DISTRIBUTIONS, n_samples=64, seed=7)
+    for i in range(0, 64, 8):
+        sample = {name: values[i].item() for name, values in result.samples.items()}
+        expected = calculate(params.replace(**sample), with_transmission=False)
+        assert result.required_power_kw[i] == expected.required_power_kw
+        assert result.motor_power_kw[i] == expected.motor_power_kw
+        assert result.max_tension_N[i] == expected.max_tension
+        assert result.safety_factor[i] == expected.safety_factor
+
+
+def test_standard_friction_factor_matches_calculate(params):
+    f = 0.025 if params.calculation_standard == "DIN 22101" else 0.022
+    result = propagate_uncertainty(params, {FRICTION_FACTOR: Distribution.uniform(f, f)}, n_samples=4, seed=1)
+    expected = calculate(params, with_transmission=False)
+    np.testing.assert_array_equal(result.max_tension_N, np.full(4, expected.max_tension))
+    np.testing.assert_array_equal(result.safety_factor, np.full(4, expected.safety_factor))
+
+
+def test_friction_factor_raises_tension(all_params):
+    p = all_params[0]
+    low = propagate_uncertainty(p, {FRICTION_FACTOR: Distribution.uniform(0.018, 0.018)}, n_samples=2)
+    high = propagate_uncertainty(p, {FRICTION_FACTOR: Distribution.uniform(0.03, 0.03)}, n_samples=2)
+    assert np.all(high.max_tension_N > low.max_tension_N)
+
+
+def test_seeded_and_summarised(all_params):
+    p = all_params[0]
+    a = propagate_uncertainty(p, DISTRIBUTIONS, n_samples=500, seed=3)
+    b = propagate_uncertainty(p, DISTRIBUTIONS, n_samples=500, seed=3)
+    np.testing.assert_array_equal(a.safety_factor, b.safety_factor)
+    assert a.n_samples == 500
+    assert a.samples["L_m"].dtype == np.int64  # trường int được làm tròn
+    assert a.samples["density_tpm3"].min() >= 0.5
+    p5, p50, p95 = a.percentiles()["safety_factor"]
+    assert p5 <= p50 <= p95
+    assert 0.0 <= a.prob_sf_below_critical <= a.prob_sf_below_warning <= 1.0
+
+
+def test_unknown_parameter(all_params):
+    with pytest.raises(TypeError):
+        propagate_uncertainty(all_params[0], {"no_such_field": Distribution.uniform(0, 1)})
+    with pytest.raises(ValueError):
+        Distribution("weibull", 1.0).sample(np.random.default_rng(0), 3)
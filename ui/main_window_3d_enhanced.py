@@ -23,6 +23,7 @@ from core.db import load_database
 from .ad_banner_widget import AdBannerWidget
 import traceback
 import os
+import sys
 from pathlib import Path
 from dotenv import load_dotenv
 from core.licensing import assigned_account_id
@@ -449,6 +450,7 @@ class Enhanced3DConveyorWindow(QMainWindow):
         self.inputs.btn_calc.clicked.connect(self._full_calculate)
         self.inputs.btn_quick.clicked.connect(self._quick_calculate)
         self.inputs.btn_opt.clicked.connect(self._run_advanced_optimization) # Changed
+        self.inputs.btn_opt_stop.clicked.connect(self._stop_optimization)
         self.inputs.cbo_material.currentTextChanged.connect(self._on_material_changed)
         self.inputs.cbo_drive.currentTextChanged.connect(self.inputs.update_drive_illustration)
         # Kết nối các checkbox với phương thức vẽ lại biểu đồ
@@ -514,7 +516,7 @@ class Enhanced3DConveyorWindow(QMainWindow):
         return self.params
 
     def _start_thread(self, params: ConveyorParameters):
-        self.th = CalculationThread(params)
+        self.th = CalculationThread(params, self.current_result)
         self.th.progress_updated.connect(self.results.progress.setValue)
         self.th.status_updated.connect(self.statusBar().showMessage)
         self.th.calculation_finished.connect(self._on_finished)
@@ -572,7 +574,12 @@ class Enhanced3DConveyorWindow(QMainWindow):
             w_safety = cost_vs_safety,      # Kéo sang phải (1) là ưu tiên safety
             w_power = 0.3, # Giữ giá trị mặc định hoặc có thể thêm slider khác
             max_budget_usd=i.spn_max_budget.value() if i.spn_max_budget.value() > 0 else None,
-            min_belt_safety_factor=i.spn_min_safety_factor.value()
+            min_belt_safety_factor=i.spn_min_safety_factor.value(),
+            # Giao diện luôn cho phép dừng khi đã hội tụ (người dùng chờ kết quả, có nút dừng)
+            early_stopping=True,
+            time_budget_s=float(i.spn_time_budget.value()) if i.spn_time_budget.value() > 0 else None,
+            # Đánh giá đa tiến trình; bản đóng gói (PyInstaller) giữ luồng
+            evaluation_backend="thread" if getattr(sys, "frozen", False) else "process",
         )
 
         base_params = self._collect()
@@ -585,17 +592,35 @@ class Enhanced3DConveyorWindow(QMainWindow):
         self.opt_thread.started.connect(self.opt_worker.run)
         self.opt_worker.finished.connect(self._on_optimizer_finished)
         self.opt_worker.status.connect(self.statusBar().showMessage)
-        # self.opt_worker.progress.connect(self.results.progress.setValue) # Can be implemented later
+        self.opt_worker.progress.connect(self._on_optimizer_progress)
+        self.opt_worker.generation.connect(self.results.update_optimizer_progress)
         
         self.opt_thread.start()
         self._set_buttons(False)
+        self.inputs.btn_opt_stop.setEnabled(True)
         self.results.progress.setVisible(True)
         self.results.progress.setRange(0, 0) # Indeterminate progress bar
 
+    def _stop_optimization(self):
+        """Yêu cầu optimizer dừng sau thế hệ đang tính; kết quả tốt nhất hiện có về qua _on_optimizer_finished."""
+        if getattr(self, 'opt_worker', None) is None:
+            return
+        self.inputs.btn_opt_stop.setEnabled(False)
+        self.statusBar().showMessage("⏹️ Đang dừng tối ưu hóa sau thế hệ hiện tại...")
+        # Gọi trực tiếp (không qua signal): luồng của worker đang bận chạy optimizer
+        self.opt_worker.cancel()
+
+    def _on_optimizer_progress(self, percent: int):
+        """Chuyển thanh tiến độ từ chế độ chờ sang phần trăm khi optimizer bắt đầu báo tiến độ."""
+        if self.results.progress.maximum() == 0:
+            self.results.progress.setRange(0, 100)
+        self.results.progress.setValue(percent)
+
     def _on_optimizer_finished(self, results):
         self.results.progress.setVisible(False)
         self.results.progress.setRange(0, 100)
         self._set_buttons(True)
+        self.inputs.btn_opt_stop.setEnabled(False)
         
         # Reset thông báo trạng thái về trạng thái ban đầu
         self.inputs.lbl_optimization_status.setText("✅ Tối ưu hóa hoàn tất!")
@@ -314,9 +314,38 @@ class InputsPanel(QWidget):
             }
         """)
         
+        # Nút dừng tối ưu hóa: chỉ bật khi optimizer đang chạy
+        self.btn_opt_stop = QPushButton("DỪNG\nTỐI ƯU")
+        self.btn_opt_stop.setMinimumHeight(50)
+        self.btn_opt_stop.setEnabled(False)
+        self.btn_opt_stop.setToolTip("Dừng sau thế hệ đang tính và hiển thị kết quả tốt nhất hiện có.")
+        self.btn_opt_stop.setStyleSheet("""
+            QPushButton {
+                background-color: #ffffff;
+                color: #dc2626;
+                border: 2px solid #fca5a5;
+                border-radius: 8px;
+                padding: 8px 16px;
+                font-weight: 600;
+                font-size: 13px;
+                min-height: 50px;
+                margin: 5px;
+                text-align: center;
+            }
+            QPushButton:hover {
+                background-color: #fef2f2;
+                border-color: #ef4444;
+            }
+            QPushButton:disabled {
+                color: #9ca3af;
+                border-color: #e5e7eb;
+            }
+        """)
+
         btn_row.addWidget(self.btn_calc, 2)
         btn_row.addWidget(self.btn_quick, 1)
         btn_row.addWidget(self.btn_opt, 1)
+        btn_row.addWidget(self.btn_opt_stop, 1)
         
         # Thêm CSS cho container chứa nút để đảm bảo hiển thị
         btn_container = QWidget()
@@ -489,6 +518,14 @@ class InputsPanel(QWidget):
         self.spn_min_safety_factor.setRange(1.0, 20.0)
         self.spn_min_safety_factor.setDecimals(1)
         self.spn_min_safety_factor.setValue(8.0)
+
+        # Ngân sách thời gian cho một lần tối ưu (OptimizerSettings.time_budget_s), 0 = không giới hạn
+        self.spn_time_budget = QSpinBox()
+        self.spn_time_budget.setRange(0, 3600)
+        self.spn_time_budget.setSingleStep(10)
+        self.spn_time_budget.setSuffix(" s")
+        self.spn_time_budget.setSpecialValueText("Không giới hạn")
+        self.spn_time_budget.setToolTip("Dừng tối ưu hóa sau số giây này và trả về kết quả tốt nhất hiện có.")
         # --- [KẾT THÚC NÂNG CẤP TỐI ƯU HÓA] ---
 
     def _project_group(self) -> QGroupBox:
@@ -798,6 +835,7 @@ class InputsPanel(QWidget):
         constraints_layout = QFormLayout(constraints_group)
         constraints_layout.addRow("Ngân sách tối đa ($):", self.spn_max_budget)
         constraints_layout.addRow("HS An toàn băng >=", self.spn_min_safety_factor)
+        constraints_layout.addRow("Thời gian tối đa:", self.spn_time_budget)
         
         f.addRow(constraints_group)
 
@@ -1004,6 +1042,7 @@ class Enhanced3DResultsPanel(QWidget):
         l_opt.addWidget(self.tbl_optimizer_results)
         self.tabs.insertTab(0, w_opt, "🏆 Kết quả Tối ưu")
         self._optimizer_results_data = [] # To store the list of DesignCandidate
+        self._optimizer_column_keys = [] # Khóa (gene, fitness) của từng cột khi cập nhật trực tiếp
         # --- [KẾT THÚC NÂNG CẤP TỐI ƯU HÓA]
 
         # Tab Tổng quan
@@ -1305,9 +1344,26 @@ class Enhanced3DResultsPanel(QWidget):
         self._current_theme = "light"
 
     # --- [BẮT ĐẦU NÂNG CẤP TỐI ƯU HÓA]
+    # Các tham số hiển thị trong bảng kết quả tối ưu (mỗi tham số là một hàng)
+    _OPTIMIZER_PARAMETER_ROWS = [
+        ("Rank", "rank"),
+        ("Điểm Fitness", "fitness_score"),
+        ("Bề rộng (mm)", "belt_width_mm"),
+        ("Tốc độ tính (m/s)", "belt_speed_mps"),
+        ("Loại băng", "belt_type_name"),
+        ("Tỉ số truyền hộp số", "gearbox_ratio"),
+        ("Mã nhông xích", "chain_designation"),
+        ("Sai số vận tốc (%)", "velocity_error_percent"),
+        ("Tổng chi phí ($)", "cost_capital_total"),
+        ("Công suất (kW)", "required_power_kw"),
+        ("HS An toàn Băng", "safety_factor"),
+        ("HS An toàn Xích", "chain_safety_margin")
+    ]
+
     def update_optimizer_results(self, results: list):
         """Hiển thị kết quả từ optimizer vào bảng."""
         self._optimizer_results_data = results
+        self._optimizer_column_keys = []
         self.tbl_optimizer_results.clear()
         
         if not results:
@@ -1323,25 +1379,45 @@ class Enhanced3DResultsPanel(QWidget):
             self.tbl_optimizer_results.resizeColumnsToContents()
             self.tbl_optimizer_results.resizeRowsToContents()
             return
-            
-        # Định nghĩa các tham số cần hiển thị (mỗi tham số là một hàng)
-        parameter_rows = [
-            ("Rank", "rank"),
-            ("Điểm Fitness", "fitness_score"),
-            ("Bề rộng (mm)", "belt_width_mm"),
-            ("Tốc độ tính (m/s)", "belt_speed_mps"),
-            ("Loại băng", "belt_type_name"),
-            ("Tỉ số truyền hộp số", "gearbox_ratio"),
-            ("Mã nhông xích", "chain_designation"),
-            ("Sai số vận tốc (%)", "velocity_error_percent"),
-            ("Tổng chi phí ($)", "cost_capital_total"),
-            ("Công suất (kW)", "required_power_kw"),
-            ("HS An toàn Băng", "safety_factor"),
-            ("HS An toàn Xích", "chain_safety_margin")
-        ]
-        
+
+        self._setup_optimizer_table(len(results))
+        for col_idx, candidate in enumerate(results):
+            self._fill_optimizer_column(col_idx, candidate)
+        self._layout_optimizer_table()
+
+    def update_optimizer_progress(self, stats):
+        """
+        Cập nhật bảng trong lúc optimizer đang chạy (GenerationStats của OptimizerWorker.generation).
+
+        Chỉ các cột có thiết kế hoặc fitness thay đổi so với lần cập nhật trước mới được ghi lại.
+        """
+        top = list(stats.top)
+        if not top:
+            return
+        keys = getattr(self, "_optimizer_column_keys", [])
+        if len(keys) != len(top):
+            # Lần cập nhật đầu tiên (hoặc số cột thay đổi): dựng lại khung bảng
+            self.tbl_optimizer_results.clear()
+            self._setup_optimizer_table(len(top))
+            keys = [None] * len(top)
+            self._optimizer_column_keys = keys
+            relayout = True
+        else:
+            relayout = False
+        self._optimizer_results_data = top
+        for col_idx, candidate in enumerate(top):
+            key = (candidate.belt_width_mm, candidate.belt_type_name, candidate.gearbox_ratio,
+                   candidate.chain_spec_designation, round(candidate.fitness_score, 4))
+            if keys[col_idx] != key:
+                keys[col_idx] = key
+                self._fill_optimizer_column(col_idx, candidate)
+        if relayout:
+            self._layout_optimizer_table()
+
+    def _setup_optimizer_table(self, num_candidates: int):
+        """Dựng khung bảng: cột tên tham số và header cho num_candidates cột thiết kế."""
+        parameter_rows = self._OPTIMIZER_PARAMETER_ROWS
         # Số cột = số candidate + 1 (cột đầu tiên là tên tham số)
-        num_candidates = len(results)
         self.tbl_optimizer_results.setColumnCount(num_candidates + 1)
         self.tbl_optimizer_results.setRowCount(len(parameter_rows))
         
@@ -1351,110 +1427,109 @@ class Enhanced3DResultsPanel(QWidget):
         header_param.setForeground(QColor("#ffffff"))
         header_param.setFont(QFont("Arial", 10, QFont.Weight.Bold))
         self.tbl_optimizer_results.setHorizontalHeaderItem(0, header_param)
-        
-        # Đặt header cho các cột candidate
-        for i, candidate in enumerate(results):
-            header_item = QTableWidgetItem(f"Candidate {i + 1}")
-            header_item.setBackground(QColor("#3b82f6"))
-            header_item.setForeground(QColor("#ffffff"))
-            header_item.setFont(QFont("Arial", 9, QFont.Weight.Bold))
-            header_item.setToolTip(f"Rank: {i + 1}, Fitness: {candidate.fitness_score:.4f}")
-            self.tbl_optimizer_results.setHorizontalHeaderItem(i + 1, header_item)
-        
-        # Điền dữ liệu cho từng hàng (tham số)
-        for row_idx, (param_name, param_key) in enumerate(parameter_rows):
-            # Cột đầu tiên: tên tham số
+
+        # Cột đầu tiên: tên tham số
+        for row_idx, (param_name, _) in enumerate(parameter_rows):
             param_item = QTableWidgetItem(param_name)
             param_item.setBackground(QColor("#f8fafc"))
             param_item.setFont(QFont("Arial", 9, QFont.Weight.Bold))
             self.tbl_optimizer_results.setItem(row_idx, 0, param_item)
-            
-            # Các cột candidate: giá trị tham số
-            for col_idx, candidate in enumerate(results):
-                res = candidate.calculation_result
-                trans = getattr(res, 'transmission_solution', None)
-                
-                # Lấy giá trị dựa trên param_key
-                if param_key == "rank":
-                    value = str(col_idx + 1)
-                elif param_key == "fitness_score":
-                    value = f"{candidate.fitness_score:.4f}"
-                elif param_key == "belt_width_mm":
-                    value = str(candidate.belt_width_mm)
-                elif param_key == "belt_speed_mps":
-                    belt_speed = getattr(res, 'belt_speed_mps', 0.0)
-                    value = f"{belt_speed:.2f}"
-                elif param_key == "belt_type_name":
-                    value = candidate.belt_type_name
-                elif param_key == "gearbox_ratio":
-                    value = f"{candidate.gearbox_ratio:.2f}"
-                elif param_key == "chain_designation":
-                    chain_designation = getattr(trans, 'chain_designation', 'N/A') if trans else 'N/A'
-                    # Loại bỏ phần "(ANSI/ISO)" khỏi hiển thị
-                    if chain_designation != 'N/A' and chain_designation.endswith(' (ANSI/ISO)'):
-                        chain_designation = chain_designation.replace(' (ANSI/ISO)', '')
-                    elif chain_designation != 'N/A' and chain_designation.endswith(' (ANSI)'):
-                        chain_designation = chain_designation.replace(' (ANSI)', '')
-                    elif chain_designation != 'N/A' and chain_designation.endswith(' (ISO)'):
-                        chain_designation = chain_designation.replace(' (ISO)', '')
-                    value = chain_designation
-                elif param_key == "velocity_error_percent":
-                    velocity_error = getattr(trans, 'velocity_error_percent', 0.0) if trans else 0.0
-                    value = f"{velocity_error:.2f} %"
-                elif param_key == "cost_capital_total":
-                    value = f"{getattr(res, 'cost_capital_total', 0):,.0f}"
-                elif param_key == "required_power_kw":
-                    value = f"{getattr(res, 'required_power_kw', 0):.2f}"
-                elif param_key == "safety_factor":
-                    value = f"{getattr(res, 'safety_factor', 0):.2f}"
-                elif param_key == "chain_safety_margin":
-                    value = f"{getattr(trans, 'safety_margin', 0):.2f}" if trans else "N/A"
-                else:
-                    value = "N/A"
-                
-                # Tạo item và áp dụng định dạng đặc biệt
-                item = QTableWidgetItem(value)
-                
-                # Định dạng đặc biệt cho một số tham số
-                if param_key == "velocity_error_percent":
-                    velocity_error_val = getattr(trans, 'velocity_error_percent', 0.0) if trans else 0.0
-                    if velocity_error_val > 10.0:
-                        item.setBackground(QColor("#fef2f2"))
-                        item.setForeground(QColor("#dc2626"))
-                        item.setToolTip("⚠️ CẢNH BÁO: Sai số vượt quá 10%, hãy thay đổi tỉ số truyền hộp số")
-                
-                elif param_key == "fitness_score":
-                    # Màu xanh cho fitness score thấp (tốt)
-                    if candidate.fitness_score < 1000:
-                        item.setBackground(QColor("#f0fdf4"))
-                        item.setForeground(QColor("#166534"))
-                    elif candidate.fitness_score < 5000:
-                        item.setBackground(QColor("#fefce8"))
-                        item.setForeground(QColor("#a16207"))
-                
-                elif param_key == "safety_factor":
-                    # Màu cảnh báo cho safety factor thấp
-                    sf_val = getattr(res, 'safety_factor', 0)
-                    if sf_val < 5.0:
-                        item.setBackground(QColor("#fef2f2"))
-                        item.setForeground(QColor("#dc2626"))
-                        item.setToolTip("⚠️ CẢNH BÁO: Safety Factor thấp")
-                    elif sf_val < 8.0:
-                        item.setBackground(QColor("#fefce8"))
-                        item.setForeground(QColor("#a16207"))
-                        item.setToolTip("⚠️ CẢNH BÁO: Safety Factor trung bình")
-                
-                self.tbl_optimizer_results.setItem(row_idx, col_idx + 1, item)
 
+    def _layout_optimizer_table(self):
         self.tbl_optimizer_results.resizeColumnsToContents()
         self.tbl_optimizer_results.resizeRowsToContents()
         
         # Cải thiện hiển thị
         self.tbl_optimizer_results.setColumnWidth(0, 200)  # Cột tham số rộng hơn
-        for i in range(1, num_candidates + 1):
+        for i in range(1, self.tbl_optimizer_results.columnCount()):
             self.tbl_optimizer_results.setColumnWidth(i, 120)  # Các cột candidate đều nhau
         
         self.tabs.setCurrentIndex(0) # Chuyển sang tab kết quả tối ưu
+
+    def _fill_optimizer_column(self, col_idx: int, candidate):
+        """Ghi header và toàn bộ giá trị của một thiết kế vào cột col_idx + 1."""
+        header_item = QTableWidgetItem(f"Candidate {col_idx + 1}")
+        header_item.setBackground(QColor("#3b82f6"))
+        header_item.setForeground(QColor("#ffffff"))
+        header_item.setFont(QFont("Arial", 9, QFont.Weight.Bold))
+        header_item.setToolTip(f"Rank: {col_idx + 1}, Fitness: {candidate.fitness_score:.4f}")
+        self.tbl_optimizer_results.setHorizontalHeaderItem(col_idx + 1, header_item)
+
+        res = candidate.calculation_result
+        trans = getattr(res, 'transmission_solution', None)
+        for row_idx, (_, param_key) in enumerate(self._OPTIMIZER_PARAMETER_ROWS):
+            # Lấy giá trị dựa trên param_key
+            if param_key == "rank":
+                value = str(col_idx + 1)
+            elif param_key == "fitness_score":
+                value = f"{candidate.fitness_score:.4f}"
+            elif param_key == "belt_width_mm":
+                value = str(candidate.belt_width_mm)
+            elif param_key == "belt_speed_mps":
+                belt_speed = getattr(res, 'belt_speed_mps', 0.0)
+                value = f"{belt_speed:.2f}"
+            elif param_key == "belt_type_name":
+                value = candidate.belt_type_name
+            elif param_key == "gearbox_ratio":
+                value = f"{candidate.gearbox_ratio:.2f}"
+            elif param_key == "chain_designation":
+                chain_designation = getattr(trans, 'chain_designation', 'N/A') if trans else 'N/A'
+                # Loại bỏ phần "(ANSI/ISO)" khỏi hiển thị
+                if chain_designation != 'N/A' and chain_designation.endswith(' (ANSI/ISO)'):
+                    chain_designation = chain_designation.replace(' (ANSI/ISO)', '')
+                elif chain_designation != 'N/A' and chain_designation.endswith(' (ANSI)'):
+                    chain_designation = chain_designation.replace(' (ANSI)', '')
+                elif chain_designation != 'N/A' and chain_designation.endswith(' (ISO)'):
+                    chain_designation = chain_designation.replace(' (ISO)', '')
+                value = chain_designation
+            elif param_key == "velocity_error_percent":
+                velocity_error = getattr(trans, 'velocity_error_percent', 0.0) if trans else 0.0
+                value = f"{velocity_error:.2f} %"
+            elif param_key == "cost_capital_total":
+                value = f"{getattr(res, 'cost_capital_total', 0):,.0f}"
+            elif param_key == "required_power_kw":
+                value = f"{getattr(res, 'required_power_kw', 0):.2f}"
+            elif param_key == "safety_factor":
+                value = f"{getattr(res, 'safety_factor', 0):.2f}"
+            elif param_key == "chain_safety_margin":
+                value = f"{getattr(trans, 'safety_margin', 0):.2f}" if trans else "N/A"
+            else:
+                value = "N/A"
+            
+            # Tạo item và áp dụng định dạng đặc biệt
+            item = QTableWidgetItem(value)
+            
+            # Định dạng đặc biệt cho một số tham số
+            if param_key == "velocity_error_percent":
+                velocity_error_val = getattr(trans, 'velocity_error_percent', 0.0) if trans else 0.0
+                if velocity_error_val > 10.0:
+                    item.setBackground(QColor("#fef2f2"))
+                    item.setForeground(QColor("#dc2626"))
+                    item.setToolTip("⚠️ CẢNH BÁO: Sai số vượt quá 10%, hãy thay đổi tỉ số truyền hộp số")
+            
+            elif param_key == "fitness_score":
+                # Màu xanh cho fitness score thấp (tốt)
+                if candidate.fitness_score < 1000:
+                    item.setBackground(QColor("#f0fdf4"))
+                    item.setForeground(QColor("#166534"))
+                elif candidate.fitness_score < 5000:
+                    item.setBackground(QColor("#fefce8"))
+                    item.setForeground(QColor("#a16207"))
+            
+            elif param_key == "safety_factor":
+                # Màu cảnh báo cho safety factor thấp
+                sf_val = getattr(res, 'safety_factor', 0)
+                if sf_val < 5.0:
+                    item.setBackground(QColor("#fef2f2"))
+                    item.setForeground(QColor("#dc2626"))
+                    item.setToolTip("⚠️ CẢNH BÁO: Safety Factor thấp")
+                elif sf_val < 8.0:
+                    item.setBackground(QColor("#fefce8"))
+                    item.setForeground(QColor("#a16207"))
+                    item.setToolTip("⚠️ CẢNH BÁO: Safety Factor trung bình")
+            
+            self.tbl_optimizer_results.setItem(row_idx, col_idx + 1, item)
+
     # --- [KẾT THÚC NÂNG CẤP TỐI ƯU HÓA] ---
 
     @Slot()